@@ -0,0 +1,394 @@
+# app/agents/mock_model.py
+"""
+Ağ bağlantısı gerektirmeyen, deterministik mock Gemini modeli.
+
+`MODEL_PROVIDER=mock` iken `build_model()` Gemini yerine bu modeli döner; agent'lar
+aynı registry/`Agent` yolundan oluşturulur, böylece servisin tamamı Vertex
+kimlik bilgisi ve maliyet olmadan benchmark edilebilir.
+
+Davranış:
+- Cevaplar Türkçe satınalma cümlelerinden üretilir; aynı seed ve aynı mesaj
+  her zaman aynı cevabı ve aynı zamanlamayı verir (`MOCK_MODEL_SEED`)
+- `response_format` (output_schema) verilirse şemaya uygun JSON döner
+  (`SatinalmaReply`, `RoutingResponse`)
+- Stream'de output_schema kapatıldığı için şema run'ın agent'ından bulunur;
+  satınalma agent'ı mail istenen turlarda SatinalmaReply alanlarını
+  `---JSON---` trailer'ı olarak ekler
+- `MODE: EMAIL` prompt'larında `send_email` tool çağrısı üretir, tool sonucu
+  geldikten sonra özet cevap verir
+- İlk token süresi log-normal dağılımlıdır (`MOCK_MODEL_TTFT_MS` medyan,
+  `MOCK_MODEL_TTFT_P95_MS` p95); sonraki parçalar `MOCK_MODEL_TOKEN_MS` aralıkla gelir
+- `MOCK_MODEL_ERROR_RATE` oranında 503, `MOCK_MODEL_RATE_LIMIT_RPM` aşılınca 429
+  (agno `ModelProviderError`) fırlatılır
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Type, get_args, get_origin
+
+from agno.exceptions import ModelProviderError
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+from pydantic import BaseModel
+
+from app.configs.settings import settings
+
+_SENTENCES = (
+    "Satınalma talebiniz için önce ilgili bütçe kaleminin onaylanmış olması gerekiyor.",
+    "Yönetmeliğe göre bu tutardaki alımlarda en az üç tedarikçiden teklif alınmalıdır.",
+    "Talep formu birim amiri tarafından imzalandıktan sonra satınalma birimine iletilir.",
+    "Doğrudan temin kapsamındaki alımlar için piyasa araştırması tutanağı hazırlanır.",
+    "Teslim alınan malzemeler muayene ve kabul komisyonu tarafından kontrol edilir.",
+    "Fatura, kabul tutanağı ile birlikte mali işler birimine en geç beş iş günü içinde gönderilmelidir.",
+    "Acil alımlarda gerekçe yazısı ile birlikte rektörlük onayı alınması gerekmektedir.",
+    "Sözleşme gerektiren alımlarda hukuk müşavirliğinin görüşü alınır.",
+    "Teknik şartnamede marka belirtilmemesi ve rekabeti kısıtlamaması gerekir.",
+    "Süreç hakkında detaylı bilgi için satınalma biriminin iç yönergesine başvurabilirsiniz.",
+    "Bu konuda ilgili dokümanda belirtilen limitler her yıl güncellenmektedir.",
+    "Tedarikçi seçimi sonrası sipariş formu sistem üzerinden oluşturulur.",
+)
+_EMAIL_WORDS = ("mail", "e-posta", "eposta", "gönder", "gonder", "ilet")
+
+
+@dataclass
+class MockTiming:
+    """Tek bir cevabın zamanlaması (saniye)."""
+    ttft: float
+    token_interval: float
+
+
+def _seed_for(*parts: str) -> int:
+    digest = hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _estimate_tokens(text: str) -> int:
+    # Türkçe için kaba tahmin: kelime başına ~1.4 token
+    return max(1, math.ceil(len(text.split()) * 1.4)) if text else 0
+
+
+def _message_text(message: Message) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return "" if content is None else str(content)
+
+
+class _RateLimiter:
+    """Dakika başına istek limiti (kayan pencere)."""
+
+    def __init__(self, rpm: int):
+        self.rpm = rpm
+        self._calls: List[float] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        if self.rpm <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            self._calls = [t for t in self._calls if now - t < 60.0]
+            if len(self._calls) >= self.rpm:
+                return False
+            self._calls.append(now)
+            return True
+
+
+_rate_limiters: Dict[str, _RateLimiter] = {}
+
+
+@dataclass
+class MockGemini(Model):
+    """agno Model arayüzünü uygulayan offline Gemini yerine geçen model."""
+
+    id: str = "mock-gemini"
+    name: str = "MockGemini"
+    provider: str = "Mock"
+    supports_native_structured_outputs: bool = True
+
+    seed: int = 0
+    ttft_ms: float = 400.0
+    ttft_p95_ms: float = 1200.0
+    token_ms: float = 25.0
+    words_per_chunk: int = 3
+    reply_sentences: int = 4
+    error_rate: float = 0.0
+    rate_limit_rpm: int = 0
+
+    # --- Üretim ---
+
+    def _rng(self, messages: List[Message]) -> random.Random:
+        last_user = next((_message_text(m) for m in reversed(messages) if m.role == "user"), "")
+        return random.Random(_seed_for(str(self.seed), self.id, last_user, str(len(messages))))
+
+    def _timing(self, rng: random.Random) -> MockTiming:
+        median = max(self.ttft_ms, 0.0) / 1000
+        p95 = max(self.ttft_p95_ms / 1000, median)
+        sigma = math.log(p95 / median) / 1.645 if median > 0 and p95 > median else 0.0
+        ttft = median * math.exp(rng.gauss(0.0, sigma)) if median > 0 else 0.0
+        return MockTiming(ttft=ttft, token_interval=max(self.token_ms, 0.0) / 1000)
+
+    def _check_faults(self, rng: random.Random) -> None:
+        limiter = _rate_limiters.setdefault(self.id, _RateLimiter(self.rate_limit_rpm))
+        limiter.rpm = self.rate_limit_rpm
+        if not limiter.acquire():
+            raise ModelProviderError(
+                message="Mock rate limit exceeded", status_code=429, model_name=self.name, model_id=self.id
+            )
+        if self.error_rate > 0 and rng.random() < self.error_rate:
+            raise ModelProviderError(
+                message="Mock injected error", status_code=503, model_name=self.name, model_id=self.id
+            )
+
+    def _reply_text(self, rng: random.Random) -> str:
+        count = max(1, self.reply_sentences + rng.randint(-1, 1))
+        return " ".join(rng.sample(_SENTENCES, min(count, len(_SENTENCES))))
+
+    def _field_value(self, name: str, annotation: Any, rng: random.Random, user_text: str, reply: str) -> Any:
+        wants_email = any(word in user_text.lower() for word in _EMAIL_WORDS)
+        if name == "reply":
+            return reply
+        if name == "target_agent_id":
+            from app.agents.registry import get_agent_registry
+
+            domain_ids = get_agent_registry().domain_ids()
+            return domain_ids[rng.randrange(len(domain_ids))] if domain_ids else "satinalma-pdf-agent"
+        if name == "reason":
+            return "Mesaj satınalma süreçleriyle ilgili olduğu için satınalma agent'ına yönlendirildi."
+        if name == "email_intent":
+            return wants_email
+        if name.startswith("email_"):
+            if not wants_email:
+                return None
+            return {
+                "email_recipient_hint": "satınalma birimi",
+                "email_subject_suggestion": "Satınalma talebi hakkında bilgi",
+                "email_body_suggestion": f"Merhaba,\n\n{reply}\n\nSaygılarımla",
+            }.get(name, reply)
+        origin = get_origin(annotation)
+        if origin is not None and type(None) in get_args(annotation):
+            return None
+        if annotation is bool:
+            return False
+        if annotation in (int, float):
+            return annotation(0)
+        return reply
+
+    def _structured(
+        self, schema: Type[BaseModel], rng: random.Random, user_text: str, reply: str
+    ) -> BaseModel:
+        values = {
+            name: self._field_value(name, field.annotation, rng, user_text, reply)
+            for name, field in schema.model_fields.items()
+        }
+        return schema(**values)
+
+    @staticmethod
+    def _stream_schema(run_response: Optional[Any]) -> Optional[Type[BaseModel]]:
+        """Stream'de `run_agent` output_schema'yı kapatır; şema run'ın agent'ından bulunur."""
+        from app.configs.agent_ids import AgentID
+
+        if getattr(run_response, "agent_id", None) != AgentID.SATINALMA_PDF.value:
+            return None
+        from app.agents.satinalma_agent import SatinalmaReply
+
+        return SatinalmaReply
+
+    def _plan(
+        self,
+        messages: List[Message],
+        response_format: Optional[Any],
+        tools: Optional[List[Any]],
+        stream: bool,
+        run_response: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """Bu tur için cevabı hazırlar: içerik, parse edilmiş çıktı veya tool çağrısı."""
+        rng = self._rng(messages)
+        self._check_faults(rng)
+        timing = self._timing(rng)
+        user_text = next((_message_text(m) for m in reversed(messages) if m.role == "user"), "")
+        input_tokens = sum(_estimate_tokens(_message_text(m)) for m in messages)
+        tool_names = [self._tool_name(tool) for tool in tools or []]
+
+        # EMAIL modu: önce send_email çağrısı, tool sonucu gelince özet
+        if "MODE: EMAIL" in user_text and messages[-1].role != "tool" and "send_email" in tool_names:
+            arguments = {
+                "to": settings.mail.mail_default_recipient,
+                "subject": "Satınalma talebi hakkında bilgi",
+                "body": f"Merhaba,\n\n{self._reply_text(rng)}\n\nSaygılarımla",
+            }
+            return {
+                "timing": timing,
+                "tool_calls": [
+                    {
+                        "id": f"call_{rng.getrandbits(48):012x}",
+                        "type": "function",
+                        "function": {"name": "send_email", "arguments": json.dumps(arguments, ensure_ascii=False)},
+                    }
+                ],
+                "content": "",
+                "input_tokens": input_tokens,
+            }
+        if messages[-1].role == "tool":
+            content = f"Mail gönderim sonucu: {_message_text(messages[-1])}. Talebiniz ilgili birime iletildi."
+            return {"timing": timing, "content": content, "input_tokens": input_tokens}
+
+        reply = self._reply_text(rng)
+        schema = response_format if isinstance(response_format, type) and issubclass(response_format, BaseModel) else None
+        if schema is None and stream:
+            schema = self._stream_schema(run_response)
+        if schema is None:
+            return {"timing": timing, "content": reply, "input_tokens": input_tokens}
+        parsed = self._structured(schema, rng, user_text, reply)
+        if stream and "email_intent" in schema.model_fields:
+            if not parsed.email_intent:
+                return {"timing": timing, "content": reply, "input_tokens": input_tokens}
+            # Stream'de structured alanlar cevabın sonunda trailer olarak gelir
+            trailer = parsed.model_dump(exclude={"reply"})
+            content = f"{reply}\n\n---JSON---\n{json.dumps(trailer, ensure_ascii=False)}\n---END---"
+            return {"timing": timing, "content": content, "input_tokens": input_tokens}
+        return {
+            "timing": timing,
+            "content": parsed.model_dump_json(),
+            "parsed": parsed,
+            "input_tokens": input_tokens,
+        }
+
+    @staticmethod
+    def _tool_name(tool: Any) -> str:
+        if isinstance(tool, dict):
+            return tool.get("function", {}).get("name") or tool.get("name", "")
+        return getattr(tool, "name", "")
+
+    @staticmethod
+    def _chunks(content: str, words_per_chunk: int) -> List[str]:
+        words = content.split(" ")
+        size = max(1, words_per_chunk)
+        return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+    @staticmethod
+    def _usage(plan: Dict[str, Any]) -> Metrics:
+        output_tokens = _estimate_tokens(plan.get("content", "")) + 20 * len(plan.get("tool_calls", []))
+        return Metrics(
+            input_tokens=plan["input_tokens"],
+            output_tokens=output_tokens,
+            total_tokens=plan["input_tokens"] + output_tokens,
+        )
+
+    def _final_response(self, plan: Dict[str, Any]) -> ModelResponse:
+        response = ModelResponse(role="assistant", content=plan.get("content") or None)
+        response.parsed = plan.get("parsed")
+        response.tool_calls = plan.get("tool_calls", [])
+        response.response_usage = self._usage(plan)
+        return response
+
+    def _generation_seconds(self, plan: Dict[str, Any]) -> float:
+        chunks = len(self._chunks(plan.get("content", ""), self.words_per_chunk))
+        return plan["timing"].ttft + max(chunks - 1, 0) * plan["timing"].token_interval
+
+    # --- agno Model arayüzü ---
+
+    def invoke(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Any] = None,
+        tools: Optional[List[Any]] = None,
+        tool_choice: Optional[Any] = None,
+        run_response: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        plan = self._plan(messages, response_format, tools, stream=False)
+        time.sleep(self._generation_seconds(plan))
+        return self._final_response(plan)
+
+    async def ainvoke(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Any] = None,
+        tools: Optional[List[Any]] = None,
+        tool_choice: Optional[Any] = None,
+        run_response: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        plan = self._plan(messages, response_format, tools, stream=False)
+        await asyncio.sleep(self._generation_seconds(plan))
+        return self._final_response(plan)
+
+    def invoke_stream(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Any] = None,
+        tools: Optional[List[Any]] = None,
+        tool_choice: Optional[Any] = None,
+        run_response: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> Iterator[ModelResponse]:
+        plan = self._plan(messages, response_format, tools, stream=True, run_response=run_response)
+        timing = plan["timing"]
+        time.sleep(timing.ttft)
+        for index, chunk in enumerate(self._chunks(plan.get("content", ""), self.words_per_chunk)):
+            if index:
+                time.sleep(timing.token_interval)
+            yield ModelResponse(role="assistant", content=chunk)
+        final = self._final_response({**plan, "parsed": None})
+        final.content = None
+        yield final
+
+    async def ainvoke_stream(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Any] = None,
+        tools: Optional[List[Any]] = None,
+        tool_choice: Optional[Any] = None,
+        run_response: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ModelResponse]:
+        plan = self._plan(messages, response_format, tools, stream=True, run_response=run_response)
+        timing = plan["timing"]
+        await asyncio.sleep(timing.ttft)
+        for index, chunk in enumerate(self._chunks(plan.get("content", ""), self.words_per_chunk)):
+            if index:
+                await asyncio.sleep(timing.token_interval)
+            yield ModelResponse(role="assistant", content=chunk)
+        # Son parça tool çağrılarını ve token kullanımını taşır
+        final = self._final_response({**plan, "parsed": None})
+        final.content = None
+        yield final
+
+    def _parse_provider_response(self, response: Any, **kwargs: Any) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
+
+
+def build_mock_model(model_id: Optional[str] = None, **params: Any) -> MockGemini:
+    """
+    Ayarlardan mock model oluşturur; agents.json'daki Gemini'ye özgü
+    parametreler (temperature, top_p...) yok sayılır.
+    """
+    config = settings.model
+    return MockGemini(
+        id=model_id or settings.gemini_model_name,
+        seed=config.mock_model_seed,
+        ttft_ms=config.mock_model_ttft_ms,
+        ttft_p95_ms=config.mock_model_ttft_p95_ms,
+        token_ms=config.mock_model_token_ms,
+        words_per_chunk=config.mock_model_words_per_chunk,
+        reply_sentences=config.mock_model_reply_sentences,
+        error_rate=config.mock_model_error_rate,
+        rate_limit_rpm=config.mock_model_rate_limit_rpm,
+    )
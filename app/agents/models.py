@@ -0,0 +1,37 @@
+# app/agents/models.py
+"""
+Agent model fabrikası.
+Model sınıfları ve Google kimlik doğrulaması ilk model oluşturulurken yüklenir.
+`MODEL_PROVIDER=mock` iken offline mock model döner (app/agents/mock_model.py).
+"""
+from typing import Any, Optional
+
+from app.configs.settings import ensure_google_credentials, settings
+
+
+def build_model(model_id: Optional[str] = None, **params: Any) -> Any:
+    """
+    Agent'lar için Gemini modeli (Vertex AI) veya MODEL_PROVIDER=mock ise mock model oluşturur.
+
+    Args:
+        model_id: Model adı; None ise GEMINI_MODEL_NAME kullanılır
+        **params: Gemini parametreleri (temperature, top_p, max_output_tokens...)
+
+    Returns:
+        agno Gemini (veya MockGemini) model instance'ı
+    """
+    if settings.model.model_provider == "mock":
+        from app.agents.mock_model import build_mock_model
+
+        return build_mock_model(model_id, **params)
+
+    from agno.models.google import Gemini
+
+    ensure_google_credentials()
+    return Gemini(
+        id=model_id or settings.gemini_model_name,
+        vertexai=True,
+        project_id=settings.project_id,
+        location=settings.location,
+        **params,
+    )
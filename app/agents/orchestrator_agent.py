@@ -3,16 +3,14 @@
 Orchestrator agent'ı.
 Kullanıcı sorgularını uygun domain agent'larına yönlendirir ve mail işlemlerini yönetir.
 """
-from typing import Optional
+from typing import TYPE_CHECKING, Any
 
-from agno.agent import Agent
-from agno.models.google import Gemini
 from pydantic import BaseModel, Field
 
 from app.configs.agent_ids import AgentID
-from app.configs.settings import settings
-from app.db.sqlite import agent_db
-from app.tools.mail_tools import MailTools
+
+if TYPE_CHECKING:
+    from agno.agent import Agent
 
 
 class RoutingResponse(BaseModel):
@@ -29,27 +27,15 @@ class RoutingResponse(BaseModel):
     )
 
 
-# Gemini model (Vertex AI)
-orchestrator_model = Gemini(
-    id=settings.gemini_model_name,
-    vertexai=True,
-    project_id=settings.project_id,
-    location=settings.location,
-)
-
-# Mail tools instance
-mail_tools = MailTools()
-
-# Orchestrator agent tanımı
-orchestrator_agent = Agent(
-    id=AgentID.ORCHESTRATOR.value,
-    name="Orchestrator Agent",
-    model=orchestrator_model,
-    db=agent_db,
-    tools=[mail_tools],
-    add_history_to_context=True,
-    num_history_runs=10,
-    markdown=True,
-    instructions=settings.orchestrator_agent_instructions,
-    output_schema=RoutingResponse,
-)
+def get_orchestrator_agent() -> "Agent":
+    """Orchestrator agent'ı registry'den döner (ilk çağrıda oluşturulur)."""
+    from app.agents.registry import get_agent
+
+    return get_agent(AgentID.ORCHESTRATOR.value)
+
+
+def __getattr__(name: str) -> Any:
+    # Geriye uyumluluk: `from app.agents.orchestrator_agent import orchestrator_agent`
+    if name == "orchestrator_agent":
+        return get_orchestrator_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
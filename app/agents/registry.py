@@ -0,0 +1,365 @@
+# app/agents/registry.py
+"""
+Konfigürasyon tabanlı agent registry.
+
+Agent'lar `AGENT_CONFIG_FILE` (varsayılan app/configs/agents.json) içinde
+tanımlanır; registry sadece spec'leri okur, agent ilk kullanımda oluşturulur
+ve sonra yeniden kullanılır. Kullanılmayan agent'lar (ör. HR, IT) startup
+süresine ve belleğe eklenmez.
+
+Reload (admin endpoint veya dosya izleme) talimatları ve model parametrelerini
+restart olmadan günceller: değişen agent'lar için yeni instance oluşturulur,
+devam eden stream'ler eski instance ile tamamlanır. Model parametreleri
+değişmediyse mevcut model (ve bağlantı havuzu) yeni instance'a aktarılır.
+"""
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.configs.settings import reload_agent_settings, settings
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+class AgentSpec(BaseModel):
+    """
+    agents.json içindeki tek agent tanımı.
+
+    Talimat kaynağı önceliği: `instructions` > `instructions_file` > `instructions_setting`.
+    `output_schema` ve `tools` "modul.yolu:Isim" formatındadır ve agent
+    oluşturulurken import edilir.
+    """
+    id: str
+    role: str = Field(default="domain", description="'orchestrator' veya 'domain'")
+    name: str
+    display_name: Optional[str] = None
+    instructions: Optional[str] = None
+    instructions_file: Optional[str] = None
+    instructions_setting: Optional[str] = None
+    model: Dict[str, Any] = Field(default_factory=dict)
+    output_schema: Optional[str] = None
+    tools: List[str] = Field(default_factory=list)
+    add_history_to_context: bool = True
+    num_history_runs: int = 10
+    markdown: bool = True
+    # Kullanıcı başına hız limitleri ve adil kuyruk ağırlığı (RATE_LIMIT_* varsayılanlarını ezer):
+    # requests_per_minute, request_burst, tokens_per_minute, token_burst, weight, max_concurrency
+    limits: Dict[str, float] = Field(default_factory=dict)
+    # AgentOS'a kayıtlı agent'lar create_app'te oluşturulur
+    agent_os: bool = False
+    enabled: bool = True
+
+
+def _resolve_path(path: str, base: Path) -> Path:
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = (base / resolved) if (base / resolved).exists() else PROJECT_ROOT / resolved
+    return resolved
+
+
+def _import_object(path: str) -> Any:
+    """'paket.modul:Isim' yolundaki objeyi import eder."""
+    module_name, _, attr = path.partition(":")
+    if not attr:
+        raise ValueError(f"Geçersiz import yolu (modul:isim bekleniyor): {path}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def load_agent_specs(config_file: Path) -> Dict[str, AgentSpec]:
+    """
+    Agent config dosyasını okur ve doğrular.
+
+    Raises:
+        ValueError: Dosya geçersizse veya aynı id birden fazla tanımlıysa
+    """
+    with open(config_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    specs: Dict[str, AgentSpec] = {}
+    for entry in data.get("agents", []):
+        spec = AgentSpec(**entry)
+        if spec.id in specs:
+            raise ValueError(f"Agent id birden fazla tanımlı: {spec.id}")
+        if spec.enabled:
+            specs[spec.id] = spec
+    return specs
+
+
+class AgentRegistry:
+    """
+    Agent spec'lerini ve oluşturulmuş agent instance'larını tutar.
+
+    Args:
+        config_file: Agent config dosyası
+        builder: spec, mevcut model (veya None) ve talimatlardan agent oluşturan fonksiyon
+    """
+
+    def __init__(self, config_file: str, builder: Optional[Callable[[AgentSpec, Optional[Any], str], Any]] = None):
+        self.config_file = _resolve_path(config_file, Path.cwd())
+        self.builder = builder or build_agent
+        self.specs: Dict[str, AgentSpec] = load_agent_specs(self.config_file)
+        self._instances: Dict[str, Any] = {}
+        self._fingerprints: Dict[str, str] = {}
+        # (agent_id, model_id) -> farklı modelle oluşturulmuş agent (ör. kota düşürmesi)
+        self._variants: Dict[Tuple[str, str], Any] = {}
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self.version = 1
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self._watched_mtimes = self._mtimes()
+
+    # --- Sorgular ---
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self.specs
+
+    def domain_ids(self) -> List[str]:
+        """Orchestrator'ın yönlendirebileceği agent id'leri."""
+        return [spec.id for spec in self.specs.values() if spec.role == "domain"]
+
+    def orchestrator_id(self) -> str:
+        for spec in self.specs.values():
+            if spec.role == "orchestrator":
+                return spec.id
+        raise KeyError("Agent config'inde orchestrator tanımlı değil")
+
+    def display_name(self, agent_id: str) -> str:
+        spec = self.specs.get(agent_id)
+        return (spec.display_name or spec.name) if spec else agent_id
+
+    def instructions_for(self, spec: AgentSpec) -> str:
+        """Spec'in talimat metnini kaynağından okur."""
+        if spec.instructions is not None:
+            return spec.instructions
+        if spec.instructions_file:
+            path = _resolve_path(spec.instructions_file, self.config_file.parent)
+            return path.read_text(encoding="utf-8")
+        if spec.instructions_setting:
+            return getattr(settings.agent, spec.instructions_setting)
+        raise ValueError(f"Agent talimat kaynağı tanımlı değil: {spec.id}")
+
+    # --- Instance'lar ---
+
+    def get(self, agent_id: str, model_id: Optional[str] = None) -> Any:
+        """
+        Agent'ı döner; ilk çağrıda oluşturur.
+
+        Args:
+            agent_id: Agent ID
+            model_id: Verilirse ve spec'teki modelden farklıysa agent bu modelle
+                oluşturulur (ör. kota aşımında düşük maliyetli model)
+
+        Raises:
+            KeyError: agent_id registry'de yoksa
+        """
+        if model_id and model_id != self.specs[agent_id].model.get("id", settings.google.gemini_model_name):
+            return self._variant(agent_id, model_id)
+        agent = self._instances.get(agent_id)
+        if agent is None:
+            spec = self.specs[agent_id]
+            started = time.perf_counter()
+            agent = self.builder(spec, None, self.instructions_for(spec))
+            self._instances[agent_id] = agent
+            self._fingerprints[agent_id] = self._fingerprint(spec)
+            logger.info(f"Agent built | agent_id: {agent_id} | {(time.perf_counter() - started) * 1000:.0f}ms")
+        return agent
+
+    def _variant(self, agent_id: str, model_id: str) -> Any:
+        agent = self._variants.get((agent_id, model_id))
+        if agent is None:
+            base = self.specs[agent_id]
+            spec = base.copy(update={"model": {**base.model, "id": model_id}})
+            agent = self.builder(spec, None, self.instructions_for(spec))
+            self._variants[(agent_id, model_id)] = agent
+            logger.info(f"Agent variant built | agent_id: {agent_id} | model: {model_id}")
+        return agent
+
+    def agent_os_agents(self) -> List[Any]:
+        """AgentOS'a kayıtlı agent'ları (gerekirse oluşturarak) döner."""
+        return [self.get(spec.id) for spec in self.specs.values() if spec.agent_os]
+
+    def built_agents(self) -> List[Any]:
+        return list(self._instances.values())
+
+    # --- Reload ---
+
+    def add_reload_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Reload sonrası değişen agent id'leri ile çağrılacak callback ekler."""
+        self._listeners.append(listener)
+
+    def _fingerprint(self, spec: AgentSpec) -> str:
+        payload = json.dumps(spec.dict(), sort_keys=True, default=str) + self.instructions_for(spec)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def reload(self) -> Dict[str, Any]:
+        """
+        Config'i ve talimatları yeniden okur; değişen agent'ları yeniden oluşturur.
+        Config geçersizse hata fırlatır ve mevcut agent'lar değişmeden kalır.
+
+        Returns:
+            Eklenen, kaldırılan ve güncellenen agent id'leri
+        """
+        # Geçersiz config aynı dosya değişene kadar tekrar denenmez
+        self._watched_mtimes = self._mtimes()
+        new_specs = load_agent_specs(self.config_file)
+        reload_agent_settings()
+
+        # Yeni instance'lar önce hazırlanır; hata olursa registry değişmez
+        rebuilt: Dict[str, Any] = {}
+        fingerprints: Dict[str, str] = {}
+        for agent_id, old_agent in self._instances.items():
+            spec = new_specs.get(agent_id)
+            if spec is None:
+                continue
+            fingerprint = self._fingerprint(spec)
+            if fingerprint == self._fingerprints.get(agent_id):
+                continue
+            # Model parametreleri aynıysa model (ve client bağlantıları) korunur
+            model = old_agent.model if spec.model == self.specs[agent_id].model else None
+            rebuilt[agent_id] = self.builder(spec, model, self.instructions_for(spec))
+            fingerprints[agent_id] = fingerprint
+
+        added = [agent_id for agent_id in new_specs if agent_id not in self.specs]
+        removed = [agent_id for agent_id in self.specs if agent_id not in new_specs]
+        updated = list(rebuilt)
+        self.specs = new_specs
+        for agent_id in removed:
+            self._instances.pop(agent_id, None)
+            self._fingerprints.pop(agent_id, None)
+        self._instances.update(rebuilt)
+        self._fingerprints.update(fingerprints)
+        # Model varyantları yeni spec/talimatlarla ilk kullanımda yeniden oluşturulur
+        self._variants.clear()
+
+        self.version += 1
+        self._watched_mtimes = self._mtimes()
+        self.last_reload = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "added": added,
+            "removed": removed,
+            "updated": updated,
+        }
+        changed = added + removed + updated
+        for listener in self._listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                logger.warning(f"Agent reload listener failed: {e}")
+        logger.info(
+            f"Agent registry reloaded | version: {self.version} | added: {added} | removed: {removed} | updated: {updated}"
+        )
+        return {"version": self.version, **self.last_reload}
+
+    def _watched_files(self) -> List[Path]:
+        files = [self.config_file]
+        for spec in self.specs.values():
+            if spec.instructions_file:
+                files.append(_resolve_path(spec.instructions_file, self.config_file.parent))
+        return files
+
+    def _mtimes(self) -> Dict[str, float]:
+        mtimes = {}
+        for path in self._watched_files():
+            try:
+                mtimes[str(path)] = os.stat(path).st_mtime
+            except FileNotFoundError:
+                mtimes[str(path)] = 0.0
+        return mtimes
+
+    def changed_on_disk(self) -> bool:
+        return self._mtimes() != self._watched_mtimes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "config_file": str(self.config_file),
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "last_reload": self.last_reload,
+            "agents": {
+                spec.id: {
+                    "role": spec.role,
+                    "display_name": self.display_name(spec.id),
+                    "built": spec.id in self._instances,
+                    "variants": sorted(model for agent_id, model in self._variants if agent_id == spec.id),
+                }
+                for spec in self.specs.values()
+            },
+        }
+
+
+def build_agent(spec: AgentSpec, model: Optional[Any], instructions: str) -> Any:
+    """
+    Spec'ten agno Agent oluşturur.
+
+    Args:
+        spec: Agent tanımı
+        model: Yeniden kullanılacak model; None ise spec.model ile yenisi oluşturulur
+        instructions: Agent talimatları
+    """
+    from agno.agent import Agent
+
+    from app.agents.models import build_model
+    from app.db.sqlite import get_agent_db
+
+    if model is None:
+        params = dict(spec.model)
+        model = build_model(params.pop("id", None), **params)
+    return Agent(
+        id=spec.id,
+        name=spec.name,
+        model=model,
+        db=get_agent_db(),
+        tools=[_import_object(tool)() for tool in spec.tools] or None,
+        add_history_to_context=spec.add_history_to_context,
+        num_history_runs=spec.num_history_runs,
+        markdown=spec.markdown,
+        instructions=instructions,
+        output_schema=_import_object(spec.output_schema) if spec.output_schema else None,
+    )
+
+
+_registry: Optional[AgentRegistry] = None
+
+
+def get_agent_registry() -> AgentRegistry:
+    """Global agent registry; config ilk çağrıda okunur."""
+    global _registry
+    if _registry is None:
+        _registry = AgentRegistry(settings.agent.agent_config_file)
+    return _registry
+
+
+def get_agent(agent_id: str) -> Any:
+    """Registry'deki agent'ı döner (ilk kullanımda oluşturulur)."""
+    return get_agent_registry().get(agent_id)
+
+
+async def watch_agent_config() -> None:
+    """
+    Config ve talimat dosyalarını `AGENT_CONFIG_POLL_SECONDS` aralıkla kontrol eder,
+    değişiklikte registry'yi reload eder.
+    """
+    interval = settings.agent.agent_config_poll_seconds
+    if interval <= 0:
+        return
+    registry = get_agent_registry()
+    while True:
+        await asyncio.sleep(interval)
+        if not registry.changed_on_disk():
+            continue
+        try:
+            registry.reload()
+        except Exception as e:
+            # Yarım yazılmış/geçersiz config: mevcut agent'lar korunur, sonraki turda tekrar denenir
+            logger.error(f"Agent config reload failed: {e}")
@@ -3,15 +3,14 @@
 Satınalma domain agent'ı.
 PDF dokümanlarından bilgi çekerek satınalma süreçleri hakkında sorulara cevap verir.
 """
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Optional
 
-from agno.agent import Agent
-from agno.models.google import Gemini
 from pydantic import BaseModel, Field
 
 from app.configs.agent_ids import AgentID
-from app.configs.settings import settings
-from app.db.sqlite import agent_db
+
+if TYPE_CHECKING:
+    from agno.agent import Agent
 
 
 class SatinalmaReply(BaseModel):
@@ -47,23 +46,15 @@ class SatinalmaReply(BaseModel):
     )
 
 
-# Gemini model (Vertex AI)
-satinalma_model = Gemini(
-    id=settings.gemini_model_name,
-    vertexai=True,
-    project_id=settings.project_id,
-    location=settings.location,
-)
+def get_satinalma_agent() -> "Agent":
+    """Satınalma agent'ını registry'den döner (ilk çağrıda oluşturulur)."""
+    from app.agents.registry import get_agent
+
+    return get_agent(AgentID.SATINALMA_PDF.value)
+
 
-# Satınalma agent tanımı
-satinalma_agent = Agent(
-    id=AgentID.SATINALMA_PDF.value,
-    name="Satınalma PDF Agent",
-    model=satinalma_model,
-    db=agent_db,
-    add_history_to_context=True,
-    num_history_runs=10,
-    markdown=True,
-    instructions=settings.satinalma_agent_instructions,
-    output_schema=SatinalmaReply,
-)
+def __getattr__(name: str) -> Any:
+    # Geriye uyumluluk: `from app.agents.satinalma_agent import satinalma_agent`
+    if name == "satinalma_agent":
+        return get_satinalma_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
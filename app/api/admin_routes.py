@@ -0,0 +1,242 @@
+# app/api/admin_routes.py
+"""
+Admin endpoint'leri.
+`OS_SECURITY_KEY` ile korunur: `Authorization: Bearer <OS_SECURITY_KEY>`.
+"""
+import asyncio
+import hmac
+import logging
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.agents.registry import get_agent_registry
+from app.configs.settings import settings
+from app.utils import memory
+from app.utils.loop_monitor import get_loop_monitor
+from app.utils.profiler import FORMATS, profile_for, profiler_stats
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+
+def require_admin_key(authorization: Optional[str] = Header(default=None)) -> None:
+    """Bearer token'ı OS_SECURITY_KEY ile karşılaştırır."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(
+        token.encode("utf-8"), settings.os_security_key.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Geçersiz veya eksik admin anahtarı",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin_key)])
+
+
+@router.get(
+    "/agents",
+    summary="Agent registry durumu",
+    description="Tanımlı agent'lar, oluşturulmuş olanlar ve son reload bilgisi",
+)
+def list_agents() -> Any:
+    return get_agent_registry().stats()
+
+
+@router.post(
+    "/agents/reload",
+    summary="Agent config'ini yeniden yükle",
+    description=(
+        "agents.json, talimat dosyaları ve agent talimat env'lerini yeniden okur. "
+        "Değişen agent'lar yeniden oluşturulur; devam eden stream'ler kesilmez."
+    ),
+)
+def reload_agents() -> Any:
+    try:
+        return get_agent_registry().reload()
+    except Exception as e:
+        logger.error(f"Agent registry reload failed: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Agent config yüklenemedi, mevcut agent'lar korunuyor: {e}",
+        )
+
+
+@router.post(
+    "/profile/cpu",
+    summary="Sampling CPU profili",
+    description=(
+        "Process'i `seconds` süre örnekler ve collapsed stack (flamegraph), speedscope JSON "
+        "veya endpoint başına özet döner. `request_sample_rate` verilirse sadece bu oranda "
+        "seçilen istekler örneklenir. Aynı anda tek oturum çalışabilir."
+    ),
+)
+async def profile_cpu(
+    request: Request,
+    seconds: float = Query(10.0, gt=0, description="Profil süresi"),
+    interval_ms: Optional[float] = Query(None, gt=0, description="Örnekleme aralığı (ms)"),
+    format: str = Query("collapsed", description="collapsed, speedscope veya summary"),
+    request_sample_rate: Optional[float] = Query(None, gt=0, le=1, description="Örneklenecek istek oranı"),
+    include_idle: bool = Query(False, description="Boşta bekleyen stack'leri de say"),
+) -> Any:
+    config = settings.profiler
+    if not config.profiler_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiler kapalı")
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format şunlardan biri olmalı: {', '.join(FORMATS)}",
+        )
+    if seconds > config.profiler_max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds en fazla {config.profiler_max_seconds} olabilir",
+        )
+
+    try:
+        profiler = await profile_for(
+            seconds,
+            interval_ms or config.profiler_default_interval_ms,
+            routes=request.app.routes,
+            request_sample_rate=request_sample_rate,
+            include_idle=include_idle,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    logger.info(f"CPU profile finished | {profiler.metadata()}")
+
+    headers = {f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in profiler.metadata().items()}
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed(), headers=headers)
+    if format == "speedscope":
+        headers["Content-Disposition"] = 'attachment; filename="cpu.speedscope.json"'
+        return JSONResponse(profiler.speedscope(), headers=headers)
+    return profiler.summary()
+
+
+@router.get(
+    "/profile",
+    summary="Profiler durumu",
+    description="Çalışan profil oturumu ve son oturumun özeti",
+)
+def profile_status() -> Any:
+    return profiler_stats()
+
+
+def _check_group_by(group_by: str) -> None:
+    if group_by not in memory.GROUP_BY_OPTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by şunlardan biri olmalı: {', '.join(memory.GROUP_BY_OPTIONS)}",
+        )
+
+
+@router.get(
+    "/memory",
+    summary="Bellek durumu",
+    description="Güncel RSS, açık fd, gc ve izlenen tiplerin canlı obje sayıları; tracemalloc durumu",
+)
+async def memory_status() -> Any:
+    return {
+        "current": await asyncio.to_thread(memory.measure),
+        "tracemalloc": memory.tracing_status(),
+        "last_report": memory.memory_stats()["last_report"],
+    }
+
+
+@router.post(
+    "/memory/tracemalloc/start",
+    summary="tracemalloc'u başlat",
+    description="Allocation izlemeyi başlatır; izleme açıkken bellek ve CPU maliyeti artar",
+)
+def memory_tracing_start(nframes: Optional[int] = Query(None, ge=1, le=100, description="Traceback derinliği")) -> Any:
+    return memory.start_tracing(nframes)
+
+
+@router.post(
+    "/memory/tracemalloc/stop",
+    summary="tracemalloc'u durdur",
+    description="İzlemeyi durdurur ve alınmış snapshot'ları siler",
+)
+def memory_tracing_stop() -> Any:
+    return memory.stop_tracing()
+
+
+@router.post(
+    "/memory/snapshots",
+    summary="tracemalloc snapshot'ı al",
+    description="Snapshot'ı saklar ve en büyük allocation noktalarını döner",
+)
+async def memory_snapshot(
+    label: Optional[str] = Query(None, description="Snapshot etiketi"),
+    group_by: str = Query("lineno", description="lineno, filename veya traceback"),
+    limit: int = Query(25, ge=1, le=500),
+) -> Any:
+    _check_group_by(group_by)
+    try:
+        info = await asyncio.to_thread(memory.take_snapshot, label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return {**info, **await asyncio.to_thread(memory.top_allocations, info["id"], group_by, limit)}
+
+
+@router.get(
+    "/memory/snapshots",
+    summary="Saklanan snapshot'lar",
+)
+def memory_snapshots() -> Any:
+    return memory.list_snapshots()
+
+
+@router.get(
+    "/memory/diff",
+    summary="Snapshot farkı",
+    description=(
+        "`base` snapshot'ından `target` snapshot'ına (verilmezse şimdiki duruma) en çok "
+        "büyüyen allocation noktaları"
+    ),
+)
+async def memory_diff(
+    base: int = Query(..., description="Başlangıç snapshot id"),
+    target: Optional[int] = Query(None, description="Bitiş snapshot id; boşsa şimdi"),
+    group_by: str = Query("lineno", description="lineno, filename veya traceback"),
+    limit: int = Query(25, ge=1, le=500),
+) -> Any:
+    _check_group_by(group_by)
+    try:
+        return await asyncio.to_thread(memory.diff_snapshots, base, target, group_by, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Snapshot bulunamadı: {e}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.post(
+    "/memory/report",
+    summary="Heap raporu yaz",
+    description="RSS eşiğini beklemeden MEMORY_REPORT_DIR altına heap raporu yazar",
+)
+async def memory_report() -> Any:
+    return await asyncio.to_thread(memory.write_heap_report, "manual")
+
+
+@router.get(
+    "/loop",
+    summary="Event loop bloklayan çağrılar",
+    description="Lag istatistikleri ve toplam bloklama süresine göre sıralı offender listesi (yakalanan stack'lerle)",
+)
+def loop_offenders(top: Optional[int] = Query(None, ge=1, le=200)) -> Any:
+    return get_loop_monitor().report(top)
+
+
+@router.post(
+    "/loop/reset",
+    summary="Offender tablosunu sıfırla",
+)
+def loop_offenders_reset() -> Any:
+    monitor = get_loop_monitor()
+    monitor.reset()
+    return monitor.stats()
@@ -0,0 +1,23 @@
+# app/api/metrics_routes.py
+"""
+Prometheus metrics endpoint'i.
+Process içi toplanan metrikleri text exposition formatında döner.
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrikleri",
+    description="Chat turu aşama histogramları, token, hata ve cache sayaçları",
+    response_class=PlainTextResponse,
+)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -8,12 +8,14 @@ import uuid
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 import time
 import json
 
-from app.agents.orchestrator_agent import orchestrator_agent, RoutingResponse
-from app.agents.satinalma_agent import satinalma_agent, SatinalmaReply
+from app.agents.orchestrator_agent import get_orchestrator_agent, RoutingResponse
+from app.agents.registry import get_agent_registry
+from app.agents.satinalma_agent import SatinalmaReply
 from app.api.schemas import (
     StartChatRequest,
     StartChatResponse,
@@ -22,21 +24,36 @@ from app.api.schemas import (
 )
 from app.api.services import (
     run_agent,
+    SlotStreamingResponse,
     extract_agent_reply,
     process_email_confirmation,
     process_email_cancellation,
     is_cancel_message,
     is_confirmation_message,
+    extract_json_trailer,
+    sse_event,
     CONFIRMATION_HINT,
 )
 from app.configs.agent_ids import AgentID, get_agent_display_name
+from app.configs.logging import bind_log_context, logging_stats
 from app.configs.exceptions import (
     AgentNotFoundError,
     InvalidAgentIDError,
     RoutingError,
     ModelProviderError,
+    QuotaExceededError,
 )
-from app.utils.conversation_logger import log_event
+from app.db.maintenance import maintenance_stats
+from app.db.sqlite import get_agent_db
+from app.utils.conversation_logger import get_conversation_log_writer, log_event
+from app.utils.idempotency import idempotency_stats
+from app.utils.loop_monitor import loop_monitor_stats
+from app.utils.memory import memory_stats, register_object_count
+from app.utils.metrics import ACTIVE_STREAMS, CHAT_TURN_SECONDS, observe_stage, record_error, time_stage
+from app.utils.rate_limit import admit, rate_limit_stats
+from app.utils.tracing import record_span, span, trace_breakdown, tracing_stats
+from app.utils.usage import enforce_quota, get_usage_accountant, record_usage
+from app.utils.warmup import get_warmup_state
 
 # Logger ayarla
 logger = logging.getLogger(__name__)
@@ -44,17 +61,15 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["chat"])
 
 
-# ==== Domain Agent Registry ====
-# Centralized agent registry - yeni agent eklerken buraya ekle
-DOMAIN_AGENTS: Dict[str, object] = {
-    AgentID.SATINALMA_PDF.value: satinalma_agent,
-    # İleride eklenecekler:
-    # AgentID.HR_PDF.value: hr_agent,
-    # AgentID.IT_PDF.value: it_agent,
-}
+# Domain agent'lar app/configs/agents.json'dan okunan registry'dedir
+# (app/agents/registry.py); yeni agent eklemek için config'e girdi eklenir.
 
 # Pending email confirmations: session_id -> data
 PENDING_EMAILS: Dict[str, Dict[str, Any]] = {}
+register_object_count("pending_emails", lambda: len(PENDING_EMAILS))
+register_object_count(
+    "open_streams", lambda: int(ACTIVE_STREAMS.value("start_chat") + ACTIVE_STREAMS.value("chat_message"))
+)
 
 
 # ==== API Endpoints ====
@@ -83,12 +98,19 @@ async def start_chat(req: StartChatRequest) -> Any:
     Raises:
         HTTPException: Routing hatası veya agent bulunamadığında
     """
+    turn_started = time.perf_counter()
     try:
         # Yeni session ID oluştur
         session_id = str(uuid.uuid4())
+        bind_log_context(session_id=session_id, user_id=req.user_id)
         logger.info(
             f"Starting new chat session | user_id: {req.user_id} | session_id: {session_id}"
         )
+        # Günlük kota: hard limitte 429, soft limitte domain agent düşük maliyetli modelle çalışır
+        downgrade_model = enforce_quota(req.user_id)
+        # Kullanıcı başına hız limiti: routing ve seçilen agent ayrı bucket'lardan düşer
+        orchestrator = get_orchestrator_agent()
+        admit(req.user_id, orchestrator.id)
         await log_event(
             session_id=session_id,
             event="start_chat_request",
@@ -105,12 +127,14 @@ async def start_chat(req: StartChatRequest) -> Any:
         )
         
         # Orchestrator run
-        routing_run = await run_agent(
-            agent=orchestrator_agent,
-            message=routing_prompt,
-            user_id=req.user_id,
-            session_id=session_id,
-        )
+        with time_stage("routing_llm", agent_id=orchestrator.id):
+            routing_run = await run_agent(
+                agent=orchestrator,
+                message=routing_prompt,
+                user_id=req.user_id,
+                session_id=session_id,
+            )
+        record_usage(req.user_id, orchestrator, getattr(routing_run, "metrics", None))
         
         # Parse routing response (Structured Output)
         routing_output = getattr(routing_run, "output", None) or getattr(routing_run, "content", None)
@@ -130,7 +154,9 @@ async def start_chat(req: StartChatRequest) -> Any:
             raise RoutingError(message="Yönlendirme yanıtı anlaşılamadı")
         
         # Agent validation
-        if not target_agent_id or target_agent_id not in DOMAIN_AGENTS:
+        validation_started = time.perf_counter()
+        registry = get_agent_registry()
+        if not target_agent_id or target_agent_id not in registry.domain_ids():
             logger.error(f"Invalid agent ID from routing: {target_agent_id}")
             raise AgentNotFoundError(
                 message=f"Geçersiz agent ID: {target_agent_id}",
@@ -138,45 +164,60 @@ async def start_chat(req: StartChatRequest) -> Any:
             )
         
         logger.info(f"Routed to agent: {target_agent_id} | reason: {reason}")
+        bind_log_context(agent_id=target_agent_id)
+        admit(req.user_id, target_agent_id)
         
         # Seçilen agent ile ilk cevap
-        domain_agent = DOMAIN_AGENTS[target_agent_id]
+        domain_agent = registry.get(target_agent_id, model_id=downgrade_model)
+        validation_seconds = time.perf_counter() - validation_started
+        observe_stage("validation", validation_seconds, target_agent_id)
+        record_span("validation", validation_seconds)
         
         if req.stream:
+            # Slot yanıt başlamadan alınır; kuyruk dolu/zaman aşımı 429 olarak döner
+            gen = await run_agent(
+                agent=domain_agent,
+                message=req.message,
+                user_id=req.user_id,
+                session_id=session_id,
+                stream=True,
+            )
+
             async def event_generator():
                 # Send session info first
-                yield f"data: {json.dumps({'type': 'session_info', 'session_id': session_id, 'assigned_agent_id': target_agent_id, 'assigned_agent_name': get_agent_display_name(target_agent_id), 'routing_reason': reason}, ensure_ascii=False)}\n\n"
+                yield sse_event({'type': 'session_info', 'session_id': session_id, 'assigned_agent_id': target_agent_id, 'assigned_agent_name': get_agent_display_name(target_agent_id), 'routing_reason': reason})
                 
                 start_time = time.time()
                 first_token_time = None
                 full_response = ""
+                run_metrics = None
+                ACTIVE_STREAMS.inc("start_chat")
                 
                 try:
-                    gen = await run_agent(
-                        agent=domain_agent,
-                        message=req.message,
-                        user_id=req.user_id,
-                        session_id=session_id,
-                        stream=True,
-                    )
-                    
-                    async for chunk in gen:
-                        if first_token_time is None:
-                            first_token_time = time.time()
+                    with span("model_stream", agent_id=target_agent_id) as model_span:
+                        async for chunk in gen:
+                            if first_token_time is None:
+                                first_token_time = time.time()
+                            run_metrics = getattr(chunk, "metrics", None) or run_metrics
                         
-                        content = ""
-                        if hasattr(chunk, "content"):
-                            content = chunk.content
-                        elif isinstance(chunk, str):
-                            content = chunk
+                            content = ""
+                            if hasattr(chunk, "content"):
+                                content = chunk.content
+                            elif isinstance(chunk, str):
+                                content = chunk
                         
-                        if content:
-                            full_response += content
-                            yield f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
+                            if content:
+                                full_response += content
+                                yield sse_event({'content': content})
+                        if model_span is not None and first_token_time is not None:
+                            model_span.set(ttft_ms=round((first_token_time - start_time) * 1000, 2))
                     
                     end_time = time.time()
                     first_token_latency = (first_token_time - start_time) if first_token_time else (end_time - start_time)
                     total_latency = end_time - start_time
+                    observe_stage("model_ttft", first_token_latency, target_agent_id)
+                    observe_stage("model_total", total_latency, target_agent_id)
+                    record_usage(req.user_id, domain_agent, run_metrics)
                     
                     # Log metrics
                     await log_event(
@@ -191,13 +232,17 @@ async def start_chat(req: StartChatRequest) -> Any:
                     )
                     
                     # Send end event with metrics
-                    yield f"data: {json.dumps({'type': 'end', 'metrics': {'first_token': first_token_latency, 'total': total_latency}}, ensure_ascii=False)}\n\n"
+                    yield sse_event({'type': 'end', 'metrics': {'first_token': first_token_latency, 'total': total_latency}, 'timings': trace_breakdown()})
                     
                 except Exception as e:
                     logger.error(f"Stream error: {str(e)}", exc_info=True)
-                    yield f"data: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+                    record_error("start_chat_stream", e)
+                    yield sse_event({'error': str(e)})
+                finally:
+                    ACTIVE_STREAMS.dec("start_chat")
+                    CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_started, "start_chat", target_agent_id, "true")
 
-            return StreamingResponse(event_generator(), media_type="text/event-stream")
+            return SlotStreamingResponse(event_generator(), gen, media_type="text/event-stream")
 
         start_time = time.time()
         domain_run = await run_agent(
@@ -208,8 +253,11 @@ async def start_chat(req: StartChatRequest) -> Any:
         )
         end_time = time.time()
         total_latency = end_time - start_time
+        observe_stage("model_total", total_latency, target_agent_id)
+        record_usage(req.user_id, domain_agent, getattr(domain_run, "metrics", None))
         
         # Extract reply
+        parse_started = time.perf_counter()
         reply_text = extract_agent_reply(domain_run, target_agent_id)
         if target_agent_id == AgentID.SATINALMA_PDF.value:
             domain_output = getattr(domain_run, "output", None) or getattr(
@@ -226,6 +274,9 @@ async def start_chat(req: StartChatRequest) -> Any:
                 logger.info(
                     "Email intent detected during start_chat; awaiting confirmation"
                 )
+        output_parse_seconds = time.perf_counter() - parse_started
+        observe_stage("output_parse", output_parse_seconds, target_agent_id)
+        record_span("output_parse", output_parse_seconds)
         
         logger.info(f"Chat session started successfully | session_id: {session_id}")
         response = StartChatResponse(
@@ -244,24 +295,38 @@ async def start_chat(req: StartChatRequest) -> Any:
                 "assigned_agent_name": response.assigned_agent_name,
                 "routing_reason": reason,
                 "reply": reply_text,
+                "total_latency": total_latency,
+                "email_intent": session_id in PENDING_EMAILS,
             },
         )
+        CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_started, "start_chat", target_agent_id, "false")
         return response
         
+    except QuotaExceededError as e:
+        logger.warning(f"Chat start rejected: {e.detail}")
+        record_error("start_chat", e)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.message,
+            headers={"Retry-After": str(e.retry_after_seconds)},
+        )
     except (AgentNotFoundError, InvalidAgentIDError, RoutingError) as e:
         logger.error(f"Chat start failed: {e.message}", exc_info=True)
+        record_error("start_chat", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=e.message,
         )
     except ModelProviderError as e:
         logger.error(f"Model provider error: {e.message}", exc_info=True)
+        record_error("start_chat", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="AI servisi şu an kullanılamıyor. Lütfen daha sonra tekrar deneyin.",
         )
     except Exception as e:
         logger.error(f"Unexpected error in start_chat: {str(e)}", exc_info=True)
+        record_error("start_chat", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.",
@@ -301,7 +366,11 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
     Raises:
         HTTPException: Agent bulunamadığında veya hata durumunda
     """
+    turn_started = time.perf_counter()
     try:
+        # Session yüklemesi validasyon ve loglama ile paralel başlar
+        get_agent_db().prefetch_session(req.session_id)
+        bind_log_context(session_id=req.session_id, agent_id=agent_id, user_id=req.user_id)
         logger.info(
             f"Chat message | agent_id: {agent_id} | user_id: {req.user_id} | "
             f"session_id: {req.session_id}"
@@ -317,17 +386,24 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
         )
         
         # Agent validation
-        if agent_id not in DOMAIN_AGENTS:
-            logger.warning(f"Agent not found: {agent_id}")
-            raise AgentNotFoundError(
-                message=f"Agent bulunamadı: {agent_id}",
-                detail=f"Mevcut agent'lar: {', '.join(DOMAIN_AGENTS.keys())}",
-            )
-        
-        agent = DOMAIN_AGENTS[agent_id]
+        with time_stage("validation", agent_id=agent_id):
+            registry = get_agent_registry()
+            domain_ids = registry.domain_ids()
+            if agent_id not in domain_ids:
+                logger.warning(f"Agent not found: {agent_id}")
+                raise AgentNotFoundError(
+                    message=f"Agent bulunamadı: {agent_id}",
+                    detail=f"Mevcut agent'lar: {', '.join(domain_ids)}",
+                )
+            
+            # Günlük kota: hard limitte 429, soft limitte düşük maliyetli model
+            agent = registry.get(agent_id, model_id=enforce_quota(req.user_id))
+            # Kullanıcı başına hız limiti (istek ve model token bucket'ları)
+            admit(req.user_id, agent_id)
 
         pending_email = PENDING_EMAILS.get(req.session_id)
         if pending_email:
+            pending_started = time.perf_counter()
             if is_cancel_message(req.message):
                 PENDING_EMAILS.pop(req.session_id, None)
                 response, structured_dump = process_email_cancellation(
@@ -345,6 +421,8 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
                         "structured_output": structured_dump,
                     },
                 )
+                observe_stage("pending_email", time.perf_counter() - pending_started, agent_id)
+                CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_started, "chat_message", agent_id, "false")
                 return response
 
             if is_confirmation_message(req.message):
@@ -356,6 +434,9 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
                 logger.info(
                     f"Email confirmation received | session_id: {req.session_id}"
                 )
+                if not response.email_triggered:
+                    # Gönderim başarısız: taslak yeni bir onayla tekrar denenebilsin
+                    PENDING_EMAILS[req.session_id] = pending_email
                 await log_event(
                     session_id=req.session_id,
                     event="chat_message_response",
@@ -367,68 +448,82 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
                         "structured_output": structured_dump,
                     },
                 )
+                observe_stage("pending_email", time.perf_counter() - pending_started, agent_id)
+                CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_started, "chat_message", agent_id, "false")
                 return response
 
             # Yeni talimat geldi, eski pending taslağı temizle
             PENDING_EMAILS.pop(req.session_id, None)
+            observe_stage("pending_email", time.perf_counter() - pending_started, agent_id)
 
         # Agent run
         if req.stream:
+            # Slot yanıt başlamadan alınır; kuyruk dolu/zaman aşımı 429 olarak döner
+            gen = await run_agent(
+                agent=agent,
+                message=req.message,
+                user_id=req.user_id,
+                session_id=req.session_id,
+                stream=True,
+            )
+
             async def event_generator():
                 start_time = time.time()
                 first_token_time = None
                 full_response = ""
+                run_metrics = None
+                ACTIVE_STREAMS.inc("chat_message")
                 
                 try:
-                    gen = await run_agent(
-                        agent=agent,
-                        message=req.message,
-                        user_id=req.user_id,
-                        session_id=req.session_id,
-                        stream=True,
-                    )
-                    
-                    async for chunk in gen:
-                        if first_token_time is None:
-                            first_token_time = time.time()
+                    with span("model_stream", agent_id=agent_id) as model_span:
+                        async for chunk in gen:
+                            if first_token_time is None:
+                                first_token_time = time.time()
+                            run_metrics = getattr(chunk, "metrics", None) or run_metrics
                         
-                        content = ""
-                        if hasattr(chunk, "content"):
-                            content = chunk.content
-                        elif isinstance(chunk, str):
-                            content = chunk
+                            content = ""
+                            if hasattr(chunk, "content"):
+                                content = chunk.content
+                            elif isinstance(chunk, str):
+                                content = chunk
                         
-                        if content:
-                            full_response += content
-                            yield f"data: {json.dumps({'content': content}, ensure_ascii=False)}\n\n"
+                            if content:
+                                full_response += content
+                                yield sse_event({'content': content})
+                        if model_span is not None and first_token_time is not None:
+                            model_span.set(ttft_ms=round((first_token_time - start_time) * 1000, 2))
                     
                     end_time = time.time()
                     first_token_latency = (first_token_time - start_time) if first_token_time else (end_time - start_time)
                     total_latency = end_time - start_time
+                    observe_stage("model_ttft", first_token_latency, agent_id)
+                    observe_stage("model_total", total_latency, agent_id)
+                    record_usage(req.user_id, agent, run_metrics)
                     
                     # Parse JSON for email intent
+                    parse_started = time.perf_counter()
                     email_intent_detected = False
                     if agent_id == AgentID.SATINALMA_PDF.value and full_response:
                         try:
-                            if "---JSON---" in full_response and "---END---" in full_response:
-                                json_start = full_response.find("---JSON---") + len("---JSON---")
-                                json_end = full_response.find("---END---")
-                                json_str = full_response[json_start:json_end].strip()
+                            agent_reply, email_data = extract_json_trailer(full_response)
+                            if email_data and email_data.get("email_intent"):
+                                # Onay akışı non-stream ile aynı SatinalmaReply'ı bekler
+                                suggestion = SatinalmaReply(**{**email_data, "reply": agent_reply})
+                                email_intent_detected = True
+                                PENDING_EMAILS[req.session_id] = {
+                                    "suggestion": suggestion,
+                                    "agent_reply": agent_reply,
+                                    "source_message": req.message,
+                                }
+                                logger.info("Email intent detected from stream JSON")
                                 
-                                email_data = json.loads(json_str)
-                                
-                                if email_data.get("email_intent"):
-                                    email_intent_detected = True
-                                    PENDING_EMAILS[req.session_id] = {
-                                        "suggestion": email_data,
-                                        "agent_reply": full_response[:json_start - len("---JSON---")].strip(),
-                                        "source_message": req.message,
-                                    }
-                                    logger.info("Email intent detected from stream JSON")
-                                    
-                                    yield f"data: {json.dumps({'type': 'email_intent', 'recipient_hint': email_data.get('email_recipient_hint'), 'subject_suggestion': email_data.get('email_subject_suggestion')}, ensure_ascii=False)}\n\n"
-                        except (json.JSONDecodeError, KeyError) as e:
+                                yield sse_event({'type': 'email_intent', 'recipient_hint': suggestion.email_recipient_hint, 'subject_suggestion': suggestion.email_subject_suggestion})
+                        except (json.JSONDecodeError, KeyError, ValidationError) as e:
                             logger.error(f"JSON parsing error: {str(e)}")
+                            record_error("chat_message_stream", e)
+                    output_parse_seconds = time.perf_counter() - parse_started
+                    observe_stage("output_parse", output_parse_seconds, agent_id)
+                    record_span("output_parse", output_parse_seconds)
                     
                     # Log metrics
                     await log_event(
@@ -443,21 +538,29 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
                         },
                     )
                     
-                    yield f"data: {json.dumps({'type': 'end', 'metrics': {'first_token': first_token_latency, 'total': total_latency}, 'email_intent': email_intent_detected}, ensure_ascii=False)}\n\n"
+                    yield sse_event({'type': 'end', 'metrics': {'first_token': first_token_latency, 'total': total_latency}, 'timings': trace_breakdown(), 'email_intent': email_intent_detected})
                     
                 except Exception as e:
                     logger.error(f"Stream error: {str(e)}", exc_info=True)
-                    yield f"data: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+                    record_error("chat_message_stream", e)
+                    yield sse_event({'error': str(e)})
+                finally:
+                    ACTIVE_STREAMS.dec("chat_message")
+                    CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_started, "chat_message", agent_id, "true")
 
-            return StreamingResponse(event_generator(), media_type="text/event-stream")
+            return SlotStreamingResponse(event_generator(), gen, media_type="text/event-stream")
 
 
+        start_time = time.time()
         run = await run_agent(
             agent=agent,
             message=req.message,
             user_id=req.user_id,
             session_id=req.session_id,
         )
+        total_latency = time.time() - start_time
+        observe_stage("model_total", total_latency, agent_id)
+        record_usage(req.user_id, agent, getattr(run, "metrics", None))
         
         # Response variables
         reply_text: str = ""
@@ -465,6 +568,7 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
         email_info: Optional[dict] = None
         
         # Structured output handling - satınalma agent için
+        parse_started = time.perf_counter()
         structured_dump: Optional[dict] = None
         if agent_id == AgentID.SATINALMA_PDF.value:
             out = getattr(run, "output", None) or getattr(run, "content", None)
@@ -498,11 +602,9 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
         else:
             # Diğer agent'lar için normal string content
             reply_text = str(run.content) if run.content else ""
-        
-        # Calculate latency (approximate for non-stream)
-        # We don't have exact first token time here, but we can log total time if we measured it.
-        # But run_agent doesn't return time.
-        # I'll skip latency logging for non-stream for now as user emphasized "stream chat ekle... ilk token gelene kadar gecikme sayılsın"
+        output_parse_seconds = time.perf_counter() - parse_started
+        observe_stage("output_parse", output_parse_seconds, agent_id)
+        record_span("output_parse", output_parse_seconds)
         
         logger.info(
             f"Chat message completed | agent_id: {agent_id} | email_triggered: {email_triggered}"
@@ -522,24 +624,38 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
                 "email_triggered": email_triggered,
                 "email_info": email_info,
                 "structured_output": structured_dump,
+                "total_latency": total_latency,
+                "email_intent": bool(email_info and email_info.get("pending_confirmation")),
             },
         )
+        CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_started, "chat_message", agent_id, "false")
         return response
         
+    except QuotaExceededError as e:
+        logger.warning(f"Chat message rejected: {e.detail}")
+        record_error("chat_message", e)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.message,
+            headers={"Retry-After": str(e.retry_after_seconds)},
+        )
     except AgentNotFoundError as e:
         logger.error(f"Agent not found: {e.message}")
+        record_error("chat_message", e)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=e.message,
         )
     except ModelProviderError as e:
         logger.error(f"Model provider error: {e.message}", exc_info=True)
+        record_error("chat_message", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="AI servisi şu an kullanılamıyor. Lütfen daha sonra tekrar deneyin.",
         )
     except Exception as e:
         logger.error(f"Unexpected error in chat_with_agent: {str(e)}", exc_info=True)
+        record_error("chat_message", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.",
@@ -553,7 +669,35 @@ async def chat_with_agent(agent_id: str, req: ChatMessageRequest) -> Any:
 )
 def health_check():
     """API health check endpoint."""
+    agent_db = get_agent_db()
+    registry = get_agent_registry()
     return {
         "status": "healthy",
-        "available_agents": list(DOMAIN_AGENTS.keys()),
+        "available_agents": registry.domain_ids(),
+        "agents": registry.stats(),
+        "conversation_log": get_conversation_log_writer().stats(),
+        "logging": logging_stats(),
+        "database": agent_db.stats(),
+        "session_cache": agent_db.session_cache.stats() if agent_db.session_cache else None,
+        "maintenance": maintenance_stats(),
+        "tracing": tracing_stats(),
+        "usage": get_usage_accountant().stats(),
+        "memory": memory_stats(),
+        "event_loop": loop_monitor_stats(),
+        "idempotency": idempotency_stats(),
+        "rate_limit": rate_limit_stats(),
     }
+
+
+@router.get(
+    "/ready",
+    summary="API readiness check",
+    description="Warm-up tamamlanıp process trafik almaya hazır olduğunda 200, aksi halde 503 döner",
+)
+def readiness_check():
+    """Load balancer readiness endpoint."""
+    state = get_warmup_state()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if state.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=state.snapshot(),
+    )
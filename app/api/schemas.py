@@ -3,7 +3,7 @@
 API Request and Response Models.
 """
 import uuid
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 from app.configs.helpers import sanitize_user_id
 
@@ -117,3 +117,62 @@ class ChatMessageResponse(BaseModel):
     reply: str
     email_triggered: bool = False
     email_info: Optional[dict] = None
+
+
+class LatencyPercentiles(BaseModel):
+    """Milisaniye cinsinden latency percentile'ları."""
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class LatencyStatsBucket(BaseModel):
+    """
+    Bir grup (agent, gün veya tümü) için latency özeti.
+    
+    Attributes:
+        group: Grup anahtarı ("all", agent ID veya YYYY-MM-DD)
+        count: Turn sayısı
+        throughput_per_minute: Dakika başına turn
+        email_intent_rate: Email intent tespit edilen turn oranı
+    """
+    group: str
+    count: int
+    throughput_per_minute: Optional[float] = None
+    email_intent_rate: Optional[float] = None
+    first_token_ms: LatencyPercentiles
+    total_ms: LatencyPercentiles
+
+
+class LatencyStatsResponse(BaseModel):
+    """/api/stats/latency yanıtı."""
+    start: str
+    end: str
+    group_by: str
+    buckets: List[LatencyStatsBucket]
+
+
+class UsageTotals(BaseModel):
+    """
+    Token ve maliyet toplamı.
+    
+    Attributes:
+        group: Grup anahtarı (YYYY-MM-DD, user ID, agent ID veya model ID)
+        runs: Agent run sayısı
+        cost_usd: Fiyat tablosuna göre tahmini maliyet (USD)
+    """
+    group: Optional[str] = None
+    runs: int
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    cost_usd: float
+
+
+class UsageStatsResponse(BaseModel):
+    """/api/stats/usage yanıtı."""
+    start: str
+    end: str
+    group_by: str
+    buckets: List[UsageTotals]
+    total: UsageTotals
@@ -2,16 +2,26 @@
 """
 Business logic and helper functions for API.
 """
+import json
 import logging
-from typing import Any, Dict, Optional, Tuple, Union, AsyncGenerator
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, Union, AsyncGenerator
 
 from agno.agent import RunOutput
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
 
-from app.agents.orchestrator_agent import orchestrator_agent
+from app.agents.orchestrator_agent import get_orchestrator_agent
 from app.agents.satinalma_agent import SatinalmaReply
 from app.api.schemas import ChatMessageRequest, ChatMessageResponse
 from app.configs.agent_ids import AgentID
-from app.configs.exceptions import ModelProviderError
+from app.configs.exceptions import ModelProviderError, RateLimitExceededError
+from app.configs.logging import log_context
+from app.db.run_store import agent_history_scope
+from app.tools.mail_transport import mail_idempotency_scope
+from app.utils.rate_limit import get_scheduler
+from app.utils.tracing import span, traced
+from app.utils.usage import record_usage
 
 # Logger ayarla
 logger = logging.getLogger(__name__)
@@ -47,6 +57,48 @@ CONFIRMATION_HINT = (
     "Revize etmek için talimat verebilirsin."
 )
 
+# Stream yanıtlarında structured output, cevabın sonuna bu işaretler arasında eklenir
+JSON_TRAILER_START = "---JSON---"
+JSON_TRAILER_END = "---END---"
+
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """
+    Payload'ı tek bir SSE `data:` frame'i olarak kodlar.
+
+    Args:
+        payload: JSON'a çevrilecek event içeriği
+
+    Returns:
+        str: `data: {...}\n\n` formatında frame
+    """
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def extract_json_trailer(text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Stream cevabının sonundaki `---JSON--- {...} ---END---` bloğunu ayırır.
+
+    Args:
+        text: Agent'ın stream ettiği tam cevap
+
+    Returns:
+        Tuple[str, Optional[dict]]: Trailer öncesi cevap metni ve parse edilen JSON
+        (trailer yoksa metnin kendisi ve None)
+
+    Raises:
+        json.JSONDecodeError: Trailer içeriği geçerli JSON değilse
+    """
+    start = text.find(JSON_TRAILER_START)
+    if start == -1:
+        return text, None
+    json_start = start + len(JSON_TRAILER_START)
+    json_end = text.find(JSON_TRAILER_END, json_start)
+    if json_end == -1:
+        return text, None
+    return text[:start].strip(), json.loads(text[json_start:json_end])
+
+
 def _normalize_message(text: str) -> str:
     return text.strip().lower()
 
@@ -87,15 +139,71 @@ def _build_email_prompt(
     )
 
 
+class SlotStream:
+    """
+    Adil kuyruktan önceden alınmış slotu tutan agent stream'i.
+
+    Slot; iterasyon bittiğinde, hata verdiğinde veya `aclose()` çağrıldığında
+    (iterasyon hiç başlamamış olsa da) bir kez bırakılır.
+
+    Args:
+        stream: agent.arun(stream=True) çıktısı
+        agent: Stream'i üreten agent
+        release: Slotu bırakan fonksiyon (bkz. FairScheduler.hold)
+    """
+
+    def __init__(self, stream: AsyncGenerator, agent, release: Callable[[], None]):
+        self._stream = stream
+        self._agent = agent
+        self._release = release
+
+    def __aiter__(self) -> AsyncIterator:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncGenerator:
+        try:
+            with agent_history_scope(getattr(self._agent, "num_history_runs", None)):
+                async for chunk in self._stream:
+                    yield chunk
+        finally:
+            self._release()
+
+    async def aclose(self) -> None:
+        self._release()
+        await self._stream.aclose()
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    SSE yanıtı; gövde hiç gönderilemese bile (ör. yanıt başlamadan kopan
+    bağlantı) agent stream'inin slotunu bırakır.
+    """
+
+    def __init__(self, content: Any, slot_stream: SlotStream, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.slot_stream = slot_stream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.slot_stream.aclose()
+
+
 async def run_agent(
     agent,
     message: str,
     user_id: str,
     session_id: str,
     stream: bool = False,
-) -> Union[RunOutput, AsyncGenerator]:
+) -> Union[RunOutput, SlotStream]:
     """
     Agent'ı asenkron çalıştırır ve sonucu döndürür.
+
+    Run, adil kuyruktan (bkz. app.utils.rate_limit) slot alarak çalışır.
+    Stream'de slot bu çağrıda alınır, böylece kuyruk dolu/zaman aşımı yanıt
+    başlamadan 429 olarak döner; slot stream bitince veya kapanınca bırakılır
+    (bkz. SlotStream, SlotStreamingResponse).
     
     Args:
         agent: Çalıştırılacak agent instance
@@ -104,17 +212,18 @@ async def run_agent(
         session_id: Session ID
     
     Returns:
-        RunOutput: Agent çıktısı
+        RunOutput: Agent çıktısı; stream'de SlotStream
     
     Raises:
         ModelProviderError: Model sağlayıcı hatası durumunda
+        RateLimitExceededError: Kuyrukta slot beklerken zaman aşımı veya kuyruk dolu
     """
     try:
         logger.info(
-            f"Running agent: {agent.id} | user_id: {user_id} | session_id: {session_id}"
+            f"Running agent: {agent.id} | user_id: {user_id} | session_id: {session_id} | stream: {stream}"
         )
         if stream:
-            logger.info(f"Running agent in stream mode: {agent.id}")
+            release = await get_scheduler().hold(user_id, agent.id)
 
             original_output_schema = getattr(agent, "output_schema", None)
             original_response_model = getattr(agent, "response_model", None)
@@ -130,19 +239,29 @@ async def run_agent(
                     session_id=session_id,
                     stream=True,
                 )
-                return result
+                return SlotStream(result, agent, release)
+            except BaseException:
+                release()
+                raise
             finally:
                 agent.output_schema = original_output_schema
                 if hasattr(agent, "response_model"):
                     agent.response_model = original_response_model
 
-        run: RunOutput = await agent.arun(
-            input=message,
-            user_id=user_id,
-            session_id=session_id,
-        )
-        logger.info(f"Agent run completed: {agent.id}")
+        async with get_scheduler().slot(user_id, agent.id):
+            with log_context(agent_id=agent.id), span("run_agent", agent_id=agent.id):
+                with agent_history_scope(getattr(agent, "num_history_runs", None)):
+                    # agno agent.stream'i kalıcı tutabilir; non-stream açıkça istenir
+                    run: RunOutput = await agent.arun(
+                        input=message,
+                        user_id=user_id,
+                        session_id=session_id,
+                        stream=False,
+                    )
+                logger.info(f"Agent run completed: {agent.id}")
         return run
+    except RateLimitExceededError:
+        raise
     except Exception as e:
         logger.error(f"Agent run failed: {agent.id} | Error: {str(e)}", exc_info=True)
         raise ModelProviderError(
@@ -151,6 +270,28 @@ async def run_agent(
         )
 
 
+def extract_email_tool_result(run: RunOutput) -> Optional[str]:
+    """
+    Orchestrator run'ındaki son `send_email` tool çağrısının sonucunu döner.
+
+    Args:
+        run: EMAIL modunda çalışan orchestrator'ın çıktısı
+
+    Returns:
+        Optional[str]: "EMAIL_SENT", "EMAIL_LOGGED", "EMAIL_ALREADY_SENT",
+        "EMAIL_FAILED: ..." veya tool hiç çağrılmadıysa None
+    """
+    result = None
+    for tool in getattr(run, "tools", None) or []:
+        if getattr(tool, "tool_name", None) == "send_email":
+            result = None if tool.result is None else str(tool.result)
+    return result
+
+
+def is_email_delivered(tool_result: Optional[str]) -> bool:
+    return tool_result in ("EMAIL_SENT", "EMAIL_LOGGED", "EMAIL_ALREADY_SENT")
+
+
 def extract_agent_reply(run: RunOutput, agent_id: str) -> str:
     """
     Agent çıktısından reply string'ini çıkarır.
@@ -175,6 +316,7 @@ def extract_agent_reply(run: RunOutput, agent_id: str) -> str:
         return str(run.content) if run.content else ""
 
 
+@traced()
 async def process_email_confirmation(
     req: ChatMessageRequest,
     pending_data: Dict[str, Any],
@@ -191,29 +333,49 @@ async def process_email_confirmation(
         suggestion=suggestion,
     )
 
-    orchestrator_run = await run_agent(
-        agent=orchestrator_agent,
-        message=email_prompt,
-        user_id=req.user_id,
-        session_id=req.session_id,
-    )
+    # Taslak başına tekil id: başarısız gönderim sonrası aynı taslak PENDING_EMAILS'e
+    # geri konur, tekrar onayda aynı anahtarla yalnızca teslim edilmeyen alıcılara gider
+    email_id = pending_data.setdefault("email_id", uuid.uuid4().hex)
+
+    orchestrator = get_orchestrator_agent()
+    with mail_idempotency_scope(f"{req.session_id}:{email_id}"):
+        orchestrator_run = await run_agent(
+            agent=orchestrator,
+            message=email_prompt,
+            user_id=req.user_id,
+            session_id=req.session_id,
+        )
+    record_usage(req.user_id, orchestrator, getattr(orchestrator_run, "metrics", None))
 
     orchestrator_reply = orchestrator_run.content
+    tool_result = extract_email_tool_result(orchestrator_run)
+    delivered = is_email_delivered(tool_result)
 
     email_info = {
         "orchestrator_reply": orchestrator_reply,
         "recipient_hint": suggestion.email_recipient_hint,
         "subject_suggestion": suggestion.email_subject_suggestion,
+        "send_result": tool_result,
     }
 
-    combined_reply = (
-        "Onayınız için teşekkürler. Taslak mail aşağıdaki içerikle gönderildi:\n\n"
-        f"{agent_reply}\n\n---\n{orchestrator_reply}"
-    )
+    if delivered:
+        combined_reply = (
+            "Onayınız için teşekkürler. Taslak mail aşağıdaki içerikle gönderildi:\n\n"
+            f"{agent_reply}\n\n---\n{orchestrator_reply}"
+        )
+    else:
+        logger.warning(
+            f"Email not delivered | session_id: {req.session_id} | result: {tool_result or 'tool not called'}"
+        )
+        combined_reply = (
+            "Mail gönderilemedi"
+            f"{f' ({tool_result})' if tool_result else ''}. "
+            "Taslak saklandı; tekrar denemek için 'gönder' yazabilir veya iptal edebilirsin."
+        )
 
     response = ChatMessageResponse(
         reply=combined_reply,
-        email_triggered=True,
+        email_triggered=delivered,
         email_info=email_info,
     )
 
@@ -0,0 +1,131 @@
+# app/api/stats_routes.py
+"""
+İstatistik endpoint'leri.
+Konuşma logu analitik index'i üzerinden latency raporları ve
+agno_metrics üzerinden token/maliyet kullanımı. Kullanım endpoint'i
+kullanıcı bazında veri döndüğü için admin anahtarı ister.
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.admin_routes import require_admin_key
+from app.api.schemas import LatencyStatsResponse, UsageStatsResponse
+from app.utils.log_analytics import GROUP_BY_OPTIONS, query_latency_stats, refresh_index
+from app.utils.usage import USAGE_GROUP_BY_OPTIONS, get_usage_accountant
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+
+def _parse_time(value: Optional[str], default: datetime) -> datetime:
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Geçersiz zaman formatı (ISO 8601 bekleniyor): {value}",
+        )
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@router.get(
+    "/latency",
+    response_model=LatencyStatsResponse,
+    summary="Latency percentile raporu",
+    description=(
+        "Verilen zaman penceresi için ilk token ve toplam latency p50/p95/p99 (ms), "
+        "throughput ve email intent oranını döner. Varsayılan pencere son 24 saattir."
+    ),
+)
+async def latency_stats(
+    start: Optional[str] = Query(None, description="Pencere başlangıcı (ISO 8601)"),
+    end: Optional[str] = Query(None, description="Pencere bitişi (ISO 8601)"),
+    agent_id: Optional[str] = Query(None, description="Sadece bu agent"),
+    group_by: str = Query("none", description="none, agent veya day"),
+    stream_only: bool = Query(False, description="Sadece stream turn'leri"),
+) -> Any:
+    """Analitik index'i günceller ve istenen pencere için özet döner."""
+    if group_by not in GROUP_BY_OPTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by şunlardan biri olmalı: {', '.join(GROUP_BY_OPTIONS)}",
+        )
+    end_dt = _parse_time(end, datetime.now(timezone.utc))
+    start_dt = _parse_time(start, end_dt - timedelta(days=1))
+    if start_dt >= end_dt:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start, end'den önce olmalı",
+        )
+
+    await refresh_index()
+    buckets = await asyncio.to_thread(
+        query_latency_stats, start_dt, end_dt, agent_id, group_by, stream_only
+    )
+    return LatencyStatsResponse(
+        start=start_dt.isoformat(),
+        end=end_dt.isoformat(),
+        group_by=group_by,
+        buckets=buckets,
+    )
+
+
+def _parse_date(value: Optional[str], default: date) -> date:
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Geçersiz tarih formatı (YYYY-MM-DD bekleniyor): {value}",
+        )
+
+
+@router.get(
+    "/usage",
+    response_model=UsageStatsResponse,
+    summary="Token ve maliyet kullanımı",
+    description=(
+        "Gün aralığı (UTC, dahil) için token ve tahmini maliyet toplamlarını "
+        "gün, kullanıcı, agent veya model kırılımında döner. Varsayılan aralık son 7 gündür. "
+        "`Authorization: Bearer <OS_SECURITY_KEY>` gerekir."
+    ),
+    dependencies=[Depends(require_admin_key)],
+)
+async def usage_stats(
+    start: Optional[str] = Query(None, description="Başlangıç günü (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Bitiş günü (YYYY-MM-DD)"),
+    user_id: Optional[str] = Query(None, description="Sadece bu kullanıcı"),
+    agent_id: Optional[str] = Query(None, description="Sadece bu agent"),
+    group_by: str = Query("day", description="day, user, agent veya model"),
+) -> Any:
+    """agno_metrics'teki günlük kullanım satırlarını ve henüz yazılmamış kullanımı özetler."""
+    if group_by not in USAGE_GROUP_BY_OPTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by şunlardan biri olmalı: {', '.join(USAGE_GROUP_BY_OPTIONS)}",
+        )
+    end_day = _parse_date(end, datetime.now(timezone.utc).date())
+    start_day = _parse_date(start, end_day - timedelta(days=6))
+    if start_day > end_day:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start, end'den sonra olamaz",
+        )
+    if group_by == "model" and (user_id or agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="group_by=model, user_id/agent_id filtresiyle birlikte kullanılamaz",
+        )
+
+    summary = await get_usage_accountant().query(start_day, end_day, user_id, agent_id, group_by)
+    return UsageStatsResponse(**summary)
@@ -0,0 +1,29 @@
+# app/client/__init__.py
+"""
+KUAgentOS async istemci SDK'sı (httpx).
+
+    from app.client import KUAgentClient, Content
+
+Sunucu modüllerini import etmez; sadece `httpx` gerektirir.
+"""
+from app.client.client import ChatReply, ChatStream, KUAgentClient, KUAgentError, Session, parse_server_timing
+from app.client.events import ChatEvent, Content, EmailIntent, End, Error, SessionInfo, parse_event
+from app.client.sse import SSEEvent, SSEParser
+
+__all__ = [
+    "ChatEvent",
+    "ChatReply",
+    "ChatStream",
+    "Content",
+    "EmailIntent",
+    "End",
+    "Error",
+    "KUAgentClient",
+    "KUAgentError",
+    "SSEEvent",
+    "SSEParser",
+    "Session",
+    "SessionInfo",
+    "parse_event",
+    "parse_server_timing",
+]
@@ -0,0 +1,365 @@
+# app/client/client.py
+"""
+KUAgentOS chat API için async istemci.
+
+- Tek `httpx.AsyncClient` ile bağlantı havuzu ve keep-alive
+- Her mantıksal istek bir `Idempotency-Key` taşır; bağlantı hatası, timeout,
+  429 ve 502/503/504 durumlarında aynı anahtarla üstel backoff ile tekrar denenir
+  (sunucu aynı anahtarlı isteği yeniden çalıştırmaz, kayıtlı yanıtı döner)
+- Stream'ler bağlantı koparsa `Last-Event-ID` ile kaldığı yerden devam eder
+
+Örnek:
+    async with KUAgentClient("http://localhost:8000") as client:
+        stream = client.start_stream("user-1", "Kaç teklif gerekir?")
+        async for event in stream:
+            if isinstance(event, Content):
+                print(event.text, end="")
+        reply = await client.send(stream.session, "Bu konuda mail taslağı hazırlar mısın?")
+        if reply.pending_confirmation:
+            await client.confirm(stream.session)
+"""
+import asyncio
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.client.events import ChatEvent, Content, EmailIntent, End, Error, SessionInfo, parse_event
+from app.client.sse import SSEParser
+
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+MAX_RETRY_AFTER_SECONDS = 30.0
+DEFAULT_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+
+class KUAgentError(Exception):
+    """
+    API hatası.
+
+    Attributes:
+        status: HTTP durum kodu (bağlantı hatalarında 0)
+        detail: Sunucunun `detail` alanı veya hata açıklaması
+    """
+
+    def __init__(self, status: int, detail: str):
+        self.status = status
+        self.detail = detail
+        super().__init__(f"HTTP {status}: {detail}" if status else detail)
+
+
+@dataclass
+class Session:
+    """Açık bir chat session'ı; `send`/`confirm`/`cancel` çağrılarında kullanılır."""
+    user_id: str
+    session_id: str
+    agent_id: str
+    agent_name: Optional[str] = None
+    routing_reason: Optional[str] = None
+
+
+@dataclass
+class ChatReply:
+    """Stream olmayan çağrıların sonucu."""
+    reply: str
+    session: Optional[Session] = None
+    email_intent: bool = False
+    email_triggered: bool = False
+    email_info: Optional[Dict[str, Any]] = None
+    server_total: Optional[float] = None
+
+    @property
+    def pending_confirmation(self) -> bool:
+        return self.email_intent
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """`Server-Timing` header'ını span adı -> ms sözlüğüne çevirir."""
+    timings: Dict[str, float] = {}
+    for metric in (header or "").split(","):
+        name, _, params = metric.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                try:
+                    timings[name] = float(value)
+                except ValueError:
+                    pass
+    return timings
+
+
+def _detail(body: bytes) -> str:
+    try:
+        data = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return body.decode("utf-8", errors="replace")[:200]
+    return str(data.get("detail", data)) if isinstance(data, dict) else str(data)
+
+
+class _Interrupted(Exception):
+    """Stream `end`/`error` event'i gelmeden kapandı."""
+
+
+class ChatStream:
+    """
+    Tek bir chat isteğinin event akışı; `async for` ile tüketilir.
+
+    Yanıt SSE değilse (ör. onay/iptal turları, `stream=false`) JSON gövdesi de
+    aynı event'lere çevrilir: `SessionInfo` (varsa), `Content`, `EmailIntent`
+    (varsa) ve `End`. İterasyon sonunda `session`, `text`, `end`, `error`
+    alanları doldurulmuş olur.
+    """
+
+    def __init__(self, client: "KUAgentClient", path: str, payload: Dict[str, Any]):
+        self._client = client
+        self.path = path
+        self.payload = payload
+        self.idempotency_key = str(uuid.uuid4())
+        self.user_id = payload.get("user_id", "")
+        self.status = 0
+        self.stream = False
+        self.session: Optional[Session] = None
+        self.text = ""
+        self.email_intent: Optional[EmailIntent] = None
+        self.end: Optional[End] = None
+        self.error: Optional[Error] = None
+        self.reconnects = 0
+        self._consumed = False
+
+    def __aiter__(self) -> AsyncIterator[ChatEvent]:
+        if self._consumed:
+            raise RuntimeError("ChatStream bir kez tüketilebilir")
+        self._consumed = True
+        return self._events()
+
+    async def collect(self) -> "ChatStream":
+        """Tüm event'leri tüketir ve stream'i döner."""
+        async for _ in self:
+            pass
+        return self
+
+    def reply(self) -> ChatReply:
+        end = self.end or End()
+        return ChatReply(
+            reply=self.text,
+            session=self.session,
+            email_intent=self.email_intent is not None or end.email_intent,
+            email_triggered=end.email_triggered,
+            email_info=end.email_info,
+            server_total=end.total,
+        )
+
+    def _track(self, event: ChatEvent) -> None:
+        if isinstance(event, Content):
+            self.text += event.text
+        elif isinstance(event, SessionInfo):
+            self.session = Session(
+                user_id=self.user_id,
+                session_id=event.session_id,
+                agent_id=event.agent_id,
+                agent_name=event.agent_name,
+                routing_reason=event.routing_reason,
+            )
+        elif isinstance(event, EmailIntent):
+            self.email_intent = event
+        elif isinstance(event, End):
+            self.end = event
+        elif isinstance(event, Error):
+            self.error = event
+
+    async def _events(self) -> AsyncIterator[ChatEvent]:
+        client = self._client
+        last_event_id: Optional[str] = None
+        # Sunucu event id'si göndermiyorsa tekrar bağlanınca baştan gelen event'ler atlanır
+        delivered = 0
+        attempt = 0
+        while True:
+            headers = {"Idempotency-Key": self.idempotency_key}
+            if last_event_id is not None:
+                headers["Last-Event-ID"] = last_event_id
+            skip = delivered if last_event_id is None else 0
+            try:
+                async with client.http.stream("POST", self.path, json=self.payload, headers=headers) as response:
+                    self.status = response.status_code
+                    if response.status_code >= 400:
+                        body = await response.aread()
+                        if response.status_code in RETRYABLE_STATUSES and attempt < client.retries:
+                            attempt += 1
+                            await asyncio.sleep(client.backoff_delay(attempt, response.headers.get("retry-after")))
+                            continue
+                        raise KUAgentError(response.status_code, _detail(body))
+
+                    if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                        body = await response.aread()
+                        try:
+                            data = json.loads(body)
+                        except json.JSONDecodeError:
+                            raise KUAgentError(response.status_code, f"geçersiz JSON yanıtı: {body[:100]!r}")
+                        for event in self._json_events(data, response.headers.get("server-timing")):
+                            self._track(event)
+                            yield event
+                        return
+
+                    self.stream = True
+                    parser = SSEParser()
+                    async for chunk in response.aiter_bytes():
+                        for sse in parser.feed(chunk):
+                            if sse.id is not None:
+                                last_event_id = sse.id
+                            try:
+                                event = parse_event(json.loads(sse.data))
+                            except json.JSONDecodeError:
+                                continue
+                            if event is None:
+                                continue
+                            if skip:
+                                skip -= 1
+                                continue
+                            delivered += 1
+                            self._track(event)
+                            yield event
+                            if isinstance(event, (End, Error)):
+                                return
+                    raise _Interrupted("stream end event'i gelmeden kapandı")
+            except (httpx.TransportError, _Interrupted) as e:
+                if attempt >= client.retries:
+                    raise KUAgentError(0, f"{type(e).__name__}: {e}") from e
+                attempt += 1
+                self.reconnects += 1
+                await asyncio.sleep(client.backoff_delay(attempt))
+
+    def _json_events(self, data: Dict[str, Any], server_timing: Optional[str]) -> List[ChatEvent]:
+        events: List[ChatEvent] = []
+        if data.get("session_id") and data.get("assigned_agent_id"):
+            events.append(SessionInfo(
+                session_id=data["session_id"],
+                agent_id=data["assigned_agent_id"],
+                agent_name=data.get("assigned_agent_name"),
+                routing_reason=data.get("routing_reason"),
+            ))
+        events.append(Content(text=data.get("reply") or ""))
+        email_info = data.get("email_info") or {}
+        pending = bool(email_info.get("pending_confirmation"))
+        if pending:
+            events.append(EmailIntent(
+                recipient_hint=email_info.get("recipient_hint"),
+                subject_suggestion=email_info.get("subject_suggestion"),
+            ))
+        total_ms = parse_server_timing(server_timing).get("total")
+        events.append(End(
+            total=total_ms / 1000 if total_ms is not None else data.get("latency_seconds"),
+            email_intent=pending,
+            email_triggered=bool(data.get("email_triggered")),
+            email_info=email_info or None,
+        ))
+        return events
+
+
+class KUAgentClient:
+    """
+    KUAgentOS chat API istemcisi.
+
+    Args:
+        base_url: Sunucu adresi
+        timeout: httpx timeout'u (stream'lerde okuma timeout'u parçalar arası süredir)
+        max_connections: Havuzdaki en fazla bağlantı
+        max_keepalive_connections: Açık tutulan boşta bağlantı sayısı
+        keepalive_expiry: Boştaki bağlantının kapatılma süresi (saniye)
+        retries: Bağlantı hatası / geçici HTTP hatası başına en fazla tekrar
+        backoff: İlk tekrar beklemesi (saniye); her denemede iki katına çıkar
+        transport: Özel httpx transport'u (test, ASGI)
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        *,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "KUAgentClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Üstel backoff + jitter; sunucu `Retry-After` verdiyse o kullanılır."""
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+            except ValueError:
+                pass
+        delay = self.backoff * (2 ** (attempt - 1))
+        return delay + random.uniform(0, delay / 2)
+
+    async def health(self) -> Dict[str, Any]:
+        response = await self.http.get("/api/health")
+        if response.status_code >= 400:
+            raise KUAgentError(response.status_code, _detail(response.content))
+        return response.json()
+
+    # --- Düşük seviye ---
+
+    def request_stream(self, path: str, payload: Dict[str, Any]) -> ChatStream:
+        """Verilen chat endpoint'ine isteği hazırlar; istek iterasyon başlayınca gönderilir."""
+        return ChatStream(self, path, payload)
+
+    # --- Session başlatma ---
+
+    def start_stream(self, user_id: str, message: str) -> ChatStream:
+        """Yeni session açar; ilk event `SessionInfo`, sonra cevap parçaları gelir."""
+        return self.request_stream("/api/chat/start", {"user_id": user_id, "message": message, "stream": True})
+
+    async def start(self, user_id: str, message: str) -> ChatReply:
+        stream = await self.request_stream(
+            "/api/chat/start", {"user_id": user_id, "message": message, "stream": False}
+        ).collect()
+        return stream.reply()
+
+    # --- Mesaj ---
+
+    def _message_payload(self, session: Session, message: str, stream: bool) -> Dict[str, Any]:
+        return {"user_id": session.user_id, "session_id": session.session_id, "message": message, "stream": stream}
+
+    def send_stream(self, session: Session, message: str) -> ChatStream:
+        stream = self.request_stream(f"/api/chat/agents/{session.agent_id}", self._message_payload(session, message, True))
+        stream.session = session
+        return stream
+
+    async def send(self, session: Session, message: str) -> ChatReply:
+        stream = self.request_stream(f"/api/chat/agents/{session.agent_id}", self._message_payload(session, message, False))
+        stream.session = session
+        return (await stream.collect()).reply()
+
+    async def confirm(self, session: Session, message: str = "gönder") -> ChatReply:
+        """Bekleyen mail taslağını onaylar (sunucu onay kelimelerini arar)."""
+        return await self.send(session, message)
+
+    async def cancel(self, session: Session, message: str = "iptal") -> ChatReply:
+        """Bekleyen mail taslağını iptal eder."""
+        return await self.send(session, message)
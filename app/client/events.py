@@ -0,0 +1,104 @@
+# app/client/events.py
+"""
+Chat stream event tipleri.
+
+Sunucunun SSE `data:` payload'ları tipli nesnelere çevrilir:
+`session_info`, `content`, `email_intent`, `end` ve `error`.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Union
+
+
+@dataclass
+class SessionInfo:
+    """`/chat/start` stream'inin ilk event'i: açılan session ve routing sonucu."""
+    session_id: str
+    agent_id: str
+    agent_name: Optional[str] = None
+    routing_reason: Optional[str] = None
+    type: str = field(default="session_info", init=False)
+
+
+@dataclass
+class Content:
+    """Model cevabından bir parça."""
+    text: str
+    type: str = field(default="content", init=False)
+
+
+@dataclass
+class EmailIntent:
+    """Agent mail taslağı hazırladı; gönderim kullanıcı onayını bekliyor."""
+    recipient_hint: Optional[str] = None
+    subject_suggestion: Optional[str] = None
+    type: str = field(default="email_intent", init=False)
+
+
+@dataclass
+class End:
+    """
+    Yanıtın sonu.
+
+    Attributes:
+        first_token: Sunucuda ölçülen ilk token süresi (s)
+        total: Sunucuda ölçülen toplam süre (s)
+        timings: Span adı -> ms (sunucu trace özeti)
+        email_intent: Bu turda mail taslağı üretildi mi?
+        email_triggered: Mail gönderildi mi? (onay turları)
+        email_info: Mail bilgileri (varsa)
+    """
+    first_token: Optional[float] = None
+    total: Optional[float] = None
+    timings: Optional[Dict[str, float]] = None
+    email_intent: bool = False
+    email_triggered: bool = False
+    email_info: Optional[Dict[str, Any]] = None
+    type: str = field(default="end", init=False)
+
+
+@dataclass
+class Error:
+    """Stream sırasında sunucuda oluşan hata."""
+    message: str
+    type: str = field(default="error", init=False)
+
+
+ChatEvent = Union[SessionInfo, Content, EmailIntent, End, Error]
+
+
+def parse_event(data: Dict[str, Any]) -> Optional[ChatEvent]:
+    """
+    SSE `data:` JSON'unu tipli event'e çevirir.
+
+    Args:
+        data: Parse edilmiş payload
+
+    Returns:
+        Optional[ChatEvent]: Tanınmayan payload'larda None
+    """
+    kind = data.get("type")
+    if "content" in data:
+        return Content(text=data["content"])
+    if kind == "session_info":
+        return SessionInfo(
+            session_id=data["session_id"],
+            agent_id=data["assigned_agent_id"],
+            agent_name=data.get("assigned_agent_name"),
+            routing_reason=data.get("routing_reason"),
+        )
+    if kind == "email_intent":
+        return EmailIntent(
+            recipient_hint=data.get("recipient_hint"),
+            subject_suggestion=data.get("subject_suggestion"),
+        )
+    if kind == "end":
+        metrics = data.get("metrics") or {}
+        return End(
+            first_token=metrics.get("first_token"),
+            total=metrics.get("total"),
+            timings=data.get("timings"),
+            email_intent=bool(data.get("email_intent")),
+        )
+    if "error" in data:
+        return Error(message=str(data["error"]))
+    return None
@@ -0,0 +1,80 @@
+# app/client/sse.py
+"""
+Server-Sent Events parser'ı.
+
+İstemci SDK'sı, CLI ve benchmark araçları aynı parser'ı kullanır.
+"""
+import codecs
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class SSEEvent:
+    event: str = "message"
+    data: str = ""
+    id: Optional[str] = None
+
+
+class SSEParser:
+    """
+    Artımlı Server-Sent Events parser'ı (WHATWG spesifikasyonu).
+
+    `feed()` gelen byte'ları alır ve tamamlanan event'leri döner; satır
+    sonları `\\n`, `\\r\\n` veya `\\r` olabilir.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._event = ""
+        self._data: List[str] = []
+        self._id: Optional[str] = None
+        self.last_event_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        self._buffer += self._decoder.decode(chunk)
+        events: List[SSEEvent] = []
+        while True:
+            index = min(
+                (i for i in (self._buffer.find("\r"), self._buffer.find("\n")) if i != -1),
+                default=-1,
+            )
+            if index == -1:
+                break
+            # Buffer sonundaki \r, devamında \n gelebileceği için bekletilir
+            if self._buffer[index] == "\r" and index == len(self._buffer) - 1:
+                break
+            line = self._buffer[:index]
+            skip = 2 if self._buffer.startswith("\r\n", index) else 1
+            self._buffer = self._buffer[index + skip:]
+            event = self._line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _line(self, line: str) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line.startswith(":"):
+            return None
+        name, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if name == "data":
+            self._data.append(value)
+        elif name == "event":
+            self._event = value
+        elif name == "id" and "\0" not in value:
+            self._id = value
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if self._id is not None:
+            self.last_event_id = self._id
+        if not self._data:
+            self._event = ""
+            return None
+        event = SSEEvent(event=self._event or "message", data="\n".join(self._data), id=self.last_event_id)
+        self._event, self._data = "", []
+        return event
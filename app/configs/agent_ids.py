@@ -20,14 +20,14 @@ class AgentID(str, Enum):
 
 # Type-safe agent ID doğrulama helper
 def is_valid_agent_id(agent_id: str) -> bool:
-    """Verilen agent_id geçerli mi kontrol eder."""
-    return agent_id in [e.value for e in AgentID]
+    """Verilen agent_id agent registry'de tanımlı mı kontrol eder."""
+    from app.agents.registry import get_agent_registry
+
+    return agent_id in get_agent_registry()
 
 
 def get_agent_display_name(agent_id: str) -> str:
-    """Agent ID'ye göre kullanıcı dostu isim döner."""
-    display_names = {
-        AgentID.ORCHESTRATOR: "Yönlendirme Asistanı",
-        AgentID.SATINALMA_PDF: "Satınalma Asistanı",
-    }
-    return display_names.get(agent_id, agent_id)
+    """Agent ID'ye göre kullanıcı dostu isim döner (agents.json'daki display_name)."""
+    from app.agents.registry import get_agent_registry
+
+    return get_agent_registry().display_name(agent_id)
@@ -41,3 +41,17 @@ class ModelProviderError(BaseAgentError):
 class MailServiceError(BaseAgentError):
     """Mail gönderimi sırasında hatalar."""
     pass
+
+
+class QuotaExceededError(BaseAgentError):
+    """Kullanıcının günlük kullanım kotası aşıldığında."""
+    def __init__(self, message: str, detail: Optional[str] = None, retry_after_seconds: int = 0):
+        self.retry_after_seconds = retry_after_seconds
+        super().__init__(message, detail)
+
+
+class RateLimitExceededError(QuotaExceededError):
+    """Kullanıcı başına istek/token hız limiti veya model kuyruğu sınırı aşıldığında."""
+    def __init__(self, message: str, detail: Optional[str] = None, retry_after_seconds: int = 0, limit: str = ""):
+        self.limit = limit
+        super().__init__(message, detail, retry_after_seconds)
@@ -1,57 +1,277 @@
 # app/configs/logging.py
 """
 Logging konfigürasyonu.
-Production ortamında daha gelişmiş logging (structured logging, log aggregation) kullanılabilir.
+
+Root logger'a senkron handler'lar yerine bir `QueueHandler` bağlanır; kayıtlar
+sınırlı bir kuyruğa bırakılır ve asıl I/O (console, dönen log dosyası) ayrı bir
+thread'de çalışan `QueueListener` tarafından yapılır. Event loop'ta kalan maliyet
+mesajın formatlanması ve kuyruğa eklenmesidir.
+
+Ek olarak:
+- JSON (structured) çıktı
+- İstek bazlı context alanları (session_id, agent_id, ...)
+- DEBUG kayıtları için örnekleme ve çağrı noktası başına rate limit
 """
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_atexit_registered = False
+
+CONTEXT_FIELDS = ("session_id", "agent_id", "user_id")
+_EXC_FORMATTER = logging.Formatter()
+
+
+def bind_log_context(**fields: Any) -> None:
+    """
+    Mevcut request/task context'ine log alanları ekler.
+
+    Eklenen alanlar aynı context'teki tüm log kayıtlarına otomatik yazılır.
+
+    Args:
+        **fields: Örn. session_id="...", agent_id="..."
+    """
+    current = _log_context.get()
+    _log_context.set({**current, **{k: v for k, v in fields.items() if v is not None}})
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Blok süresince log context alanlarını ekler, sonra eski haline döner."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def get_log_context() -> Dict[str, Any]:
+    return _log_context.get()
+
+
+class ContextFilter(logging.Filter):
+    """Context alanlarını kayda ekler (kayıt kuyruğa girmeden önce çalışır)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        record.context = context
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field, "-"))
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    DEBUG kayıtlarını örnekler ve çağrı noktası başına saniyelik limit uygular.
+    INFO ve üstü kayıtlara dokunmaz.
+
+    Args:
+        sample_rate: Geçirilecek DEBUG kayıt oranı (0-1)
+        rate_limit_per_second: (logger, satır) başına saniyede maksimum kayıt
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate_limit_per_second: int = 0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_limit_per_second = rate_limit_per_second
+        self._windows: Dict[Tuple[str, int], Tuple[int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if self.rate_limit_per_second > 0:
+            key = (record.name, record.lineno)
+            second = int(time.monotonic())
+            window, count = self._windows.get(key, (second, 0))
+            if window != second:
+                window, count = second, 0
+            if count >= self.rate_limit_per_second:
+                self._windows[key] = (window, count)
+                return False
+            self._windows[key] = (window, count + 1)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Her kaydı tek satırlık JSON olarak yazar."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Kuyruk doluysa bloklamak yerine kaydı düşürüp sayan QueueHandler."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Varsayılan prepare traceback'i mesaja gömer; JSON çıktıda ayrı alan
+        # olarak kalması için exc_text'e taşınır
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 def setup_logging(
     level: int = logging.INFO,
     log_file: str = None,
+    json_format: bool = False,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    queue_size: int = 10000,
+    debug_sample_rate: float = 1.0,
+    debug_rate_limit_per_second: int = 0,
 ) -> None:
     """
     Application logging'i yapılandırır.
-    
+
     Args:
         level: Log seviyesi (logging.DEBUG, logging.INFO, vs.)
-        log_file: Log dosyası yolu (opsiyonel)
+        log_file: Log dosyası yolu (opsiyonel, boyuta göre döner)
+        json_format: True ise structured JSON çıktı
+        max_bytes: Log dosyası rotasyon boyutu
+        backup_count: Saklanacak eski log dosyası sayısı
+        queue_size: Log kuyruğu kapasitesi; dolarsa kayıtlar düşürülür
+        debug_sample_rate: DEBUG kayıtlarının örneklenme oranı (0-1)
+        debug_rate_limit_per_second: Çağrı noktası başına saniyelik DEBUG limiti
     """
+    global _listener, _queue_handler, _atexit_registered
+    stop_logging()
+
     # Root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
-    
+
     # Clear existing handlers
     root_logger.handlers.clear()
-    
+
     # Format
-    log_format = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    
-    # Console handler
+    if json_format:
+        log_format: logging.Formatter = JsonFormatter()
+    else:
+        log_format = logging.Formatter(
+            fmt="%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(session_id)s | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+
+    # Console handler (listener thread'inde çalışır)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(log_format)
-    root_logger.addHandler(console_handler)
-    
-    # File handler (opsiyonel)
+    handlers = [console_handler]
+
+    # File handler (opsiyonel, boyuta göre rotasyon)
     if log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
         file_handler.setLevel(level)
         file_handler.setFormatter(log_format)
-        root_logger.addHandler(file_handler)
-    
+        handlers.append(file_handler)
+
+    # Root logger'a sadece kuyruk handler'ı bağlanır
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate, debug_rate_limit_per_second))
+    _queue_handler.addFilter(ContextFilter())
+    root_logger.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        _queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    if not _atexit_registered:
+        # setup_logging tekrar çağrılabilir (reload, testler); hook bir kez kaydedilir
+        atexit.register(stop_logging)
+        _atexit_registered = True
+
     # Kütüphane loglarını azalt
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("httpcore").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
-    
+
     # İlk log
     root_logger.info("Logging initialized")
+
+
+def setup_logging_from_settings(settings: Any) -> None:
+    """`LoggingSettings` grubundaki değerlerle setup_logging çağırır."""
+    config = settings.logging
+    setup_logging(
+        level=logging.getLevelName(config.log_level.upper()),
+        log_file=config.log_file,
+        json_format=config.log_format == "json",
+        max_bytes=config.log_max_bytes,
+        backup_count=config.log_backup_count,
+        queue_size=config.log_queue_size,
+        debug_sample_rate=config.log_debug_sample_rate,
+        debug_rate_limit_per_second=config.log_debug_rate_limit_per_second,
+    )
+
+
+def stop_logging() -> None:
+    """Listener'ı durdurur; kuyruktaki kayıtlar yazılır."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            # Sentinel kuyruğa sığmadı; daemon thread process ile birlikte kapanır
+            pass
+        _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    """Log kuyruğu derinliği ve düşürülen kayıt sayısı."""
+    if _queue_handler is None:
+        return {"queue_depth": 0, "dropped": 0}
+    return {
+        "queue_depth": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+    }
@@ -4,8 +4,10 @@ Uygulama ayarları ve konfigürasyon yönetimi.
 """
 import os
 from pathlib import Path
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, field_validator, model_validator
 
 
 class GoogleSettings(BaseSettings):
@@ -19,16 +21,40 @@ class GoogleSettings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
         extra = "ignore"
-    project_id: str = Field(..., env="PROJECT_ID")
+    # MODEL_PROVIDER=gemini iken zorunlu (Settings içinde doğrulanır)
+    project_id: Optional[str] = Field(default=None, env="PROJECT_ID")
     location: str = Field(default="us-central1", env="LOCATION")
     gemini_model_name: str = Field(default="gemini-2.5-flash", env="GEMINI_MODEL_NAME")
 
 
 class VertexAISearchSettings(BaseSettings):
     """Vertex AI Search (RAG) ayarları."""
-    data_store_id: str = Field(..., env="DATA_STORE_ID")
+    # MODEL_PROVIDER=gemini iken zorunlu (Settings içinde doğrulanır)
+    data_store_id: Optional[str] = Field(default=None, env="DATA_STORE_ID")
     data_store_location: str = Field(default="global", env="DATA_STORE_LOCATION")
-    gcs_bucket_name: str = Field(..., env="GCS_BUCKET_NAME")
+    gcs_bucket_name: Optional[str] = Field(default=None, env="GCS_BUCKET_NAME")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class ModelSettings(BaseSettings):
+    """Model sağlayıcı seçimi ve offline mock model ayarları."""
+    # "gemini" (Vertex AI) veya "mock" (ağ ve kimlik bilgisi gerektirmez)
+    model_provider: str = Field(default="gemini", env="MODEL_PROVIDER")
+    mock_model_seed: int = Field(default=0, env="MOCK_MODEL_SEED")
+    # İlk token süresi log-normal: medyan ve p95 (ms)
+    mock_model_ttft_ms: float = Field(default=400.0, env="MOCK_MODEL_TTFT_MS")
+    mock_model_ttft_p95_ms: float = Field(default=1200.0, env="MOCK_MODEL_TTFT_P95_MS")
+    # Stream parçaları arası süre (ms) ve parça başına kelime
+    mock_model_token_ms: float = Field(default=25.0, env="MOCK_MODEL_TOKEN_MS")
+    mock_model_words_per_chunk: int = Field(default=3, env="MOCK_MODEL_WORDS_PER_CHUNK")
+    mock_model_reply_sentences: int = Field(default=4, env="MOCK_MODEL_REPLY_SENTENCES")
+    # Hata enjeksiyonu (0-1) ve model başına dakikalık istek limiti (0 = limitsiz)
+    mock_model_error_rate: float = Field(default=0.0, env="MOCK_MODEL_ERROR_RATE")
+    mock_model_rate_limit_rpm: int = Field(default=0, env="MOCK_MODEL_RATE_LIMIT_RPM")
 
     class Config:
         env_file = ".env"
@@ -40,6 +66,49 @@ class DatabaseSettings(BaseSettings):
     """Veritabanı ayarları."""
     sqlite_db_file: str = Field(default="data/agent_sessions.db", env="AGNO_SQLITE_DB_FILE")
 
+    # Production profili: WAL + pragmas + sınırlı connection pool
+    sqlite_journal_mode: str = Field(default="WAL", env="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="NORMAL", env="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5000, env="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_cache_size_kib: int = Field(default=65536, env="SQLITE_CACHE_SIZE_KIB")
+    sqlite_mmap_size_bytes: int = Field(default=256 * 1024 * 1024, env="SQLITE_MMAP_SIZE_BYTES")
+    sqlite_pool_size: int = Field(default=5, env="SQLITE_POOL_SIZE")
+    sqlite_pool_timeout_seconds: float = Field(default=30.0, env="SQLITE_POOL_TIMEOUT_SECONDS")
+    # Yazma işlemlerini process içinde tek writer'a sıralar
+    sqlite_serialize_writes: bool = Field(default=True, env="SQLITE_SERIALIZE_WRITES")
+    sqlite_checkpoint_interval_seconds: float = Field(default=300.0, env="SQLITE_CHECKPOINT_INTERVAL_SECONDS")
+
+    # Run'lar session blob'u yerine agno_session_runs tablosunda (run başına satır)
+    sqlite_append_only_runs: bool = Field(default=True, env="SQLITE_APPEND_ONLY_RUNS")
+    # Agent geçmişi yüklenirken okunan en az run sayısı (AgentOS okumaları tüm run'ları alır)
+    sqlite_run_history_limit: int = Field(default=20, env="SQLITE_RUN_HISTORY_LIMIT")
+
+    # Session'ları session_id hash'i ile K dosyaya dağıtır (1 = shard yok)
+    sqlite_shard_count: int = Field(default=1, env="SQLITE_SHARD_COUNT")
+    sqlite_shard_virtual_nodes: int = Field(default=64, env="SQLITE_SHARD_VIRTUAL_NODES")
+
+    # Process içi session cache (read-through / write-through)
+    session_cache_enabled: bool = Field(default=True, env="SESSION_CACHE_ENABLED")
+    session_cache_max_bytes: int = Field(default=64 * 1024 * 1024, env="SESSION_CACHE_MAX_BYTES")
+    session_cache_ttl_seconds: float = Field(default=900.0, env="SESSION_CACHE_TTL_SECONDS")
+    # Worker'lar arası invalidation: "sqlite" (paylaşımlı tablo) veya "none" (tek worker / sticky session).
+    # "none" iken birden fazla worker tespit edilirse cache açılmaz.
+    session_cache_invalidation: Literal["none", "sqlite"] = Field(default="sqlite", env="SESSION_CACHE_INVALIDATION")
+    session_cache_bus_file: str = Field(default="data/session_cache_bus.db", env="SESSION_CACHE_BUS_FILE")
+    # Başka bir worker'ın yazdığı session bu süre kadar bayat okunabilir
+    session_cache_bus_poll_seconds: float = Field(default=0.5, env="SESSION_CACHE_BUS_POLL_SECONDS")
+
+    # Bakım: retention (0 = kapalı), arşiv, batch'li silme, vacuum/analyze
+    session_retention_days: int = Field(default=0, env="SESSION_RETENTION_DAYS")
+    session_inactive_days: int = Field(default=0, env="SESSION_INACTIVE_DAYS")
+    session_archive_enabled: bool = Field(default=True, env="SESSION_ARCHIVE_ENABLED")
+    session_archive_dir: str = Field(default="data/archive", env="SESSION_ARCHIVE_DIR")
+    maintenance_interval_seconds: float = Field(default=3600.0, env="MAINTENANCE_INTERVAL_SECONDS")
+    maintenance_batch_size: int = Field(default=200, env="MAINTENANCE_BATCH_SIZE")
+    maintenance_batch_pause_seconds: float = Field(default=0.05, env="MAINTENANCE_BATCH_PAUSE_SECONDS")
+    maintenance_analyze_interval_seconds: float = Field(default=86400.0, env="MAINTENANCE_ANALYZE_INTERVAL_SECONDS")
+    sqlite_incremental_vacuum_pages: int = Field(default=2000, env="SQLITE_INCREMENTAL_VACUUM_PAGES")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -53,6 +122,230 @@ class MailSettings(BaseSettings):
     mail_default_recipient: str = Field(default="satinalma@example.com", env="MAIL_DEFAULT_RECIPIENT")
     conversation_logs_dir: str = Field(default="data/conversations", env="CONVERSATION_LOGS_DIR")
 
+    # Transport: "log" (mock, sadece loglar) veya "smtp"
+    mail_transport: str = Field(default="log", env="MAIL_TRANSPORT")
+    smtp_host: str = Field(default="localhost", env="SMTP_HOST")
+    smtp_port: int = Field(default=587, env="SMTP_PORT")
+    smtp_username: Optional[str] = Field(default=None, env="SMTP_USERNAME")
+    smtp_password: Optional[str] = Field(default=None, env="SMTP_PASSWORD")
+    smtp_use_tls: bool = Field(default=False, env="SMTP_USE_TLS")
+    smtp_start_tls: bool = Field(default=True, env="SMTP_START_TLS")
+    smtp_timeout_seconds: float = Field(default=15.0, env="SMTP_TIMEOUT_SECONDS")
+    smtp_pool_size: int = Field(default=4, env="SMTP_POOL_SIZE")
+    smtp_max_messages_per_connection: int = Field(default=100, env="SMTP_MAX_MESSAGES_PER_CONNECTION")
+    smtp_max_recipients_per_message: int = Field(default=50, env="SMTP_MAX_RECIPIENTS_PER_MESSAGE")
+    smtp_health_check_interval_seconds: float = Field(default=30.0, env="SMTP_HEALTH_CHECK_INTERVAL_SECONDS")
+    smtp_rate_limit_per_second: float = Field(default=5.0, env="SMTP_RATE_LIMIT_PER_SECOND")
+    smtp_rate_limit_burst: int = Field(default=10, env="SMTP_RATE_LIMIT_BURST")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class ConversationLogSettings(BaseSettings):
+    """Konuşma logu (JSONL) yazıcı ayarları."""
+    conversation_log_queue_size: int = Field(default=10000, env="CONVERSATION_LOG_QUEUE_SIZE")
+    conversation_log_batch_size: int = Field(default=256, env="CONVERSATION_LOG_BATCH_SIZE")
+    conversation_log_flush_interval_seconds: float = Field(
+        default=0.5, env="CONVERSATION_LOG_FLUSH_INTERVAL_SECONDS"
+    )
+    # "never": OS'e bırak, "batch": her batch sonrası, "interval": flush aralığında bir
+    conversation_log_fsync: str = Field(default="never", env="CONVERSATION_LOG_FSYNC")
+    conversation_log_max_open_files: int = Field(default=128, env="CONVERSATION_LOG_MAX_OPEN_FILES")
+
+    # Depolama: "per_session" (session başına JSONL) veya "segmented"
+    conversation_log_storage: str = Field(default="per_session", env="CONVERSATION_LOG_STORAGE")
+    conversation_log_segment_seconds: int = Field(default=3600, env="CONVERSATION_LOG_SEGMENT_SECONDS")
+    conversation_log_segment_max_bytes: int = Field(
+        default=64 * 1024 * 1024, env="CONVERSATION_LOG_SEGMENT_MAX_BYTES"
+    )
+    # Kapanmış segmentler için: "none", "gzip" veya "zstd"
+    conversation_log_compression: str = Field(default="gzip", env="CONVERSATION_LOG_COMPRESSION")
+    # 0 ise retention kapalı
+    conversation_log_retention_days: int = Field(default=0, env="CONVERSATION_LOG_RETENTION_DAYS")
+    conversation_log_maintenance_interval_seconds: float = Field(
+        default=600.0, env="CONVERSATION_LOG_MAINTENANCE_INTERVAL_SECONDS"
+    )
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class AnalyticsSettings(BaseSettings):
+    """Konuşma logu analitik index ayarları."""
+    analytics_db_file: str = Field(default="data/analytics.db", env="ANALYTICS_DB_FILE")
+    analytics_index_interval_seconds: float = Field(default=60.0, env="ANALYTICS_INDEX_INTERVAL_SECONDS")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class LoggingSettings(BaseSettings):
+    """Uygulama logging ayarları."""
+    log_level: Literal["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"] = Field(default="INFO", env="LOG_LEVEL")
+    # "text" veya "json"
+    log_format: str = Field(default="text", env="LOG_FORMAT")
+    log_file: Optional[str] = Field(default=None, env="LOG_FILE")
+    log_max_bytes: int = Field(default=10 * 1024 * 1024, env="LOG_MAX_BYTES")
+    log_backup_count: int = Field(default=5, env="LOG_BACKUP_COUNT")
+    log_queue_size: int = Field(default=10000, env="LOG_QUEUE_SIZE")
+    # DEBUG kayıtlarının örneklenme oranı (0-1) ve çağrı noktası başına saniyelik limit
+    log_debug_sample_rate: float = Field(default=1.0, env="LOG_DEBUG_SAMPLE_RATE")
+    log_debug_rate_limit_per_second: int = Field(default=50, env="LOG_DEBUG_RATE_LIMIT_PER_SECOND")
+
+    @field_validator("log_level", mode="before")
+    @classmethod
+    def _normalize_log_level(cls, value: str) -> str:
+        """LOG_LEVEL büyük/küçük harf duyarsızdır; geçersiz değer startup'ta açık hata verir."""
+        return value.strip().upper() if isinstance(value, str) else value
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class WarmupSettings(BaseSettings):
+    """Startup warm-up ve readiness ayarları."""
+    warmup_enabled: bool = Field(default=True, env="WARMUP_ENABLED")
+    warmup_timeout_seconds: float = Field(default=30.0, env="WARMUP_TIMEOUT_SECONDS")
+    # Model bağlantısını ısıtmak için 1 token'lık test üretimi
+    warmup_test_generation: bool = Field(default=True, env="WARMUP_TEST_GENERATION")
+    warmup_hot_sessions: int = Field(default=50, env="WARMUP_HOT_SESSIONS")
+    # Zorunlu adımlardan biri başarısızsa tekrar deneme aralığı
+    warmup_retry_seconds: float = Field(default=15.0, env="WARMUP_RETRY_SECONDS")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class TracingSettings(BaseSettings):
+    """Request tracing ayarları."""
+    tracing_enabled: bool = Field(default=True, env="TRACING_ENABLED")
+    # Export edilecek trace oranı (0-1); gelen traceparent'ın sampled bayrağı önceliklidir
+    tracing_sample_rate: float = Field(default=0.1, env="TRACING_SAMPLE_RATE")
+    # "none", "jsonl" veya "otlp" (OTLP/HTTP JSON)
+    tracing_exporter: str = Field(default="none", env="TRACING_EXPORTER")
+    tracing_jsonl_file: str = Field(default="data/traces/spans.jsonl", env="TRACING_JSONL_FILE")
+    tracing_otlp_endpoint: str = Field(default="http://localhost:4318/v1/traces", env="TRACING_OTLP_ENDPOINT")
+    tracing_export_queue_size: int = Field(default=1000, env="TRACING_EXPORT_QUEUE_SIZE")
+    tracing_server_timing: bool = Field(default=True, env="TRACING_SERVER_TIMING")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class IdempotencySettings(BaseSettings):
+    """`Idempotency-Key` header'lı chat istekleri için yanıt tekrarı ve stream devamı."""
+    idempotency_enabled: bool = Field(default=True, env="IDEMPOTENCY_ENABLED")
+    # Tamamlanan yanıtların (stream frame'leri dahil) saklanma süresi
+    idempotency_ttl_seconds: float = Field(default=300.0, env="IDEMPOTENCY_TTL_SECONDS")
+    idempotency_max_entries: int = Field(default=2000, env="IDEMPOTENCY_MAX_ENTRIES")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class ProfilerSettings(BaseSettings):
+    """Admin CPU profiler sınırları."""
+    profiler_enabled: bool = Field(default=True, env="PROFILER_ENABLED")
+    profiler_max_seconds: float = Field(default=60.0, env="PROFILER_MAX_SECONDS")
+    profiler_default_interval_ms: float = Field(default=10.0, env="PROFILER_DEFAULT_INTERVAL_MS")
+    profiler_min_interval_ms: float = Field(default=1.0, env="PROFILER_MIN_INTERVAL_MS")
+    profiler_max_stack_depth: int = Field(default=64, env="PROFILER_MAX_STACK_DEPTH")
+    # Örnekleyicinin harcayabileceği en fazla wall time oranı; aşılırsa aralık açılır
+    profiler_max_overhead: float = Field(default=0.02, env="PROFILER_MAX_OVERHEAD")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class MemorySettings(BaseSettings):
+    """Bellek gauge'u, tracemalloc ve otomatik heap raporu ayarları."""
+    memory_gauge_interval_seconds: float = Field(default=60.0, env="MEMORY_GAUGE_INTERVAL_SECONDS")
+    # Canlı obje sayısı izlenen tip adları (virgülle ayrılmış)
+    memory_tracked_types: str = Field(
+        default="RunOutput,RunOutputEvent,SatinalmaReply,RoutingResponse,Agent,Message",
+        env="MEMORY_TRACKED_TYPES",
+    )
+    memory_tracemalloc_on_start: bool = Field(default=False, env="MEMORY_TRACEMALLOC_ON_START")
+    memory_tracemalloc_frames: int = Field(default=10, env="MEMORY_TRACEMALLOC_FRAMES")
+    memory_max_snapshots: int = Field(default=10, env="MEMORY_MAX_SNAPSHOTS")
+    # RSS bu değeri (MB) aşınca heap raporu yazılır; 0 ise kapalı
+    memory_report_rss_mb: int = Field(default=0, env="MEMORY_REPORT_RSS_MB")
+    memory_report_cooldown_seconds: float = Field(default=3600.0, env="MEMORY_REPORT_COOLDOWN_SECONDS")
+    memory_report_dir: str = Field(default="data/memory", env="MEMORY_REPORT_DIR")
+    memory_report_top: int = Field(default=50, env="MEMORY_REPORT_TOP")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class LoopMonitorSettings(BaseSettings):
+    """Event loop lag izleyicisi."""
+    loop_monitor_enabled: bool = Field(default=True, env="LOOP_MONITOR_ENABLED")
+    loop_lag_interval_ms: float = Field(default=100.0, env="LOOP_LAG_INTERVAL_MS")
+    # Bu süreden uzun bloklamalarda loop thread'inin stack'i yakalanır
+    loop_lag_threshold_ms: float = Field(default=100.0, env="LOOP_LAG_THRESHOLD_MS")
+    loop_offenders_top: int = Field(default=20, env="LOOP_OFFENDERS_TOP")
+    loop_offender_stack_depth: int = Field(default=30, env="LOOP_OFFENDER_STACK_DEPTH")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class UsageSettings(BaseSettings):
+    """Token/maliyet muhasebesi ve kullanıcı kotaları."""
+    usage_accounting_enabled: bool = Field(default=True, env="USAGE_ACCOUNTING_ENABLED")
+    usage_flush_interval_seconds: float = Field(default=60.0, env="USAGE_FLUSH_INTERVAL_SECONDS")
+    # Varsayılan fiyatları ezmek için: {"model-id": {"input": 0.3, "output": 2.5}} (USD / 1M token)
+    usage_pricing_json: str = Field(default="", env="USAGE_PRICING_JSON")
+    # Kullanıcı başına günlük token limitleri; 0 ise kapalı
+    usage_user_daily_soft_tokens: int = Field(default=0, env="USAGE_USER_DAILY_SOFT_TOKENS")
+    usage_user_daily_hard_tokens: int = Field(default=0, env="USAGE_USER_DAILY_HARD_TOKENS")
+    # Soft limit aşıldığında domain agent'ın kullanacağı model
+    usage_downgrade_model: str = Field(default="gemini-2.5-flash-lite", env="USAGE_DOWNGRADE_MODEL")
+
+    class Config:
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+        extra = "ignore"
+
+
+class RateLimitSettings(BaseSettings):
+    """Kullanıcı başına hız limitleri ve model çalıştırmaları için adil kuyruk."""
+    rate_limit_enabled: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
+    # Kullanıcı + agent başına token bucket'lar; 0 ise ilgili limit kapalı.
+    # agents.json'daki "limits" alanı agent bazında ezer.
+    rate_limit_user_requests_per_minute: float = Field(default=30.0, env="RATE_LIMIT_USER_REQUESTS_PER_MINUTE")
+    rate_limit_user_request_burst: float = Field(default=10.0, env="RATE_LIMIT_USER_REQUEST_BURST")
+    rate_limit_user_tokens_per_minute: float = Field(default=0.0, env="RATE_LIMIT_USER_TOKENS_PER_MINUTE")
+    # 0 ise dakikalık token limiti kadar
+    rate_limit_user_token_burst: float = Field(default=0.0, env="RATE_LIMIT_USER_TOKEN_BURST")
+    # Aynı anda çalışan model run'ları; bekleyenler kullanıcı ve agent bazında adil paylaştırılır
+    rate_limit_max_concurrent_runs: int = Field(default=32, env="RATE_LIMIT_MAX_CONCURRENT_RUNS")
+    rate_limit_max_queued_per_user: int = Field(default=8, env="RATE_LIMIT_MAX_QUEUED_PER_USER")
+    rate_limit_queue_timeout_seconds: float = Field(default=30.0, env="RATE_LIMIT_QUEUE_TIMEOUT_SECONDS")
+    rate_limit_max_buckets: int = Field(default=10000, env="RATE_LIMIT_MAX_BUCKETS")
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -69,6 +362,10 @@ class AgentSettings(BaseSettings):
         ...,
         env="ORCHESTRATOR_AGENT_INSTRUCTIONS",
     )
+    # Agent registry konfigürasyonu (id, rol, talimat kaynağı, model parametreleri)
+    agent_config_file: str = Field(default="app/configs/agents.json", env="AGENT_CONFIG_FILE")
+    # Config ve talimat dosyalarında değişiklik kontrol aralığı; 0 ise izleme kapalı
+    agent_config_poll_seconds: float = Field(default=0.0, env="AGENT_CONFIG_POLL_SECONDS")
 
     class Config:
         env_file = ".env"
@@ -81,20 +378,50 @@ class Settings(BaseSettings):
     # Alt setting grupları
     google: GoogleSettings = Field(default_factory=GoogleSettings)
     vertex_search: VertexAISearchSettings = Field(default_factory=VertexAISearchSettings)
+    model: ModelSettings = Field(default_factory=ModelSettings)
     database: DatabaseSettings = Field(default_factory=DatabaseSettings)
     mail: MailSettings = Field(default_factory=MailSettings)
+    conversation_log: ConversationLogSettings = Field(default_factory=ConversationLogSettings)
+    analytics: AnalyticsSettings = Field(default_factory=AnalyticsSettings)
+    logging: LoggingSettings = Field(default_factory=LoggingSettings)
+    warmup: WarmupSettings = Field(default_factory=WarmupSettings)
+    tracing: TracingSettings = Field(default_factory=TracingSettings)
+    idempotency: IdempotencySettings = Field(default_factory=IdempotencySettings)
+    usage: UsageSettings = Field(default_factory=UsageSettings)
+    profiler: ProfilerSettings = Field(default_factory=ProfilerSettings)
+    memory: MemorySettings = Field(default_factory=MemorySettings)
+    loop_monitor: LoopMonitorSettings = Field(default_factory=LoopMonitorSettings)
+    rate_limit: RateLimitSettings = Field(default_factory=RateLimitSettings)
     agent: AgentSettings = Field(default_factory=AgentSettings)
     
     # Genel ayarlar
     os_security_key: str = Field(..., env="OS_SECURITY_KEY")
     
+    @model_validator(mode="after")
+    def _require_google_settings(self) -> "Settings":
+        """Gemini kullanılırken Google Cloud alanları zorunludur; mock model için gerekmez."""
+        if self.model.model_provider == "mock":
+            return self
+        missing = [
+            env
+            for env, value in (
+                ("PROJECT_ID", self.google.project_id),
+                ("DATA_STORE_ID", self.vertex_search.data_store_id),
+                ("GCS_BUCKET_NAME", self.vertex_search.gcs_bucket_name),
+            )
+            if not value
+        ]
+        if missing:
+            raise ValueError(f"MODEL_PROVIDER={self.model.model_provider} için zorunlu ayarlar eksik: {', '.join(missing)}")
+        return self
+
     # Legacy properties (geriye uyumluluk için)
     @property
     def google_application_credentials(self) -> str:
         return self.google.google_application_credentials
     
     @property
-    def project_id(self) -> str:
+    def project_id(self) -> Optional[str]:
         return self.google.project_id
     
     @property
@@ -106,7 +433,7 @@ class Settings(BaseSettings):
         return self.google.gemini_model_name
     
     @property
-    def data_store_id(self) -> str:
+    def data_store_id(self) -> Optional[str]:
         return self.vertex_search.data_store_id
     
     @property
@@ -114,7 +441,7 @@ class Settings(BaseSettings):
         return self.vertex_search.data_store_location
     
     @property
-    def gcs_bucket_name(self) -> str:
+    def gcs_bucket_name(self) -> Optional[str]:
         return self.vertex_search.gcs_bucket_name
     
     @property
@@ -153,17 +480,68 @@ class Settings(BaseSettings):
         env_nested_delimiter = "__"
 
 
-# Global settings instance
-settings = Settings()
-
-# Google credentials path ayarlama
-if settings.google_application_credentials:
-    creds_path = Path(settings.google_application_credentials)
-    if not creds_path.is_absolute():
-        project_root = Path(__file__).resolve().parents[2]
-        creds_path = project_root / creds_path
-    if not creds_path.exists():
-        raise FileNotFoundError(
-            f"Google kimlik dosyası bulunamadı: {creds_path}"
-        )
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(creds_path)
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """
+    Global Settings instance'ını döner.
+
+    Env okuma ve validasyon ilk çağrıda yapılır; modül import'u eksik
+    konfigürasyonda hata vermez.
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+class _LazySettings:
+    """`settings` proxy'si; attribute erişimini get_settings() instance'ına yönlendirir."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __repr__(self) -> str:
+        return f"<LazySettings loaded={_settings is not None}>"
+
+
+# Global settings instance (lazy)
+settings: Settings = _LazySettings()  # type: ignore[assignment]
+
+_credentials_checked = False
+
+
+def ensure_google_credentials() -> None:
+    """
+    Google kimlik dosyasını doğrular ve GOOGLE_APPLICATION_CREDENTIALS'ı ayarlar.
+    Model oluşturulurken çağrılır; MODEL_PROVIDER=mock iken kimlik dosyası aranmaz.
+
+    Raises:
+        FileNotFoundError: Kimlik dosyası bulunamazsa
+    """
+    global _credentials_checked
+    if _credentials_checked or get_settings().model.model_provider == "mock":
+        return
+    credentials = get_settings().google_application_credentials
+    if credentials:
+        creds_path = Path(credentials)
+        if not creds_path.is_absolute():
+            project_root = Path(__file__).resolve().parents[2]
+            creds_path = project_root / creds_path
+        if not creds_path.exists():
+            raise FileNotFoundError(
+                f"Google kimlik dosyası bulunamadı: {creds_path}"
+            )
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = str(creds_path)
+    _credentials_checked = True
+
+
+def reload_agent_settings() -> AgentSettings:
+    """
+    Agent talimatlarını env/.env'den yeniden okur ve global settings'e uygular.
+    Agent registry reload'unda çağrılır; diğer setting grupları değişmez.
+    """
+    agent_settings = AgentSettings()
+    get_settings().agent = agent_settings
+    return agent_settings
@@ -0,0 +1,68 @@
+# app/db/hash_ring.py
+"""
+Session DB shard'ları için consistent hash ring.
+Hem `ShardedSqliteDb` hem de rebalance aracı kullanır; bu modül ağır bağımlılık
+import etmez.
+"""
+import bisect
+import hashlib
+from pathlib import Path
+from typing import List, Tuple
+
+
+def _hash(key: str) -> int:
+    # Python'un hash()'i process'e göre değişir; shard ataması kalıcı olmalı
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Virtual node'lu consistent hash ring.
+
+    Shard sayısı K'dan K+1'e çıktığında session'ların yaklaşık 1/(K+1)'i yer
+    değiştirir.
+
+    Args:
+        shard_count: Shard sayısı
+        virtual_nodes: Shard başına ring üzerindeki nokta sayısı
+    """
+
+    def __init__(self, shard_count: int, virtual_nodes: int = 64):
+        if shard_count < 1:
+            raise ValueError("shard_count must be >= 1")
+        self.shard_count = shard_count
+        points: List[Tuple[int, int]] = sorted(
+            (_hash(f"shard-{shard}#{node}"), shard)
+            for shard in range(shard_count)
+            for node in range(virtual_nodes)
+        )
+        self._keys = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        if self.shard_count == 1:
+            return 0
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._shards[index]
+
+
+def shard_file(db_file: str, index: int) -> str:
+    """
+    Shard dosya yolu. Shard 0 ana DB dosyasıdır; diğerleri yanında durur:
+    data/agent_sessions.db -> data/agent_sessions.shard-1.db
+    """
+    if index == 0:
+        return db_file
+    path = Path(db_file)
+    return str(path.with_name(f"{path.stem}.shard-{index}{path.suffix}"))
+
+
+def existing_shard_files(db_file: str) -> List[Tuple[int, str]]:
+    """Diskteki shard dosyalarını (index, yol) olarak döner."""
+    path = Path(db_file)
+    found = [(0, db_file)] if path.exists() else []
+    for candidate in path.parent.glob(f"{path.stem}.shard-*{path.suffix}"):
+        index = candidate.name[len(path.stem) + len(".shard-"):-len(path.suffix) or None]
+        if index.isdigit():
+            found.append((int(index), str(candidate)))
+    return sorted(found)
@@ -0,0 +1,447 @@
+# app/db/maintenance.py
+"""
+Session DB bakım zamanlayıcısı.
+
+Periyodik olarak her shard dosyasında:
+1. Retention: `SESSION_RETENTION_DAYS`'ten eski veya `SESSION_INACTIVE_DAYS`
+   süredir güncellenmeyen session'lar seçilir
+2. Arşiv: session satırı ve run'ları gzip JSONL dosyasına yazılır
+   (`SESSION_ARCHIVE_DIR/sessions-YYYYmmdd.jsonl.gz`)
+3. Silme: küçük batch'ler halinde, her batch writer lock'u kısa süre tutarak.
+   Arşiv ve silme, seçim koşulu yeniden uygulanarak tek `BEGIN IMMEDIATE`
+   transaction'ında yapılır; seçimden sonra başka bir worker'da devam eden
+   session silinmez
+4. Incremental vacuum: boş sayfalar dosyadan geri verilir
+5. `PRAGMA optimize`, belirli aralıklarla tam `ANALYZE`
+
+Incremental vacuum için DB'nin `auto_vacuum=INCREMENTAL` olması gerekir. Yeni
+oluşturulan DB ve shard dosyaları bu modda açılır (bkz. `app/db/pragmas.py`);
+daha önce oluşturulmuş bir DB'yi bir kerelik dönüştürmek için (servis kapalıyken):
+    python -m app.db.maintenance enable-incremental-vacuum
+
+Çoklu worker'da her tur, DB dosyasının yanındaki `.maintenance.lock` dosyası
+üzerinde process'ler arası kilit alınarak çalışır; kilidi alamayan worker turu
+atlar, böylece aynı session'lar iki kez arşivlenmez.
+
+Tur sayısı, süre, silinen session ve geri kazanılan byte `/metrics` altında
+`kuagentos_db_maintenance_*` metrikleriyle yayınlanır.
+
+Elle çalıştırma:
+    python -m app.db.maintenance run [--dry-run]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.configs.settings import settings
+from app.db.pragmas import immediate_transaction
+from app.db.run_schema import RUNS_TABLE, decode_runs_column
+from app.utils.metrics import REGISTRY
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_RUNS_TOTAL = REGISTRY.counter(
+    "kuagentos_db_maintenance_runs_total",
+    "Session DB maintenance rounds by outcome (ok, error, skipped when another worker holds the lock).",
+    labelnames=("outcome",),
+)
+MAINTENANCE_DURATION_SECONDS = REGISTRY.histogram(
+    "kuagentos_db_maintenance_duration_seconds",
+    "Duration of completed session DB maintenance rounds.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0),
+)
+MAINTENANCE_DELETED_SESSIONS_TOTAL = REGISTRY.counter(
+    "kuagentos_db_maintenance_deleted_sessions_total",
+    "Sessions deleted (and archived when enabled) by retention.",
+)
+MAINTENANCE_RECLAIMED_BYTES_TOTAL = REGISTRY.counter(
+    "kuagentos_db_maintenance_reclaimed_bytes_total",
+    "Bytes returned to the filesystem by incremental vacuum.",
+)
+
+_stats: Dict[str, Any] = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_seconds": None,
+    "last_deleted_sessions": 0,
+    "last_reclaimed_bytes": 0,
+    "deleted_sessions_total": 0,
+    "archived_sessions_total": 0,
+    "reclaimed_bytes_total": 0,
+    "skipped_runs": 0,
+    "last_error": None,
+}
+_last_analyze_at = 0.0
+
+
+class MaintenanceLock:
+    """
+    Worker process'leri arasında bloklamayan, tek sahipli dosya kilidi.
+
+    Kilit, sahibi process kapandığında işletim sistemi tarafından bırakılır.
+
+    Args:
+        path: Kilit dosyası
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Kilidi almayı dener; başka bir process tutuyorsa False."""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+def maintenance_lock(db: Any) -> MaintenanceLock:
+    """Ana DB dosyasının (shard 0) yanındaki bakım kilidi."""
+    shards = list(getattr(db, "shards", [db]))
+    return MaintenanceLock(f"{shards[0].tuned_db_file}.maintenance.lock")
+
+
+def _connect(db_file: str) -> sqlite3.Connection:
+    return sqlite3.connect(db_file, timeout=settings.database.sqlite_busy_timeout_ms / 1000)
+
+
+def _expiry_predicate() -> Tuple[str, List[int]]:
+    """Süresi dolmuş session koşulu (SQL, parametreler); saklama kapalıysa boş SQL."""
+    config = settings.database
+    now = int(time.time())
+    clauses, params = [], []
+    if config.session_retention_days > 0:
+        clauses.append("created_at < ?")
+        params.append(now - config.session_retention_days * 86400)
+    if config.session_inactive_days > 0:
+        clauses.append("COALESCE(updated_at, created_at) < ?")
+        params.append(now - config.session_inactive_days * 86400)
+    return " OR ".join(clauses), params
+
+
+def _expired_session_ids(db_file: str, limit: int) -> List[str]:
+    predicate, params = _expiry_predicate()
+    if not predicate:
+        return []
+    conn = _connect(db_file)
+    try:
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agno_sessions'"
+        ).fetchone():
+            return []
+        rows = conn.execute(
+            f"SELECT session_id FROM agno_sessions WHERE {predicate} LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in rows]
+
+
+def _archive_and_delete(db_file: str, session_ids: Sequence[str], archive_dir: Optional[Path]) -> List[str]:
+    """
+    Batch'ten hâlâ süresi dolmuş olanları arşive yazar ve siler (thread'de çağrılmalı).
+
+    Aday seçimi kilitsiz yapıldığından, arada başka bir worker'da devam eden
+    session'lar korunur: koşul `BEGIN IMMEDIATE` ile alınan yazma kilidi
+    altında yeniden uygulanır; arşivlenen ve silinen satırlar aynıdır.
+
+    Returns:
+        Silinen session id'leri
+    """
+    predicate, params = _expiry_predicate()
+    if not predicate or not session_ids:
+        return []
+    marks = ",".join("?" * len(session_ids))
+    conn = sqlite3.connect(db_file, timeout=settings.database.sqlite_busy_timeout_ms / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        with immediate_transaction(conn):
+            return _archive_and_delete_locked(conn, session_ids, marks, predicate, params, archive_dir)
+    finally:
+        conn.close()
+
+
+def _archive_and_delete_locked(
+    conn: sqlite3.Connection,
+    session_ids: Sequence[str],
+    marks: str,
+    predicate: str,
+    params: List[int],
+    archive_dir: Optional[Path],
+) -> List[str]:
+    sessions = conn.execute(
+        f"SELECT * FROM agno_sessions WHERE session_id IN ({marks}) AND ({predicate})",
+        (*session_ids, *params),
+    ).fetchall()
+    expired = [row["session_id"] for row in sessions]
+    if not expired:
+        return []
+    has_runs_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RUNS_TABLE,)
+    ).fetchone()
+    expired_marks = ",".join("?" * len(expired))
+    runs: Dict[str, List[Any]] = {}
+    if has_runs_table:
+        for row in conn.execute(
+            f"SELECT session_id, run_data FROM {RUNS_TABLE} WHERE session_id IN ({expired_marks}) ORDER BY run_index",
+            expired,
+        ):
+            runs.setdefault(row["session_id"], []).append(json.loads(row["run_data"]))
+
+    if archive_dir is not None:
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        archive_path = archive_dir / f"sessions-{day}.jsonl.gz"
+        # Her batch ayrı bir gzip member'ı olarak eklenir; dosya tek parça okunabilir.
+        # Arşiv silmeden (commit'ten) önce diske yazılır
+        with gzip.open(archive_path, "at", encoding="utf-8") as archive:
+            for row in sessions:
+                record = dict(row)
+                record["runs"] = runs.get(record["session_id"]) or decode_runs_column(record.get("runs"))
+                archive.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            archive.flush()
+            os.fsync(archive.fileno())
+
+    # Aynı koşul silmede de tekrarlanır: arşivlenmeyen satır silinmez
+    if has_runs_table:
+        conn.execute(
+            f"DELETE FROM {RUNS_TABLE} WHERE session_id IN ("
+            f"SELECT session_id FROM agno_sessions WHERE session_id IN ({expired_marks}) AND ({predicate}))",
+            (*expired, *params),
+        )
+    conn.execute(
+        f"DELETE FROM agno_sessions WHERE session_id IN ({expired_marks}) AND ({predicate})",
+        (*expired, *params),
+    )
+    return expired
+
+
+def _free_bytes(db_file: str) -> int:
+    conn = _connect(db_file)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+    finally:
+        conn.close()
+
+
+def _vacuum_and_analyze(db_file: str, pages: int, full_analyze: bool) -> int:
+    """
+    Incremental vacuum ve optimize/analyze çalıştırır.
+
+    Returns:
+        Dosyadan geri verilen byte
+    """
+    conn = _connect(db_file)
+    try:
+        reclaimed = 0
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            before = _free_bytes(db_file)
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            conn.commit()
+            reclaimed = max(0, before - _free_bytes(db_file))
+        if full_analyze:
+            conn.execute("ANALYZE")
+        else:
+            conn.execute("PRAGMA optimize")
+        conn.commit()
+    finally:
+        conn.close()
+    return reclaimed
+
+
+async def run_maintenance(db: Any, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Tüm shard'larda tek bir bakım turu çalıştırır.
+
+    Args:
+        db: `shards` listesi olan session DB (agent_db)
+        dry_run: True ise sadece silinecek session sayısı raporlanır
+
+    Returns:
+        Tur özeti
+    """
+    global _last_analyze_at
+    config = settings.database
+    started = time.perf_counter()
+    full_analyze = time.time() - _last_analyze_at >= config.maintenance_analyze_interval_seconds
+    archive_dir = Path(config.session_archive_dir) if config.session_archive_enabled else None
+    cache = getattr(db, "session_cache", None)
+
+    deleted = candidates = reclaimed = 0
+    shards: List[Any] = list(getattr(db, "shards", [db]))
+    for shard in shards:
+        db_file = shard.tuned_db_file
+        if dry_run:
+            # LIMIT -1: SQLite'ta limitsiz
+            candidates += len(await asyncio.to_thread(_expired_session_ids, db_file, -1))
+            continue
+        while True:
+            session_ids = await asyncio.to_thread(_expired_session_ids, db_file, config.maintenance_batch_size)
+            if not session_ids:
+                break
+            candidates += len(session_ids)
+            # Her batch writer lock'u sadece kendi süresi kadar tutar
+            async with shard.writer():
+                removed = await asyncio.to_thread(_archive_and_delete, db_file, session_ids, archive_dir)
+            deleted += len(removed)
+            if cache is not None:
+                for session_id in removed:
+                    cache.invalidate(session_id)
+            await asyncio.sleep(config.maintenance_batch_pause_seconds)
+
+        async with shard.writer():
+            reclaimed += await asyncio.to_thread(
+                _vacuum_and_analyze, db_file, config.sqlite_incremental_vacuum_pages, full_analyze
+            )
+
+    if full_analyze and not dry_run:
+        _last_analyze_at = time.time()
+    duration = time.perf_counter() - started
+    summary = {
+        "dry_run": dry_run,
+        "candidates": candidates,
+        "deleted_sessions": deleted,
+        "reclaimed_bytes": reclaimed,
+        "duration_seconds": round(duration, 3),
+        "analyzed": full_analyze and not dry_run,
+    }
+    if not dry_run:
+        _stats["runs"] += 1
+        _stats["last_run_at"] = datetime.now(timezone.utc).isoformat()
+        _stats["last_duration_seconds"] = summary["duration_seconds"]
+        _stats["last_deleted_sessions"] = deleted
+        _stats["last_reclaimed_bytes"] = reclaimed
+        _stats["deleted_sessions_total"] += deleted
+        if archive_dir is not None:
+            _stats["archived_sessions_total"] += deleted
+        _stats["reclaimed_bytes_total"] += reclaimed
+        MAINTENANCE_RUNS_TOTAL.inc("ok")
+        MAINTENANCE_DURATION_SECONDS.observe(duration)
+        MAINTENANCE_DELETED_SESSIONS_TOTAL.inc(amount=deleted)
+        MAINTENANCE_RECLAIMED_BYTES_TOTAL.inc(amount=reclaimed)
+    logger.info(
+        f"Session DB maintenance | deleted: {deleted} | reclaimed_bytes: {reclaimed} | "
+        f"duration: {duration:.3f}s | dry_run: {dry_run}"
+    )
+    return summary
+
+
+def maintenance_stats() -> Dict[str, Any]:
+    """Health endpoint için bakım metrikleri."""
+    return dict(_stats)
+
+
+async def maintenance_loop(db: Any) -> None:
+    """
+    Startup'ta başlatılan periyodik bakım döngüsü.
+
+    Her worker'da çalışır; bir turu yalnızca bakım kilidini alan worker yürütür.
+    """
+    interval = settings.database.maintenance_interval_seconds
+    lock = maintenance_lock(db)
+    while True:
+        await asyncio.sleep(interval)
+        if not await asyncio.to_thread(lock.acquire):
+            _stats["skipped_runs"] += 1
+            MAINTENANCE_RUNS_TOTAL.inc("skipped")
+            logger.debug("Session DB maintenance skipped: another worker holds the lock")
+            continue
+        try:
+            await run_maintenance(db)
+            _stats["last_error"] = None
+        except Exception as e:
+            _stats["last_error"] = str(e)
+            MAINTENANCE_RUNS_TOTAL.inc("error")
+            logger.error(f"Session DB maintenance failed: {str(e)}", exc_info=True)
+        finally:
+            lock.release()
+
+
+def enable_incremental_vacuum(db_file: str) -> Dict[str, Any]:
+    """
+    auto_vacuum=INCREMENTAL yapar ve dosyayı VACUUM ile yeniden yazar.
+    Servis kapalıyken çalıştırılmalıdır.
+    """
+    conn = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+    try:
+        size_before = os.path.getsize(db_file)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "db_file": db_file,
+        "auto_vacuum": mode,
+        "size_before": size_before,
+        "size_after": os.path.getsize(db_file),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Session DB bakım araçları")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Tek bir bakım turu çalıştır")
+    run_parser.add_argument("--dry-run", action="store_true")
+    sub.add_parser("enable-incremental-vacuum", help="Tüm shard'ları auto_vacuum=INCREMENTAL yap")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from app.db.sqlite import agent_db
+
+    if args.command == "run":
+        lock = maintenance_lock(agent_db)
+        if not lock.acquire():
+            parser.exit(1, "Bakım şu anda başka bir process tarafından çalıştırılıyor\n")
+        try:
+            print(json.dumps(asyncio.run(run_maintenance(agent_db, dry_run=args.dry_run)), indent=2))
+        finally:
+            lock.release()
+    elif args.command == "enable-incremental-vacuum":
+        for shard in agent_db.shards:
+            print(json.dumps(enable_incremental_vacuum(shard.tuned_db_file)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# app/db/pragmas.py
+"""
+SQLite pragma profili.
+Hem uygulama engine'i hem de benchmark script'leri aynı ayarları kullanır;
+bu modül ağır bağımlılık import etmez. Ham sqlite3 bağlantıları için
+process'ler arası yazma transaction'ı da buradadır.
+"""
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+
+
+def sqlite_pragmas(
+    journal_mode: str = "WAL",
+    synchronous: str = "NORMAL",
+    busy_timeout_ms: int = 5000,
+    cache_size_kib: int = 65536,
+    mmap_size_bytes: int = 256 * 1024 * 1024,
+    temp_store: str = "MEMORY",
+    auto_vacuum: str = "INCREMENTAL",
+) -> List[str]:
+    """
+    Bağlantı açılışında çalıştırılacak PRAGMA listesini üretir.
+
+    Args:
+        journal_mode: WAL okuyucuların writer'ı beklemesini engeller
+        synchronous: WAL ile NORMAL, commit başına fsync'i checkpoint'e taşır
+        busy_timeout_ms: Kilit beklerken hata vermeden önceki süre
+        cache_size_kib: Bağlantı başına page cache (KiB)
+        mmap_size_bytes: Memory-mapped I/O boyutu (0 ise kapalı)
+        temp_store: Geçici tablolar için "MEMORY" veya "FILE"
+        auto_vacuum: Yalnızca henüz tablo içermeyen (yeni) dosyada etkilidir;
+            WAL'a geçilmeden önce çalışmalıdır. Mevcut DB'ler için
+            `python -m app.db.maintenance enable-incremental-vacuum`
+
+    Returns:
+        PRAGMA ifadeleri
+    """
+    return [
+        f"PRAGMA auto_vacuum={auto_vacuum}",
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA cache_size=-{int(cache_size_kib)}",
+        f"PRAGMA mmap_size={int(mmap_size_bytes)}",
+        f"PRAGMA temp_store={temp_store}",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+def pragmas_from_settings(database_settings: Any) -> List[str]:
+    """`DatabaseSettings` grubundan pragma listesi üretir."""
+    return sqlite_pragmas(
+        journal_mode=database_settings.sqlite_journal_mode,
+        synchronous=database_settings.sqlite_synchronous,
+        busy_timeout_ms=database_settings.sqlite_busy_timeout_ms,
+        cache_size_kib=database_settings.sqlite_cache_size_kib,
+        mmap_size_bytes=database_settings.sqlite_mmap_size_bytes,
+    )
+
+
+def apply_pragmas(dbapi_connection: Any, pragmas: List[str]) -> None:
+    """DB-API bağlantısı üzerinde pragma'ları çalıştırır."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def immediate_transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Yazma kilidini baştan alan (`BEGIN IMMEDIATE`) transaction.
+
+    Oku-karar ver-yaz adımları diğer worker process'lerinin yazmalarıyla
+    araya girmeden tek transaction'da çalışır. Bağlantı `isolation_level=None`
+    (autocommit) ile açılmış olmalıdır.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,55 @@
+# app/db/run_schema.py
+"""
+Append-only run tablosunun şeması.
+Hem `RunLogSqliteDb` hem de benchmark script'leri kullanır; bu modül ağır
+bağımlılık import etmez.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List
+
+RUNS_TABLE = "agno_session_runs"
+RUNS_VIEW = "agno_sessions_with_runs"
+
+RUNS_DDL = (
+    f"CREATE TABLE IF NOT EXISTS {RUNS_TABLE} ("
+    " session_id VARCHAR NOT NULL,"
+    " run_index INTEGER NOT NULL,"
+    " run_id VARCHAR NOT NULL,"
+    " agent_id VARCHAR,"
+    " run_hash VARCHAR NOT NULL,"
+    " run_data JSON NOT NULL,"
+    " created_at BIGINT NOT NULL,"
+    " PRIMARY KEY (session_id, run_index))",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{RUNS_TABLE}_run_id ON {RUNS_TABLE} (session_id, run_id)",
+    # Eski araçlar için: runs kolonunu run tablosundan yeniden oluşturan view.
+    # Önceki sürümlerin view'ı taşınmamış session'lar için boş liste döndürüyordu;
+    # tanım her açılışta yenilenir
+    f"DROP VIEW IF EXISTS {RUNS_VIEW}",
+    f"CREATE VIEW IF NOT EXISTS {RUNS_VIEW} AS"
+    " SELECT s.session_id, s.session_type, s.agent_id, s.team_id, s.workflow_id, s.user_id,"
+    " s.session_data, s.agent_data, s.team_data, s.workflow_data, s.metadata, s.summary,"
+    " s.created_at, s.updated_at,"
+    # Boş kümede json_group_array NULL değil '[]' döner; taşınmamış session blob'unu korur
+    f" CASE WHEN EXISTS (SELECT 1 FROM {RUNS_TABLE} WHERE session_id = s.session_id)"
+    " THEN (SELECT json_group_array(json(r.run_data)) FROM"
+    f" (SELECT run_data FROM {RUNS_TABLE} WHERE session_id = s.session_id ORDER BY run_index) r)"
+    " ELSE s.runs END AS runs"
+    " FROM agno_sessions s",
+)
+
+
+def hash_run(run_json: str) -> str:
+    return hashlib.blake2b(run_json.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def decode_runs_column(value: Any) -> List[Dict[str, Any]]:
+    """
+    `agno_sessions.runs` değerini listeye çevirir.
+
+    agno SQLite'ta runs'ı JSON string olarak JSON kolona yazdığı için değer
+    iki kez encode edilmiş olabilir.
+    """
+    while isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    return value or []
@@ -0,0 +1,344 @@
+# app/db/run_store.py
+"""
+Append-only run deposu.
+
+agno varsayılan olarak bir session'ın tüm run'larını `agno_sessions.runs` JSON
+kolonunda tutar; her turn'de blob okunur, deserialize edilir, sonuna ekleme
+yapılıp tamamı yeniden yazılır. Bu modülde run'lar ayrı bir tabloda, run başına
+bir satır olarak saklanır:
+
+    agno_session_runs (session_id, run_index) -> run_data
+
+- Yazarken sadece yeni veya değişmiş run'lar yazılır (içerik hash'i ile)
+- Agent'ın geçmiş yüklemesi (`agent_history_scope` içinde) sadece son
+  `max(num_history_runs, SQLITE_RUN_HISTORY_LIMIT)` run'ı okur; AgentOS
+  endpoint'leri gibi diğer okumalar tüm run listesini alır
+- `agno_sessions.runs` kolonu taşınan session'lar için NULL kalır; `runs`
+  kolonunu SQL ile okuyan araçlar `agno_sessions_with_runs` view'ını kullanabilir
+
+Mevcut DB için migration:
+    python -m app.db.run_store migrate
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.configs.settings import settings
+from app.db.run_schema import RUNS_DDL, RUNS_TABLE, decode_runs_column, hash_run
+from app.db.tuned_sqlite import TunedAsyncSqliteDb
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+# Agent run'ı sırasında geçmiş için istenen run sayısı; None ise tam liste okunur
+_history_runs: ContextVar[Optional[int]] = ContextVar("history_runs", default=None)
+
+
+@contextmanager
+def agent_history_scope(num_history_runs: Optional[int] = None) -> Iterator[None]:
+    """
+    Bu blok içindeki session okumaları agent geçmişi içindir; run listesi kırpılır.
+
+    Async generator'lar içinde de kullanılabilir: önceki değer token yerine
+    doğrudan geri yazılır, farklı bir context'te kapanmak hata vermez.
+
+    Args:
+        num_history_runs: Agent'ın context'e eklediği run sayısı
+    """
+    previous = _history_runs.get()
+    _history_runs.set(num_history_runs or 0)
+    try:
+        yield
+    finally:
+        _history_runs.set(previous)
+
+
+def history_runs_limit(default: int) -> Optional[int]:
+    """Aktif agent geçmişi kapsamındaki run limiti; kapsam dışında None (tam liste)."""
+    requested = _history_runs.get()
+    if requested is None:
+        return None
+    return max(requested, default)
+
+
+def _run_to_dict(run: Any) -> Dict[str, Any]:
+    if isinstance(run, dict):
+        return run
+    return run.to_dict()
+
+
+class RunLogSqliteDb(TunedAsyncSqliteDb):
+    """
+    Run'ları `agno_session_runs` tablosunda satır satır saklayan AsyncSqliteDb.
+
+    Args:
+        run_history_limit: Agent geçmişi için get_session ile yüklenen en az run sayısı
+        append_only_runs: False ise agno'nun varsayılan blob davranışı kullanılır
+        **kwargs: TunedAsyncSqliteDb'ye iletilir
+    """
+
+    def __init__(self, run_history_limit: int = 20, append_only_runs: bool = True, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.run_history_limit = run_history_limit
+        self.append_only_runs = append_only_runs
+        self._runs_table_ready = False
+
+    async def _ensure_runs_table(self) -> None:
+        if self._runs_table_ready:
+            return
+        async with self.db_engine.begin() as conn:
+            for statement in RUNS_DDL:
+                await conn.execute(text(statement))
+        self._runs_table_ready = True
+
+    def _tail_limit(self) -> Optional[int]:
+        return history_runs_limit(self.run_history_limit)
+
+    async def session_updated_at(self, session_id: str) -> Optional[int]:
+        """Session satırının DB'deki `updated_at` değeri; satır veya tablo yoksa None."""
+        try:
+            async with self.db_engine.connect() as conn:
+                result = await conn.execute(
+                    text(f"SELECT updated_at FROM {self.session_table_name} WHERE session_id = :session_id"),
+                    {"session_id": session_id},
+                )
+                row = result.fetchone()
+        except OperationalError:
+            # Session tablosu henüz oluşturulmamış
+            return None
+        return row[0] if row else None
+
+    async def _load_runs(self, session_id: str, limit: Optional[int]) -> Optional[List[Dict[str, Any]]]:
+        """Son `limit` run'ı (None ise tümünü) döner; session henüz taşınmamışsa None."""
+        await self._ensure_runs_table()
+        async with self.db_engine.connect() as conn:
+            result = await conn.execute(
+                text(
+                    f"SELECT run_data FROM {RUNS_TABLE} WHERE session_id = :session_id"
+                    " ORDER BY run_index DESC LIMIT :limit"
+                ),
+                # SQLite'ta LIMIT -1 limitsizdir
+                {"session_id": session_id, "limit": limit if limit is not None else -1},
+            )
+            rows = result.fetchall()
+        if not rows:
+            return None
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    async def _write_runs(self, session_id: str, runs: Sequence[Any]) -> int:
+        """
+        Yeni veya içeriği değişmiş run'ları yazar.
+
+        Returns:
+            Yazılan run sayısı
+        """
+        if not runs:
+            return 0
+        await self._ensure_runs_table()
+        prepared: List[Tuple[str, Dict[str, Any], str, str]] = []
+        for run in runs:
+            data = _run_to_dict(run)
+            run_json = json.dumps(data, ensure_ascii=False, default=str)
+            prepared.append((data.get("run_id"), data, run_json, hash_run(run_json)))
+
+        async with self.writer():
+            async with self.db_engine.begin() as conn:
+                existing_rows = (
+                    await conn.execute(
+                        text(
+                            f"SELECT run_id, run_index, run_hash FROM {RUNS_TABLE}"
+                            " WHERE session_id = :session_id ORDER BY run_index DESC LIMIT :limit"
+                        ),
+                        {"session_id": session_id, "limit": len(prepared) + self.run_history_limit},
+                    )
+                ).fetchall()
+                existing = {row[0]: (row[1], row[2]) for row in existing_rows}
+                next_index = (
+                    await conn.execute(
+                        text(f"SELECT COALESCE(MAX(run_index), -1) + 1 FROM {RUNS_TABLE} WHERE session_id = :session_id"),
+                        {"session_id": session_id},
+                    )
+                ).scalar()
+
+                written = 0
+                now = int(time.time())
+                for run_id, data, run_json, run_hash in prepared:
+                    known = existing.get(run_id)
+                    if known is not None:
+                        if known[1] == run_hash:
+                            continue
+                        await conn.execute(
+                            text(
+                                f"UPDATE {RUNS_TABLE} SET run_data = :run_data, run_hash = :run_hash"
+                                " WHERE session_id = :session_id AND run_index = :run_index"
+                            ),
+                            {
+                                "run_data": run_json,
+                                "run_hash": run_hash,
+                                "session_id": session_id,
+                                "run_index": known[0],
+                            },
+                        )
+                    else:
+                        await conn.execute(
+                            text(
+                                f"INSERT OR IGNORE INTO {RUNS_TABLE} (session_id, run_index, run_id, agent_id,"
+                                " run_hash, run_data, created_at) VALUES (:session_id, :run_index, :run_id,"
+                                " :agent_id, :run_hash, :run_data, :created_at)"
+                            ),
+                            {
+                                "session_id": session_id,
+                                "run_index": next_index,
+                                "run_id": run_id,
+                                "agent_id": data.get("agent_id"),
+                                "run_hash": run_hash,
+                                "run_data": run_json,
+                                "created_at": data.get("created_at") or now,
+                            },
+                        )
+                        next_index += 1
+                    written += 1
+        return written
+
+    async def get_session(
+        self,
+        session_id: str,
+        session_type: Any,
+        user_id: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+    ) -> Any:
+        session = await super().get_session(
+            session_id=session_id,
+            session_type=session_type,
+            user_id=user_id,
+            deserialize=deserialize,
+        )
+        if session is None or not self.append_only_runs:
+            return session
+
+        tail = await self._load_runs(session_id, self._tail_limit())
+        if tail is None:
+            # Taşınmamış session: runs hâlâ blob'da
+            return session
+        if isinstance(session, dict):
+            session["runs"] = tail
+            return session
+        return type(session).from_dict({**session.to_dict(), "runs": tail})
+
+    async def upsert_session(self, session: Any, deserialize: Optional[bool] = True) -> Any:
+        if not self.append_only_runs or not hasattr(session, "runs"):
+            return await super().upsert_session(session, deserialize=deserialize)
+
+        runs = session.runs or []
+        await self._write_runs(session.session_id, runs)
+        # Session satırı runs olmadan yazılır; blob artık büyümez
+        session.runs = None
+        try:
+            result = await super().upsert_session(session, deserialize=deserialize)
+        finally:
+            session.runs = runs
+        if isinstance(result, dict):
+            result["runs"] = [_run_to_dict(run) for run in runs]
+        elif result is not None and hasattr(result, "runs"):
+            result.runs = runs
+        return result
+
+    async def delete_session(self, session_id: str) -> Any:
+        result = await super().delete_session(session_id)
+        await self._delete_runs([session_id])
+        return result
+
+    async def delete_sessions(self, session_ids: List[str]) -> Any:
+        result = await super().delete_sessions(session_ids)
+        await self._delete_runs(session_ids)
+        return result
+
+    async def _delete_runs(self, session_ids: Sequence[str]) -> None:
+        if not self.append_only_runs or not session_ids:
+            return
+        await self._ensure_runs_table()
+        async with self.writer():
+            async with self.db_engine.begin() as conn:
+                for session_id in session_ids:
+                    await conn.execute(
+                        text(f"DELETE FROM {RUNS_TABLE} WHERE session_id = :session_id"),
+                        {"session_id": session_id},
+                    )
+
+
+def migrate_runs(db_file: str, batch_size: int = 200) -> Dict[str, int]:
+    """
+    `agno_sessions.runs` blob'larını `agno_session_runs` tablosuna taşır.
+
+    Her batch ayrı transaction'da işlenir; taşınan session'ın runs kolonu NULL
+    yapılır. Tekrar çalıştırılabilir (idempotent).
+
+    Returns:
+        Taşınan session ve run sayıları
+    """
+    conn = sqlite3.connect(db_file, timeout=30)
+    try:
+        for statement in RUNS_DDL:
+            conn.execute(statement)
+        sessions = runs_total = 0
+        while True:
+            rows = conn.execute(
+                "SELECT session_id, runs FROM agno_sessions WHERE runs IS NOT NULL LIMIT ?",
+                (batch_size,),
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                for session_id, raw_runs in rows:
+                    runs = decode_runs_column(raw_runs)
+                    start = conn.execute(
+                        f"SELECT COALESCE(MAX(run_index), -1) + 1 FROM {RUNS_TABLE} WHERE session_id = ?",
+                        (session_id,),
+                    ).fetchone()[0]
+                    for offset, run in enumerate(runs):
+                        run_json = json.dumps(run, ensure_ascii=False)
+                        conn.execute(
+                            f"INSERT OR IGNORE INTO {RUNS_TABLE} (session_id, run_index, run_id, agent_id,"
+                            " run_hash, run_data, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (
+                                session_id,
+                                start + offset,
+                                run.get("run_id"),
+                                run.get("agent_id"),
+                                hash_run(run_json),
+                                run_json,
+                                run.get("created_at") or int(time.time()),
+                            ),
+                        )
+                    conn.execute(
+                        "UPDATE agno_sessions SET runs = NULL WHERE session_id = ?", (session_id,)
+                    )
+                    sessions += 1
+                    runs_total += len(runs)
+    finally:
+        conn.close()
+    return {"sessions": sessions, "runs": runs_total}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append-only run deposu araçları")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="runs blob'larını run tablosuna taşı")
+    migrate.add_argument("--db", default=settings.sqlite_db_file)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "migrate":
+        print(json.dumps(migrate_runs(args.db)))
+
+
+if __name__ == "__main__":
+    main()
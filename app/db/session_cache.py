@@ -0,0 +1,556 @@
+# app/db/session_cache.py
+"""
+Session read-through cache.
+
+Aktif konuşmalarda her turn agent session'ı ve son run'ları SQLite'tan yeniden
+yükler. Bu modül process içinde son session'ları tutan bir LRU cache sağlar:
+
+- Okuma: cache'te varsa DB'ye gidilmez (read-through)
+- Yazma: upsert sonrası cache güncellenir (write-through)
+- Boyut limiti byte cinsindendir; TTL'i dolan kayıtlar okunmaz
+- Prefetch: turn isteği kabul edilir edilmez session yüklenmeye başlar;
+  validasyon ve loglama ile paralel ilerler, eşzamanlı yüklemeler birleşir
+- Append-only run'larda cache agent geçmişi için kırpılmış run listesini tutar;
+  sadece `agent_history_scope` içindeki okumalar cache'ten karşılanır, diğer
+  okumalar (AgentOS session/run endpoint'leri) tam listeyi DB'den alır
+
+Birden fazla worker process'i aynı DB'yi kullanıyorsa bir worker'ın yazdığı
+session diğerlerinin cache'inde bayatlar; bayat kopyayla çalışan turn eksik
+geçmişle cevap üretir ve upsert'te session satırını eski haliyle ezer.
+Varsayılan `SESSION_CACHE_INVALIDATION=sqlite` ile yazılan session_id'ler küçük
+bir paylaşımlı SQLite tablosuna yazılır ve her worker bu tabloyu
+`SESSION_CACHE_BUS_POLL_SECONDS` aralıkla okuyup kendi cache'inden siler. Bu
+aralık içinde gelen istekler hâlâ bayat kopyayı okuyabilir; aynı session'ın
+ardışık turn'lerinin farklı worker'lara bu süreden kısa arayla düşmemesi
+(sticky session) tam tutarlılık sağlar.
+
+Bayat kopyanın satırı ezmemesi için upsert öncesi satırın `updated_at` değeri
+turn'ün başladığı kopyanınkiyle karşılaştırılır. DB'deki daha yeniyse cache
+kaydı silinir, session DB'den yeniden yüklenir ve turn'ün run'ları run_id ile
+güncel run listesine eklenerek yazılır. `updated_at` saniye çözünürlüğündedir;
+aynı saniye içindeki iki yazma ayırt edilemez.
+
+`SESSION_CACHE_INVALIDATION=none` yalnızca tek worker veya sticky session için
+uygundur; birden fazla worker tespit edilirse cache açılmaz.
+"""
+import asyncio
+import json
+import logging
+import os
+import shlex
+import sqlite3
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agno.db.base import SessionType
+
+from app.configs.settings import settings
+from app.db.run_store import agent_history_scope
+from app.utils.metrics import REGISTRY, observe_stage
+from app.utils.tracing import span
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """
+    Byte limitli, TTL'li LRU session cache.
+
+    Session'lar JSON string olarak saklanır; her okuma bağımsız bir kopya
+    üretir, agent'ın session üzerindeki değişiklikleri cache'i bozmaz.
+
+    Args:
+        max_bytes: Toplam JSON boyutu limiti
+        ttl_seconds: Kayıt ömrü
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # session_id -> (session sınıfı, session_type, user_id, json, expires_at, runs_limit)
+        self._entries: "OrderedDict[str, Tuple[Any, Any, Optional[str], str, float, Optional[int]]]" = OrderedDict()
+        self._bytes = 0
+        self._listeners: List[Callable[[str], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_writes = 0
+
+    def get(
+        self,
+        session_id: str,
+        session_type: Any,
+        user_id: Optional[str],
+        runs_limit: Optional[int] = None,
+    ) -> Optional[Any]:
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        session_cls, cached_type, cached_user, payload, expires_at, cached_limit = entry
+        if expires_at < time.monotonic():
+            self._discard(session_id)
+            self.misses += 1
+            return None
+        if cached_limit is not None and (runs_limit is None or cached_limit < runs_limit):
+            # Cache'teki run listesi istenenden kısa
+            self.misses += 1
+            return None
+        if cached_type != session_type or (user_id is not None and cached_user != user_id):
+            # Filtre uyuşmuyor; DB'nin vereceği cevaba bırak
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return session_cls.from_dict(json.loads(payload))
+
+    def put(self, session: Any, session_type: Any, runs_limit: Optional[int] = None) -> None:
+        data = session.to_dict()
+        if runs_limit and data.get("runs"):
+            data["runs"] = data["runs"][-runs_limit:]
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        if len(payload) > self.max_bytes:
+            self._discard(session.session_id)
+            return
+        self._discard(session.session_id)
+        self._entries[session.session_id] = (
+            type(session),
+            session_type,
+            getattr(session, "user_id", None),
+            payload,
+            time.monotonic() + self.ttl_seconds,
+            runs_limit,
+        )
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def invalidate(self, session_id: str, notify: bool = True) -> None:
+        """
+        Session'ı cache'ten siler.
+
+        Args:
+            session_id: Session ID
+            notify: True ise kayıtlı invalidation listener'ları çağrılır
+        """
+        if self._discard(session_id):
+            self.invalidations += 1
+        if notify:
+            for listener in self._listeners:
+                try:
+                    listener(session_id)
+                except Exception as e:
+                    logger.warning(f"Session cache invalidation listener failed: {str(e)}")
+
+    def add_invalidation_listener(self, listener: Callable[[str], None]) -> None:
+        """Bu worker'da yazılan/silinen her session için çağrılacak hook ekler."""
+        self._listeners.append(listener)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._entries
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _discard(self, session_id: str) -> bool:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry[3])
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_writes": self.stale_writes,
+        }
+
+
+class SessionCacheMixin:
+    """
+    AsyncSqliteDb alt sınıflarına read-through/write-through session cache ekler.
+    MRO'da DB sınıfından önce gelmelidir.
+
+    Args:
+        session_cache: Kullanılacak cache; None ise cache kapalıdır
+    """
+
+    def __init__(self, *args: Any, session_cache: Optional[SessionCache] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.session_cache = session_cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _runs_limit(self) -> Optional[int]:
+        """Okunan session'daki run limiti (agent geçmişi kapsamında), aksi halde None."""
+        return self._tail_limit() if getattr(self, "append_only_runs", False) else None
+
+    def _cacheable(self) -> bool:
+        # Append-only run'larda cache kırpılmış liste tutar; tam liste isteyen okumalar DB'ye gider
+        return not getattr(self, "append_only_runs", False) or self._tail_limit() is not None
+
+    async def get_session(
+        self,
+        session_id: str,
+        session_type: Any,
+        user_id: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            with span("history_load", cached=session_id in self.session_cache if self.session_cache else False):
+                return await self._get_session_cached(session_id, session_type, user_id, deserialize)
+        finally:
+            observe_stage("history_load", time.perf_counter() - started)
+
+    async def _get_session_cached(
+        self,
+        session_id: str,
+        session_type: Any,
+        user_id: Optional[str],
+        deserialize: Optional[bool],
+    ) -> Any:
+        cache = self.session_cache
+        if cache is None or not deserialize or not self._cacheable():
+            return await super().get_session(
+                session_id=session_id,
+                session_type=session_type,
+                user_id=user_id,
+                deserialize=deserialize,
+            )
+
+        runs_limit = self._runs_limit()
+        cached = cache.get(session_id, session_type, user_id, runs_limit)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(session_id)
+        if inflight is not None:
+            # Prefetch sürüyorsa ikinci bir DB okuması yapmadan bekle
+            await asyncio.shield(inflight)
+            cached = cache.get(session_id, session_type, user_id, runs_limit)
+            if cached is not None:
+                return cached
+
+        session = await super().get_session(
+            session_id=session_id,
+            session_type=session_type,
+            user_id=user_id,
+            deserialize=True,
+        )
+        if session is not None:
+            cache.put(session, session_type, runs_limit)
+        return session
+
+    def prefetch_session(self, session_id: str, session_type: Any = SessionType.AGENT) -> None:
+        """
+        Session'ı arka planda cache'e yükler. Aynı session için süren bir
+        yükleme varsa yenisi başlatılmaz.
+        """
+        cache = self.session_cache
+        if cache is None or session_id in self._inflight or session_id in cache:
+            return
+
+        async def _load() -> None:
+            try:
+                # Prefetch agent'ın bir sonraki turu içindir
+                with agent_history_scope():
+                    session = await super(SessionCacheMixin, self).get_session(
+                        session_id=session_id,
+                        session_type=session_type,
+                        deserialize=True,
+                    )
+                    runs_limit = self._runs_limit()
+                if session is not None and session_id in self._inflight:
+                    cache.put(session, session_type, runs_limit)
+            except Exception as e:
+                logger.warning(f"Session prefetch failed | session_id: {session_id} | {str(e)}")
+            finally:
+                self._inflight.pop(session_id, None)
+
+        self._inflight[session_id] = asyncio.ensure_future(_load())
+
+    async def preload_sessions(self, session_ids: List[str], session_type: Any = SessionType.AGENT) -> int:
+        """
+        Session'ları cache'e yükler ve yüklemelerin bitmesini bekler (warm-up).
+
+        Returns:
+            Cache'te bulunan session sayısı
+        """
+        cache = self.session_cache
+        if cache is None:
+            return 0
+        for session_id in session_ids:
+            self.prefetch_session(session_id, session_type)
+        pending = [self._inflight[s] for s in session_ids if s in self._inflight]
+        if pending:
+            await asyncio.gather(*pending)
+        return sum(1 for session_id in session_ids if session_id in cache)
+
+    async def upsert_session(self, session: Any, deserialize: Optional[bool] = True) -> Any:
+        cache = self.session_cache
+        written = session
+        if cache is not None:
+            written = await self._rebase_if_stale(session)
+        with span("session_write"):
+            result = await super().upsert_session(written, deserialize=deserialize)
+        if cache is not None:
+            # Süren bir prefetch eski veriyi cache'e yazmasın
+            self._inflight.pop(session.session_id, None)
+            cache.invalidate(session.session_id)
+            if result is not None and not isinstance(result, dict) and self._cacheable():
+                cache.put(result, _session_type_of(result), self._runs_limit())
+        if result is not None:
+            # Aynı nesnenin sonraki upsert'i kendi yazısını bayat saymasın
+            session.updated_at = result.get("updated_at") if isinstance(result, dict) else result.updated_at
+        return result
+
+    async def _rebase_if_stale(self, session: Any) -> Any:
+        """
+        Session, turn başladıktan sonra başka bir worker tarafından yazıldıysa
+        güncel satırı yükler ve turn'ün run'larını onun üzerine ekler.
+
+        Returns:
+            Yazılacak session; satır değişmediyse verilen nesnenin kendisi
+        """
+        known = getattr(session, "updated_at", None)
+        if known is None:
+            return session
+        current = await self.session_updated_at(session.session_id)
+        if current is None or current <= known:
+            return session
+
+        self.session_cache.stale_writes += 1
+        logger.warning(
+            f"Stale session on upsert, reloading latest row | session_id: {session.session_id} | "
+            f"turn version: {known} | db version: {current}"
+        )
+        self._inflight.pop(session.session_id, None)
+        self.session_cache.invalidate(session.session_id, notify=False)
+        latest = await self.get_session(session.session_id, _session_type_of(session), deserialize=True)
+        if latest is None:
+            return session
+
+        # Ortak run_id'lerde turn'ün kopyası, yalnız DB'de olanlarda DB'ninki kalır
+        own = {_run_id(run): run for run in session.runs or []}
+        merged = [own.pop(_run_id(run), run) for run in latest.runs or []]
+        merged.extend(own.values())
+        return type(session).from_dict(
+            {**session.to_dict(), "runs": [_run_dict(run) for run in merged], "updated_at": current}
+        )
+
+    async def rename_session(self, session_id: str, *args: Any, **kwargs: Any) -> Any:
+        result = await super().rename_session(session_id, *args, **kwargs)
+        if self.session_cache is not None:
+            self.session_cache.invalidate(session_id)
+        return result
+
+    async def delete_session(self, session_id: str) -> Any:
+        result = await super().delete_session(session_id)
+        if self.session_cache is not None:
+            self.session_cache.invalidate(session_id)
+        return result
+
+    async def delete_sessions(self, session_ids: List[str]) -> Any:
+        result = await super().delete_sessions(session_ids)
+        if self.session_cache is not None:
+            for session_id in session_ids:
+                self.session_cache.invalidate(session_id)
+        return result
+
+
+def _run_id(run: Any) -> Optional[str]:
+    return run.get("run_id") if isinstance(run, dict) else getattr(run, "run_id", None)
+
+
+def _run_dict(run: Any) -> Dict[str, Any]:
+    return run if isinstance(run, dict) else run.to_dict()
+
+
+def _session_type_of(session: Any) -> Any:
+    """Session nesnesinin tipine karşılık gelen SessionType."""
+    name = type(session).__name__
+    if name.startswith("Team"):
+        return SessionType.TEAM
+    if name.startswith("Workflow"):
+        return SessionType.WORKFLOW
+    return SessionType.AGENT
+
+
+class SqliteInvalidationBus:
+    """
+    Worker'lar arası cache invalidation için paylaşımlı SQLite tablosu.
+
+    Yazılan session_id'ler tabloya eklenir; her worker kendi eklemedikleri
+    satırları okuyup cache'inden siler. Eski satırlar periyodik olarak temizlenir.
+
+    Args:
+        cache: Invalidation uygulanacak cache
+        db_file: Paylaşımlı bus dosyası
+        poll_seconds: Okuma aralığı
+        retention_seconds: Satırların tabloda kalma süresi
+    """
+
+    def __init__(self, cache: SessionCache, db_file: str, poll_seconds: float, retention_seconds: float = 600.0):
+        self.cache = cache
+        self.db_file = db_file
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._pending: List[str] = []
+        self._last_seq: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        cache.add_invalidation_listener(self._pending.append)
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.db_file).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS invalidations ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " session_id TEXT NOT NULL,"
+            " origin TEXT NOT NULL,"
+            " ts REAL NOT NULL)"
+        )
+        return conn
+
+    def sync_once(self) -> List[str]:
+        """
+        Bekleyen invalidation'ları yayınlar, diğer worker'lardan gelenleri okur
+        (thread'de çağrılmalı).
+
+        Returns:
+            Diğer worker'ların yazdığı session_id'ler
+        """
+        published, self._pending[:] = list(self._pending), []
+        conn = self._connect()
+        try:
+            now = time.time()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO invalidations (session_id, origin, ts) VALUES (?, ?, ?)",
+                    [(session_id, self.origin, now) for session_id in published],
+                )
+                conn.execute("DELETE FROM invalidations WHERE ts < ?", (now - self.retention_seconds,))
+            if self._last_seq is None:
+                # İlk turda geçmiş satırlar atlanır; cache zaten boş başlar
+                self._last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM invalidations").fetchone()[0]
+                return []
+            rows = conn.execute(
+                "SELECT seq, session_id FROM invalidations WHERE seq > ? AND origin != ? ORDER BY seq",
+                (self._last_seq, self.origin),
+            ).fetchall()
+            if rows:
+                self._last_seq = rows[-1][0]
+        finally:
+            conn.close()
+        return [session_id for _seq, session_id in rows]
+
+    async def run(self) -> None:
+        while True:
+            try:
+                for session_id in await asyncio.to_thread(self.sync_once):
+                    self.cache.invalidate(session_id, notify=False)
+            except Exception as e:
+                logger.warning(f"Session cache invalidation sync failed: {str(e)}")
+            await asyncio.sleep(self.poll_seconds)
+
+
+_bus: Optional[SqliteInvalidationBus] = None
+
+
+def _workers_from_args(args: List[str]) -> int:
+    for index, arg in enumerate(args):
+        value = None
+        if arg in ("-w", "--workers") and index + 1 < len(args):
+            value = args[index + 1]
+        elif arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        elif arg.startswith("-w") and arg[2:].isdigit():
+            value = arg[2:]
+        if value is not None and value.isdigit():
+            return int(value)
+    return 1
+
+
+def detected_worker_count() -> int:
+    """
+    Aynı DB'yi paylaşan worker sayısını tahmin eder.
+
+    gunicorn/uvicorn `-w/--workers` argümanlarına (worker'lar master'ın argv'sini
+    devralır), `GUNICORN_CMD_ARGS` ve `WEB_CONCURRENCY` env değişkenlerine bakar.
+    """
+    counts = [
+        _workers_from_args(sys.argv[1:]),
+        _workers_from_args(shlex.split(os.environ.get("GUNICORN_CMD_ARGS", ""))),
+    ]
+    concurrency = os.environ.get("WEB_CONCURRENCY", "")
+    if concurrency.isdigit():
+        counts.append(int(concurrency))
+    return max(counts)
+
+
+def build_session_cache() -> Optional[SessionCache]:
+    """Ayarlara göre cache oluşturur; kapalıysa veya güvenli değilse None."""
+    config = settings.database
+    if not config.session_cache_enabled:
+        return None
+    if config.session_cache_invalidation != "sqlite":
+        workers = detected_worker_count()
+        if workers > 1:
+            logger.warning(
+                f"Session cache disabled: {workers} workers detected without cross-worker invalidation; "
+                "set SESSION_CACHE_INVALIDATION=sqlite to enable it"
+            )
+            return None
+    cache = SessionCache(
+        max_bytes=config.session_cache_max_bytes,
+        ttl_seconds=config.session_cache_ttl_seconds,
+    )
+    REGISTRY.callback(
+        "kuagentos_session_cache_requests_total",
+        "Session cache lookups by result.",
+        "counter",
+        ("result",),
+        lambda: {("hit",): cache.hits, ("miss",): cache.misses},
+    )
+    REGISTRY.callback(
+        "kuagentos_session_cache_bytes",
+        "Session cache size in bytes.",
+        "gauge",
+        (),
+        lambda: {(): cache._bytes},
+    )
+    return cache
+
+
+def start_session_cache_bus(cache: Optional[SessionCache]) -> Optional[asyncio.Task]:
+    """SESSION_CACHE_INVALIDATION=sqlite ise worker'lar arası senkronizasyonu başlatır."""
+    global _bus
+    config = settings.database
+    if cache is None or config.session_cache_invalidation != "sqlite":
+        return None
+    _bus = SqliteInvalidationBus(
+        cache,
+        db_file=config.session_cache_bus_file,
+        poll_seconds=config.session_cache_bus_poll_seconds,
+    )
+    return asyncio.create_task(_bus.run(), name="session-cache-invalidation")
@@ -0,0 +1,334 @@
+# app/db/sharding.py
+"""
+Shard'lanmış session DB.
+
+Tek SQLite dosyasında aynı anda tek writer olabildiği için session'lar
+`SQLITE_SHARD_COUNT` dosyaya session_id'nin consistent hash'i ile dağıtılır.
+Her shard kendi connection pool'u ve writer lock'u olan bir `RunLogSqliteDb`'dir;
+farklı shard'lardaki session'ların yazmaları birbirini beklemez.
+
+- Session metotları (get/upsert/rename/delete) session_id'nin shard'ına gider
+- Listeleme ve metrik hesaplama için gereken taramalar tüm shard'larda paralel
+  çalışır ve sonuçlar birleştirilir
+- Memory, metrics, eval ve knowledge tabloları shard 0'da (ana DB dosyası) kalır
+
+Shard sayısı değiştiğinde session'ları yeni yerlerine taşımak için (servis kapalıyken):
+    python -m app.db.sharding status
+    python -m app.db.sharding rebalance --shards 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.configs.settings import settings
+from app.db.hash_ring import HashRing, existing_shard_files, shard_file
+from app.db.run_schema import RUNS_DDL, RUNS_TABLE
+from app.db.run_store import RunLogSqliteDb
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+
+def _sort_value(item: Any, key: str) -> Any:
+    value = item.get(key) if isinstance(item, dict) else getattr(item, key, None)
+    # None değerler sıralamada en sona düşer
+    return (value is not None, value if value is not None else 0)
+
+
+class ShardedSqliteDb(RunLogSqliteDb):
+    """
+    Session'ları birden fazla SQLite dosyasına dağıtan DB. Shard 0 bu nesnenin
+    kendisidir; shard_count=1 iken davranışı `RunLogSqliteDb` ile aynıdır.
+
+    Args:
+        db_file: Ana DB dosyası (shard 0)
+        shard_count: Toplam shard sayısı
+        virtual_nodes: Hash ring'de shard başına nokta sayısı
+        **kwargs: Her shard'ın RunLogSqliteDb'sine iletilir
+    """
+
+    def __init__(self, db_file: str, shard_count: int = 1, virtual_nodes: int = 64, **kwargs: Any):
+        super().__init__(db_file=db_file, **kwargs)
+        self.ring = HashRing(shard_count, virtual_nodes)
+        self.shards: List[RunLogSqliteDb] = [self] + [
+            RunLogSqliteDb(db_file=shard_file(db_file, index), **kwargs)
+            for index in range(1, shard_count)
+        ]
+
+    def shard_index(self, session_id: str) -> int:
+        return self.ring.shard_for(session_id)
+
+    def _session_method(self, name: str, session_id: str) -> Any:
+        shard = self.shards[self.shard_index(session_id)]
+        if shard is self:
+            return getattr(super(), name)
+        return getattr(shard, name)
+
+    def _group_by_shard(self, session_ids: Sequence[str]) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        for session_id in session_ids:
+            groups.setdefault(self.shard_index(session_id), []).append(session_id)
+        return groups
+
+    # --- Tek session ---
+
+    async def get_session(
+        self,
+        session_id: str,
+        session_type: Any,
+        user_id: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+    ) -> Any:
+        method = self._session_method("get_session", session_id)
+        return await method(
+            session_id=session_id,
+            session_type=session_type,
+            user_id=user_id,
+            deserialize=deserialize,
+        )
+
+    async def upsert_session(self, session: Any, deserialize: Optional[bool] = True) -> Any:
+        method = self._session_method("upsert_session", session.session_id)
+        return await method(session, deserialize=deserialize)
+
+    async def session_updated_at(self, session_id: str) -> Optional[int]:
+        method = self._session_method("session_updated_at", session_id)
+        return await method(session_id)
+
+    async def rename_session(self, session_id: str, *args: Any, **kwargs: Any) -> Any:
+        method = self._session_method("rename_session", session_id)
+        return await method(session_id, *args, **kwargs)
+
+    async def delete_session(self, session_id: str) -> Any:
+        method = self._session_method("delete_session", session_id)
+        return await method(session_id)
+
+    # --- Çoklu session ---
+
+    async def delete_sessions(self, session_ids: List[str]) -> Any:
+        calls = []
+        for index, ids in self._group_by_shard(session_ids).items():
+            if index == 0:
+                calls.append(super().delete_sessions(ids))
+            else:
+                calls.append(self.shards[index].delete_sessions(ids))
+        await asyncio.gather(*calls)
+
+    async def upsert_sessions(self, sessions: List[Any], *args: Any, **kwargs: Any) -> List[Any]:
+        groups: Dict[int, List[Any]] = {}
+        for session in sessions:
+            groups.setdefault(self.shard_index(session.session_id), []).append(session)
+        calls = []
+        for index, group in groups.items():
+            if index == 0:
+                calls.append(super().upsert_sessions(group, *args, **kwargs))
+            else:
+                calls.append(self.shards[index].upsert_sessions(group, *args, **kwargs))
+        results = await asyncio.gather(*calls)
+        return [item for result in results for item in (result or [])]
+
+    async def get_sessions(
+        self,
+        session_type: Any = None,
+        user_id: Optional[str] = None,
+        component_id: Optional[str] = None,
+        session_name: Optional[str] = None,
+        start_timestamp: Optional[int] = None,
+        end_timestamp: Optional[int] = None,
+        limit: Optional[int] = None,
+        page: Optional[int] = None,
+        sort_by: Optional[str] = None,
+        sort_order: Optional[str] = None,
+        deserialize: Optional[bool] = True,
+    ) -> Any:
+        """
+        Tüm shard'ları paralel sorgular, sonuçları sıralayıp sayfalar.
+
+        Her shard'dan ilk `limit * page` kayıt istenir; birleştirilmiş listeden
+        istenen sayfa kesilir.
+        """
+        filters = dict(
+            session_type=session_type,
+            user_id=user_id,
+            component_id=component_id,
+            session_name=session_name,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            deserialize=deserialize,
+        )
+        if len(self.shards) == 1:
+            return await super().get_sessions(limit=limit, page=page, **filters)
+
+        page = page or 1
+        fetch_limit = limit * page if limit else None
+        results = await asyncio.gather(
+            super().get_sessions(limit=fetch_limit, page=1 if fetch_limit else None, **filters),
+            *[
+                shard.get_sessions(limit=fetch_limit, page=1 if fetch_limit else None, **filters)
+                for shard in self.shards[1:]
+            ],
+        )
+
+        if deserialize:
+            items = [item for result in results for item in (result or [])]
+            total = len(items)
+        else:
+            items = [item for rows, _count in results for item in rows]
+            total = sum(count for _rows, count in results)
+
+        items.sort(
+            key=lambda item: _sort_value(item, sort_by or "created_at"),
+            reverse=(sort_order or "desc") != "asc",
+        )
+        if limit:
+            items = items[(page - 1) * limit:page * limit]
+        return items if deserialize else (items, total)
+
+    async def _get_all_sessions_for_metrics_calculation(self, *args: Any, **kwargs: Any) -> List[Any]:
+        # agno metrik hesaplaması session'ları bu metotla tarar; tüm shard'lar dahil edilir
+        results = await asyncio.gather(
+            super()._get_all_sessions_for_metrics_calculation(*args, **kwargs),
+            *[shard._get_all_sessions_for_metrics_calculation(*args, **kwargs) for shard in self.shards[1:]],
+        )
+        return [item for result in results for item in (result or [])]
+
+    # --- Bakım ---
+
+    def stats(self) -> Dict[str, Any]:
+        if len(self.shards) == 1:
+            return super().stats()
+        shards = [super().stats()] + [shard.stats() for shard in self.shards[1:]]
+        return {
+            "shard_count": len(self.shards),
+            "writes": sum(s["writes"] for s in shards),
+            "lock_wait_seconds_total": round(sum(s["lock_wait_seconds_total"] for s in shards), 6),
+            "shards": shards,
+        }
+
+    async def dispose(self) -> None:
+        await asyncio.gather(*[shard.db_engine.dispose() for shard in self.shards])
+
+
+def _copy_schema(source: sqlite3.Connection, target_file: str) -> None:
+    """Hedef shard dosyasında kaynaktaki agno tablolarını ve run tablosunu oluşturur."""
+    target = sqlite3.connect(target_file)
+    try:
+        # Yeni dosyada tablolar oluşmadan önce; bakım döngüsünün incremental vacuum'u için
+        target.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        for kind, sql in source.execute(
+            "SELECT type, sql FROM sqlite_master WHERE sql IS NOT NULL AND type IN ('table', 'index')"
+            " AND name LIKE 'agno_%' ORDER BY type = 'index'"
+        ):
+            keyword = "CREATE TABLE " if kind == "table" else "CREATE INDEX "
+            target.execute(sql.replace(keyword, f"{keyword}IF NOT EXISTS ", 1))
+        for statement in RUNS_DDL:
+            target.execute(statement)
+        target.commit()
+    finally:
+        target.close()
+
+
+def rebalance(db_file: str, shard_count: int, virtual_nodes: int = 64, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Session'ları (ve run satırlarını) yeni shard sayısına göre doğru dosyaya taşır.
+
+    Önce hedefe yazılır, sonra kaynaktan silinir; yarıda kesilirse tekrar
+    çalıştırılabilir.
+
+    Returns:
+        Taşınan session sayısı ve shard başına son durum
+    """
+    ring = HashRing(shard_count, virtual_nodes)
+    moved = 0
+    for source_index, source_file in existing_shard_files(db_file):
+        source = sqlite3.connect(source_file, timeout=30)
+        try:
+            if not source.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agno_sessions'"
+            ).fetchone():
+                continue
+            for statement in RUNS_DDL:
+                source.execute(statement)
+            plan: Dict[int, List[str]] = {}
+            for (session_id,) in source.execute("SELECT session_id FROM agno_sessions"):
+                target_index = ring.shard_for(session_id)
+                if target_index != source_index:
+                    plan.setdefault(target_index, []).append(session_id)
+
+            for target_index, session_ids in plan.items():
+                target_file = shard_file(db_file, target_index)
+                _copy_schema(source, target_file)
+                source.execute("ATTACH DATABASE ? AS target", (target_file,))
+                try:
+                    source.execute(
+                        "INSERT OR IGNORE INTO target.agno_schema_versions SELECT * FROM main.agno_schema_versions"
+                    )
+                    for start in range(0, len(session_ids), batch_size):
+                        batch = session_ids[start:start + batch_size]
+                        marks = ",".join("?" * len(batch))
+                        with source:
+                            source.execute(
+                                f"INSERT OR REPLACE INTO target.agno_sessions"
+                                f" SELECT * FROM main.agno_sessions WHERE session_id IN ({marks})",
+                                batch,
+                            )
+                            source.execute(
+                                f"INSERT OR REPLACE INTO target.{RUNS_TABLE}"
+                                f" SELECT * FROM main.{RUNS_TABLE} WHERE session_id IN ({marks})",
+                                batch,
+                            )
+                            source.execute(f"DELETE FROM main.{RUNS_TABLE} WHERE session_id IN ({marks})", batch)
+                            source.execute(f"DELETE FROM main.agno_sessions WHERE session_id IN ({marks})", batch)
+                        moved += len(batch)
+                finally:
+                    source.execute("DETACH DATABASE target")
+                logger.info(
+                    f"Sessions moved | from: {source_index} | to: {target_index} | count: {len(session_ids)}"
+                )
+        finally:
+            source.close()
+    return {"moved": moved, "shards": shard_status(db_file)}
+
+
+def shard_status(db_file: str) -> List[Dict[str, Any]]:
+    """Diskteki her shard dosyasındaki session sayısı."""
+    status = []
+    for index, path in existing_shard_files(db_file):
+        conn = sqlite3.connect(path)
+        try:
+            has_table = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agno_sessions'"
+            ).fetchone()
+            count = conn.execute("SELECT COUNT(*) FROM agno_sessions").fetchone()[0] if has_table else 0
+        finally:
+            conn.close()
+        status.append({"shard": index, "file": path, "sessions": count})
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Session DB shard araçları")
+    parser.add_argument("--db", default=settings.sqlite_db_file)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Shard başına session sayısı")
+    rebalance_parser = sub.add_parser("rebalance", help="Session'ları yeni shard sayısına göre taşı")
+    rebalance_parser.add_argument("--shards", type=int, default=settings.database.sqlite_shard_count)
+    rebalance_parser.add_argument(
+        "--virtual-nodes", type=int, default=settings.database.sqlite_shard_virtual_nodes
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        print(json.dumps(shard_status(args.db), indent=2))
+    elif args.command == "rebalance":
+        print(json.dumps(rebalance(args.db, args.shards, args.virtual_nodes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,103 @@
 # app/db/sqlite.py
-from agno.db.sqlite import AsyncSqliteDb
+"""
+Agent session veritabanı.
+
+Production profili (bkz. `app/db/tuned_sqlite.py`):
+- WAL journal, synchronous=NORMAL, busy_timeout, mmap ve cache_size pragma'ları
+- Sınırlı boyutlu connection pool, process içinde tek writer yolu
+- WAL dosyası periyodik olarak checkpoint edilir
+
+Run'lar session satırındaki JSON blob yerine run başına bir satır olarak
+saklanır (bkz. `app/db/run_store.py`). `SQLITE_SHARD_COUNT` > 1 ise session'lar
+birden fazla dosyaya dağıtılır (bkz. `app/db/sharding.py`). Aktif session'lar
+process içi cache'ten okunur (bkz. `app/db/session_cache.py`).
+
+`agno_metrics` tablosu token muhasebesinin satırlarını da tutar
+(bkz. `app/utils/usage.py`); agno'nun metrik okuma ve hesaplaması yalnızca
+kendi "daily" satırlarını görür.
+"""
+import asyncio
+import logging
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import select
 
 from app.configs.settings import settings
+from app.db.session_cache import SessionCacheMixin, build_session_cache
+from app.db.sharding import ShardedSqliteDb
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+# agno'nun kendi metrik satırlarının aggregation_period değeri
+AGNO_METRICS_PERIOD = "daily"
+
+
+class AgentSessionDb(SessionCacheMixin, ShardedSqliteDb):
+    """Session cache + shard'lanmış, append-only run'lı SQLite DB."""
+
+    async def get_metrics(self, *args: Any, **kwargs: Any) -> Tuple[List[dict], Optional[int]]:
+        # AgentOS GET /metrics: token muhasebesi satırları dışarıda kalır
+        rows, _ = await super().get_metrics(*args, **kwargs)
+        rows = [row for row in rows if row.get("aggregation_period") == AGNO_METRICS_PERIOD]
+        if not rows:
+            return [], None
+        return rows, max((row.get("updated_at") or 0 for row in rows), default=None)
+
+    async def _get_metrics_calculation_starting_date(self, table: Any) -> Any:
+        # Hesaplamanın başlangıç günü yalnızca agno'nun satırlarından bulunur;
+        # aksi halde bugünün tamamlanmamış kullanım satırı geçmiş günleri atlatır
+        daily = select(table).where(table.c.aggregation_period == AGNO_METRICS_PERIOD).subquery()
+        return await super()._get_metrics_calculation_starting_date(daily)
+
+
+_agent_db: Optional[AgentSessionDb] = None
+
+
+def get_agent_db() -> AgentSessionDb:
+    """Tüm agent'ler için ortak DB; ilk çağrıda oluşturulur."""
+    global _agent_db
+    if _agent_db is None:
+        database = settings.database
+        _agent_db = AgentSessionDb(
+            db_file=database.sqlite_db_file,
+            shard_count=database.sqlite_shard_count,
+            virtual_nodes=database.sqlite_shard_virtual_nodes,
+            serialize_writes=database.sqlite_serialize_writes,
+            run_history_limit=database.sqlite_run_history_limit,
+            append_only_runs=database.sqlite_append_only_runs,
+            session_cache=build_session_cache(),
+        )
+    return _agent_db
+
+
+def __getattr__(name: str) -> Any:
+    # Geriye uyumluluk: `from app.db.sqlite import agent_db`
+    if name == "agent_db":
+        return get_agent_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def checkpoint_loop() -> None:
+    """WAL dosyasının büyümesini engellemek için periyodik PASSIVE checkpoint."""
+    interval = settings.database.sqlite_checkpoint_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        for shard in get_agent_db().shards:
+            try:
+                result = await asyncio.to_thread(shard.checkpoint, "PASSIVE")
+                logger.debug(f"SQLite WAL checkpoint | {shard.tuned_db_file} | {result}")
+            except Exception as e:
+                logger.warning(f"SQLite WAL checkpoint failed | {shard.tuned_db_file} | {str(e)}")
+
 
-# Tüm agent'ler için ortak DB
-agent_db = AsyncSqliteDb(
-    db_file=settings.sqlite_db_file,
-)
+async def close_agent_db() -> None:
+    """Shutdown'da WAL'i ana dosyaya yazar ve pool'u kapatır."""
+    if _agent_db is None:
+        return
+    for shard in _agent_db.shards:
+        try:
+            await asyncio.to_thread(shard.checkpoint, "TRUNCATE")
+        except Exception as e:
+            logger.warning(f"SQLite final checkpoint failed | {shard.tuned_db_file} | {str(e)}")
+    await _agent_db.dispose()
@@ -0,0 +1,138 @@
+# app/db/tuned_sqlite.py
+"""
+Production profili ayarlanmış AsyncSqliteDb.
+
+- WAL journal, synchronous=NORMAL, busy_timeout, mmap ve cache_size pragma'ları
+  her yeni bağlantıda uygulanır
+- Sınırlı boyutlu connection pool (okumalar paralel)
+- Yazma işlemleri process içinde tek writer'a sıralanır; SQLite'ın busy
+  handler'ında uyuyarak beklemek yerine asyncio lock'unda beklenir
+"""
+import asyncio
+import functools
+import logging
+import sqlite3
+import time
+from typing import Any, Callable, Dict
+
+from agno.db.sqlite import AsyncSqliteDb
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.configs.settings import settings
+from app.db.pragmas import apply_pragmas, pragmas_from_settings
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+# agno AsyncSqliteDb üzerinde yazma yapan metotlar
+WRITE_METHODS = (
+    "upsert_session",
+    "upsert_sessions",
+    "delete_session",
+    "delete_sessions",
+    "rename_session",
+    "upsert_user_memory",
+    "upsert_memories",
+    "delete_user_memory",
+    "delete_user_memories",
+    "clear_memories",
+    "calculate_metrics",
+    "create_eval_run",
+    "delete_eval_runs",
+    "rename_eval_run",
+    "upsert_knowledge_content",
+    "delete_knowledge_content",
+)
+
+
+def _serialized(method: Callable) -> Callable:
+    @functools.wraps(method)
+    async def wrapper(self: "TunedAsyncSqliteDb", *args: Any, **kwargs: Any) -> Any:
+        async with self.writer():
+            return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class TunedAsyncSqliteDb(AsyncSqliteDb):
+    """
+    Pragma'ları ayarlanmış engine ve tek writer yolu olan AsyncSqliteDb.
+
+    Args:
+        db_file: SQLite dosya yolu
+        serialize_writes: True ise yazma metotları tek bir lock altında çalışır
+        **kwargs: AsyncSqliteDb'ye iletilir
+    """
+
+    def __init__(self, db_file: str, serialize_writes: bool = True, **kwargs: Any):
+        database = settings.database
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{db_file}",
+            pool_size=database.sqlite_pool_size,
+            max_overflow=0,
+            pool_timeout=database.sqlite_pool_timeout_seconds,
+            pool_pre_ping=False,
+        )
+        pragmas = pragmas_from_settings(database)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection: Any, _record: Any) -> None:
+            apply_pragmas(dbapi_connection, pragmas)
+
+        super().__init__(db_engine=engine, **kwargs)
+        self.tuned_db_file = db_file
+        self.serialize_writes = serialize_writes
+        self._write_lock = asyncio.Lock()
+        self.write_stats: Dict[str, float] = {
+            "writes": 0,
+            "lock_wait_seconds_total": 0.0,
+            "lock_wait_seconds_max": 0.0,
+        }
+
+    def writer(self) -> "_WriterSlot":
+        """Yazma işlemi için tek writer slot'u (async context manager)."""
+        return _WriterSlot(self)
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Dict[str, int]:
+        """
+        WAL checkpoint'i ayrı bir stdlib bağlantısıyla çalıştırır (thread'de çağrılmalı).
+
+        Returns:
+            busy, wal sayfa sayısı ve checkpoint edilen sayfa sayısı
+        """
+        conn = sqlite3.connect(self.tuned_db_file, timeout=settings.database.sqlite_busy_timeout_ms / 1000)
+        try:
+            busy, log_pages, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        finally:
+            conn.close()
+        return {"busy": busy, "wal_pages": log_pages, "checkpointed_pages": checkpointed}
+
+    def stats(self) -> Dict[str, Any]:
+        """Health endpoint için yazma istatistikleri."""
+        return {"db_file": self.tuned_db_file, **self.write_stats}
+
+
+class _WriterSlot:
+    def __init__(self, db: TunedAsyncSqliteDb):
+        self.db = db
+
+    async def __aenter__(self) -> None:
+        if not self.db.serialize_writes:
+            return
+        started = time.perf_counter()
+        await self.db._write_lock.acquire()
+        waited = time.perf_counter() - started
+        stats = self.db.write_stats
+        stats["writes"] += 1
+        stats["lock_wait_seconds_total"] += waited
+        stats["lock_wait_seconds_max"] = max(stats["lock_wait_seconds_max"], waited)
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self.db.serialize_writes:
+            self.db._write_lock.release()
+
+
+for _name in WRITE_METHODS:
+    if hasattr(AsyncSqliteDb, _name):
+        setattr(TunedAsyncSqliteDb, _name, _serialized(getattr(AsyncSqliteDb, _name)))
@@ -1,87 +1,184 @@
+"""
+Uygulama giriş noktası.
+
+`app` ilk erişimde `create_app()` ile oluşturulur; modül import'u settings
+okumaz, model/DB/AgentOS kurmaz. `uvicorn app.main:app` aynı şekilde çalışır.
+"""
+import asyncio
 import logging
+import time
+from typing import Any, Optional
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from agno.os import AgentOS
-from agno.os.settings import AgnoAPISettings
+logger = logging.getLogger(__name__)
 
-from app.api.routes import router as chat_router
-from app.agents.orchestrator_agent import orchestrator_agent
-from app.agents.satinalma_agent import satinalma_agent
-from app.configs.settings import settings
-from app.configs.logging import setup_logging
-from app.configs.helpers import format_error_message
+_app: Optional[FastAPI] = None
+
+
+def create_app() -> FastAPI:
+    """
+    FastAPI + AgentOS uygulamasını kurar.
+
+    Returns:
+        FastAPI: Çalışmaya hazır uygulama
+    """
+    started = time.perf_counter()
+
+    from agno.os import AgentOS
+    from agno.os.settings import AgnoAPISettings
+
+    from app.api.admin_routes import router as admin_router
+    from app.api.metrics_routes import router as metrics_router
+    from app.api.routes import router as chat_router
+    from app.api.stats_routes import router as stats_router
+    from app.agents.registry import get_agent_registry, watch_agent_config
+    from app.configs.settings import settings
+    from app.configs.logging import setup_logging_from_settings, stop_logging
+    from app.configs.helpers import format_error_message
+    from app.db.maintenance import maintenance_loop
+    from app.db.session_cache import start_session_cache_bus
+    from app.db.sqlite import checkpoint_loop, close_agent_db, get_agent_db
+    from app.tools.mail_transport import close_mail_transport
+    from app.utils.conversation_logger import start_conversation_logger, stop_conversation_logger
+    from app.utils.idempotency import IdempotencyMiddleware
+    from app.utils.log_analytics import index_loop
+    from app.utils.loop_monitor import loop_monitor_loop
+    from app.utils.memory import memory_gauge_loop
+    from app.utils.profiler import ProfilerMiddleware
+    from app.utils.tracing import TracingMiddleware, close_span_exporter
+    from app.utils.usage import flush_usage, usage_flush_loop
+    from app.utils.warmup import run_warmup
+
+    setup_logging_from_settings(settings)
+
+    app = FastAPI(
+        title="KUAgentOS",
+        version="1.0.0",
+        description="Koç Üniversitesi Agent OS",
+        docs_url="/docs",
+        redoc_url="/redoc",
+    )
 
-setup_logging(level=logging.INFO)
-logger = logging.getLogger(__name__)
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request: Request, exc: Exception):
+        logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
+        error_msg = format_error_message(exc, user_friendly=True)
+        return JSONResponse(
+            status_code=500,
+            content={"detail": error_msg},
+        )
+
+    app.add_middleware(IdempotencyMiddleware)
+    app.add_middleware(ProfilerMiddleware)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.include_router(chat_router)
+    app.include_router(stats_router)
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
 
-app = FastAPI(
-    title="KUAgentOS",
-    version="1.0.0",
-    description="Koç Üniversitesi Agent OS",
-    docs_url="/docs",
-    redoc_url="/redoc",
-)
-
-
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    error_msg = format_error_message(exc, user_friendly=True)
-    return JSONResponse(
-        status_code=500,
-        content={"detail": error_msg},
+    api_settings = AgnoAPISettings(
+        os_security_key=settings.os_security_key,
     )
 
+    logger.info("Initializing AgentOS...")
+    registry = get_agent_registry()
+    agent_os = AgentOS(
+        description="Koç Üniversitesi Agent OS",
+        agents=registry.agent_os_agents(),
+        base_app=app,
+        settings=api_settings,
+    )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(chat_router)
-
-api_settings = AgnoAPISettings(
-    os_security_key=settings.os_security_key,
-)
-
-logger.info("Initializing AgentOS...")
-agent_os = AgentOS(
-    description="Koç Üniversitesi Agent OS",
-    agents=[
-        orchestrator_agent,
-        satinalma_agent,
-    ],
-    base_app=app,
-    settings=api_settings,
-)
-
-app = agent_os.get_app()
-
-logger.info("Application initialized successfully")
-
-
-@app.on_event("startup")
-async def startup_event():
-    logger.info("=" * 60)
-    logger.info("🚀 KUAgentOS Started")
-    logger.info("=" * 60)
-    logger.info(f"Project ID: {settings.project_id}")
-    logger.info(f"Location: {settings.location}")
-    logger.info(f"Model: {settings.gemini_model_name}")
-    logger.info(f"Available Agents: orchestrator-agent, satinalma-pdf-agent")
-    logger.info("=" * 60)
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Application shutting down...")
-    logger.info("Database connections closed (if applicable)")
+    def _sync_agent_os(changed_ids):
+        # Reload sonrası AgentOS'un agent listesindeki eski instance'ları değiştir
+        agents = getattr(agent_os, "agents", None)
+        if agents is None:
+            return
+        for index, agent in enumerate(agents):
+            if agent.id in changed_ids and agent.id in registry:
+                agents[index] = registry.get(agent.id)
+
+    registry.add_reload_listener(_sync_agent_os)
+
+    app = agent_os.get_app()
+    app.state.boot_seconds = round(time.perf_counter() - started, 3)
+
+    logger.info(f"Application initialized successfully | boot: {app.state.boot_seconds}s")
+
+    @app.on_event("startup")
+    async def startup_event():
+        logger.info("=" * 60)
+        logger.info("🚀 KUAgentOS Started")
+        logger.info("=" * 60)
+        logger.info(f"Project ID: {settings.project_id}")
+        logger.info(f"Location: {settings.location}")
+        logger.info(f"Model: {settings.gemini_model_name} | provider: {settings.model.model_provider}")
+        logger.info(f"Available Agents: {', '.join(registry.specs)}")
+        logger.info("=" * 60)
+        agent_db = get_agent_db()
+        await start_conversation_logger()
+        app.state.analytics_task = asyncio.create_task(index_loop(), name="log-analytics-indexer")
+        app.state.checkpoint_task = asyncio.create_task(checkpoint_loop(), name="sqlite-checkpoint")
+        app.state.session_cache_task = start_session_cache_bus(agent_db.session_cache)
+        app.state.maintenance_task = asyncio.create_task(maintenance_loop(agent_db), name="session-db-maintenance")
+        app.state.warmup_task = asyncio.create_task(run_warmup(), name="warmup")
+        app.state.agent_config_task = asyncio.create_task(watch_agent_config(), name="agent-config-watch")
+        app.state.usage_task = asyncio.create_task(usage_flush_loop(), name="usage-flush")
+        app.state.memory_task = asyncio.create_task(memory_gauge_loop(), name="memory-gauge")
+        app.state.loop_monitor_task = asyncio.create_task(loop_monitor_loop(), name="loop-lag-monitor")
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        logger.info("Application shutting down...")
+        for task_name in (
+            "analytics_task",
+            "checkpoint_task",
+            "session_cache_task",
+            "maintenance_task",
+            "warmup_task",
+            "agent_config_task",
+            "usage_task",
+            "memory_task",
+            "loop_monitor_task",
+        ):
+            task = getattr(app.state, task_name, None)
+            if task is not None:
+                task.cancel()
+        await stop_conversation_logger()
+        await close_mail_transport()
+        await flush_usage()
+        await close_agent_db()
+        logger.info("Database connections closed")
+        close_span_exporter()
+        stop_logging()
+
+    return app
+
+
+def get_app() -> FastAPI:
+    """Global uygulama instance'ı; ilk çağrıda oluşturulur."""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(name: str) -> Any:
+    # `uvicorn app.main:app` ve `from app.main import app` için
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
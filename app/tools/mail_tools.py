@@ -1,15 +1,16 @@
 # app/tools/mail_tools.py
 """
 Mail gönderimi için toolkit.
-Şu an logging yapıyor, production için SMTP/SendGrid/Gmail API entegrasyonu eklenebilir.
+Gönderim `app/tools/mail_transport.py` içindeki transport katmanına devredilir
+(mock logging veya havuzlanmış SMTP).
 """
 import logging
 from typing import Optional
-from datetime import datetime
 
 from agno.tools.toolkit import Toolkit
 
-from app.configs.settings import settings
+from app.configs.exceptions import MailServiceError
+from app.tools.mail_transport import MailDraft, current_idempotency_key, get_mail_transport
 
 # Logger ayarla
 logger = logging.getLogger(__name__)
@@ -19,24 +20,23 @@ class MailTools(Toolkit):
     """
     Mail gönderimi için toolkit.
     
-    Şu an sadece mail bilgilerini logluyor (mock).
-    Production ortamı için:
-    - SMTP entegrasyonu
-    - SendGrid/Mailgun gibi servisler
-    - Gmail/Outlook API
-    eklenebilir.
+    Transport `MAIL_TRANSPORT` ayarı ile seçilir:
+    - "log": Mail bilgileri sadece loglanır (mock)
+    - "smtp": Havuzlanmış SMTP bağlantıları, batch gönderim ve rate limit
     
     Mail settings'den alınan bilgiler:
     - mail_sender_name: Gönderen adı
     - mail_sender_email: Gönderen mail adresi
     - mail_default_recipient: Varsayılan alıcı
+    - smtp_*: SMTP bağlantı, havuz ve rate limit ayarları
     """
 
     def __init__(self, *args, **kwargs):
         """Mail tools initializer."""
         tools = [self.send_email]
         super().__init__(name="mail_tools", tools=tools, *args, **kwargs)
-        logger.info("MailTools initialized (mock mode)")
+        self.transport = get_mail_transport()
+        logger.info(f"MailTools initialized (transport: {self.transport.name})")
 
     async def send_email(
         self,
@@ -46,16 +46,17 @@ class MailTools(Toolkit):
         cc: Optional[str] = None,
     ) -> str:
         """
-        Mail gönderir (şu an mock - sadece loglar).
+        Mail gönderir.
         
         Args:
-            to: Alıcı mail adresi
+            to: Alıcı mail adresi (birden fazla ise virgülle ayrılır)
             subject: Mail konusu
             body: Mail içeriği
             cc: Kopya alıcılar (opsiyonel)
         
         Returns:
-            str: İşlem durumu mesajı
+            str: İşlem durumu mesajı ("EMAIL_SENT", "EMAIL_LOGGED",
+            "EMAIL_ALREADY_SENT" veya hata)
         
         Example:
             >>> mail_tools.send_email(
@@ -63,36 +64,18 @@ class MailTools(Toolkit):
             ...     subject="Satınalma Talebi",
             ...     body="Merhaba, ..."
             ... )
-            "EMAIL_LOGGED"
+            "EMAIL_SENT"
         """
-        # Mail bilgilerini logluyoruz
-        logger.info("=" * 60)
-        logger.info("📧 EMAIL SEND REQUEST")
-        logger.info("=" * 60)
-        logger.info(f"Timestamp: {datetime.now().isoformat()}")
-        logger.info(f"From: {settings.mail_sender_name} <{settings.mail_sender_email}>")
-        logger.info(f"To: {to}")
-        if cc:
-            logger.info(f"CC: {cc}")
-        logger.info(f"Subject: {subject}")
-        logger.info("-" * 60)
-        logger.info(f"Body:\n{body}")
-        logger.info("=" * 60)
-        
-        # TODO: Gerçek mail servisi entegrasyonu
-        # Örnek implementasyon:
-        # try:
-        #     smtp_client.send(
-        #         from_email=settings.mail_sender_email,
-        #         to_email=to,
-        #         subject=subject,
-        #         body=body,
-        #         cc=cc
-        #     )
-        #     logger.info(f"Email successfully sent to {to}")
-        #     return "EMAIL_SENT"
-        # except Exception as e:
-        #     logger.error(f"Failed to send email: {e}")
-        #     raise MailServiceError(f"Mail gönderilemedi: {str(e)}")
-        
-        return "EMAIL_LOGGED"
+        # Onay akışında tool retry'ları aynı anahtarı taşır (bkz. mail_idempotency_scope)
+        draft = MailDraft(
+            to=to,
+            subject=subject,
+            body=body,
+            cc=cc,
+            idempotency_key=current_idempotency_key(),
+        )
+        try:
+            return await self.transport.send(draft)
+        except MailServiceError as e:
+            logger.error(f"Failed to send email: {e.message} | {e.detail or ''}")
+            return f"EMAIL_FAILED: {e.message}"
@@ -0,0 +1,524 @@
+# app/tools/mail_transport.py
+"""
+Mail transport katmanı.
+MailTools'un arkasında çalışan, havuzlanmış (pooled) async SMTP bağlantıları,
+çok alıcılı mailler için batch gönderim ve rate limit sağlar.
+
+Transport seçimi `MAIL_TRANSPORT` ayarı ile yapılır:
+- "log": Mevcut mock davranış, mail sadece loglanır
+- "smtp": aiosmtplib ile gerçek SMTP gönderimi
+
+Lokal test için bir SMTP stand-in'i yeterlidir:
+    python -m aiosmtpd -n -l localhost:1025
+    MAIL_TRANSPORT=smtp SMTP_PORT=1025 SMTP_START_TLS=false
+
+Transport'un aiosmtpd'ye karşı testleri `tests/test_mail_transport.py` içindedir.
+
+Tekrar gönderim güvenliği:
+- Bir batch yalnızca mesaj sunucuya ulaşmadan oluşan bağlantı hatalarında
+  (bağlantı kurulamadı, havuzdaki bağlantı düşmüş) yeni bağlantıyla tekrar denenir;
+  5xx, reddedilen alıcı veya DATA sonrası zaman aşımı tekrar denenmez
+- Teslim edilen alıcılar yalnızca taslağın `idempotency_key`'i varsa hatırlanır.
+  Anahtar onay başına üretilir (`mail_idempotency_scope`); aynı onayın tool retry'ı
+  yalnızca teslim edilmeyen alıcılara gider, tümü teslim edildiyse gönderim
+  atlanır ve "EMAIL_ALREADY_SENT" döner. Anahtarsız taslaklar içerikleri aynı
+  olsa bile her seferinde gönderilir
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from typing import Any, AsyncIterator, Iterator, List, Optional, Set, Tuple
+
+from app.configs.exceptions import MailServiceError
+from app.configs.settings import settings
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+_ADDRESS_SPLIT_RE = re.compile(r"[;,]")
+
+# Teslim edilen alıcıların hatırlanma süresi ve en fazla anahtar sayısı
+_DELIVERED_TTL_SECONDS = 3600.0
+_DELIVERED_MAX_DRAFTS = 1024
+
+# Aktif mail onayının idempotency anahtarı; kapsam dışında None (dedup yok)
+_idempotency_key: ContextVar[Optional[str]] = ContextVar("mail_idempotency_key", default=None)
+
+
+@contextmanager
+def mail_idempotency_scope(key: str) -> Iterator[None]:
+    """
+    Bu blok içinde oluşturulan taslaklar verilen idempotency anahtarını taşır.
+
+    Args:
+        key: Onay başına tekil anahtar (ör. "<session_id>:<pending email id>")
+    """
+    previous = _idempotency_key.get()
+    _idempotency_key.set(key)
+    try:
+        yield
+    finally:
+        _idempotency_key.set(previous)
+
+
+def current_idempotency_key() -> Optional[str]:
+    """Aktif `mail_idempotency_scope` anahtarı; kapsam dışında None."""
+    return _idempotency_key.get()
+
+
+def parse_addresses(value: Optional[str]) -> List[str]:
+    """
+    Virgül veya noktalı virgülle ayrılmış adres listesini parse eder.
+
+    Args:
+        value: "a@x.com, b@x.com" formatında adres string'i
+
+    Returns:
+        Tekrarsız, sırası korunmuş adres listesi
+    """
+    if not value:
+        return []
+    seen = []
+    for part in _ADDRESS_SPLIT_RE.split(value):
+        address = part.strip()
+        if address and address not in seen:
+            seen.append(address)
+    return seen
+
+
+@dataclass
+class MailDraft:
+    """
+    Gönderilecek mail taslağı.
+
+    MIME mesajı `render()` ile taslak başına bir kez üretilir; batch'ler
+    aynı mesajı farklı envelope alıcılarıyla tekrar kullanır.
+    """
+    to: str
+    subject: str
+    body: str
+    cc: Optional[str] = None
+    idempotency_key: Optional[str] = None
+    _rendered: Optional[EmailMessage] = field(default=None, init=False, repr=False)
+
+    @property
+    def recipients(self) -> List[str]:
+        """To + CC alıcılarının tekil listesi (envelope alıcıları)."""
+        addresses = parse_addresses(self.to)
+        for address in parse_addresses(self.cc):
+            if address not in addresses:
+                addresses.append(address)
+        return addresses
+
+    def render(self) -> EmailMessage:
+        """MIME mesajını üretir (cache'lenir)."""
+        if self._rendered is None:
+            message = EmailMessage()
+            message["From"] = formataddr(
+                (settings.mail_sender_name, settings.mail_sender_email)
+            )
+            message["To"] = ", ".join(parse_addresses(self.to))
+            if self.cc:
+                message["Cc"] = ", ".join(parse_addresses(self.cc))
+            message["Subject"] = self.subject
+            message["Date"] = formatdate(localtime=True)
+            message["Message-ID"] = make_msgid()
+            message.set_content(self.body)
+            self._rendered = message
+        return self._rendered
+
+
+class TokenBucket:
+    """
+    Basit async token bucket rate limiter.
+
+    Args:
+        rate: Saniyede eklenen token sayısı
+        burst: Bucket kapasitesi
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Yeterli token birikene kadar bekler."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def _retryable_errors() -> Tuple[type, ...]:
+    """
+    Mesaj sunucuya ulaşmadan oluşan, yeni bağlantıyla tekrar denenebilir hatalar.
+
+    Zaman aşımları (`SMTPTimeoutError`) ConnectionError değildir; DATA sonrası
+    bir zaman aşımında mesaj teslim edilmiş olabileceği için tekrar denenmez.
+    """
+    try:
+        import aiosmtplib
+    except ImportError:
+        # Havuz bağlantı açarken eksik bağımlılığı MailServiceError olarak bildirir
+        return (ConnectionError,)
+    return (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError)
+
+
+@dataclass
+class _PooledConnection:
+    client: Any
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+    messages_sent: int = 0
+
+
+class SmtpConnectionPool:
+    """
+    Yeniden kullanılabilir async SMTP bağlantı havuzu.
+
+    - Her mail için yeni TLS handshake yapmak yerine bağlantılar tutulur
+    - Boşta bekleyen bağlantı kullanılmadan önce NOOP ile sağlık kontrolü yapılır
+    - Belirli sayıda mesajdan sonra bağlantı yenilenir
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        size: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: bool = True,
+        timeout: float = 15.0,
+        max_messages_per_connection: int = 100,
+        health_check_interval: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.size = max(1, size)
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.health_check_interval = health_check_interval
+        self._idle: List[_PooledConnection] = []
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._closed = False
+
+    async def _connect(self) -> _PooledConnection:
+        try:
+            import aiosmtplib
+        except ImportError as e:
+            raise MailServiceError(
+                message="SMTP transport için aiosmtplib gerekli",
+                detail="pip install aiosmtplib",
+            ) from e
+
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=False if self.use_tls else self.start_tls,
+            timeout=self.timeout,
+        )
+        await client.connect()
+        if self.username and self.password:
+            await client.login(self.username, self.password)
+        logger.info(f"SMTP connection opened | host: {self.host}:{self.port}")
+        return _PooledConnection(client=client)
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        if not conn.client.is_connected:
+            return False
+        if conn.messages_sent >= self.max_messages_per_connection:
+            return False
+        if time.monotonic() - conn.last_used_at < self.health_check_interval:
+            return True
+        try:
+            await conn.client.noop()
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, conn: _PooledConnection) -> None:
+        try:
+            await conn.client.quit()
+        except Exception:
+            conn.client.close()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """Havuzdan sağlıklı bir bağlantı alır, iş bitince geri bırakır."""
+        if self._closed:
+            raise MailServiceError(message="SMTP havuzu kapatıldı")
+
+        async with self._semaphore:
+            conn: Optional[_PooledConnection] = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if await self._is_healthy(candidate):
+                    conn = candidate
+                    break
+                await self._discard(candidate)
+            if conn is None:
+                conn = await self._connect()
+
+            healthy = True
+            try:
+                yield conn.client
+                conn.messages_sent += 1
+            except Exception:
+                healthy = False
+                raise
+            finally:
+                conn.last_used_at = time.monotonic()
+                if healthy and not self._closed:
+                    self._idle.append(conn)
+                else:
+                    await self._discard(conn)
+
+    async def close(self) -> None:
+        """Tüm boştaki bağlantıları kapatır."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+        if idle:
+            logger.info(f"SMTP pool closed | connections: {len(idle)}")
+
+
+class LoggingMailTransport:
+    """Mock transport: mail bilgilerini loglar, gönderim yapmaz."""
+
+    name = "log"
+
+    async def send(self, draft: MailDraft) -> str:
+        logger.info(
+            f"EMAIL_LOGGED | from: {settings.mail_sender_email} | "
+            f"to: {draft.to} | cc: {draft.cc or '-'} | subject: {draft.subject}"
+        )
+        logger.debug(f"Email body:\n{draft.body}")
+        return "EMAIL_LOGGED"
+
+    async def warm_up(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+class SmtpMailTransport:
+    """
+    Havuzlanmış SMTP transport.
+
+    Çok alıcılı (To + CC) mailler `smtp_max_recipients_per_message` boyutunda
+    envelope batch'lerine bölünür ve havuzdaki bağlantılar üzerinden paralel
+    gönderilir. Her batch rate limiter'dan token alır.
+    """
+
+    name = "smtp"
+
+    def __init__(self, pool: SmtpConnectionPool, limiter: TokenBucket, batch_size: int):
+        self.pool = pool
+        self.limiter = limiter
+        self.batch_size = max(1, batch_size)
+        # idempotency_key -> (son teslim zamanı, teslim edilen alıcılar)
+        self._delivered: "OrderedDict[str, Tuple[float, Set[str]]]" = OrderedDict()
+
+    def _already_delivered(self, key: Optional[str]) -> Set[str]:
+        now = time.monotonic()
+        while self._delivered:
+            oldest, (delivered_at, _) = next(iter(self._delivered.items()))
+            if now - delivered_at < _DELIVERED_TTL_SECONDS and len(self._delivered) <= _DELIVERED_MAX_DRAFTS:
+                break
+            self._delivered.pop(oldest)
+        if key is None:
+            return set()
+        entry = self._delivered.get(key)
+        return set(entry[1]) if entry else set()
+
+    def _mark_delivered(self, key: Optional[str], recipients: List[str]) -> None:
+        if key is None:
+            return
+        _, delivered = self._delivered.pop(key, (0.0, set()))
+        delivered.update(recipients)
+        self._delivered[key] = (time.monotonic(), delivered)
+
+    async def _send_batch(self, message: EmailMessage, recipients: List[str]) -> List[str]:
+        """
+        Tek bir envelope batch'ini gönderir.
+
+        Returns:
+            List[str]: Sunucunun RCPT aşamasında reddettiği alıcılar (diğerleri teslim edildi)
+        """
+        await self.limiter.acquire()
+        retryable = _retryable_errors()
+        for attempt in (1, 2):
+            try:
+                async with self.pool.connection() as client:
+                    refused, _ = await client.send_message(
+                        message,
+                        sender=settings.mail_sender_email,
+                        recipients=recipients,
+                    )
+                return list(refused)
+            except MailServiceError:
+                raise
+            except retryable as e:
+                # Sunucu bağlantıyı düşürdüyse yeni bağlantıyla bir kez daha dene
+                if attempt == 2:
+                    raise MailServiceError(
+                        message=f"Mail gönderilemedi: {str(e)}",
+                        detail=f"recipients: {', '.join(recipients)}",
+                    ) from e
+                logger.warning(f"SMTP connection lost, retrying with fresh connection: {e}")
+            except Exception as e:
+                # 5xx, reddedilen alıcı, DATA sonrası zaman aşımı: tekrar gönderim çift mail riski taşır
+                raise MailServiceError(
+                    message=f"Mail gönderilemedi: {str(e)}",
+                    detail=f"recipients: {', '.join(recipients)}",
+                ) from e
+
+    async def send(self, draft: MailDraft) -> str:
+        recipients = draft.recipients
+        if not recipients:
+            raise MailServiceError(message="Mail alıcısı belirtilmedi")
+
+        key = draft.idempotency_key
+        delivered = self._already_delivered(key)
+        pending = [address for address in recipients if address not in delivered]
+        if not pending:
+            logger.warning(
+                f"Email already delivered for this confirmation, skipping resend | "
+                f"key: {key} | to: {draft.to}"
+            )
+            return "EMAIL_ALREADY_SENT"
+        if delivered:
+            logger.info(
+                f"Resending email to undelivered recipients only | "
+                f"delivered: {len(delivered)} | pending: {len(pending)}"
+            )
+
+        message = draft.render()
+        batches = [
+            pending[i:i + self.batch_size]
+            for i in range(0, len(pending), self.batch_size)
+        ]
+        started = time.perf_counter()
+        # Tüm batch'ler sonuçlanana kadar beklenir; teslim edilenler retry'da atlanır
+        results = await asyncio.gather(
+            *(self._send_batch(message, batch) for batch in batches),
+            return_exceptions=True,
+        )
+        failed: List[str] = []
+        errors: List[BaseException] = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                failed.extend(batch)
+                errors.append(result)
+                continue
+            if result:
+                failed.extend(result)
+                errors.append(MailServiceError(message=f"Alıcı reddedildi: {', '.join(result)}"))
+            self._mark_delivered(key, [address for address in batch if address not in result])
+        if errors:
+            first = errors[0]
+            reason = first.message if isinstance(first, MailServiceError) else str(first)
+            sent_count = len(recipients) - len(failed)
+            logger.error(
+                f"Email delivery incomplete | delivered: {sent_count}/{len(recipients)} | "
+                f"failed: {', '.join(failed)}"
+            )
+            raise MailServiceError(
+                message=(
+                    f"Mail {sent_count}/{len(recipients)} alıcıya gönderildi, "
+                    f"kalan alıcılara gönderilemedi: {reason}"
+                    if sent_count else reason
+                ),
+                detail=f"failed recipients: {', '.join(failed)}",
+            ) from first
+        logger.info(
+            f"Email sent | to: {draft.to} | recipients: {len(pending)} | "
+            f"batches: {len(batches)} | duration: {time.perf_counter() - started:.3f}s"
+        )
+        return "EMAIL_SENT"
+
+    async def warm_up(self) -> None:
+        """Havuza bir bağlantı açar (TLS + login) ve geri bırakır."""
+        async with self.pool.connection():
+            pass
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+_transport = None
+
+
+def get_mail_transport():
+    """
+    Ayarlara göre process genelinde tek bir transport instance'ı döner.
+
+    Returns:
+        LoggingMailTransport veya SmtpMailTransport
+    """
+    global _transport
+    if _transport is None:
+        mail = settings.mail
+        if mail.mail_transport == "smtp":
+            pool = SmtpConnectionPool(
+                host=mail.smtp_host,
+                port=mail.smtp_port,
+                size=mail.smtp_pool_size,
+                username=mail.smtp_username,
+                password=mail.smtp_password,
+                use_tls=mail.smtp_use_tls,
+                start_tls=mail.smtp_start_tls,
+                timeout=mail.smtp_timeout_seconds,
+                max_messages_per_connection=mail.smtp_max_messages_per_connection,
+                health_check_interval=mail.smtp_health_check_interval_seconds,
+            )
+            limiter = TokenBucket(
+                rate=mail.smtp_rate_limit_per_second,
+                burst=mail.smtp_rate_limit_burst,
+            )
+            _transport = SmtpMailTransport(
+                pool=pool,
+                limiter=limiter,
+                batch_size=mail.smtp_max_recipients_per_message,
+            )
+        else:
+            _transport = LoggingMailTransport()
+        logger.info(f"Mail transport initialized: {_transport.name}")
+    return _transport
+
+
+async def close_mail_transport() -> None:
+    """Shutdown sırasında açık SMTP bağlantılarını kapatır."""
+    global _transport
+    if _transport is not None:
+        await _transport.close()
+        _transport = None
@@ -1,22 +1,318 @@
+# app/utils/conversation_logger.py
+"""
+Konuşma logları (session başına JSONL veya segmentli depo).
+
+`log_event` artık dosyaya doğrudan yazmaz; kaydı sınırlı bir in-memory
+kuyruğa bırakır ve hemen döner. Tek bir arka plan writer task'ı kuyruğu
+batch'ler halinde boşaltır, açık dosya handle'larını LRU ile cache'ler ve
+flush/fsync politikasını uygular. Böylece loglama chat turn'lerinin
+kritik yoluna gecikme eklemez.
+
+Kayıtlar kuyruğa alınırken JSON'a çevrilir: serileştirilemeyen bir payload
+çağıranda hata verir (batch'teki diğer kayıtları etkilemez) ve payload'ın
+sonradan değiştirilmesi loglanan içeriği değiştirmez.
+
+Depolama formatı `CONVERSATION_LOG_STORAGE` ile seçilir; "segmented" için
+bkz. `app/utils/conversation_store.py`.
+"""
+import asyncio
 import json
+import logging
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, IO, List, Optional, Tuple
 
-import aiofiles
 from app.configs.settings import settings
+from app.utils.conversation_store import SegmentedLogSink, default_segments_dir, maintenance_loop
+from app.utils.metrics import time_stage
+from app.utils.tracing import current_trace
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+# (session_id, JSON'a çevrilmiş kayıt)
+LogEntry = Tuple[str, str]
+
+
+class _PerSessionFileSink:
+    """
+    Kayıtları `<logs_dir>/<session_id>.jsonl` dosyalarına yazar.
+
+    Sadece writer thread'i tarafından kullanılır; thread-safe değildir.
+    """
+
+    def __init__(self, logs_dir: Path, max_open_files: int):
+        self.logs_dir = logs_dir
+        self.max_open_files = max(1, max_open_files)
+        self._handles: "OrderedDict[str, IO[str]]" = OrderedDict()
+        self._dir_ready = False
+
+    def _handle(self, session_id: str) -> IO[str]:
+        handle = self._handles.get(session_id)
+        if handle is not None:
+            self._handles.move_to_end(session_id)
+            return handle
+        if not self._dir_ready:
+            self.logs_dir.mkdir(parents=True, exist_ok=True)
+            self._dir_ready = True
+        if len(self._handles) >= self.max_open_files:
+            _, evicted = self._handles.popitem(last=False)
+            evicted.close()
+        handle = open(self.logs_dir / f"{session_id}.jsonl", "a", encoding="utf-8")
+        self._handles[session_id] = handle
+        return handle
+
+    def write_batch(self, entries: List[LogEntry], fsync: bool) -> None:
+        grouped: Dict[str, List[str]] = {}
+        for session_id, line in entries:
+            grouped.setdefault(session_id, []).append(line + "\n")
+        for session_id, lines in grouped.items():
+            handle = self._handle(session_id)
+            handle.write("".join(lines))
+            handle.flush()
+            if fsync:
+                os.fsync(handle.fileno())
+
+    def sync(self) -> None:
+        for handle in self._handles.values():
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def close(self) -> None:
+        while self._handles:
+            _, handle = self._handles.popitem(last=False)
+            handle.close()
+
+    @property
+    def open_files(self) -> int:
+        return len(self._handles)
+
+
+class ConversationLogWriter:
+    """
+    Sınırlı kuyruk + tek writer task'lı konuşma log servisi.
+
+    Args:
+        sink: Batch'leri kalıcı hale getiren hedef (write_batch/sync/close)
+        queue_size: Kuyruk kapasitesi; dolduğunda yeni kayıtlar düşürülür
+        batch_size: Tek seferde yazılacak maksimum kayıt sayısı
+        flush_interval: Batch toplama için maksimum bekleme (saniye)
+        fsync_policy: "never", "batch" veya "interval"
+    """
+
+    def __init__(
+        self,
+        sink: Any,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+        fsync_policy: str = "never",
+    ):
+        self.sink = sink
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_fsync = time.monotonic()
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Kuyruk ve task oluşturuldukları loop'a bağlıdır (ör. ardışık asyncio.run)
+            if self._queue is not None and not self._queue.empty():
+                self.dropped += self._queue.qsize()
+                logger.warning(
+                    f"Conversation log writer moved to a new event loop, entries dropped: {self._queue.qsize()}"
+                )
+            self._queue = None
+            self._task = None
+            self._loop = loop
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = loop.create_task(self._run(self._queue), name="conversation-log-writer")
+
+    async def start(self) -> None:
+        """Writer task'ını başlatır (idempotent)."""
+        self._ensure_started()
+
+    def submit(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        """
+        Kaydı JSON'a çevirip kuyruğa bırakır, beklemez.
+
+        Returns:
+            bool: Kayıt kuyruğa alındıysa True, kuyruk dolu olduğu için düştüyse False
+
+        Raises:
+            TypeError: Kayıt JSON'a çevrilemezse (kuyruğa alınmaz)
+        """
+        line = json.dumps(entry, ensure_ascii=False)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((session_id, line))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(
+                    f"Conversation log queue full, entries dropped: {self.dropped}"
+                )
+            return False
+
+    async def _collect_batch(self, queue: asyncio.Queue) -> List[LogEntry]:
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _should_fsync(self) -> bool:
+        if self.fsync_policy == "batch":
+            return True
+        if self.fsync_policy == "interval":
+            now = time.monotonic()
+            if now - self._last_fsync >= self.flush_interval:
+                self._last_fsync = now
+                return True
+        return False
+
+    async def _write(self, batch: List[LogEntry], queue: asyncio.Queue) -> None:
+        try:
+            await asyncio.to_thread(self.sink.write_batch, batch, self._should_fsync())
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Conversation log write failed: {str(e)}", exc_info=True)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        # Kuyruk parametre olarak alınır; loop değişince eski task yeni kuyruğa dokunmaz
+        while True:
+            batch = await self._collect_batch(queue)
+            await self._write(batch, queue)
+
+    async def stop(self) -> None:
+        """Kuyruğu boşaltır, dosyaları flush edip kapatır ve task'ı durdurur."""
+        if self._task is None:
+            return
+        # Başka bir loop'a ait task beklenemez; kuyruktaki kayıtlar o loop'la gider
+        if self._loop is asyncio.get_running_loop() and not self._task.done():
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._queue = None
+        self._loop = None
+        await asyncio.to_thread(self._close_sink)
+        logger.info(
+            f"Conversation log writer stopped | written: {self.written} | dropped: {self.dropped}"
+        )
+
+    def _close_sink(self) -> None:
+        if self.fsync_policy != "never":
+            self.sink.sync()
+        self.sink.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Kuyruk derinliği ve sayaçlar."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "open_files": self.sink.open_files,
+        }
+
+
+_writer: Optional[ConversationLogWriter] = None
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+def _build_sink() -> Any:
+    config = settings.conversation_log
+    if config.conversation_log_storage == "segmented":
+        return SegmentedLogSink(
+            segments_dir=default_segments_dir(),
+            segment_seconds=config.conversation_log_segment_seconds,
+            segment_max_bytes=config.conversation_log_segment_max_bytes,
+        )
+    return _PerSessionFileSink(
+        logs_dir=Path(settings.conversation_logs_dir),
+        max_open_files=config.conversation_log_max_open_files,
+    )
+
+
+def get_conversation_log_writer() -> ConversationLogWriter:
+    """Process genelindeki tek writer instance'ını döner."""
+    global _writer
+    if _writer is None:
+        config = settings.conversation_log
+        _writer = ConversationLogWriter(
+            sink=_build_sink(),
+            queue_size=config.conversation_log_queue_size,
+            batch_size=config.conversation_log_batch_size,
+            flush_interval=config.conversation_log_flush_interval_seconds,
+            fsync_policy=config.conversation_log_fsync,
+        )
+    return _writer
 
 
 async def log_event(session_id: str, event: str, payload: Dict[str, Any]) -> None:
-    logs_dir = Path(settings.conversation_logs_dir)
-    logs_dir.mkdir(parents=True, exist_ok=True)
-    log_path = logs_dir / f"{session_id}.jsonl"
-    entry = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "event": event,
-        "payload": payload,
-    }
-    async with aiofiles.open(log_path, "a", encoding="utf-8") as handle:
-        await handle.write(json.dumps(entry, ensure_ascii=False))
-        await handle.write("\n")
+    with time_stage("log_write"):
+        entry = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "event": event,
+            "payload": payload,
+        }
+        trace = current_trace()
+        if trace is not None:
+            entry["trace_id"] = trace.trace_id
+        get_conversation_log_writer().submit(session_id, entry)
+
+
+async def start_conversation_logger() -> None:
+    """Startup'ta writer task'ını (ve segmentli depoda bakım task'ını) başlatır."""
+    global _maintenance_task
+    writer = get_conversation_log_writer()
+    await writer.start()
+    if isinstance(writer.sink, SegmentedLogSink) and _maintenance_task is None:
+        _maintenance_task = asyncio.get_running_loop().create_task(
+            maintenance_loop(writer.sink), name="conversation-store-maintenance"
+        )
+
 
+async def stop_conversation_logger() -> None:
+    """Shutdown'da bekleyen kayıtları diske yazar."""
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        _maintenance_task = None
+    if _writer is not None:
+        await _writer.stop()
@@ -0,0 +1,613 @@
+# app/utils/conversation_store.py
+"""
+Segmentli konuşma log deposu.
+
+Session başına bir JSONL dosyası yerine tüm kayıtlar append-only, zamana göre
+dönen segment dosyalarına yazılır:
+
+    <logs_dir>/segments/conv-20251202T070000-000.jsonl      (aktif)
+    <logs_dir>/segments/conv-20251202T060000-000.jsonl.gz   (kapanmış, sıkıştırılmış)
+    <logs_dir>/segments/index.sqlite                        (session_id -> segment, offset)
+
+Index, session başına okumayı dizin taraması yapmadan birkaç seek'e indirir.
+Offset'ler sıkıştırılmamış segment içindeki byte konumlarıdır.
+
+CLI:
+    python -m app.utils.conversation_store migrate [--delete-source]
+    python -m app.utils.conversation_store show <session_id>
+    python -m app.utils.conversation_store maintain
+"""
+import argparse
+import asyncio
+import gzip
+import heapq
+import io
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from app.configs.settings import settings
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "conv-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_FILE = "index.sqlite"
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+_SEGMENT_RE = re.compile(r"^conv-(\d{8}T\d{6})-(\d{3})\.jsonl(\.gz|\.zst)?$")
+_WINDOW_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def _open_index(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " session_id TEXT NOT NULL,"
+        " segment TEXT NOT NULL,"
+        " offset INTEGER NOT NULL,"
+        " length INTEGER NOT NULL)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_entries_session ON entries (session_id, segment, offset)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_segment ON entries (segment)")
+    # Migration'ın okuduğu kaynak dosyalar ve okunan byte konumu (tekrar çalıştırma güvenliği)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS migrated_files ("
+        " name TEXT PRIMARY KEY,"
+        " offset INTEGER NOT NULL,"
+        " entries INTEGER NOT NULL,"
+        " migrated_at REAL NOT NULL)"
+    )
+    return conn
+
+
+def _segment_line(session_id: str, line: str) -> bytes:
+    """JSON'a çevrilmiş kaydın başına session_id alanını ekler."""
+    prefix = '{"session_id": ' + json.dumps(session_id, ensure_ascii=False)
+    body = line[1:].lstrip()
+    return (prefix + (", " + body if body != "}" else "}")).encode("utf-8") + b"\n"
+
+
+def _parse_timestamp(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def segment_window_start(segment: str) -> Optional[datetime]:
+    """Segment adından zaman penceresinin başlangıcını (UTC) döner."""
+    match = _SEGMENT_RE.match(segment)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), _WINDOW_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def resolve_segment_path(segments_dir: Path, segment: str) -> Optional[Path]:
+    """Segmentin diskteki dosyasını (düz veya sıkıştırılmış) bulur."""
+    for suffix in ("", ".gz", ".zst"):
+        path = segments_dir / f"{segment}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def open_segment(path: Path) -> IO[bytes]:
+    """Segmenti okumak için açar; sıkıştırılmışsa şeffaf şekilde açar."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    if path.suffix == ".zst":
+        import zstandard
+
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        )
+    return open(path, "rb")
+
+
+def list_segments(segments_dir: Path) -> List[Path]:
+    """Segment dosyalarını kronolojik sırada döner."""
+    if not segments_dir.exists():
+        return []
+    return sorted(
+        (p for p in segments_dir.iterdir() if _SEGMENT_RE.match(p.name)),
+        key=lambda p: p.name,
+    )
+
+
+def segment_name(path: Path) -> str:
+    """Sıkıştırma uzantısı olmadan segment adı."""
+    name = path.name
+    for suffix in (".gz", ".zst"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+class SegmentedLogSink:
+    """
+    ConversationLogWriter için segmentli depolama hedefi.
+
+    Sadece writer thread'i tarafından kullanılır; thread-safe değildir.
+
+    Args:
+        segments_dir: Segment dosyalarının dizini
+        segment_seconds: Segment zaman penceresi
+        segment_max_bytes: Pencere dolmadan rotasyon için boyut sınırı
+    """
+
+    def __init__(self, segments_dir: Path, segment_seconds: int, segment_max_bytes: int):
+        self.segments_dir = segments_dir
+        self.segment_seconds = max(60, segment_seconds)
+        self.segment_max_bytes = segment_max_bytes
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        self._index = _open_index(self.segments_dir / INDEX_FILE)
+        self._handle: Optional[IO[bytes]] = None
+        self._segment: Optional[str] = None
+        self._window: Optional[int] = None
+
+    @property
+    def active_segment(self) -> Optional[str]:
+        return self._segment
+
+    @property
+    def open_files(self) -> int:
+        return 1 if self._handle is not None else 0
+
+    def _window_for(self, ts: float) -> int:
+        return int(ts // self.segment_seconds) * self.segment_seconds
+
+    def _open_segment(self, window: int) -> None:
+        self._close_handle()
+        stamp = datetime.fromtimestamp(window, tz=timezone.utc).strftime(_WINDOW_FORMAT)
+        seq = 0
+        while True:
+            name = f"{SEGMENT_PREFIX}{stamp}-{seq:03d}{SEGMENT_SUFFIX}"
+            existing = resolve_segment_path(self.segments_dir, name)
+            # Sıkıştırılmış ya da dolu segmentlere tekrar yazılmaz
+            if existing is None or (
+                existing.suffix == SEGMENT_SUFFIX
+                and existing.stat().st_size < self.segment_max_bytes
+            ):
+                break
+            seq += 1
+        self._handle = open(self.segments_dir / name, "ab")
+        self._segment = name
+        self._window = window
+
+    def _close_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        self._handle = None
+        self._segment = None
+        self._window = None
+
+    def write_entries(self, entries: List[Tuple[str, str, float]], fsync: bool) -> None:
+        """
+        (session_id, JSON kayıt, epoch_ts) kayıtlarını zaman penceresine göre segmentlere yazar.
+
+        Kayıtlar zamana göre sıralı gelmelidir; aksi halde segmentler tekrar açılır.
+        """
+        self.commit(self.append_entries(entries), fsync)
+
+    def append_entries(self, entries: Iterable[Tuple[str, str, float]]) -> List[Tuple[str, str, int, int]]:
+        """
+        Kayıtları segmentlere ekler, index'e yazmadan index satırlarını döner.
+
+        Index'e girmeyen byte'lar okuyucular tarafından görülmez; `commit`
+        çağrılana kadar kayıtlar yazılmamış sayılır.
+        """
+        rows = []
+        for session_id, serialized, ts in entries:
+            window = self._window_for(ts)
+            if (
+                self._handle is None
+                or window != self._window
+                or self._handle.tell() >= self.segment_max_bytes
+            ):
+                self._open_segment(window)
+            line = _segment_line(session_id, serialized)
+            offset = self._handle.tell()
+            self._handle.write(line)
+            rows.append((session_id, self._segment, offset, len(line)))
+        return rows
+
+    def commit(
+        self,
+        rows: List[Tuple[str, str, int, int]],
+        fsync: bool,
+        migrated: Iterable[Tuple[str, int, int]] = (),
+    ) -> None:
+        """
+        Segmenti flush eder ve index satırlarını tek transaction'da yazar.
+
+        Args:
+            rows: `append_entries` çıktısı
+            fsync: Segment dosyası fsync edilsin mi
+            migrated: Aynı transaction'da kaydedilecek (kaynak dosya, byte konumu, kayıt sayısı)
+        """
+        if self._handle is not None:
+            self._handle.flush()
+            if fsync:
+                os.fsync(self._handle.fileno())
+        with self._index:
+            self._index.executemany(
+                "INSERT INTO entries (session_id, segment, offset, length) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            now = time.time()
+            self._index.executemany(
+                "INSERT INTO migrated_files (name, offset, entries, migrated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET offset = excluded.offset,"
+                " entries = migrated_files.entries + excluded.entries, migrated_at = excluded.migrated_at",
+                [(name, offset, count, now) for name, offset, count in migrated],
+            )
+
+    def reset_migrated_offsets(self, names: List[str]) -> None:
+        """Silinen kaynak dosyaların okunan konumunu sıfırlar."""
+        with self._index:
+            self._index.executemany(
+                "UPDATE migrated_files SET offset = 0 WHERE name = ?", [(name,) for name in names]
+            )
+
+    def migrated_offsets(self) -> Dict[str, int]:
+        """Migration'ın daha önce okuduğu kaynak dosyalar ve byte konumları."""
+        return dict(self._index.execute("SELECT name, offset FROM migrated_files"))
+
+    def write_batch(self, entries: List[Tuple[str, str]], fsync: bool) -> None:
+        now = time.time()
+        self.write_entries([(sid, line, now) for sid, line in entries], fsync)
+
+    def sync(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+
+    def close(self) -> None:
+        self._close_handle()
+        self._index.close()
+
+
+def read_session_events(session_id: str, segments_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """
+    Bir session'ın tüm kayıtlarını index üzerinden okur.
+
+    Args:
+        session_id: Session ID
+        segments_dir: Segment dizini (varsayılan: ayarlardaki dizin)
+
+    Returns:
+        Kronolojik sıralı kayıt listesi
+    """
+    segments_dir = segments_dir or default_segments_dir()
+    index_path = segments_dir / INDEX_FILE
+    if not index_path.exists():
+        return []
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT segment, offset, length FROM entries WHERE session_id = ? ORDER BY segment, offset",
+            (session_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    events: List[Dict[str, Any]] = []
+    current: Optional[str] = None
+    handle: Optional[IO[bytes]] = None
+    try:
+        for segment, offset, length in rows:
+            if segment != current:
+                if handle is not None:
+                    handle.close()
+                    handle = None
+                current = segment
+                path = resolve_segment_path(segments_dir, segment)
+                if path is None:
+                    continue
+                handle = open_segment(path)
+            if handle is None:
+                continue
+            handle.seek(offset)
+            events.append(json.loads(handle.read(length)))
+    finally:
+        if handle is not None:
+            handle.close()
+    return events
+
+
+def iter_segment_entries(path: Path, start_offset: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Segmentteki kayıtları (bitiş offset'i, kayıt) olarak sırayla döner."""
+    with open_segment(path) as handle:
+        if start_offset:
+            handle.seek(start_offset)
+        offset = start_offset
+        for line in handle:
+            if not line.endswith(b"\n"):
+                # Yazımı bitmemiş son satır
+                break
+            offset += len(line)
+            try:
+                yield offset, json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _compress_file(path: Path, compression: str) -> Path:
+    target = path.with_name(path.name + COMPRESSED_SUFFIXES[compression])
+    tmp = target.with_name(target.name + ".tmp")
+    with open(path, "rb") as src:
+        if compression == "zstd":
+            import zstandard
+
+            with open(tmp, "wb") as raw:
+                zstandard.ZstdCompressor(level=10).copy_stream(src, raw)
+        else:
+            with gzip.open(tmp, "wb", compresslevel=6) as dst:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+    os.replace(tmp, target)
+    path.unlink()
+    return target
+
+
+def compress_closed_segments(
+    segments_dir: Path,
+    compression: str,
+    active_segment: Optional[str] = None,
+    segment_seconds: int = 3600,
+) -> int:
+    """
+    Penceresi kapanmış, sıkıştırılmamış segmentleri sıkıştırır.
+
+    Aktif segmente dokunulmaz; writer bloklanmaz.
+
+    Returns:
+        Sıkıştırılan segment sayısı
+    """
+    if compression not in COMPRESSED_SUFFIXES:
+        return 0
+    now = datetime.now(timezone.utc)
+    compressed = 0
+    for path in list_segments(segments_dir):
+        if path.suffix != SEGMENT_SUFFIX or path.name == active_segment:
+            continue
+        start = segment_window_start(path.name)
+        if start is None or start + timedelta(seconds=segment_seconds) > now:
+            continue
+        _compress_file(path, compression)
+        compressed += 1
+    return compressed
+
+
+def apply_retention(
+    segments_dir: Path,
+    retention_days: int,
+    active_segment: Optional[str] = None,
+    batch_size: int = 5000,
+) -> int:
+    """
+    Retention süresini aşan segmentleri ve index kayıtlarını siler.
+
+    Index silmeleri küçük transaction'larla yapılır, writer uzun süre beklemez.
+
+    Returns:
+        Silinen segment sayısı
+    """
+    if retention_days <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    expired = [
+        path for path in list_segments(segments_dir)
+        if segment_name(path) != active_segment
+        and (segment_window_start(path.name) or cutoff) < cutoff
+    ]
+    if not expired:
+        return 0
+
+    conn = _open_index(segments_dir / INDEX_FILE)
+    try:
+        for path in expired:
+            name = segment_name(path)
+            while True:
+                with conn:
+                    deleted = conn.execute(
+                        "DELETE FROM entries WHERE rowid IN ("
+                        " SELECT rowid FROM entries WHERE segment = ? LIMIT ?)",
+                        (name, batch_size),
+                    ).rowcount
+                if deleted < batch_size:
+                    break
+            path.unlink(missing_ok=True)
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    finally:
+        conn.close()
+    return len(expired)
+
+
+def default_segments_dir() -> Path:
+    return Path(settings.conversation_logs_dir) / "segments"
+
+
+def run_maintenance(active_segment: Optional[str] = None) -> Dict[str, int]:
+    """Retention ve sıkıştırma işlerini bir kez çalıştırır."""
+    config = settings.conversation_log
+    segments_dir = default_segments_dir()
+    removed = apply_retention(
+        segments_dir, config.conversation_log_retention_days, active_segment
+    )
+    compressed = compress_closed_segments(
+        segments_dir,
+        config.conversation_log_compression,
+        active_segment,
+        config.conversation_log_segment_seconds,
+    )
+    if removed or compressed:
+        logger.info(
+            f"Conversation store maintenance | removed: {removed} | compressed: {compressed}"
+        )
+    return {"removed_segments": removed, "compressed_segments": compressed}
+
+
+async def maintenance_loop(sink: SegmentedLogSink) -> None:
+    """Retention/sıkıştırma işlerini arka planda, writer'ı bloklamadan çalıştırır."""
+    interval = settings.conversation_log.conversation_log_maintenance_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(run_maintenance, sink.active_segment)
+        except Exception as e:
+            logger.error(f"Conversation store maintenance failed: {str(e)}", exc_info=True)
+
+
+class _SourceFile:
+    """Migration kaynağı: `<session_id>.jsonl` dosyasını bir byte konumundan itibaren okur."""
+
+    def __init__(self, path: Path, start_offset: int):
+        self.path = path
+        self.session_id = path.stem
+        self.start_offset = start_offset
+        self.offset = start_offset
+        self.entries = 0
+        self.size = start_offset
+
+    def __iter__(self) -> Iterator[Tuple[str, str, float]]:
+        with open(self.path, "rb") as handle:
+            handle.seek(self.start_offset)
+            for raw in handle:
+                # Yazımı süren son satır (newline yok) bir sonraki çalıştırmaya bırakılır
+                if not raw.endswith(b"\n"):
+                    break
+                self.offset += len(raw)
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping invalid line in {self.path.name}")
+                    continue
+                self.entries += 1
+                yield self.session_id, line, _parse_timestamp(entry.get("timestamp"))
+            self.size = handle.seek(0, os.SEEK_END)
+
+
+def migrate_per_session_files(
+    logs_dir: Path,
+    segments_dir: Path,
+    delete_source: bool = False,
+    files_per_group: int = 256,
+) -> Dict[str, int]:
+    """
+    Mevcut `<session_id>.jsonl` dosyalarını segmentli formata taşır.
+
+    Dosyalar `files_per_group`'luk gruplar halinde akış olarak okunur; grup
+    içindeki dosyalar timestamp'e göre k-way merge edilir, böylece bellek ve
+    açık dosya sayısı dosya sayısından bağımsızdır. Her grubun index satırları
+    ve kaynak dosyaların okunan byte konumları (`migrated_files`) tek
+    transaction'da yazılır: tekrar çalıştırma yalnızca yeni eklenen satırları
+    taşır, yarıda kesilen bir grup ise baştan taşınır.
+
+    Returns:
+        Taşınan/atlanan dosya ve kayıt sayıları
+    """
+    config = settings.conversation_log
+    sink = SegmentedLogSink(
+        segments_dir=segments_dir,
+        segment_seconds=config.conversation_log_segment_seconds,
+        segment_max_bytes=config.conversation_log_segment_max_bytes,
+    )
+    migrated = sink.migrated_offsets()
+    result = {"files": 0, "skipped_files": 0, "entries": 0, "deleted_files": 0}
+    try:
+        pending: List[_SourceFile] = []
+        done: List[Path] = []
+        for path in sorted(logs_dir.glob("*.jsonl")):
+            offset = migrated.get(path.name, 0)
+            if offset and path.stat().st_size <= offset:
+                result["skipped_files"] += 1
+                done.append(path)
+                continue
+            pending.append(_SourceFile(path, offset))
+        if delete_source and done:
+            # Önceki bir çalıştırmada tamamen taşınmış dosyalar
+            for path in done:
+                path.unlink()
+            sink.reset_migrated_offsets([path.name for path in done])
+            result["deleted_files"] += len(done)
+
+        for i in range(0, len(pending), max(1, files_per_group)):
+            group = pending[i:i + files_per_group]
+            rows: List[Tuple[str, str, int, int]] = []
+            merged = heapq.merge(*group, key=lambda item: item[2])
+            while True:
+                chunk = list(itertools.islice(merged, 5000))
+                if not chunk:
+                    break
+                rows.extend(sink.append_entries(chunk))
+            sink.commit(
+                rows,
+                fsync=True,
+                migrated=[
+                    (source.path.name, source.offset, source.entries)
+                    for source in group
+                    if source.offset > source.start_offset
+                ],
+            )
+            result["files"] += sum(1 for source in group if source.offset > source.start_offset)
+            result["entries"] += sum(source.entries for source in group)
+
+            if delete_source:
+                # Yalnızca sonuna kadar taşınmış dosyalar silinir; aynı adla yeniden
+                # oluşan bir dosya baştan okunsun diye konumu sıfırlanır
+                deleted = [source.path for source in group if source.offset >= source.size]
+                for path in deleted:
+                    path.unlink()
+                sink.reset_migrated_offsets([path.name for path in deleted])
+                result["deleted_files"] += len(deleted)
+    finally:
+        sink.close()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Segmentli konuşma log deposu araçları")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Session başına JSONL dosyalarını segmentlere taşı")
+    migrate.add_argument("--delete-source", action="store_true")
+    show = sub.add_parser("show", help="Bir session'ın kayıtlarını yazdır")
+    show.add_argument("session_id")
+    sub.add_parser("maintain", help="Retention ve sıkıştırmayı bir kez çalıştır")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "migrate":
+        result = migrate_per_session_files(
+            Path(settings.conversation_logs_dir), default_segments_dir(), args.delete_source
+        )
+        print(json.dumps(result))
+    elif args.command == "show":
+        for event in read_session_events(args.session_id):
+            print(json.dumps(event, ensure_ascii=False))
+    elif args.command == "maintain":
+        print(json.dumps(run_maintenance()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# app/utils/idempotency.py
+"""
+Chat istekleri için idempotency ve devam ettirilebilir (resumable) stream'ler.
+
+`Idempotency-Key` header'ı taşıyan `POST /api/chat/...` istekleri, istemci
+bağlantısından bağımsız bir task'ta çalıştırılır ve yanıtı bellekte tutulur:
+
+- Aynı anahtarla gelen tekrar (retry) isteği, endpoint'i yeniden çalıştırmadan
+  aynı yanıtı alır; ilk istek hâlâ sürüyorsa onun sonucunu bekler.
+- SSE yanıtlarında her frame'e `id: <n>` eklenir. Bağlantısı kopan istemci aynı
+  istek ve anahtarla, `Last-Event-ID: <n>` header'ı ile tekrar bağlanır ve
+  n'den sonraki frame'leri (üretim sürüyorsa canlı olarak) alır.
+- Aynı anahtar farklı bir body ile kullanılırsa 422 döner.
+- 5xx ve 429 yanıtları saklanmaz; retry endpoint'i yeniden çalıştırır.
+
+Kayıtlar process belleğindedir: birden fazla worker'da retry'ın aynı worker'a
+gitmesi gerekir (sticky session), aksi halde istek yeniden çalıştırılır.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.configs.settings import settings
+from app.utils.metrics import REGISTRY
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_PATH_PREFIX = "/api/chat/"
+
+IDEMPOTENT_REQUESTS_TOTAL = REGISTRY.counter(
+    "kuagentos_idempotent_requests_total",
+    "Chat requests carrying an Idempotency-Key, by outcome (executed, replayed, conflict).",
+    labelnames=("outcome",),
+)
+
+
+class _Entry:
+    """Tek bir anahtarın yanıtı; üretici task yazar, istemci bağlantıları okur."""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.stream = False
+        self.frames: List[bytes] = []
+        self.body = b""
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self._pending = b""
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+    def start(self, status: int, headers: List[Tuple[bytes, bytes]]) -> None:
+        self.status = status
+        self.headers = headers
+        self.stream = dict(headers).get(b"content-type", b"").startswith(b"text/event-stream")
+        self.notify()
+
+    def append(self, chunk: bytes) -> None:
+        if not self.stream:
+            self.body += chunk
+            return
+        self._pending += chunk
+        *frames, self._pending = self._pending.split(b"\n\n")
+        if frames:
+            self.frames.extend(frame for frame in frames if frame)
+            self.notify()
+
+    def finish(self) -> None:
+        if self._pending.strip():
+            self.frames.append(self._pending)
+        self._pending = b""
+        self.done = True
+        self.finished_at = time.monotonic()
+        self.notify()
+
+    @property
+    def cacheable(self) -> bool:
+        return self.status is not None and self.status < 500 and self.status != 429
+
+
+class IdempotencyStore:
+    """
+    Anahtar -> yanıt kaydı; süresi dolan ve kapasiteyi aşan tamamlanmış kayıtları atar.
+
+    Args:
+        ttl: Tamamlanan kayıtların saklanma süresi (saniye)
+        max_entries: En fazla kayıt sayısı
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.done and time.monotonic() - entry.finished_at > self.ttl:
+            del self._entries[key]
+            return None
+        return entry
+
+    def create(self, key: str, fingerprint: str) -> _Entry:
+        self._purge()
+        entry = self._entries[key] = _Entry(fingerprint)
+        return entry
+
+    def discard(self, key: str, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry.done and now - entry.finished_at > self.ttl]:
+            del self._entries[key]
+        # Kapasite aşımında en eski tamamlanmış kayıtlar atılır; süren yanıtlar korunur
+        overflow = len(self._entries) - self.max_entries + 1
+        if overflow > 0:
+            for key in [key for key, entry in self._entries.items() if entry.done][:overflow]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        active = sum(1 for entry in self._entries.values() if not entry.done)
+        return {"entries": len(self._entries), "active": active}
+
+
+_store: Optional[IdempotencyStore] = None
+
+# Üretici task'lar; event loop task'ları zayıf referansla tuttuğu için burada saklanır
+_producers: Set[asyncio.Task] = set()
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        config = settings.idempotency
+        _store = IdempotencyStore(config.idempotency_ttl_seconds, config.idempotency_max_entries)
+    return _store
+
+
+def idempotency_stats() -> Optional[Dict[str, Any]]:
+    return _store.stats() if _store is not None else None
+
+
+async def _read_body(receive: Callable) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+def _json_response(status: int, detail: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    start = {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    return start, {"type": "http.response.body", "body": body}
+
+
+class IdempotencyMiddleware:
+    """
+    `Idempotency-Key` header'lı chat isteklerini ayrık bir task'ta çalıştırıp
+    yanıtı kaydeder; tekrar eden istekleri ve `Last-Event-ID` ile devam eden
+    stream bağlantılarını bu kayıttan yanıtlar.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if (
+            scope["type"] != "http"
+            or scope.get("method") != "POST"
+            or not scope.get("path", "").startswith(IDEMPOTENT_PATH_PREFIX)
+            or not settings.idempotency.idempotency_enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        raw_key = headers.get(b"idempotency-key")
+        if not raw_key:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{scope['path']}|{raw_key.decode('latin-1')}"
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store = get_idempotency_store()
+        entry = store.get(key)
+        if entry is None:
+            IDEMPOTENT_REQUESTS_TOTAL.inc("executed")
+            entry = store.create(key, fingerprint)
+            task = asyncio.create_task(self._produce(scope, body, key, entry), name="idempotent-request")
+            _producers.add(task)
+            task.add_done_callback(_producers.discard)
+            replayed = False
+        elif entry.fingerprint != fingerprint:
+            IDEMPOTENT_REQUESTS_TOTAL.inc("conflict")
+            start, message = _json_response(422, "Idempotency-Key farklı bir istek gövdesiyle tekrar kullanıldı")
+            await send(start)
+            await send(message)
+            return
+        else:
+            IDEMPOTENT_REQUESTS_TOTAL.inc("replayed")
+            replayed = True
+
+        try:
+            after = int(headers.get(b"last-event-id", b"-1"))
+        except ValueError:
+            after = -1
+        await self._serve(entry, send, after, replayed)
+
+    async def _produce(self, scope: Dict[str, Any], body: bytes, key: str, entry: _Entry) -> None:
+        """Endpoint'i istemci bağlantısından bağımsız çalıştırır; kopan istemci üretimi durdurmaz."""
+        delivered = False
+        never = asyncio.Event()
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await never.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                entry.start(message["status"], list(message.get("headers") or []))
+            elif message["type"] == "http.response.body":
+                entry.append(message.get("body", b""))
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception as e:
+            logger.error(f"Idempotent request failed | path: {scope.get('path')} | error: {str(e)}", exc_info=True)
+            if entry.status is None:
+                start, message = _json_response(500, "Beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.")
+                entry.start(start["status"], start["headers"])
+                entry.append(message["body"])
+        finally:
+            if entry.status is None:
+                entry.start(500, [])
+            entry.finish()
+            if not entry.cacheable:
+                get_idempotency_store().discard(key, entry)
+
+    async def _serve(self, entry: _Entry, send: Callable, after: int, replayed: bool) -> None:
+        while entry.status is None:
+            await entry.wait()
+        headers = list(entry.headers)
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+
+        if not entry.stream:
+            while not entry.done:
+                await entry.wait()
+            await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        index = after + 1
+        while True:
+            while index < len(entry.frames):
+                frame = entry.frames[index]
+                await send({
+                    "type": "http.response.body",
+                    "body": b"id: %d\n%s\n\n" % (index, frame),
+                    "more_body": True,
+                })
+                index += 1
+            if entry.done:
+                break
+            await entry.wait()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
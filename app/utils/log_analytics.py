@@ -0,0 +1,331 @@
+# app/utils/log_analytics.py
+"""
+Konuşma logu analitik index'i.
+
+Konuşma loglarını (session başına JSONL veya segmentli depo) artımlı olarak
+okuyup latency içeren kayıtları lokal bir SQLite tablosuna yazar. Her kaynak
+dosya için okunan offset, satırlarla aynı transaction'da checkpoint olarak
+saklanır; index yeniden başlatıldığında kaldığı yerden devam eder.
+
+CLI:
+    python -m app.utils.log_analytics index
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.configs.settings import settings
+from app.utils.conversation_store import (
+    SEGMENT_SUFFIX,
+    default_segments_dir,
+    iter_segment_entries,
+    list_segments,
+    segment_name,
+)
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS turn_metrics ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " session_id TEXT NOT NULL,"
+    " agent_id TEXT,"
+    " event TEXT NOT NULL,"
+    " ts REAL NOT NULL,"
+    " day TEXT NOT NULL,"
+    " stream INTEGER NOT NULL,"
+    " first_token_ms REAL,"
+    " total_ms REAL,"
+    " email_intent INTEGER NOT NULL DEFAULT 0)",
+    "CREATE INDEX IF NOT EXISTS idx_turn_metrics_ts ON turn_metrics (ts)",
+    "CREATE INDEX IF NOT EXISTS idx_turn_metrics_agent_ts ON turn_metrics (agent_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_turn_metrics_day ON turn_metrics (day)",
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    " source TEXT PRIMARY KEY,"
+    " offset INTEGER NOT NULL,"
+    " complete INTEGER NOT NULL DEFAULT 0,"
+    " updated_at REAL NOT NULL)",
+)
+
+GROUP_BY_OPTIONS = ("none", "agent", "day")
+
+
+def _connect(path: Optional[str] = None) -> sqlite3.Connection:
+    db_path = Path(path or settings.analytics.analytics_db_file)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _to_epoch(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _metric_row(session_id: str, entry: Dict[str, Any]) -> Optional[Tuple]:
+    """Latency içeren kayıtları tablo satırına çevirir, diğerlerini atlar."""
+    payload = entry.get("payload") or {}
+    total = payload.get("total_latency")
+    if total is None:
+        return None
+    ts = _to_epoch(entry.get("timestamp"))
+    if ts is None:
+        return None
+    event = entry.get("event", "")
+    first_token = payload.get("first_token_latency")
+    agent_id = payload.get("agent_id") or payload.get("assigned_agent_id")
+    email_intent = bool(payload.get("email_intent_detected") or payload.get("email_intent"))
+    return (
+        session_id,
+        agent_id,
+        event,
+        ts,
+        datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d"),
+        1 if event.endswith("_stream_metrics") else 0,
+        first_token * 1000.0 if first_token is not None else None,
+        total * 1000.0,
+        1 if email_intent else 0,
+    )
+
+
+def _iter_sources(logs_dir: Path) -> Iterator[Tuple[str, Path, bool]]:
+    """
+    Aktif depolama formatının dosyalarını döner.
+
+    Yields:
+        (checkpoint anahtarı, dosya, session_id dosya adında mı)
+    """
+    if settings.conversation_log.conversation_log_storage == "segmented":
+        # Eski session dosyaları migration ile segmentlere taşınır; ikisini
+        # birden indexlemek kayıtları çift sayar
+        for path in list_segments(default_segments_dir()):
+            yield f"segment:{segment_name(path)}", path, False
+    elif logs_dir.exists():
+        for path in logs_dir.glob("*.jsonl"):
+            yield f"session:{path.name}", path, True
+
+
+class LogAnalyticsIndexer:
+    """
+    Konuşma loglarını analitik tablosuna artımlı olarak indexler.
+
+    Args:
+        db_path: Analitik SQLite dosyası (varsayılan: ANALYTICS_DB_FILE)
+        logs_dir: Konuşma log dizini (varsayılan: CONVERSATION_LOGS_DIR)
+    """
+
+    def __init__(self, db_path: Optional[str] = None, logs_dir: Optional[Path] = None):
+        self.db_path = db_path
+        self.logs_dir = logs_dir or Path(settings.conversation_logs_dir)
+
+    def index_once(self) -> Dict[str, int]:
+        """
+        Yeni kayıtları indexler.
+
+        Returns:
+            Taranan kaynak ve eklenen satır sayıları
+        """
+        conn = _connect(self.db_path)
+        try:
+            checkpoints = {
+                source: (offset, bool(complete))
+                for source, offset, complete in conn.execute(
+                    "SELECT source, offset, complete FROM checkpoints"
+                )
+            }
+            scanned = inserted = 0
+            for source, path, session_in_name in _iter_sources(self.logs_dir):
+                offset, complete = checkpoints.get(source, (0, False))
+                compressed = path.suffix != SEGMENT_SUFFIX
+                if complete:
+                    continue
+                if not compressed:
+                    try:
+                        if path.stat().st_size <= offset:
+                            continue
+                    except FileNotFoundError:
+                        continue
+
+                rows: List[Tuple] = []
+                end_offset = offset
+                try:
+                    for end_offset, entry in iter_segment_entries(path, offset):
+                        session_id = path.stem if session_in_name else entry.get("session_id", "")
+                        row = _metric_row(session_id, entry)
+                        if row is not None:
+                            rows.append(row)
+                except FileNotFoundError:
+                    # Bakım sırasında sıkıştırılmış/silinmiş olabilir; sonraki turda
+                    continue
+                scanned += 1
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO turn_metrics (session_id, agent_id, event, ts, day, stream,"
+                        " first_token_ms, total_ms, email_intent) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    conn.execute(
+                        "INSERT INTO checkpoints (source, offset, complete, updated_at)"
+                        " VALUES (?, ?, ?, ?) ON CONFLICT(source) DO UPDATE SET"
+                        " offset = excluded.offset, complete = excluded.complete,"
+                        " updated_at = excluded.updated_at",
+                        (source, end_offset, 1 if compressed else 0, time.time()),
+                    )
+                inserted += len(rows)
+        finally:
+            conn.close()
+        if inserted:
+            logger.info(f"Log analytics indexed | sources: {scanned} | rows: {inserted}")
+        return {"sources": scanned, "rows": inserted}
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Sıralı listede nearest-rank percentile."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return round(values[rank - 1], 2)
+
+
+def _summarize(rows: List[Tuple], window_seconds: float) -> Dict[str, Any]:
+    first_tokens = sorted(r[0] for r in rows if r[0] is not None)
+    totals = sorted(r[1] for r in rows if r[1] is not None)
+    count = len(rows)
+    return {
+        "count": count,
+        "throughput_per_minute": round(count / (window_seconds / 60.0), 3) if window_seconds > 0 else None,
+        "email_intent_rate": round(sum(r[2] for r in rows) / count, 4) if count else None,
+        "first_token_ms": {
+            "p50": _percentile(first_tokens, 50),
+            "p95": _percentile(first_tokens, 95),
+            "p99": _percentile(first_tokens, 99),
+        },
+        "total_ms": {
+            "p50": _percentile(totals, 50),
+            "p95": _percentile(totals, 95),
+            "p99": _percentile(totals, 99),
+        },
+    }
+
+
+def query_latency_stats(
+    start: datetime,
+    end: datetime,
+    agent_id: Optional[str] = None,
+    group_by: str = "none",
+    stream_only: bool = False,
+    db_path: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Zaman penceresi için latency percentile, throughput ve email intent oranı hesaplar.
+
+    Args:
+        start: Pencere başlangıcı
+        end: Pencere bitişi
+        agent_id: Sadece bu agent (opsiyonel)
+        group_by: "none", "agent" veya "day"
+        stream_only: Sadece stream turn'leri
+
+    Returns:
+        Grup başına özet listesi
+    """
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    sql = (
+        "SELECT agent_id, day, first_token_ms, total_ms, email_intent FROM turn_metrics"
+        " WHERE ts >= ? AND ts < ?"
+    )
+    params: List[Any] = [start_ts, end_ts]
+    if agent_id:
+        sql += " AND agent_id = ?"
+        params.append(agent_id)
+    if stream_only:
+        sql += " AND stream = 1"
+
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    groups: Dict[str, List[Tuple]] = {}
+    for row_agent, day, first_token, total, email_intent in rows:
+        if group_by == "agent":
+            key = row_agent or "unknown"
+        elif group_by == "day":
+            key = day
+        else:
+            key = "all"
+        groups.setdefault(key, []).append((first_token, total, email_intent))
+
+    window_seconds = end_ts - start_ts
+    results = []
+    for key in sorted(groups):
+        bucket_window = 86400.0 if group_by == "day" else window_seconds
+        results.append({"group": key, **_summarize(groups[key], min(bucket_window, window_seconds))})
+    return results
+
+
+_indexer: Optional[LogAnalyticsIndexer] = None
+_index_lock: Optional[asyncio.Lock] = None
+_last_indexed_at = 0.0
+
+
+def get_log_analytics_indexer() -> LogAnalyticsIndexer:
+    global _indexer
+    if _indexer is None:
+        _indexer = LogAnalyticsIndexer()
+    return _indexer
+
+
+async def refresh_index(min_interval: float = 5.0) -> None:
+    """Index'i thread'de günceller; eşzamanlı çağrılar tek taramada birleşir."""
+    global _index_lock, _last_indexed_at
+    if _index_lock is None:
+        _index_lock = asyncio.Lock()
+    async with _index_lock:
+        if time.monotonic() - _last_indexed_at < min_interval:
+            return
+        await asyncio.to_thread(get_log_analytics_indexer().index_once)
+        _last_indexed_at = time.monotonic()
+
+
+async def index_loop() -> None:
+    """Startup'ta başlatılan periyodik indexleme döngüsü."""
+    interval = settings.analytics.analytics_index_interval_seconds
+    while True:
+        try:
+            await refresh_index()
+        except Exception as e:
+            logger.error(f"Log analytics indexing failed: {str(e)}", exc_info=True)
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Konuşma logu analitik index'i")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("index", help="Yeni kayıtları indexle")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "index":
+        print(json.dumps(get_log_analytics_indexer().index_once()))
+
+
+if __name__ == "__main__":
+    main()
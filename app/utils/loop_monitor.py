@@ -0,0 +1,215 @@
+# app/utils/loop_monitor.py
+"""
+Event loop gecikme (lag) izleyicisi.
+
+İki parça:
+- Heartbeat task'ı `LOOP_LAG_INTERVAL_MS` aralıkla uyur ve uyanma gecikmesini
+  `kuagentos_event_loop_lag_seconds` histogram'ına yazar. Gecikme, loop'u o
+  sürede bloklayan senkron işlerin (sync log handler, büyük `json.dumps`,
+  Pydantic dump, dosya I/O...) toplamıdır.
+- Watchdog thread'i heartbeat'in gecikmesini izler; gecikme
+  `LOOP_LAG_THRESHOLD_MS`'i geçtiği anda loop thread'inin stack'ini
+  (`sys._current_frames()`) yakalar. Bloklama bitince ölçülen süre yakalanan
+  stack'e yazılır ve "blocking offenders" tablosu (konum başına sayı, toplam
+  ve en uzun süre) güncellenir.
+
+Maliyet: aralık başına bir timer callback'i ve watchdog'un kısa uyanmaları;
+stack sadece eşik aşıldığında okunur.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.configs.settings import settings
+from app.utils.metrics import REGISTRY
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2]) + os.sep
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "kuagentos_event_loop_lag_seconds",
+    "Event loop scheduling lag in seconds.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_BLOCKS_TOTAL = REGISTRY.counter(
+    "kuagentos_event_loop_blocks_total",
+    "Event loop blocking episodes longer than LOOP_LAG_THRESHOLD_MS.",
+)
+
+
+def _is_project_frame(filename: str) -> bool:
+    return filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+
+
+def _format_frame(filename: str, lineno: int, name: str) -> str:
+    if filename.startswith(PROJECT_ROOT):
+        filename = filename[len(PROJECT_ROOT):]
+    elif "site-packages" in filename:
+        filename = filename.split(f"site-packages{os.sep}", 1)[-1]
+    return f"{filename}:{lineno} {name}"
+
+
+class LoopMonitor:
+    """
+    Tek event loop için lag ölçümü ve bloklayan çağrı tespiti.
+
+    Args:
+        interval_ms: Heartbeat aralığı
+        threshold_ms: Stack yakalama eşiği
+        top: Saklanan offender sayısı
+        stack_depth: Yakalanan stack'in en fazla frame sayısı
+    """
+
+    def __init__(self, interval_ms: float, threshold_ms: float, top: int = 20, stack_depth: int = 30):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.top = top
+        self.stack_depth = stack_depth
+        self.loop_thread_id: Optional[int] = None
+        # Heartbeat'in bir sonraki beklenen uyanma zamanı (monotonic)
+        self._expected: Optional[float] = None
+        self._captured: Optional[Tuple[str, List[str]]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self.offenders: Dict[str, Dict[str, Any]] = {}
+        self.max_lag = 0.0
+        self.blocks = 0
+
+    # --- Watchdog ---
+
+    def _capture(self) -> Optional[Tuple[str, List[str]]]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return None
+        stack: List[str] = []
+        location = None
+        while frame is not None and len(stack) < self.stack_depth:
+            code = frame.f_code
+            if location is None and _is_project_frame(code.co_filename):
+                # Uygulama kodundaki en içteki frame offender konumudur
+                location = _format_frame(code.co_filename, frame.f_lineno, code.co_name)
+            stack.append(_format_frame(code.co_filename, frame.f_lineno, code.co_name))
+            frame = frame.f_back
+        if not stack:
+            return None
+        leaf = stack[0]
+        key = f"{location} -> {leaf}" if location and location != leaf else leaf
+        return key, stack
+
+    def _watch(self) -> None:
+        period = max(self.threshold / 2, 0.005)
+        while not self._stop.wait(period):
+            expected = self._expected
+            if expected is None or self._captured is not None:
+                continue
+            if time.monotonic() - expected >= self.threshold:
+                captured = self._capture()
+                with self._lock:
+                    if self._captured is None and self._expected == expected:
+                        self._captured = captured
+
+    # --- Heartbeat ---
+
+    def _record(self, lag: float) -> None:
+        LOOP_LAG_SECONDS.observe(lag)
+        self.max_lag = max(self.max_lag, lag)
+        with self._lock:
+            captured, self._captured = self._captured, None
+        if lag < self.threshold:
+            return
+        self.blocks += 1
+        LOOP_BLOCKS_TOTAL.inc()
+        key, stack = captured or ("(stack yakalanamadı)", [])
+        entry = self.offenders.get(key)
+        if entry is None:
+            entry = self.offenders[key] = {"location": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["count"] += 1
+        entry["total_ms"] += lag * 1000
+        entry["max_ms"] = max(entry["max_ms"], lag * 1000)
+        entry["last_at"] = datetime.now(timezone.utc).isoformat()
+        if stack:
+            entry["stack"] = stack
+        logger.warning(f"Event loop blocked | {lag * 1000:.0f}ms | {key}")
+        if len(self.offenders) > self.top * 4:
+            # En az zaman alanlar atılır; tablo sınırlı kalır
+            keep = sorted(self.offenders.values(), key=lambda item: -item["total_ms"])[: self.top * 2]
+            self.offenders = {item["location"]: item for item in keep}
+
+    async def run(self) -> None:
+        """Heartbeat döngüsü; watchdog thread'ini de başlatır."""
+        self.loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        try:
+            while True:
+                self._expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                woke = time.monotonic()
+                lag = max(0.0, woke - self._expected)
+                self._expected = None
+                self._record(lag)
+        finally:
+            self._stop.set()
+
+    # --- Rapor ---
+
+    def report(self, top: Optional[int] = None) -> Dict[str, Any]:
+        offenders = sorted(self.offenders.values(), key=lambda item: -item["total_ms"])[: top or self.top]
+        return {
+            **self.stats(),
+            "offenders": [
+                {**item, "total_ms": round(item["total_ms"], 1), "max_ms": round(item["max_ms"], 1)}
+                for item in offenders
+            ],
+        }
+
+    def reset(self) -> None:
+        self.offenders.clear()
+        self.max_lag = 0.0
+        self.blocks = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": LOOP_LAG_SECONDS.count(),
+            "blocks": self.blocks,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+        }
+
+
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> LoopMonitor:
+    global _monitor
+    if _monitor is None:
+        config = settings.loop_monitor
+        _monitor = LoopMonitor(
+            config.loop_lag_interval_ms,
+            config.loop_lag_threshold_ms,
+            top=config.loop_offenders_top,
+            stack_depth=config.loop_offender_stack_depth,
+        )
+    return _monitor
+
+
+async def loop_monitor_loop() -> None:
+    """Startup'ta başlatılır; LOOP_MONITOR_ENABLED=false ise hiçbir şey yapmaz."""
+    if not settings.loop_monitor.loop_monitor_enabled:
+        return
+    await get_loop_monitor().run()
+
+
+def loop_monitor_stats() -> Optional[Dict[str, Any]]:
+    return _monitor.stats() if _monitor is not None else None
@@ -0,0 +1,341 @@
+# app/utils/memory.py
+"""
+Bellek profili ve sızıntı takibi.
+
+- `tracemalloc` isteğe bağlı başlatılır (admin endpoint veya
+  `MEMORY_TRACEMALLOC_ON_START`); snapshot'lar bellekte sınırlı sayıda tutulur
+  ve iki snapshot (veya snapshot ile şimdi) arasındaki fark allocation
+  noktalarına göre raporlanır.
+- Arka plan gauge'u `MEMORY_GAUGE_INTERVAL_SECONDS` aralıkla RSS, açık dosya
+  tanımlayıcıları ve izlenen tiplerin (RunOutput, SatinalmaReply, Agent...)
+  canlı obje sayılarını ölçer; `/metrics` ve admin endpoint'i son ölçümü okur.
+  Modüller kendi sayaçlarını `register_object_count()` ile ekler (ör. pending
+  email taslakları).
+- `MEMORY_REPORT_RSS_MB` aşıldığında heap raporu `MEMORY_REPORT_DIR` altına
+  JSON olarak yazılır (cooldown ile); tracemalloc kapalıysa bu noktada
+  başlatılır, böylece sonraki raporlar allocation farklarını da içerir.
+"""
+import asyncio
+import gc
+import json
+import logging
+import os
+import resource
+import time
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.configs.settings import settings
+from app.utils.metrics import REGISTRY
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+GROUP_BY_OPTIONS = ("lineno", "filename", "traceback")
+
+# tracemalloc'un kendi ve import sisteminin allocation'ları raporlara girmez
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_next_snapshot_id = 1
+_object_counters: Dict[str, Callable[[], int]] = {}
+_last_gauge: Dict[str, Any] = {}
+_last_report: Optional[Dict[str, Any]] = None
+_last_report_at = 0.0
+
+
+# --- Process ölçümleri ---
+
+def rss_bytes() -> int:
+    """Güncel resident set size; /proc yoksa (macOS) tepe RSS."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def open_fds() -> Optional[int]:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def register_object_count(name: str, counter: Callable[[], int]) -> None:
+    """Gauge'a tip sayımı dışında bir sayaç ekler (ör. len(PENDING_EMAILS))."""
+    _object_counters[name] = counter
+
+
+def tracked_types() -> List[str]:
+    return [name.strip() for name in settings.memory.memory_tracked_types.split(",") if name.strip()]
+
+
+def count_objects(type_names: List[str]) -> Tuple[Dict[str, int], int]:
+    """gc'nin izlediği objeler arasında verilen tip adlarının canlı sayısı ve toplam obje sayısı."""
+    wanted = set(type_names)
+    counts = dict.fromkeys(type_names, 0)
+    objects = gc.get_objects()
+    for obj in objects:
+        name = type(obj).__name__
+        if name in wanted:
+            counts[name] += 1
+    return counts, len(objects)
+
+
+def measure() -> Dict[str, Any]:
+    """RSS, fd, gc ve obje sayılarını ölçer (gc.get_objects() yüzünden thread'de çağrılmalı)."""
+    objects, gc_objects = count_objects(tracked_types())
+    for name, counter in list(_object_counters.items()):
+        try:
+            objects[name] = counter()
+        except Exception as e:
+            logger.debug(f"Object counter failed | {name} | {e}")
+    traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+    return {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "rss_bytes": rss_bytes(),
+        "open_fds": open_fds(),
+        "gc_counts": gc.get_count(),
+        "gc_objects": gc_objects,
+        "objects": objects,
+        "tracemalloc": {"current_bytes": traced[0], "peak_bytes": traced[1]} if traced else None,
+    }
+
+
+# --- tracemalloc ---
+
+def start_tracing(nframes: Optional[int] = None) -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(nframes or settings.memory.memory_tracemalloc_frames)
+        logger.info(f"tracemalloc started | frames: {tracemalloc.get_traceback_limit()}")
+    return tracing_status()
+
+
+def stop_tracing() -> Dict[str, Any]:
+    """tracemalloc'u durdurur; trace'ler ve alınmış snapshot'lar silinir."""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("tracemalloc stopped")
+    _snapshots.clear()
+    return tracing_status()
+
+
+def tracing_status() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else None,
+        "traced_current_bytes": current,
+        "traced_peak_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        "snapshots": list_snapshots(),
+    }
+
+
+def _format_traceback(traceback: tracemalloc.Traceback) -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+def _stat_dict(stat: Any) -> Dict[str, Any]:
+    entry = {
+        "site": _format_traceback(stat.traceback),
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if hasattr(stat, "size_diff"):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+def take_snapshot(label: Optional[str] = None) -> Dict[str, Any]:
+    """
+    tracemalloc snapshot'ı alır ve saklar; en eski snapshot'lar
+    `MEMORY_MAX_SNAPSHOTS` aşılınca atılır.
+
+    Raises:
+        RuntimeError: tracemalloc çalışmıyorsa
+    """
+    global _next_snapshot_id
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc çalışmıyor; önce başlatılmalı")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    snapshot_id = _next_snapshot_id
+    _next_snapshot_id += 1
+    _snapshots[snapshot_id] = {
+        "id": snapshot_id,
+        "label": label,
+        "taken_at": datetime.now(timezone.utc).isoformat(),
+        "rss_bytes": rss_bytes(),
+        "snapshot": snapshot,
+    }
+    while len(_snapshots) > settings.memory.memory_max_snapshots:
+        _snapshots.popitem(last=False)
+    return _snapshot_info(_snapshots[snapshot_id])
+
+
+def _snapshot_info(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in entry.items() if key != "snapshot"}
+
+
+def list_snapshots() -> List[Dict[str, Any]]:
+    return [_snapshot_info(entry) for entry in _snapshots.values()]
+
+
+def top_allocations(snapshot_id: Optional[int] = None, group_by: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+    """
+    Snapshot'taki (None ise şimdiki) en büyük allocation noktaları.
+
+    Raises:
+        KeyError: snapshot_id bulunamazsa
+        RuntimeError: snapshot_id verilmedi ve tracemalloc çalışmıyorsa
+    """
+    if snapshot_id is None:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc çalışmıyor; önce başlatılmalı")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    else:
+        snapshot = _snapshots[snapshot_id]["snapshot"]
+    stats = snapshot.statistics(group_by)
+    return {
+        "snapshot_id": snapshot_id,
+        "group_by": group_by,
+        "total_bytes": sum(stat.size for stat in stats),
+        "top": [_stat_dict(stat) for stat in stats[:limit]],
+    }
+
+
+def diff_snapshots(
+    base_id: int,
+    target_id: Optional[int] = None,
+    group_by: str = "lineno",
+    limit: int = 25,
+) -> Dict[str, Any]:
+    """
+    İki snapshot arasındaki farkı büyüme miktarına göre sıralı döner.
+    target_id None ise şimdiki durumla karşılaştırılır.
+
+    Raises:
+        KeyError: snapshot bulunamazsa
+        RuntimeError: target_id verilmedi ve tracemalloc çalışmıyorsa
+    """
+    base = _snapshots[base_id]
+    if target_id is None:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc çalışmıyor; önce başlatılmalı")
+        target = {"id": None, "taken_at": datetime.now(timezone.utc).isoformat(), "rss_bytes": rss_bytes()}
+        target_snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    else:
+        target = _snapshots[target_id]
+        target_snapshot = target["snapshot"]
+    stats = target_snapshot.compare_to(base["snapshot"], group_by)
+    return {
+        "base": _snapshot_info(base),
+        "target": _snapshot_info(target),
+        "group_by": group_by,
+        "size_diff_bytes": sum(stat.size_diff for stat in stats),
+        "rss_diff_bytes": target["rss_bytes"] - base["rss_bytes"],
+        "top": [_stat_dict(stat) for stat in stats[:limit]],
+    }
+
+
+# --- Gauge ve otomatik rapor ---
+
+def last_measurement() -> Dict[str, Any]:
+    return _last_gauge
+
+
+def memory_stats() -> Dict[str, Any]:
+    return {
+        "last": _last_gauge or None,
+        "tracemalloc": tracemalloc.is_tracing(),
+        "snapshots": len(_snapshots),
+        "last_report": _last_report,
+    }
+
+
+def write_heap_report(reason: str) -> Dict[str, Any]:
+    """
+    Ölçüm + (tracemalloc açıksa) en büyük allocation noktaları ve önceki
+    rapordan bu yana fark içeren JSON raporu yazar.
+    """
+    global _last_report
+    config = settings.memory
+    report: Dict[str, Any] = {"reason": reason, **measure()}
+    if tracemalloc.is_tracing():
+        previous = next(
+            (entry["id"] for entry in reversed(_snapshots.values()) if entry.get("label") == "heap-report"),
+            None,
+        )
+        current = take_snapshot("heap-report")
+        report["top"] = top_allocations(current["id"], limit=config.memory_report_top)["top"]
+        if previous is not None and previous in _snapshots:
+            report["diff"] = diff_snapshots(previous, current["id"], limit=config.memory_report_top)["top"]
+    else:
+        # Sonraki rapor allocation noktalarını içersin
+        start_tracing()
+        report["note"] = "tracemalloc bu raporla başlatıldı; allocation noktaları sonraki raporda"
+
+    report_dir = Path(config.memory_report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    path = report_dir / f"heap-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')}-{os.getpid()}.json"
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+    _last_report = {"at": report["at"], "reason": reason, "path": str(path), "rss_bytes": report["rss_bytes"]}
+    logger.warning(f"Heap report written | reason: {reason} | path: {path}")
+    return _last_report
+
+
+async def memory_gauge_loop() -> None:
+    """
+    Bellek ölçümlerini `MEMORY_GAUGE_INTERVAL_SECONDS` aralıkla günceller ve
+    RSS eşiği aşıldığında heap raporu yazar.
+    """
+    global _last_gauge, _last_report_at
+    config = settings.memory
+    if config.memory_tracemalloc_on_start:
+        start_tracing()
+    if config.memory_gauge_interval_seconds <= 0:
+        return
+    threshold = config.memory_report_rss_mb * 1024 * 1024
+    while True:
+        try:
+            _last_gauge = await asyncio.to_thread(measure)
+            if (
+                threshold > 0
+                and _last_gauge["rss_bytes"] >= threshold
+                and time.monotonic() - _last_report_at >= config.memory_report_cooldown_seconds
+            ):
+                _last_report_at = time.monotonic()
+                await asyncio.to_thread(
+                    write_heap_report, f"rss {_last_gauge['rss_bytes'] // (1024 * 1024)}MB >= {config.memory_report_rss_mb}MB"
+                )
+        except Exception as e:
+            logger.error(f"Memory gauge failed: {e}")
+        await asyncio.sleep(config.memory_gauge_interval_seconds)
+
+
+REGISTRY.callback(
+    "kuagentos_process_resident_memory_bytes",
+    "Resident memory size in bytes (last gauge measurement).",
+    "gauge",
+    (),
+    lambda: {(): _last_gauge["rss_bytes"]} if _last_gauge else {},
+)
+REGISTRY.callback(
+    "kuagentos_live_objects",
+    "Live object counts for tracked types (last gauge measurement).",
+    "gauge",
+    ("type",),
+    lambda: {(name,): count for name, count in _last_gauge.get("objects", {}).items()},
+)
@@ -0,0 +1,310 @@
+# app/utils/metrics.py
+"""
+Process içi metrikler ve Prometheus text exposition (format 0.0.4).
+
+Counter ve histogram'lar label değerleri başına bellekte toplanır; gözlem
+maliyeti bir bucket araması ve birkaç toplama işlemidir. `/metrics` endpoint'i
+scrape sırasında `render()` çıktısını döner. Harici bağımlılık yoktur.
+
+Chat turu aşamaları (`kuagentos_chat_stage_seconds{stage=...}`):
+- validation: handler içi doğrulama ve agent çözümleme
+- routing_llm: orchestrator ROUTING çağrısı (ileride hızlı yol: routing_fast)
+- history_load: session (geçmiş) yüklemesi
+- model_ttft / model_total: domain agent ilk token ve toplam süre
+- output_parse: structured output / JSON trailer ayrıştırma
+- pending_email: mail onay/iptal işleme
+- log_write: konuşma logu kaydının kuyruğa eklenmesi
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.configs.logging import get_log_context
+from app.utils.tracing import span
+
+# Saniye cinsinden; process içi aşamalar için 100 µs'den LLM çağrıları için 30 s'ye kadar
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[str, ...]:
+        if kwargs:
+            labels = tuple(kwargs.get(name, "") for name in self.labelnames)
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(value) for value in labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monoton artan sayaç."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0, **kwargs: Any) -> None:
+        key = self._key(labels, kwargs)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any, **kwargs: Any) -> float:
+        return self._values.get(self._key(labels, kwargs), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Artıp azalabilen değer (ör. açık stream sayısı)."""
+    kind = "gauge"
+
+    def dec(self, *labels: Any, amount: float = 1.0, **kwargs: Any) -> None:
+        self.inc(*labels, amount=-amount, **kwargs)
+
+    def set(self, value: float, *labels: Any, **kwargs: Any) -> None:
+        key = self._key(labels, kwargs)
+        with self._lock:
+            self._values[key] = value
+
+
+class CallbackMetric(_Metric):
+    """Değeri scrape sırasında bir fonksiyondan okunan counter/gauge."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Sabit bucket'lı histogram."""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label değerleri -> [bucket sayaçları..., +Inf], toplam
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: Any, **kwargs: Any) -> None:
+        key = self._key(labels, kwargs)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, *labels: Any, **kwargs: Any) -> int:
+        return sum(self._counts.get(self._key(labels, kwargs), ()))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrikleri isim sırasıyla tutar ve text formatında render eder."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+    ) -> CallbackMetric:
+        """Aynı isimle tekrar çağrılırsa callback değiştirilir (ör. DB yeniden oluşturulduğunda)."""
+        existing = self._metrics.get(name)
+        if isinstance(existing, CallbackMetric):
+            existing.callback = callback
+            return existing
+        return self.register(CallbackMetric(name, documentation, kind, labelnames, callback))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+CHAT_STAGE_SECONDS = REGISTRY.histogram(
+    "kuagentos_chat_stage_seconds",
+    "Chat turn stage duration in seconds.",
+    ("stage", "agent_id"),
+)
+CHAT_TURN_SECONDS = REGISTRY.histogram(
+    "kuagentos_chat_turn_seconds",
+    "End-to-end chat turn duration in seconds.",
+    ("endpoint", "agent_id", "stream"),
+)
+TOKENS_TOTAL = REGISTRY.counter(
+    "kuagentos_tokens_total",
+    "Model tokens by agent and kind (input/output).",
+    ("agent_id", "kind"),
+)
+ERRORS_TOTAL = REGISTRY.counter(
+    "kuagentos_errors_total",
+    "Errors by endpoint and exception type.",
+    ("endpoint", "exception"),
+)
+ACTIVE_STREAMS = REGISTRY.gauge(
+    "kuagentos_active_streams",
+    "SSE responses currently streaming.",
+    ("endpoint",),
+)
+
+
+@contextmanager
+def time_stage(stage: str, agent_id: Optional[str] = None) -> Iterator[None]:
+    """
+    Blok süresini `kuagentos_chat_stage_seconds` histogram'ına yazar ve aynı
+    isimle bir trace span'i açar. agent_id verilmezse log context'indeki
+    agent_id kullanılır.
+    """
+    started = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started, agent_id)
+
+
+def observe_stage(stage: str, seconds: float, agent_id: Optional[str] = None) -> None:
+    if agent_id is None:
+        agent_id = get_log_context().get("agent_id", "")
+    CHAT_STAGE_SECONDS.observe(seconds, stage, agent_id)
+
+
+def record_error(endpoint: str, exc: BaseException) -> None:
+    ERRORS_TOTAL.inc(endpoint, type(exc).__name__)
+
+
+def token_counts(metrics: Any) -> Tuple[int, int]:
+    """
+    agno run metriklerinden (input, output) token sayılarını çıkarır.
+
+    Args:
+        metrics: RunOutput.metrics (obje veya dict) ya da None
+    """
+    if metrics is None:
+        return 0, 0
+    counts = []
+    for kind in ("input_tokens", "output_tokens"):
+        value = metrics.get(kind) if isinstance(metrics, dict) else getattr(metrics, kind, None)
+        if isinstance(value, list):
+            value = sum(v for v in value if v)
+        counts.append(int(value or 0))
+    return counts[0], counts[1]
+
+
+def record_tokens(agent_id: str, metrics: Any) -> None:
+    """agno run metriklerinden token sayılarını sayaçlara ekler."""
+    input_tokens, output_tokens = token_counts(metrics)
+    if input_tokens:
+        TOKENS_TOTAL.inc(agent_id, "input", amount=input_tokens)
+    if output_tokens:
+        TOKENS_TOTAL.inc(agent_id, "output", amount=output_tokens)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,368 @@
+# app/utils/profiler.py
+"""
+Production'da isteğe bağlı çalıştırılan sampling CPU profiler.
+
+Arka plan thread'i `INTERVAL_MS` aralıkla tüm thread'lerin stack'ini
+(`sys._current_frames()`) okur; kodu instrument etmez, bu yüzden profil
+kapalıyken maliyet yoktur, açıkken maliyet örnek başına bir stack yürüyüşüdür.
+Örnekleyici kendi harcadığı CPU süresini ölçer ve aralığı, toplam süre wall time'ın
+`PROFILER_MAX_OVERHEAD`'ini aşmayacak şekilde açar.
+
+Örnekler endpoint'e göre gruplanır: event loop thread'indeki stack'te bir route
+endpoint'inin (veya içindeki SSE generator'ının) frame'i varsa örnek o route'a
+yazılır. Diğer thread'ler (ör. `asyncio.to_thread` worker'ları) thread adıyla,
+boşta bekleyen loop `(idle)` olarak gruplanır.
+
+İki mod:
+- Süreli: N saniye boyunca process'in tamamı örneklenir
+- İstek örneklemesi: `request_sample_rate` oranında seçilen isteklerin task'ları
+  (ve bu task'ların oluşturduğu alt task'lar, ör. StreamingResponse) örneklenir
+
+Çıktı: collapsed stack (flamegraph.pl / speedscope import), speedscope JSON
+veya endpoint başına özet.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.configs.settings import settings
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2]) + os.sep
+
+FORMATS = ("collapsed", "speedscope", "summary")
+
+IDLE = "(idle)"
+OTHER = "(other)"
+
+# Stack'in en üstündeki bu frame'ler CPU kullanmadan beklemeyi gösterir
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+Frame = Tuple[str, str, int]
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(PROJECT_ROOT):
+        return filename[len(PROJECT_ROOT):]
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+def _endpoint_key(code: Any) -> Tuple[str, str]:
+    # İç içe fonksiyonlar (ör. start_chat.<locals>.event_generator) dış endpoint'e bağlanır
+    qualname = getattr(code, "co_qualname", code.co_name)
+    return code.co_filename, qualname.split(".<locals>.", 1)[0]
+
+
+def route_labels(routes: Iterable[Any]) -> Dict[Tuple[str, str], str]:
+    """FastAPI route'larından (dosya, fonksiyon) -> "METHOD /path" eşlemesi oluşturur."""
+    labels: Dict[Tuple[str, str], str] = {}
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            continue
+        methods = ",".join(sorted(getattr(route, "methods", None) or ())) or "ANY"
+        labels[_endpoint_key(code)] = f"{methods} {route.path}"
+    return labels
+
+
+class SamplingProfiler:
+    """
+    Tek bir profil oturumu.
+
+    Args:
+        interval_ms: Örnekleme aralığı
+        routes: Endpoint gruplaması için app.routes
+        loop: Event loop (istek örneklemesi ve loop thread'ini tanımak için)
+        request_sample_rate: None ise tüm process, aksi halde seçilen isteklerin oranı
+        include_idle: Boşta bekleyen stack'ler de sayılsın mı
+    """
+
+    def __init__(
+        self,
+        interval_ms: float,
+        routes: Iterable[Any] = (),
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        request_sample_rate: Optional[float] = None,
+        include_idle: bool = False,
+    ):
+        config = settings.profiler
+        self.interval = max(interval_ms, config.profiler_min_interval_ms) / 1000
+        self.max_depth = config.profiler_max_stack_depth
+        self.max_overhead = config.profiler_max_overhead
+        self.labels = route_labels(routes)
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident() if loop is not None else None
+        self.request_sample_rate = request_sample_rate
+        self.include_idle = include_idle
+        # (endpoint, stack) -> örnek sayısı; stack kökten yaprağa
+        self.stacks: Counter = Counter()
+        # (endpoint, stack) -> örneklerin temsil ettiği wall time (s); GIL beklemesi
+        # yüzünden gerçek aralık INTERVAL_MS'ten uzun olabilir
+        self.weights: Counter = Counter()
+        self.samples = 0
+        self.sampler_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._selected: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self._previous_factory: Optional[Callable] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- İstek seçimi ---
+
+    def select_current_task(self) -> bool:
+        """Middleware'den çağrılır; istek örneklenecekse mevcut task'ı işaretler."""
+        if self.request_sample_rate is None or random.random() >= self.request_sample_rate:
+            return False
+        task = asyncio.current_task()
+        if task is None:
+            return False
+        self._selected.add(task)
+        return True
+
+    def _task_factory(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Task:
+        # Seçili task'ın alt task'ları (StreamingResponse, anyio task group) da seçilir
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        parent = asyncio.current_task(loop)
+        if parent is not None and parent in self._selected:
+            self._selected.add(task)
+        return task
+
+    def _running_task(self) -> Optional[asyncio.Task]:
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+        if current_tasks is None or self.loop is None:
+            return None
+        return current_tasks.get(self.loop)
+
+    # --- Örnekleme ---
+
+    def _frame_stack(self, frame: Any) -> Tuple[Optional[str], Tuple[Frame, ...], bool]:
+        """Frame zincirinden (endpoint etiketi, kökten yaprağa stack, boşta mı) döner."""
+        stack: List[Frame] = []
+        endpoint = None
+        top = frame
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno))
+            label = self.labels.get(_endpoint_key(code))
+            if label is not None:
+                endpoint = label
+            frame = frame.f_back
+        stack.reverse()
+        idle = (os.path.basename(top.f_code.co_filename), top.f_code.co_name) in _IDLE_FRAMES
+        return endpoint, tuple(stack), idle
+
+    def _sample(self, weight: float) -> None:
+        own = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            is_loop = thread_id == self.loop_thread_id
+            if self.request_sample_rate is not None:
+                # İstek modunda sadece seçili task çalışırken loop thread'i örneklenir
+                if not is_loop or self._running_task() not in self._selected:
+                    continue
+            endpoint, stack, idle = self._frame_stack(frame)
+            if idle and not self.include_idle:
+                continue
+            if endpoint is None:
+                if idle and is_loop:
+                    endpoint = IDLE
+                else:
+                    endpoint = OTHER if is_loop else f"(thread {thread_names.get(thread_id, thread_id)})"
+            self.stacks[(endpoint, stack)] += 1
+            self.weights[(endpoint, stack)] += weight
+            self.samples += 1
+
+    def _run(self) -> None:
+        interval = self.interval
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            # thread_time: GIL beklemesi değil, örnekleyicinin kendi CPU süresi
+            started = time.thread_time()
+            self._sample(now - last)
+            last = now
+            elapsed = time.thread_time() - started
+            self.sampler_seconds += elapsed
+            # Örnekleme maliyeti aralığın max_overhead oranını aşarsa aralık açılır
+            self._stop.wait(max(interval, elapsed / self.max_overhead) - elapsed)
+
+    def start(self) -> None:
+        if self.request_sample_rate is not None and self.loop is not None:
+            self._previous_factory = self.loop.get_task_factory()
+            self.loop.set_task_factory(self._task_factory)
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="cpu-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.request_sample_rate is not None and self.loop is not None:
+            self.loop.set_task_factory(self._previous_factory)
+        self.stopped_at = time.time()
+
+    # --- Çıktı ---
+
+    @property
+    def duration(self) -> float:
+        return ((self.stopped_at or time.time()) - self.started_at) if self.started_at else 0.0
+
+    def metadata(self) -> Dict[str, Any]:
+        duration = self.duration
+        return {
+            "duration_seconds": round(duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "request_sample_rate": self.request_sample_rate,
+            "overhead_pct": round(self.sampler_seconds / duration * 100, 3) if duration else 0.0,
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed formatı: `endpoint;frame;...;frame count`."""
+        lines = []
+        for (endpoint, stack), count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            frames = ";".join(f"{name} ({_short_path(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{endpoint};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Endpoint başına bir "sampled" profil içeren speedscope dosyası."""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for (endpoint, stack), weight in self.weights.items():
+            indexes = []
+            for frame in stack:
+                index = frame_index.get(frame)
+                if index is None:
+                    index = frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": _short_path(frame[1]), "line": frame[2]})
+                indexes.append(index)
+            profile = profiles.setdefault(
+                endpoint,
+                {"type": "sampled", "name": endpoint, "unit": "milliseconds", "startValue": 0, "samples": [], "weights": []},
+            )
+            profile["samples"].append(indexes)
+            profile["weights"].append(round(weight * 1000, 3))
+        for profile in profiles.values():
+            profile["endValue"] = sum(profile["weights"])
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"kuagentos cpu profile {time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self.started_at or 0))}",
+            "exporter": "kuagentos.profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": sorted(profiles.values(), key=lambda profile: -profile["endValue"]),
+        }
+
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        """Endpoint başına örnek sayısı, CPU payı ve en çok self süre alan frame'ler."""
+        endpoints: Dict[str, Dict[str, Any]] = {}
+        for (endpoint, stack), count in self.stacks.items():
+            entry = endpoints.setdefault(endpoint, {"samples": 0, "seconds": 0.0, "self": Counter(), "total": Counter()})
+            entry["samples"] += count
+            entry["seconds"] += self.weights[(endpoint, stack)]
+            if stack:
+                name, filename, line = stack[-1]
+                entry["self"][f"{name} ({_short_path(filename)}:{line})"] += count
+            for name, filename, line in set(stack):
+                entry["total"][f"{name} ({_short_path(filename)}:{line})"] += count
+        return {
+            **self.metadata(),
+            "endpoints": [
+                {
+                    "endpoint": endpoint,
+                    "samples": entry["samples"],
+                    "share_pct": round(entry["samples"] / self.samples * 100, 2) if self.samples else 0.0,
+                    "estimated_ms": round(entry["seconds"] * 1000, 1),
+                    "top_self": [{"frame": f, "samples": c} for f, c in entry["self"].most_common(top)],
+                    "top_total": [{"frame": f, "samples": c} for f, c in entry["total"].most_common(top)],
+                }
+                for endpoint, entry in sorted(endpoints.items(), key=lambda item: -item[1]["samples"])
+            ],
+        }
+
+
+_active: Optional[SamplingProfiler] = None
+_last: Optional[Dict[str, Any]] = None
+
+
+def active_profiler() -> Optional[SamplingProfiler]:
+    return _active
+
+
+async def profile_for(
+    seconds: float,
+    interval_ms: float,
+    routes: Iterable[Any] = (),
+    request_sample_rate: Optional[float] = None,
+    include_idle: bool = False,
+) -> SamplingProfiler:
+    """
+    Profiler'ı `seconds` süre çalıştırır ve tamamlanmış oturumu döner.
+
+    Raises:
+        RuntimeError: Başka bir profil oturumu çalışıyorsa
+    """
+    global _active, _last
+    if _active is not None:
+        raise RuntimeError("Başka bir profil oturumu çalışıyor")
+    profiler = SamplingProfiler(
+        interval_ms,
+        routes=routes,
+        loop=asyncio.get_running_loop(),
+        request_sample_rate=request_sample_rate,
+        include_idle=include_idle,
+    )
+    _active = profiler
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        _active = None
+        _last = {"finished_at": profiler.stopped_at, **profiler.metadata()}
+    return profiler
+
+
+def profiler_stats() -> Dict[str, Any]:
+    return {
+        "active": _active.metadata() if _active is not None else None,
+        "last": _last,
+    }
+
+
+class ProfilerMiddleware:
+    """İstek örneklemesi modunda seçilen isteklerin task'larını işaretler."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        profiler = _active
+        if profiler is not None and scope["type"] == "http":
+            profiler.select_current_task()
+        await self.app(scope, receive, send)
@@ -0,0 +1,483 @@
+# app/utils/rate_limit.py
+"""
+Kullanıcı başına hız limitleri ve model run'ları için adil kuyruk.
+
+İki katman:
+
+- **Token bucket'lar** (istek kabulünde): doğrulanmış `user_id` + agent başına
+  bir istek bucket'ı ve opsiyonel bir model token bucket'ı tutulur. İstek
+  bucket'ı boşsa ya da token bucket'ı önceki run'ların kullanımıyla borca
+  girdiyse istek `RateLimitExceededError` (429 + Retry-After) ile reddedilir.
+  Token kullanımı run bittikten sonra bilindiği için token bucket'ı borçlanabilir;
+  borç dolana kadar yeni istek kabul edilmez.
+- **Adil kuyruk** (`FairScheduler`): aynı anda en fazla
+  `RATE_LIMIT_MAX_CONCURRENT_RUNS` model run'ı çalışır. Boş slot, bekleyenler
+  arasında önce agent'lara (ağırlıklarıyla orantılı), sonra o agent'ı bekleyen
+  kullanıcılara eşit paylaştırılır (start-time fair queuing). Böylece çok istek
+  atan bir kullanıcı ya da yoğun bir agent diğerlerini aç bırakmaz.
+
+Agent bazında limitler agents.json'daki `limits` alanıyla ezilir:
+    {"requests_per_minute", "request_burst", "tokens_per_minute",
+     "token_burst", "weight", "max_concurrency"}
+Sıfır değer ilgili limiti kapatır. Bucket'lar ve kuyruk process belleğindedir;
+birden fazla worker'da limitler worker başınadır.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+from app.agents.registry import get_agent_registry
+from app.configs.exceptions import RateLimitExceededError
+from app.configs.settings import settings
+from app.utils.metrics import REGISTRY
+from app.utils.tracing import record_span
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+LIMIT_KEYS = ("requests_per_minute", "request_burst", "tokens_per_minute", "token_burst", "weight", "max_concurrency")
+
+RATE_LIMITED_TOTAL = REGISTRY.counter(
+    "kuagentos_rate_limited_total",
+    "Rejected chat requests by agent and limit (requests, tokens, queue_full, queue_timeout).",
+    labelnames=("agent_id", "limit"),
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "kuagentos_scheduler_wait_seconds",
+    "Time agent runs waited in the fair queue for a concurrency slot.",
+    ("agent_id",),
+)
+
+
+# limit -> reddedilen istek sayısı
+_rejected: Dict[str, int] = {}
+
+
+def _reject(user_id: str, agent_id: str, limit: str, wait_seconds: float) -> None:
+    """Reddi sayar ve Retry-After ile RateLimitExceededError fırlatır."""
+    _rejected[limit] = _rejected.get(limit, 0) + 1
+    RATE_LIMITED_TOTAL.inc(agent_id, limit)
+    retry_after = max(1, math.ceil(wait_seconds))
+    logger.warning(f"Rate limited | user_id: {user_id} | agent_id: {agent_id} | limit: {limit} | retry_after: {retry_after}s")
+    raise RateLimitExceededError(
+        message="Çok fazla istek gönderildi. Lütfen biraz bekleyip tekrar deneyin.",
+        detail=f"user_id: {user_id} | agent_id: {agent_id} | limit: {limit}",
+        retry_after_seconds=retry_after,
+        limit=limit,
+    )
+
+
+def agent_limits(agent_id: str) -> Dict[str, float]:
+    """
+    Agent için geçerli limitler (RATE_LIMIT_* varsayılanları + agents.json `limits`).
+
+    Args:
+        agent_id: Agent ID
+
+    Returns:
+        LIMIT_KEYS anahtarlarıyla dict
+    """
+    config = settings.rate_limit
+    limits = {
+        "requests_per_minute": config.rate_limit_user_requests_per_minute,
+        "request_burst": config.rate_limit_user_request_burst,
+        "tokens_per_minute": config.rate_limit_user_tokens_per_minute,
+        "token_burst": config.rate_limit_user_token_burst,
+        "weight": 1.0,
+        "max_concurrency": 0,
+    }
+    spec = get_agent_registry().specs.get(agent_id)
+    if spec is not None:
+        limits.update({key: value for key, value in spec.limits.items() if key in LIMIT_KEYS})
+    return limits
+
+
+class TokenBucket:
+    """
+    Sürekli dolan token bucket.
+
+    Args:
+        rate: Saniyede eklenen token
+        burst: Bucket kapasitesi
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float = 1.0) -> float:
+        """
+        Yeterli token varsa düşer.
+
+        Returns:
+            0 ise alındı, aksi halde yeterli token için beklenmesi gereken saniye
+        """
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def charge(self, amount: float) -> None:
+        """Token'ı koşulsuz düşer; bucket borca (negatife) girebilir."""
+        self._refill()
+        self.tokens -= amount
+
+    def debt_seconds(self) -> float:
+        """Bucket borçtaysa sıfıra dönmesi için gereken saniye, değilse 0."""
+        self._refill()
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Kullanıcı + agent başına istek ve token bucket'ları.
+
+    Args:
+        max_buckets: Tutulacak en fazla bucket; aşılınca en uzun süre
+            kullanılmayan atılır (LRU)
+    """
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._requests: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._tokens: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.admitted = 0
+
+    def _bucket(
+        self, buckets: "OrderedDict[Tuple[str, str], TokenBucket]", key: Tuple[str, str], rate: float, burst: float
+    ) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst)
+            if len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+            # agents.json reload'unda limitler değişmiş olabilir
+            bucket.rate, bucket.burst = rate, burst
+        return bucket
+
+    def admit(self, user_id: str, agent_id: str) -> None:
+        """
+        Kullanıcının bu agent'a yeni istek atmasına izin verilip verilmediğini kontrol eder.
+
+        Raises:
+            RateLimitExceededError: İstek bucket'ı boşsa veya token bucket'ı borçtaysa
+        """
+        if not settings.rate_limit.rate_limit_enabled:
+            return
+        limits = agent_limits(agent_id)
+        key = (user_id, agent_id)
+        tokens_per_minute = limits["tokens_per_minute"]
+        if tokens_per_minute > 0:
+            bucket = self._bucket(
+                self._tokens, key, tokens_per_minute / 60, limits["token_burst"] or tokens_per_minute
+            )
+            debt = bucket.debt_seconds()
+            if debt > 0:
+                _reject(user_id, agent_id, "tokens", debt)
+        requests_per_minute = limits["requests_per_minute"]
+        if requests_per_minute > 0:
+            bucket = self._bucket(
+                self._requests, key, requests_per_minute / 60, max(1.0, limits["request_burst"])
+            )
+            wait = bucket.take()
+            if wait > 0:
+                _reject(user_id, agent_id, "requests", wait)
+        self.admitted += 1
+
+    def charge_tokens(self, user_id: str, agent_id: str, tokens: int) -> None:
+        """Biten run'ın token kullanımını kullanıcının token bucket'ından düşer."""
+        if not settings.rate_limit.rate_limit_enabled or tokens <= 0:
+            return
+        limits = agent_limits(agent_id)
+        tokens_per_minute = limits["tokens_per_minute"]
+        if tokens_per_minute > 0:
+            bucket = self._bucket(
+                self._tokens, (user_id, agent_id), tokens_per_minute / 60, limits["token_burst"] or tokens_per_minute
+            )
+            bucket.charge(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "request_buckets": len(self._requests),
+            "token_buckets": len(self._tokens),
+            "admitted": self.admitted,
+        }
+
+
+class _AgentQueue:
+    """Bir agent'ı bekleyen kullanıcı kuyrukları ve sanal zamanları."""
+
+    __slots__ = ("vtime", "users", "user_vtime", "user_clock", "running")
+
+    def __init__(self):
+        # Agent seviyesinde sanal bitiş zamanı (her dispatch'te 1 / weight artar)
+        self.vtime = 0.0
+        self.users: Dict[str, Deque[asyncio.Future]] = {}
+        self.user_vtime: Dict[str, float] = {}
+        self.user_clock = 0.0
+        self.running = 0
+
+
+class FairScheduler:
+    """
+    Model run'ları için ağırlıklı adil kuyruk.
+
+    Slot boşaldığında bekleyen agent'lardan sanal zamanı en küçük olan, onun
+    içinde de sanal zamanı en küçük kullanıcı seçilir (kullanıcı içinde FIFO).
+    Kuyruğa yeni giren agent/kullanıcının sanal zamanı o anki saate çekilir;
+    boşta kaldığı süre için birikmiş hak kazanmaz.
+
+    Args:
+        slots: Aynı anda çalışabilecek run sayısı
+        max_queued_per_user: Kullanıcı başına bekleyebilecek en fazla run
+        queue_timeout: Slot için en fazla bekleme (s); aşılınca 429
+    """
+
+    def __init__(self, slots: int, max_queued_per_user: int, queue_timeout: float):
+        self.slots = max(1, slots)
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeout = queue_timeout
+        self._agents: Dict[str, _AgentQueue] = {}
+        self._user_queued: Dict[str, int] = {}
+        self._clock = 0.0
+        self.running = 0
+        self.queued = 0
+        self.dispatched = 0
+        self.timeouts = 0
+
+    def _agent(self, agent_id: str) -> _AgentQueue:
+        queue = self._agents.get(agent_id)
+        if queue is None:
+            queue = self._agents[agent_id] = _AgentQueue()
+        return queue
+
+    def _can_run(self, agent_id: str, queue: _AgentQueue) -> bool:
+        max_concurrency = agent_limits(agent_id)["max_concurrency"]
+        return max_concurrency <= 0 or queue.running < max_concurrency
+
+    def _start(self, agent_id: str, queue: _AgentQueue, user_id: str) -> None:
+        """Run'ı başlatır ve agent/kullanıcı sanal zamanlarını ilerletir."""
+        weight = agent_limits(agent_id)["weight"]
+        self._clock = max(self._clock, queue.vtime)
+        queue.vtime += 1.0 / weight if weight > 0 else 1.0
+        user_vtime = queue.user_vtime.get(user_id, queue.user_clock)
+        queue.user_clock = max(queue.user_clock, user_vtime)
+        if user_id in queue.users:
+            queue.user_vtime[user_id] = user_vtime + 1.0
+        queue.running += 1
+        self.running += 1
+        self.dispatched += 1
+
+    def _enqueue(self, agent_id: str, queue: _AgentQueue, user_id: str) -> asyncio.Future:
+        if not any(queue.users.values()):
+            queue.vtime = max(queue.vtime, self._clock)
+        waiters = queue.users.get(user_id)
+        if waiters is None:
+            waiters = queue.users[user_id] = deque()
+            queue.user_vtime[user_id] = max(queue.user_vtime.get(user_id, 0.0), queue.user_clock)
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        self._user_queued[user_id] = self._user_queued.get(user_id, 0) + 1
+        self.queued += 1
+        return future
+
+    def _dequeue(self, queue: _AgentQueue, user_id: str, future: asyncio.Future) -> None:
+        waiters = queue.users[user_id]
+        waiters.remove(future)
+        if not waiters:
+            # Kuyruğu boşalan kullanıcı sıradaki girişinde saate çekilir
+            del queue.users[user_id]
+            queue.user_vtime.pop(user_id, None)
+        remaining = self._user_queued[user_id] - 1
+        if remaining:
+            self._user_queued[user_id] = remaining
+        else:
+            del self._user_queued[user_id]
+        self.queued -= 1
+
+    def _dispatch(self) -> None:
+        """Boş slotları bekleyenlere adil sırayla dağıtır."""
+        while self.running < self.slots and self.queued:
+            candidates = [
+                (queue.vtime, agent_id, queue)
+                for agent_id, queue in self._agents.items()
+                if queue.users and self._can_run(agent_id, queue)
+            ]
+            if not candidates:
+                return
+            _, agent_id, queue = min(candidates, key=lambda item: item[0])
+            user_id = min(queue.users, key=lambda uid: queue.user_vtime[uid])
+            future = queue.users[user_id][0]
+            self._start(agent_id, queue, user_id)
+            self._dequeue(queue, user_id, future)
+            future.set_result(None)
+
+    async def acquire(self, user_id: str, agent_id: str) -> float:
+        """
+        Run için slot alır; gerekiyorsa adil kuyrukta bekler.
+
+        Returns:
+            Kuyrukta beklenen süre (s)
+
+        Raises:
+            RateLimitExceededError: Kullanıcının kuyruğu doluysa veya bekleme zaman aşımına uğradıysa
+        """
+        queue = self._agent(agent_id)
+        if self.running < self.slots and not self.queued and self._can_run(agent_id, queue):
+            self._start(agent_id, queue, user_id)
+            SCHEDULER_WAIT_SECONDS.observe(0.0, agent_id)
+            return 0.0
+        if 0 < self.max_queued_per_user <= self._user_queued.get(user_id, 0):
+            _reject(user_id, agent_id, "queue_full", 1)
+        started = time.perf_counter()
+        future = self._enqueue(agent_id, queue, user_id)
+        self._dispatch()
+        try:
+            await asyncio.wait((future,), timeout=self.queue_timeout if self.queue_timeout > 0 else None)
+        except asyncio.CancelledError:
+            if future.done():
+                self.release(agent_id)
+            else:
+                self._dequeue(queue, user_id, future)
+            raise
+        waited = time.perf_counter() - started
+        SCHEDULER_WAIT_SECONDS.observe(waited, agent_id)
+        if not future.done():
+            self._dequeue(queue, user_id, future)
+            self.timeouts += 1
+            _reject(user_id, agent_id, "queue_timeout", self.queue_timeout)
+        record_span("scheduler_wait", waited, agent_id=agent_id)
+        return waited
+
+    def release(self, agent_id: str) -> None:
+        """Run'ın slotunu bırakır ve sıradakini başlatır."""
+        self._agents[agent_id].running -= 1
+        self.running -= 1
+        self._dispatch()
+
+    async def hold(self, user_id: str, agent_id: str) -> Callable[[], None]:
+        """
+        Slot alır ve onu bir kez bırakan fonksiyonu döner (limitler kapalıysa no-op).
+
+        Slotun, onu kullanacak iş başlamadan alınması gereken yerler içindir
+        (ör. stream yanıtı başlamadan 429 dönebilmek).
+
+        Raises:
+            RateLimitExceededError: Kullanıcının kuyruğu doluysa veya bekleme zaman aşımına uğradıysa
+        """
+        if not settings.rate_limit.rate_limit_enabled:
+            return lambda: None
+        await self.acquire(user_id, agent_id)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release(agent_id)
+
+        return release
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, agent_id: str) -> AsyncIterator[None]:
+        """Run süresince slot tutan context manager (limitler kapalıysa no-op)."""
+        if not settings.rate_limit.rate_limit_enabled:
+            yield
+            return
+        await self.acquire(user_id, agent_id)
+        try:
+            yield
+        finally:
+            self.release(agent_id)
+
+    def depth(self) -> Dict[Tuple[str, ...], float]:
+        return {
+            (agent_id,): sum(len(waiters) for waiters in queue.users.values())
+            for agent_id, queue in self._agents.items()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "running": self.running,
+            "queued": self.queued,
+            "dispatched": self.dispatched,
+            "timeouts": self.timeouts,
+            "by_agent": {
+                agent_id: {"running": queue.running, "queued": sum(len(w) for w in queue.users.values())}
+                for agent_id, queue in self._agents.items()
+            },
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+_scheduler: Optional[FairScheduler] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(settings.rate_limit.rate_limit_max_buckets)
+    return _limiter
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        config = settings.rate_limit
+        _scheduler = FairScheduler(
+            config.rate_limit_max_concurrent_runs,
+            config.rate_limit_max_queued_per_user,
+            config.rate_limit_queue_timeout_seconds,
+        )
+    return _scheduler
+
+
+def admit(user_id: str, agent_id: str) -> None:
+    """Kullanıcının agent'a yeni isteğini token bucket'larla kontrol eder (bkz. RateLimiter.admit)."""
+    get_rate_limiter().admit(user_id, agent_id)
+
+
+def charge_tokens(user_id: str, agent_id: str, tokens: int) -> None:
+    get_rate_limiter().charge_tokens(user_id, agent_id, tokens)
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    return {
+        "enabled": settings.rate_limit.rate_limit_enabled,
+        "rejected": dict(_rejected),
+        "limiter": _limiter.stats() if _limiter is not None else None,
+        "scheduler": _scheduler.stats() if _scheduler is not None else None,
+    }
+
+
+REGISTRY.callback(
+    "kuagentos_scheduler_queue_depth",
+    "Agent runs waiting in the fair queue.",
+    "gauge",
+    ("agent_id",),
+    lambda: _scheduler.depth() if _scheduler is not None else {},
+)
+REGISTRY.callback(
+    "kuagentos_scheduler_running",
+    "Agent runs holding a concurrency slot.",
+    "gauge",
+    ("agent_id",),
+    lambda: {(agent_id,): queue.running for agent_id, queue in _scheduler._agents.items()} if _scheduler is not None else {},
+)
@@ -0,0 +1,142 @@
+# app/utils/startup_profile.py
+"""
+Startup (boot) profili.
+
+Temiz bir Python process'inde `python -X importtime` ile `app.main` import'unu
+ve `create_app()` çağrısını çalıştırır; faz sürelerini ve en pahalı import'ları
+raporlar. Bu modül sadece stdlib kullanır.
+
+CLI:
+    python -m app.utils.startup_profile
+    python -m app.utils.startup_profile --top 40 --json
+    python -m app.utils.startup_profile --import-only
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_MARKER = "STARTUP_PROFILE "
+
+_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+if {build_app}:
+    app.main.create_app()
+t2 = time.perf_counter()
+print({marker!r} + json.dumps({{"import_seconds": t1 - t0, "create_app_seconds": t2 - t1}}), flush=True)
+"""
+
+
+def _parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """`-X importtime` satırlarını (self_us, cumulative_us, module, depth) listesine çevirir."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        # "import time:       412 |        980 |     app.configs.settings"
+        try:
+            self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": self_us / 1000.0,
+                "cumulative_ms": cumulative_us / 1000.0,
+            }
+        )
+    return modules
+
+
+def measure_boot(build_app: bool = True, importtime: bool = True, timeout: float = 120.0) -> Dict[str, Any]:
+    """
+    Yeni bir process'te boot'u ölçer.
+
+    Args:
+        build_app: True ise create_app() da çalıştırılır
+        importtime: True ise -X importtime çıktısı toplanır
+        timeout: Process zaman aşımı
+
+    Returns:
+        Faz süreleri ve (istenirse) modül bazlı import süreleri
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", _PROBE.format(build_app=build_app, marker=_MARKER)]
+    proc = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=timeout)
+    phases: Optional[Dict[str, float]] = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(_MARKER):
+            phases = json.loads(line[len(_MARKER):])
+    if proc.returncode != 0 or phases is None:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("Startup probe failed:\n" + "\n".join(errors[-20:]))
+    result: Dict[str, Any] = {
+        "import_seconds": round(phases["import_seconds"], 4),
+        "create_app_seconds": round(phases["create_app_seconds"], 4),
+        "total_seconds": round(phases["import_seconds"] + phases["create_app_seconds"], 4),
+    }
+    if importtime:
+        result["modules"] = _parse_importtime(proc.stderr)
+    return result
+
+
+def summarize(result: Dict[str, Any], top: int = 25) -> Dict[str, Any]:
+    """En pahalı import'lar ve top-level paket başına self süre toplamları."""
+    modules = result.get("modules", [])
+    packages: Dict[str, float] = {}
+    for module in modules:
+        root = module["module"].split(".", 1)[0]
+        packages[root] = packages.get(root, 0.0) + module["self_ms"]
+    return {
+        "import_seconds": result["import_seconds"],
+        "create_app_seconds": result["create_app_seconds"],
+        "total_seconds": result["total_seconds"],
+        "module_count": len(modules),
+        "top_cumulative": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top],
+        "top_packages": [
+            {"package": name, "self_ms": round(ms, 2)}
+            for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+    }
+
+
+def _print_report(summary: Dict[str, Any]) -> None:
+    print(f"import app.main : {summary['import_seconds'] * 1000:9.1f} ms")
+    print(f"create_app()    : {summary['create_app_seconds'] * 1000:9.1f} ms")
+    print(f"total           : {summary['total_seconds'] * 1000:9.1f} ms  ({summary['module_count']} modules)")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module in summary["top_cumulative"]:
+        print(f"{module['cumulative_ms']:14.1f} {module['self_ms']:9.1f}  {'  ' * module['depth']}{module['module']}")
+    print()
+    print(f"{'self ms':>14}  package")
+    for package in summary["top_packages"]:
+        print(f"{package['self_ms']:14.1f}  {package['package']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup import-time raporu")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--import-only", action="store_true", help="create_app() çağırma")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    summary = summarize(measure_boot(build_app=not args.import_only), top=args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+# app/utils/tracing.py
+"""
+Hafif request tracing.
+
+Her HTTP isteği `TracingMiddleware` ile bir trace alır (gelen W3C `traceparent`
+header'ı varsa aynı trace id kullanılır). `span()` context manager'ı iç içe
+span'ler açar; aktif trace ve span contextvars ile taşınır, bu yüzden
+`start_chat`, `chat_with_agent`, `run_agent`, `process_email_confirmation` ve
+`log_event` içinde açılan span'ler aynı trace'e bağlanır.
+
+- Non-stream yanıtlar `Server-Timing` header'ı taşır (span adı başına toplam süre)
+- SSE `end` event'i `trace_breakdown()` ile aynı dağılımı taşır
+- Örneklenen trace'ler arka plan thread'inde JSONL dosyasına veya OTLP/HTTP
+  (JSON) endpoint'ine aktarılır; örnekleme oranı `TRACING_SAMPLE_RATE`
+
+Trace kaydı her istekte yapılır (Server-Timing için); örnekleme sadece export'u etkiler.
+
+Yerel collector yerine geçen basit alıcı:
+    python -m app.utils.tracing collect --port 4318 --out data/traces/otlp.jsonl
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.configs.logging import bind_log_context
+from app.configs.settings import settings
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+# Metrics/health endpoint'leri trace'lenmez
+EXCLUDED_PATHS = ("/metrics", "/api/health", "/api/ready")
+
+
+class Span:
+    """Tek bir zamanlanmış işlem."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Bir isteğin span'leri."""
+
+    def __init__(self, trace_id: Optional[str] = None, sampled: bool = False):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+
+    def start_span(self, name: str, parent: Optional[Span], attributes: Dict[str, Any]) -> Span:
+        span = Span(self.trace_id, name, parent.span_id if parent else None, attributes)
+        self.spans.append(span)
+        if self.root is None:
+            self.root = span
+        return span
+
+    def breakdown(self) -> Dict[str, float]:
+        """Kök hariç, span adı başına toplam süre (ms)."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span is self.root:
+                continue
+            totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+        result = {name: round(ms, 2) for name, ms in totals.items()}
+        if self.root is not None:
+            result["total"] = round(self.root.duration_ms, 2)
+        return result
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.breakdown().items())
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def trace_breakdown() -> Optional[Dict[str, float]]:
+    """Aktif trace'in span süreleri; trace yoksa None (SSE end event'i için)."""
+    trace = _current_trace.get()
+    return trace.breakdown() if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Aktif trace altında bir span açar; aktif trace yoksa hiçbir şey yapmaz.
+
+    Args:
+        name: Span adı (Server-Timing metric adı olarak da kullanılır)
+        **attributes: Span attribute'ları
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start_span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.end()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Async generator farklı bir context'te kapatıldı
+            _current_span.set(None)
+
+
+def record_span(name: str, seconds: float, **attributes: Any) -> None:
+    """Süresi ölçülmüş, şimdi biten bir span'i aktif trace'e ekler."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    item = trace.start_span(name, _current_span.get(), attributes)
+    item.end_ns = time.time_ns()
+    item.start_ns = item.end_ns - int(seconds * 1e9)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Async fonksiyonu span ile saran decorator."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[bool]]:
+    """W3C traceparent: 00-<trace_id>-<parent_id>-<flags>"""
+    if not header:
+        return None, None, None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None, None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+def begin_trace(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Tuple[Trace, Span]:
+    """Yeni trace ve kök span'i başlatır ve aktif context'e bağlar."""
+    trace_id, parent_id, parent_sampled = _parse_traceparent(traceparent)
+    if parent_sampled is None:
+        sampled = random.random() < settings.tracing.tracing_sample_rate
+    else:
+        sampled = parent_sampled
+    trace = Trace(trace_id, sampled)
+    root = trace.start_span(name, None, attributes)
+    root.parent_id = parent_id
+    _current_trace.set(trace)
+    _current_span.set(root)
+    bind_log_context(trace_id=trace.trace_id)
+    return trace, root
+
+
+def finish_trace(trace: Trace) -> None:
+    """Kök span'i kapatır; trace örneklendiyse export kuyruğuna ekler."""
+    if trace.root is not None:
+        trace.root.end()
+    if trace.sampled:
+        exporter = get_span_exporter()
+        if exporter is not None:
+            exporter.submit(trace)
+
+
+# --- Export ---
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces: List[Trace], service_name: str = "kuagentos") -> Dict[str, Any]:
+    """Trace'leri OTLP/JSON `ExportTraceServiceRequest` formatına çevirir."""
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            otlp_span = {
+                "traceId": item.trace_id,
+                "spanId": item.span_id,
+                "name": item.name,
+                # SERVER (kök) / INTERNAL
+                "kind": 2 if item is trace.root else 1,
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.end_ns or item.start_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in item.attributes.items()],
+                "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+            }
+            if item.parent_id:
+                otlp_span["parentSpanId"] = item.parent_id
+            spans.append(otlp_span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+                "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """
+    Trace'leri arka plan thread'inde batch'ler halinde aktarır.
+    Kuyruk doluysa trace düşürülür; istek yolu hiçbir zaman beklemez.
+
+    Args:
+        kind: "jsonl" veya "otlp"
+        target: JSONL dosya yolu veya OTLP/HTTP traces endpoint'i
+        queue_size: Bekleyen trace limiti
+        batch_size: Tek seferde aktarılan trace sayısı
+    """
+
+    def __init__(self, kind: str, target: str, queue_size: int = 1000, batch_size: int = 64):
+        self.kind = kind
+        self.target = target
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(maxsize=queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export(self, batch: List[Trace]) -> None:
+        if self.kind == "jsonl":
+            path = Path(self.target)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                for trace in batch:
+                    for item in trace.spans:
+                        f.write(json.dumps(item.to_dict(), ensure_ascii=False, default=str) + "\n")
+        else:
+            body = json.dumps(to_otlp(batch), default=str).encode("utf-8")
+            request = urllib.request.Request(
+                self.target, data=body, headers={"Content-Type": "application/json"}, method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                response.read()
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            batch = [trace]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._export_safe(batch)
+                    return
+                batch.append(item)
+            self._export_safe(batch)
+
+    def _export_safe(self, batch: List[Trace]) -> None:
+        try:
+            self._export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Span export failed | exporter: {self.kind} | traces: {len(batch)} | {e}")
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "exporter": self.kind,
+            "target": self.target,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_initialized = False
+
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    """Ayarlara göre exporter'ı ilk çağrıda oluşturur; "none" ise None."""
+    global _exporter, _exporter_initialized
+    if not _exporter_initialized:
+        _exporter_initialized = True
+        config = settings.tracing
+        if config.tracing_exporter == "jsonl":
+            _exporter = SpanExporter("jsonl", config.tracing_jsonl_file, config.tracing_export_queue_size)
+        elif config.tracing_exporter == "otlp":
+            _exporter = SpanExporter("otlp", config.tracing_otlp_endpoint, config.tracing_export_queue_size)
+    return _exporter
+
+
+def close_span_exporter() -> None:
+    global _exporter, _exporter_initialized
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = None
+    _exporter_initialized = False
+
+
+def tracing_stats() -> Dict[str, Any]:
+    config = settings.tracing
+    return {
+        "enabled": config.tracing_enabled,
+        "sample_rate": config.tracing_sample_rate,
+        "exporter": _exporter.stats() if _exporter is not None else None,
+    }
+
+
+# --- ASGI middleware ---
+
+class TracingMiddleware:
+    """
+    Her HTTP isteği için trace başlatır.
+
+    Yanıt başlatılırken `X-Trace-Id` ve (stream olmayan yanıtlarda) `Server-Timing`
+    header'ları eklenir; son body parçası gönderildiğinde trace kapatılır.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if (
+            scope["type"] != "http"
+            or scope.get("path") in EXCLUDED_PATHS
+            or not settings.tracing.tracing_enabled
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent")
+        trace, root = begin_trace(
+            f"{scope.get('method', 'GET')} {scope.get('path', '')}",
+            traceparent.decode("latin-1") if traceparent else None,
+            path=scope.get("path", ""),
+            method=scope.get("method", ""),
+        )
+        finished = False
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal finished
+            if message["type"] == "http.response.start":
+                root.set(status_code=message["status"])
+                response_headers = list(message.get("headers") or [])
+                response_headers.append((b"x-trace-id", trace.trace_id.encode("latin-1")))
+                content_type = dict(response_headers).get(b"content-type", b"")
+                if settings.tracing.tracing_server_timing and not content_type.startswith(b"text/event-stream"):
+                    response_headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": response_headers}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not finished:
+                finished = True
+                finish_trace(trace)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            if not finished:
+                finished = True
+                finish_trace(trace)
+
+
+# --- Collector stand-in ---
+
+def _serve_collector(port: int, out: str) -> None:
+    """OTLP/HTTP JSON isteklerini kabul edip span'leri JSONL olarak yazan basit alıcı."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    out_path = Path(out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                spans = [
+                    item
+                    for resource in payload.get("resourceSpans", [])
+                    for scope_spans in resource.get("scopeSpans", [])
+                    for item in scope_spans.get("spans", [])
+                ]
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            with lock, open(out_path, "a", encoding="utf-8") as f:
+                for item in spans:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            body = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            return
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    print(f"Collecting OTLP/JSON spans on :{port}/v1/traces -> {out_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tracing araçları")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    collect_parser = subparsers.add_parser("collect", help="Yerel OTLP/JSON alıcısı")
+    collect_parser.add_argument("--port", type=int, default=4318)
+    collect_parser.add_argument("--out", default="data/traces/otlp.jsonl")
+    args = parser.parse_args()
+    if args.command == "collect":
+        _serve_collector(args.port, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+# app/utils/usage.py
+"""
+Token ve maliyet muhasebesi.
+
+Her agent run'ının token kullanımı (stream ve non-stream) bellekte gün
+(UTC) -> kullanıcı -> agent ve gün -> model kırılımında toplanır ve
+`USAGE_FLUSH_INTERVAL_SECONDS` aralıkla `agno_metrics` tablosuna yazılır.
+Satırlar `aggregation_period = "daily_usage"` ile tutulur; agno'nun kendi
+"daily" metrik satırlarıyla çakışmaz; agno'nun okuma ve hesaplaması bu
+satırları dışarıda bırakır (bkz. `app/db/sqlite.py`). Birden fazla worker aynı günün satırını
+okuyup üzerine ekleyerek günceller; okuma ve yazma `BEGIN IMMEDIATE` ile
+tek transaction'dır, böylece eşzamanlı flush'lar birbirinin kullanımını ezmez.
+
+token_metrics JSON yapısı:
+    {"runs", "input_tokens", "output_tokens", "total_tokens", "cost_usd",
+     "by_user": {user_id: {... , "by_agent": {agent_id: {...}}}},
+     "by_agent": {agent_id: {...}}}
+model_metrics: {model_id: {"runs", "input_tokens", ...}}
+
+Opsiyonel soft kotalar (kullanıcı başına günlük token):
+- `USAGE_USER_DAILY_SOFT_TOKENS` aşılınca domain agent `USAGE_DOWNGRADE_MODEL` ile çalışır
+- `USAGE_USER_DAILY_HARD_TOKENS` aşılınca istek 429 ile reddedilir
+Kotalar bu worker'ın bildiği kullanımla (son flush + bekleyenler) kontrol
+edildiğinden yaklaşık (soft) sınırlardır.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.configs.exceptions import QuotaExceededError
+from app.configs.settings import settings
+from app.db.pragmas import immediate_transaction
+from app.utils.metrics import record_tokens, token_counts
+from app.utils.rate_limit import charge_tokens
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+USAGE_AGGREGATION_PERIOD = "daily_usage"
+
+# USD / 1M token (Vertex AI liste fiyatları); USAGE_PRICING_JSON ile değiştirilebilir
+DEFAULT_PRICING: Dict[str, Dict[str, float]] = {
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.0},
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40},
+    "gemini-2.0-flash": {"input": 0.15, "output": 0.60},
+    "gemini-2.0-flash-lite": {"input": 0.075, "output": 0.30},
+}
+
+# agno'nun oluşturduğu tabloyla aynı şema (tablo yoksa); satırlar sahipsiz (user_id = '') bucket'tır
+_METRICS_DDL = """
+CREATE TABLE IF NOT EXISTS agno_metrics (
+    id VARCHAR NOT NULL,
+    agent_runs_count BIGINT NOT NULL,
+    team_runs_count BIGINT NOT NULL,
+    workflow_runs_count BIGINT NOT NULL,
+    agent_sessions_count BIGINT NOT NULL,
+    team_sessions_count BIGINT NOT NULL,
+    workflow_sessions_count BIGINT NOT NULL,
+    users_count BIGINT NOT NULL,
+    token_metrics JSON NOT NULL,
+    model_metrics JSON NOT NULL,
+    date DATE NOT NULL,
+    aggregation_period VARCHAR NOT NULL,
+    user_id VARCHAR NOT NULL DEFAULT '',
+    created_at BIGINT NOT NULL,
+    updated_at BIGINT,
+    completed BOOLEAN NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT agno_metrics_uq_metrics_user_date_period UNIQUE (user_id, date, aggregation_period)
+)
+"""
+
+USAGE_GROUP_BY_OPTIONS = ("day", "user", "agent", "model")
+
+_TOTAL_FIELDS = ("runs", "input_tokens", "output_tokens", "total_tokens", "cost_usd")
+
+
+def _merge(target: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Sayısal alanları toplayarak iç içe dict'leri birleştirir."""
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            _merge(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+
+def _totals(source: Dict[str, Any]) -> Dict[str, Any]:
+    totals = {field: source.get(field, 0) for field in _TOTAL_FIELDS}
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    return totals
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _seconds_until_tomorrow() -> int:
+    now = datetime.now(timezone.utc)
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return max(1, int((tomorrow - now).total_seconds()))
+
+
+def load_pricing() -> Dict[str, Dict[str, float]]:
+    pricing = dict(DEFAULT_PRICING)
+    override = settings.usage.usage_pricing_json
+    if override:
+        pricing.update(json.loads(override))
+    return pricing
+
+
+class UsageAccountant:
+    """
+    Token kullanımını bellekte toplar ve agno_metrics'e yazar.
+
+    Args:
+        db_file: agno_metrics tablosunun bulunduğu SQLite dosyası (ana DB / shard 0)
+        pricing: Model başına USD / 1M token fiyatları
+    """
+
+    def __init__(self, db_file: str, pricing: Dict[str, Dict[str, float]]):
+        self.db_file = db_file
+        self.pricing = pricing
+        # gün -> yazılmamış toplamlar
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Son flush/okumada DB'deki günlük kullanıcı token toplamları (kota için)
+        self._persisted_day: Optional[str] = None
+        self._persisted_user_tokens: Dict[str, int] = {}
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_flush_at: Optional[str] = None
+
+    def cost(self, model_id: str, input_tokens: int, output_tokens: int) -> float:
+        price = self.pricing.get(model_id)
+        if price is None:
+            return 0.0
+        return (input_tokens * price["input"] + output_tokens * price["output"]) / 1_000_000
+
+    def record(self, user_id: str, agent_id: str, model_id: str, input_tokens: int, output_tokens: int) -> None:
+        """Tek bir run'ın kullanımını bugünün toplamlarına ekler."""
+        totals = {
+            "runs": 1,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "cost_usd": self.cost(model_id, input_tokens, output_tokens),
+        }
+        day = self._pending.setdefault(_today(), {"token_metrics": {}, "model_metrics": {}})
+        _merge(
+            day["token_metrics"],
+            {
+                **totals,
+                "by_user": {user_id: {**totals, "by_agent": {agent_id: totals}}},
+                "by_agent": {agent_id: totals},
+            },
+        )
+        _merge(day["model_metrics"], {model_id: totals})
+
+    def user_tokens_today(self, user_id: str) -> int:
+        """Kullanıcının bugünkü toplam token'ı (son flush + bekleyenler)."""
+        today = _today()
+        persisted = self._persisted_user_tokens.get(user_id, 0) if self._persisted_day == today else 0
+        pending = self._pending.get(today, {}).get("token_metrics", {}).get("by_user", {}).get(user_id, {})
+        return persisted + pending.get("total_tokens", 0)
+
+    # --- DB ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_file, timeout=settings.database.sqlite_busy_timeout_ms / 1000, isolation_level=None
+        )
+        conn.execute(_METRICS_DDL)
+        return conn
+
+    def _flush_sync(self, pending: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Bekleyen günleri mevcut satırlara ekler; bugünün kullanıcı toplamlarını döner."""
+        now = int(time.time())
+        today = _today()
+        today_users: Dict[str, int] = {}
+        conn = self._connect()
+        try:
+            # Satır yazma kilidi alındıktan sonra okunur; diğer worker'ın aynı
+            # anda okuyup üzerine yazması (kayıp güncelleme) engellenir
+            with immediate_transaction(conn):
+                for day, delta in pending.items():
+                    row = conn.execute(
+                        "SELECT token_metrics, model_metrics FROM agno_metrics"
+                        " WHERE date = ? AND aggregation_period = ?",
+                        (day, USAGE_AGGREGATION_PERIOD),
+                    ).fetchone()
+                    token_metrics = _merge(json.loads(row[0]) if row else {}, delta["token_metrics"])
+                    model_metrics = _merge(json.loads(row[1]) if row else {}, delta["model_metrics"])
+                    values = (
+                        token_metrics.get("runs", 0),
+                        len(token_metrics.get("by_user", {})),
+                        json.dumps(token_metrics, ensure_ascii=False),
+                        json.dumps(model_metrics, ensure_ascii=False),
+                        now,
+                        day < today,
+                    )
+                    if row:
+                        conn.execute(
+                            "UPDATE agno_metrics SET agent_runs_count = ?, users_count = ?, token_metrics = ?,"
+                            " model_metrics = ?, updated_at = ?, completed = ?"
+                            " WHERE date = ? AND aggregation_period = ?",
+                            (*values, day, USAGE_AGGREGATION_PERIOD),
+                        )
+                    else:
+                        conn.execute(
+                            "INSERT INTO agno_metrics (id, agent_runs_count, team_runs_count, workflow_runs_count,"
+                            " agent_sessions_count, team_sessions_count, workflow_sessions_count, users_count,"
+                            " token_metrics, model_metrics, date, aggregation_period, user_id, created_at,"
+                            " updated_at, completed) VALUES (?, ?, 0, 0, 0, 0, 0, ?, ?, ?, ?, ?, '', ?, ?, ?)",
+                            (str(uuid.uuid4()), *values[:4], day, USAGE_AGGREGATION_PERIOD, now, now, values[5]),
+                        )
+                    if day == today:
+                        today_users = {
+                            user_id: totals.get("total_tokens", 0)
+                            for user_id, totals in token_metrics.get("by_user", {}).items()
+                        }
+                if today not in pending:
+                    row = conn.execute(
+                        "SELECT token_metrics FROM agno_metrics WHERE date = ? AND aggregation_period = ?",
+                        (today, USAGE_AGGREGATION_PERIOD),
+                    ).fetchone()
+                    by_user = json.loads(row[0]).get("by_user", {}) if row else {}
+                    today_users = {user_id: totals.get("total_tokens", 0) for user_id, totals in by_user.items()}
+        finally:
+            conn.close()
+        return today_users
+
+    async def flush(self, db: Any = None) -> int:
+        """
+        Bekleyen toplamları DB'ye yazar; diğer worker'ların yazdıklarıyla
+        birlikte bugünün kullanıcı toplamlarını kota için yeniler.
+
+        Args:
+            db: Verilirse yazma bu shard'ın writer lock'u altında yapılır
+
+        Returns:
+            Yazılan gün sayısı
+        """
+        pending, self._pending = self._pending, {}
+        try:
+            if db is not None:
+                async with db.writer():
+                    today_users = await asyncio.to_thread(self._flush_sync, pending)
+            else:
+                today_users = await asyncio.to_thread(self._flush_sync, pending)
+        except Exception:
+            # Yazılamayanlar bir sonraki tura kalır
+            for day, delta in pending.items():
+                _merge(self._pending.setdefault(day, {"token_metrics": {}, "model_metrics": {}}), delta)
+            self.flush_errors += 1
+            raise
+        self._persisted_day = _today()
+        self._persisted_user_tokens = today_users
+        self.flushes += 1
+        self.last_flush_at = datetime.now(timezone.utc).isoformat()
+        return len(pending)
+
+    def _load_rows(self, start: date, end: date) -> Dict[str, Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT date, token_metrics, model_metrics FROM agno_metrics"
+                " WHERE aggregation_period = ? AND date >= ? AND date <= ? ORDER BY date",
+                (USAGE_AGGREGATION_PERIOD, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            str(day): {"token_metrics": json.loads(token_metrics), "model_metrics": json.loads(model_metrics)}
+            for day, token_metrics, model_metrics in rows
+        }
+
+    async def query(
+        self,
+        start: date,
+        end: date,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        group_by: str = "day",
+    ) -> Dict[str, Any]:
+        """
+        Gün aralığı için kullanım özeti (DB + henüz yazılmamış kullanım).
+
+        Args:
+            start, end: Dahil gün aralığı (UTC)
+            user_id: Sadece bu kullanıcı
+            agent_id: Sadece bu agent
+            group_by: "day", "user", "agent" veya "model"
+        """
+        days = await asyncio.to_thread(self._load_rows, start, end)
+        for day, delta in self._pending.items():
+            if start.isoformat() <= day <= end.isoformat():
+                _merge(days.setdefault(day, {"token_metrics": {}, "model_metrics": {}}), json.loads(json.dumps(delta)))
+
+        buckets: Dict[str, Dict[str, Any]] = {}
+        for day in sorted(days):
+            token_metrics = days[day]["token_metrics"]
+            scope = token_metrics
+            if user_id is not None:
+                scope = token_metrics.get("by_user", {}).get(user_id, {})
+            if agent_id is not None:
+                scope = scope.get("by_agent", {}).get(agent_id, {})
+            if group_by == "day":
+                groups = {day: scope}
+            elif group_by == "user":
+                groups = {
+                    uid: (totals.get("by_agent", {}).get(agent_id, {}) if agent_id else totals)
+                    for uid, totals in token_metrics.get("by_user", {}).items()
+                    if user_id is None or uid == user_id
+                }
+            elif group_by == "agent":
+                groups = (scope if user_id is not None else token_metrics).get("by_agent", {})
+                if agent_id is not None:
+                    groups = {agent_id: scope}
+            else:
+                groups = days[day]["model_metrics"]
+            for key, totals in groups.items():
+                if totals:
+                    _merge(buckets.setdefault(key, {}), _totals(totals))
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "group_by": group_by,
+            "buckets": [{"group": key, **_totals(totals)} for key, totals in buckets.items()],
+            "total": _totals({field: sum(b.get(field, 0) for b in buckets.values()) for field in _TOTAL_FIELDS}),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_days": len(self._pending),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "last_flush_at": self.last_flush_at,
+        }
+
+
+_accountant: Optional[UsageAccountant] = None
+
+
+def get_usage_accountant() -> UsageAccountant:
+    global _accountant
+    if _accountant is None:
+        _accountant = UsageAccountant(settings.database.sqlite_db_file, load_pricing())
+    return _accountant
+
+
+def record_usage(user_id: str, agent: Any, metrics: Any) -> None:
+    """
+    Run metriklerini Prometheus sayaçlarına ve günlük kullanım toplamlarına ekler.
+
+    Args:
+        user_id: Kullanıcı ID
+        agent: Run'ı yapan agent (id ve model.id kullanılır)
+        metrics: RunOutput.metrics ya da stream'in son event'indeki metrics
+    """
+    record_tokens(agent.id, metrics)
+    input_tokens, output_tokens = token_counts(metrics)
+    # Kullanıcının dakikalık model token bucket'ı (RATE_LIMIT_USER_TOKENS_PER_MINUTE)
+    charge_tokens(user_id, agent.id, input_tokens + output_tokens)
+    if not settings.usage.usage_accounting_enabled:
+        return
+    if input_tokens or output_tokens:
+        model_id = getattr(getattr(agent, "model", None), "id", None) or "unknown"
+        get_usage_accountant().record(user_id, agent.id, model_id, input_tokens, output_tokens)
+
+
+def enforce_quota(user_id: str) -> Optional[str]:
+    """
+    Kullanıcının günlük kotasını kontrol eder.
+
+    Returns:
+        Soft kota aşıldıysa kullanılacak düşük maliyetli model id'si, aksi halde None
+
+    Raises:
+        QuotaExceededError: Hard kota aşıldıysa
+    """
+    config = settings.usage
+    if not config.usage_accounting_enabled or (
+        config.usage_user_daily_soft_tokens <= 0 and config.usage_user_daily_hard_tokens <= 0
+    ):
+        return None
+    used = get_usage_accountant().user_tokens_today(user_id)
+    if 0 < config.usage_user_daily_hard_tokens <= used:
+        raise QuotaExceededError(
+            message="Günlük kullanım limitine ulaşıldı. Lütfen yarın tekrar deneyin.",
+            detail=f"user_id: {user_id} | used: {used} | limit: {config.usage_user_daily_hard_tokens}",
+            retry_after_seconds=_seconds_until_tomorrow(),
+        )
+    if 0 < config.usage_user_daily_soft_tokens <= used:
+        logger.info(f"Soft quota exceeded, downgrading model | user_id: {user_id} | used: {used}")
+        return config.usage_downgrade_model
+    return None
+
+
+def _usage_db() -> Any:
+    from app.db.sqlite import get_agent_db
+
+    # agno_metrics ana DB dosyasındadır (shard 0); yazma o shard'ın writer'ı altında yapılır
+    return get_agent_db().shards[0]
+
+
+async def usage_flush_loop() -> None:
+    """Kullanımı USAGE_FLUSH_INTERVAL_SECONDS aralıkla agno_metrics'e yazar."""
+    interval = settings.usage.usage_flush_interval_seconds
+    if not settings.usage.usage_accounting_enabled or interval <= 0:
+        return
+    accountant = get_usage_accountant()
+    db = _usage_db()
+    while True:
+        try:
+            await accountant.flush(db)
+        except Exception as e:
+            logger.error(f"Usage flush failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def flush_usage() -> None:
+    """Shutdown'da bekleyen kullanımı yazar (DB kapanmadan önce çağrılmalı)."""
+    if _accountant is None or not _accountant._pending:
+        return
+    try:
+        await _accountant.flush(_usage_db())
+    except Exception as e:
+        logger.error(f"Final usage flush failed: {e}")
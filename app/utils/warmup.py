@@ -0,0 +1,230 @@
+# app/utils/warmup.py
+"""
+Startup warm-up ve readiness durumu.
+
+Process trafik almadan önce soğuk başlangıç maliyetlerini öder:
+- settings validasyonu ve Google kimlik dosyası
+- Google auth token'ı (Vertex AI)
+- Model client bağlantı havuzu + 1 token'lık test üretimi
+- SQLite: her shard'da pool bağlantıları (pragma'lar), şema ve run tablosu
+- Son aktif session'lar session cache'e
+- SMTP bağlantı havuzu (transport smtp ise)
+
+Warm-up arka planda çalışır; `/api/ready` zorunlu adımlar tamamlanana kadar
+503 döner. Başarısız zorunlu adımlar `WARMUP_RETRY_SECONDS` aralıkla yeniden denenir.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.configs.settings import ensure_google_credentials, get_settings, settings
+
+# Logger ayarla
+logger = logging.getLogger(__name__)
+
+_GOOGLE_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+
+class WarmupState:
+    """Warm-up adımlarının durumu ve süreleri."""
+
+    def __init__(self):
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.attempts = 0
+        self.ready = False
+
+    def record(self, name: str, required: bool, status: str, duration_ms: float, detail: Any = None) -> None:
+        self.components[name] = {
+            "status": status,
+            "required": required,
+            "duration_ms": round(duration_ms, 2),
+            "detail": detail,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "components": dict(self.components),
+        }
+
+
+_state = WarmupState()
+
+
+def get_warmup_state() -> WarmupState:
+    return _state
+
+
+# --- Adımlar ---
+
+async def _warm_settings() -> str:
+    get_settings()
+    ensure_google_credentials()
+    return "ok"
+
+
+def _fetch_google_token() -> str:
+    import google.auth
+    from google.auth.transport.requests import Request
+
+    credentials, project = google.auth.default(scopes=_GOOGLE_SCOPES)
+    credentials.refresh(Request())
+    return f"project: {project}"
+
+
+async def _warm_auth() -> str:
+    if settings.model.model_provider == "mock":
+        return "skipped (mock model)"
+    return await asyncio.to_thread(_fetch_google_token)
+
+
+async def _warm_models() -> Dict[str, Any]:
+    """Her agent modelinin client'ını oluşturur ve 1 token'lık üretim yapar."""
+    from app.agents.registry import get_agent_registry
+
+    timings = {}
+    for agent in get_agent_registry().agent_os_agents():
+        model = agent.model
+        started = time.perf_counter()
+        get_client = getattr(model, "get_client", None)
+        if get_client is None:
+            # Client'ı olmayan (mock) modeller için ısıtılacak bağlantı yok
+            timings[agent.id] = "skipped"
+            continue
+        client = get_client()
+        if settings.warmup.warmup_test_generation:
+            await client.aio.models.generate_content(
+                model=model.id,
+                contents="ping",
+                config={"max_output_tokens": 1},
+            )
+        timings[agent.id] = round((time.perf_counter() - started) * 1000, 2)
+    return timings
+
+
+async def _warm_database() -> Dict[str, Any]:
+    """Her shard'da pool'u doldurur, şemayı ve sık okunan sayfaları belleğe alır."""
+    from app.db.sqlite import get_agent_db
+
+    agent_db = get_agent_db()
+    pool_size = settings.database.sqlite_pool_size
+
+    async def _touch(shard: Any) -> None:
+        async with shard.db_engine.connect() as conn:
+            await conn.execute(text("SELECT count(*) FROM sqlite_master"))
+
+    for shard in agent_db.shards:
+        await shard._ensure_runs_table()
+        # Pool'daki tüm bağlantılar açılır; pragma'lar connect event'inde uygulanır
+        await asyncio.gather(*[_touch(shard) for _ in range(pool_size)])
+    return {"shards": len(agent_db.shards), "connections_per_shard": pool_size}
+
+
+async def _recent_session_ids(shard: Any, limit: int) -> List[str]:
+    async with shard.db_engine.connect() as conn:
+        exists = (
+            await conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agno_sessions'")
+            )
+        ).fetchone()
+        if not exists:
+            return []
+        rows = (
+            await conn.execute(
+                text(
+                    "SELECT session_id FROM agno_sessions"
+                    " ORDER BY COALESCE(updated_at, created_at) DESC LIMIT :limit"
+                ),
+                {"limit": limit},
+            )
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+async def _warm_sessions() -> Dict[str, int]:
+    from app.db.sqlite import get_agent_db
+
+    agent_db = get_agent_db()
+    limit = settings.warmup.warmup_hot_sessions
+    if agent_db.session_cache is None or limit <= 0:
+        return {"loaded": 0}
+    per_shard = await asyncio.gather(*[_recent_session_ids(shard, limit) for shard in agent_db.shards])
+    session_ids = [session_id for ids in per_shard for session_id in ids][:limit]
+    loaded = await agent_db.preload_sessions(session_ids)
+    return {"candidates": len(session_ids), "loaded": loaded}
+
+
+async def _warm_mail() -> str:
+    from app.tools.mail_transport import get_mail_transport
+
+    transport = get_mail_transport()
+    await transport.warm_up()
+    return transport.name
+
+
+def _steps() -> List[tuple]:
+    """(isim, zorunlu mu, adım fonksiyonu)"""
+    return [
+        ("settings", True, _warm_settings),
+        ("database", True, _warm_database),
+        ("google_auth", True, _warm_auth),
+        ("models", True, _warm_models),
+        ("session_cache", False, _warm_sessions),
+        ("mail", False, _warm_mail),
+    ]
+
+
+async def _run_step(name: str, required: bool, step: Callable[[], Awaitable[Any]], timeout: float) -> bool:
+    started = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(step(), timeout=timeout)
+        _state.record(name, required, "ok", (time.perf_counter() - started) * 1000, detail)
+        return True
+    except asyncio.TimeoutError:
+        _state.record(name, required, "timeout", (time.perf_counter() - started) * 1000, f"> {timeout}s")
+    except Exception as e:
+        _state.record(name, required, "failed", (time.perf_counter() - started) * 1000, str(e))
+    logger.warning(f"Warm-up step failed | step: {name} | required: {required} | {_state.components[name]['detail']}")
+    return False
+
+
+async def run_warmup() -> None:
+    """
+    Warm-up adımlarını sırayla çalıştırır; zorunlu adımların hepsi başarılı
+    olunca process ready olur.
+    """
+    config = settings.warmup
+    started = time.perf_counter()
+    _state.started_at = datetime.now(timezone.utc).isoformat()
+    if not config.warmup_enabled:
+        _state.ready = True
+        _state.finished_at = _state.started_at
+        return
+
+    pending = _steps()
+    while True:
+        _state.attempts += 1
+        failed = []
+        for name, required, step in pending:
+            ok = await _run_step(name, required, step, config.warmup_timeout_seconds)
+            if not ok and required:
+                failed.append((name, required, step))
+        if not failed:
+            break
+        pending = failed
+        await asyncio.sleep(config.warmup_retry_seconds)
+
+    _state.ready = True
+    _state.finished_at = datetime.now(timezone.utc).isoformat()
+    logger.info(
+        f"Warm-up complete | attempts: {_state.attempts} | duration: {(time.perf_counter() - started) * 1000:.0f}ms"
+    )
@@ -0,0 +1,420 @@
+# benchmarks/load_test.py
+"""
+Eşzamanlı yük üretici (load test harness).
+
+Çalışan bir sunucuya istemci SDK'sı (`app.client`) ile çok sayıda simüle kullanıcı gönderir.
+Kullanıcılar Poisson süreciyle (`--rate` kullanıcı/s) gelir; her kullanıcı
+`/api/chat/start` ile session açar, ardından `--turns` tur boyunca trafik
+karışımından (`--mix`) seçilen mesajları yollar:
+
+- followup: aynı session'da normal soru
+- email: mail taslağı isteği (satınalma agent'ında `email_intent` üretir)
+- confirm / cancel: bekleyen taslak varsa onay ("gönder") veya iptal
+
+SSE yanıtları SDK'nın ortak parser'ıyla okunur; SDK retry yapmaz (`retries=0`),
+her hata rapora yansır. İstek başına istemci
+TTFT'si ve toplam süresi, sunucunun `end` event'indeki (stream) veya
+`Server-Timing` header'ındaki (non-stream) süreleriyle karşılaştırılır;
+fark "skew" olarak raporlanır (ağ + kuyruk + `/chat/start`'taki routing).
+
+Gerçek model maliyeti olmadan çalıştırmak için sunucu mock modelle başlatılır:
+    MODEL_PROVIDER=mock MAIL_TRANSPORT=log python run.py
+
+Kullanım:
+    python -m benchmarks.load_test --users 200 --rate 20
+    python -m benchmarks.load_test --users 2000 --rate 100 --concurrency 500 --turns 4
+    python -m benchmarks.load_test --mix followup=3,email=1,confirm=2,cancel=1 --json out.json --csv out.csv
+    python -m benchmarks.load_test --slo-ttft-p95 1.5 --slo-error-rate 0.01 --label $(git rev-parse --short HEAD)
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.client import Content, EmailIntent, End, Error, KUAgentClient, KUAgentError, SessionInfo
+
+DEFAULT_MIX = {"followup": 3.0, "email": 1.0, "confirm": 2.0, "cancel": 1.0}
+
+START_MESSAGES = (
+    "Araç kiralama hizmet alımı için en az kaç teklif gereklidir?",
+    "Doğrudan temin limiti nedir ve hangi maddede yazar?",
+    "Satınalma talebi onay akışı nasıl işliyor?",
+    "Tedarikçi değerlendirme kriterleri nelerdir?",
+    "Hizmet alımlarında sözleşme süresi en fazla ne kadar olabilir?",
+)
+FOLLOWUP_MESSAGES = (
+    "Bu kuralın istisnaları var mı?",
+    "Peki bu süreç kaç gün sürüyor?",
+    "Hangi belgeler gerekiyor?",
+    "Bunu biraz daha detaylı açıklar mısın?",
+    "Limit aşılırsa ne yapılmalı?",
+)
+EMAIL_MESSAGES = (
+    "Bu konuda satınalma birimine bir mail taslağı hazırlar mısın?",
+    "Bu bilgileri ilgili birime e-posta ile iletmek istiyorum.",
+)
+CONFIRM_MESSAGE = "Evet, gönder"
+CANCEL_MESSAGE = "Vazgeçtim, iptal et"
+
+
+# ==== İstek ====
+
+@dataclass
+class RequestResult:
+    user: int
+    kind: str
+    endpoint: str
+    started_at: float
+    status: int = 0
+    ok: bool = False
+    error: Optional[str] = None
+    stream: bool = False
+    ttft: Optional[float] = None
+    total: Optional[float] = None
+    server_ttft: Optional[float] = None
+    server_total: Optional[float] = None
+    chunks: int = 0
+    chars: int = 0
+    email_intent: bool = False
+    session_id: Optional[str] = None
+    agent_id: Optional[str] = None
+
+
+async def _send(
+    client: KUAgentClient,
+    result: RequestResult,
+    payload: Dict[str, Any],
+) -> RequestResult:
+    """
+    İsteği SDK ile gönderir ve event'leri tüketir. Onay/iptal gibi bazı turlar
+    `stream=true` olsa da JSON döner; SDK bunları da aynı event'lere çevirir.
+    """
+    started = time.perf_counter()
+    stream = client.request_stream(result.endpoint, payload)
+    try:
+        async for event in stream:
+            if isinstance(event, Content):
+                if result.ttft is None:
+                    result.ttft = time.perf_counter() - started
+                result.chunks += 1
+                result.chars += len(event.text)
+            elif isinstance(event, SessionInfo):
+                result.session_id = event.session_id
+                result.agent_id = event.agent_id
+            elif isinstance(event, EmailIntent):
+                result.email_intent = True
+            elif isinstance(event, End):
+                result.server_ttft = event.first_token
+                result.server_total = event.total
+            elif isinstance(event, Error):
+                result.error = event.message[:200]
+    except KUAgentError as e:
+        result.error = str(e)[:200]
+    result.status = stream.status
+    result.stream = stream.stream
+    result.total = time.perf_counter() - started
+    if result.error is None and stream.end is None:
+        result.error = "stream ended without end event"
+    result.ok = result.error is None and 200 <= result.status < 300
+    return result
+
+
+# ==== Kullanıcı senaryosu ====
+
+@dataclass
+class LoadConfig:
+    base_url: str
+    users: int
+    rate: float
+    concurrency: int
+    turns: int
+    think_ms: float
+    mix: Dict[str, float]
+    stream: bool
+    timeout: float
+    seed: int
+
+
+@dataclass
+class LoadRun:
+    config: LoadConfig
+    results: List[RequestResult] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+
+
+def _client(base_url: str, concurrency: int, timeout: float) -> KUAgentClient:
+    """Ölçüm için retry'sız, havuzu eşzamanlılık kadar geniş istemci."""
+    return KUAgentClient(
+        base_url,
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        retries=0,
+    )
+
+
+def _pick_turn(rng: random.Random, mix: Dict[str, float], pending: bool) -> str:
+    """Bekleyen taslak varsa confirm/cancel, yoksa followup/email arasından seçer."""
+    kinds = ("confirm", "cancel") if pending else ("followup", "email")
+    weights = [mix.get(kind, 0.0) for kind in kinds]
+    if not any(weights):
+        kinds, weights = ("followup", "email"), [mix.get("followup", 0.0), mix.get("email", 0.0)]
+    if not any(weights):
+        return "followup"
+    return rng.choices(kinds, weights=weights)[0]
+
+
+async def _simulate_user(
+    client: KUAgentClient,
+    run: LoadRun,
+    user: int,
+    semaphore: asyncio.Semaphore,
+) -> None:
+    config = run.config
+    rng = random.Random(f"{config.seed}:{user}")
+    user_id = f"loadtest-{config.seed}-{user}"
+
+    async def request(kind: str, endpoint: str, payload: Dict[str, Any], session_id: Optional[str] = None) -> RequestResult:
+        result = RequestResult(
+            user=user,
+            kind=kind,
+            endpoint=endpoint,
+            started_at=time.perf_counter() - run.started,
+            session_id=session_id,
+        )
+        async with semaphore:
+            await _send(client, result, payload)
+        run.results.append(result)
+        return result
+
+    first = await request(
+        "new_session",
+        "/api/chat/start",
+        {"user_id": user_id, "message": rng.choice(START_MESSAGES), "stream": config.stream},
+    )
+    if not first.ok or not first.session_id or not first.agent_id:
+        return
+    session_id, agent_id = first.session_id, first.agent_id
+    pending = first.email_intent
+
+    for _ in range(config.turns):
+        if config.think_ms > 0:
+            await asyncio.sleep(rng.expovariate(1000 / config.think_ms))
+        kind = _pick_turn(rng, config.mix, pending)
+        message = {
+            "followup": lambda: rng.choice(FOLLOWUP_MESSAGES),
+            "email": lambda: rng.choice(EMAIL_MESSAGES),
+            "confirm": lambda: CONFIRM_MESSAGE,
+            "cancel": lambda: CANCEL_MESSAGE,
+        }[kind]()
+        result = await request(
+            kind,
+            f"/api/chat/agents/{agent_id}",
+            {"user_id": user_id, "session_id": session_id, "message": message, "stream": config.stream},
+            session_id=session_id,
+        )
+        if not result.ok:
+            return
+        pending = result.email_intent if kind in ("followup", "email") else False
+
+
+async def run_load(config: LoadConfig) -> LoadRun:
+    """Kullanıcıları Poisson varışlarıyla başlatır ve hepsi bitene kadar bekler."""
+    run = LoadRun(config=config)
+    semaphore = asyncio.Semaphore(config.concurrency)
+    arrivals = random.Random(config.seed)
+
+    async with _client(config.base_url, config.concurrency, config.timeout) as client:
+        await client.health()
+        run.started = time.perf_counter()
+        tasks: List[asyncio.Task] = []
+        for user in range(config.users):
+            tasks.append(asyncio.create_task(_simulate_user(client, run, user, semaphore)))
+            if config.rate > 0 and user < config.users - 1:
+                await asyncio.sleep(arrivals.expovariate(config.rate))
+        await asyncio.gather(*tasks)
+        run.finished = time.perf_counter()
+    return run
+
+
+# ==== Rapor ====
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """Lineer interpolasyonlu yüzdelik; boş listede None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    value = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+    return round(value, 4)
+
+
+def _distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": _percentile(values, 0.50),
+        "p90": _percentile(values, 0.90),
+        "p95": _percentile(values, 0.95),
+        "p99": _percentile(values, 0.99),
+        "max": round(max(values), 4) if values else None,
+    }
+
+
+def _summarize(results: List[RequestResult], elapsed: float) -> Dict[str, Any]:
+    ok = [result for result in results if result.ok]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if not result.ok:
+            key = result.error.split(":", 1)[0] if result.error else f"HTTP {result.status}"
+            errors[key] = errors.get(key, 0) + 1
+    ttft = [result.ttft for result in ok if result.ttft is not None]
+    total = [result.total for result in ok if result.total is not None]
+    ttft_skew = [
+        result.ttft - result.server_ttft
+        for result in ok
+        if result.ttft is not None and result.server_ttft is not None
+    ]
+    total_skew = [
+        result.total - result.server_total
+        for result in ok
+        if result.total is not None and result.server_total is not None
+    ]
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else None,
+        "chunks_per_second": round(sum(result.chunks for result in ok) / elapsed, 1) if elapsed > 0 else None,
+        "email_intents": sum(1 for result in ok if result.email_intent),
+        "ttft_seconds": _distribution(ttft),
+        "total_seconds": _distribution(total),
+        "skew_seconds": {"ttft": _distribution(ttft_skew), "total": _distribution(total_skew)},
+    }
+
+
+def build_report(run: LoadRun, label: Optional[str] = None) -> Dict[str, Any]:
+    elapsed = run.finished - run.started
+    by_kind: Dict[str, List[RequestResult]] = {}
+    for result in run.results:
+        by_kind.setdefault(result.kind, []).append(result)
+    return {
+        "label": label,
+        "config": asdict(run.config),
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": _summarize(run.results, elapsed),
+        "by_kind": {kind: _summarize(results, elapsed) for kind, results in sorted(by_kind.items())},
+    }
+
+
+def check_slos(report: Dict[str, Any], ttft_p95: Optional[float], total_p95: Optional[float], error_rate: Optional[float]) -> List[str]:
+    """Aşılan SLO'ların açıklamalarını döner; boş liste = geçti."""
+    overall = report["overall"]
+    failures = []
+    observed_ttft = overall["ttft_seconds"]["p95"]
+    if ttft_p95 is not None and observed_ttft is not None and observed_ttft > ttft_p95:
+        failures.append(f"ttft p95 {observed_ttft}s > {ttft_p95}s")
+    observed_total = overall["total_seconds"]["p95"]
+    if total_p95 is not None and observed_total is not None and observed_total > total_p95:
+        failures.append(f"total p95 {observed_total}s > {total_p95}s")
+    if error_rate is not None and overall["error_rate"] > error_rate:
+        failures.append(f"error rate {overall['error_rate']} > {error_rate}")
+    return failures
+
+
+def write_csv(path: str, results: List[RequestResult]) -> None:
+    """İstek başına bir satır; commit'ler arası karşılaştırma için ham veri."""
+    columns = list(RequestResult.__dataclass_fields__)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns)
+        writer.writeheader()
+        for result in sorted(results, key=lambda item: item.started_at):
+            row = asdict(result)
+            for key in ("started_at", "ttft", "total", "server_ttft", "server_total"):
+                if row[key] is not None:
+                    row[key] = round(row[key], 4)
+            writer.writerow(row)
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        kind, _, weight = item.partition("=")
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"bilinmeyen tür: {kind} ({', '.join(DEFAULT_MIX)})")
+        try:
+            mix[kind] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"geçersiz ağırlık: {item}")
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Eşzamanlı chat yük testi")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=100, help="Toplam simüle kullanıcı")
+    parser.add_argument("--rate", type=float, default=10.0, help="Kullanıcı varış hızı (kullanıcı/s, Poisson); 0 = hepsi aynı anda")
+    parser.add_argument("--concurrency", type=int, default=200, help="Aynı anda açık en fazla istek")
+    parser.add_argument("--turns", type=int, default=3, help="Session başına /chat/start sonrası tur sayısı")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Turlar arası ortalama bekleme (üstel)")
+    parser.add_argument("--mix", type=_parse_mix, default=dict(DEFAULT_MIX), help="followup=3,email=1,confirm=2,cancel=1")
+    parser.add_argument("--no-stream", action="store_true", help="stream=false ile JSON yanıt iste")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", help="Rapora yazılacak etiket (ör. commit hash)")
+    parser.add_argument("--json", dest="json_path", help="Raporu JSON dosyasına yaz")
+    parser.add_argument("--csv", dest="csv_path", help="İstek başına satırları CSV'ye yaz")
+    parser.add_argument("--slo-ttft-p95", type=float)
+    parser.add_argument("--slo-total-p95", type=float)
+    parser.add_argument("--slo-error-rate", type=float)
+    args = parser.parse_args()
+
+    config = LoadConfig(
+        base_url=args.base_url.rstrip("/"),
+        users=args.users,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        turns=args.turns,
+        think_ms=args.think_ms,
+        mix=args.mix,
+        stream=not args.no_stream,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    try:
+        run = asyncio.run(run_load(config))
+    except (httpx.HTTPError, KUAgentError) as e:
+        print(f"Sunucuya ulaşılamadı ({config.base_url}): {e}", file=sys.stderr)
+        sys.exit(2)
+
+    report = build_report(run, label=args.label)
+    failures = check_slos(report, args.slo_ttft_p95, args.slo_total_p95, args.slo_error_rate)
+    report["slo"] = {
+        "ttft_p95": args.slo_ttft_p95,
+        "total_p95": args.slo_total_p95,
+        "error_rate": args.slo_error_rate,
+        "passed": not failures,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+    if args.csv_path:
+        write_csv(args.csv_path, run.results)
+    if failures:
+        print("SLO violation: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
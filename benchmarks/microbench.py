@@ -0,0 +1,354 @@
+# benchmarks/microbench.py
+"""
+İstek hot path'i için mikro benchmark'lar.
+
+Her case `timeit` mantığıyla ölçülür: tekrar başına en az `--min-time` sürecek
+şekilde iterasyon sayısı kalibre edilir, `--repeat` kez çalıştırılır ve işlem
+başına medyan/minimum süre (ns) raporlanır. Ölçüm sırasında GC kapalıdır.
+
+Sonuçlar `benchmarks/baselines/microbench.json`'daki baseline ile karşılaştırılır;
+medyanı baseline'dan `--threshold` oranından fazla yavaşlayan case'ler regresyon
+sayılır ve çıkış kodu 1 olur. Baseline makineye özgüdür; referans makinede
+`--save` ile yazılır. Baseline dosyası yoksa veya bir case baseline'da yoksa
+karşılaştırma yapılamadığı uyarısı basılır; `--require-baseline` ile bu durum
+hata sayılır (çıkış kodu 2), CI'da kullanılmalıdır.
+
+Model çağrılmaz; settings'in Google alanları gerekmesin diye MODEL_PROVIDER
+verilmemişse mock kabul edilir.
+
+Kullanım:
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --filter sse --filter trailer
+    python -m benchmarks.microbench --save
+    python -m benchmarks.microbench --threshold 0.15 --json microbench.json
+    python -m benchmarks.microbench --require-baseline
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault("MODEL_PROVIDER", "mock")
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "microbench.json"
+DEFAULT_THRESHOLD = 0.10
+
+_REPLY = (
+    "Satınalma Yönetmeliği'nin 12. maddesine göre araç kiralama gibi hizmet alımlarında "
+    "en az üç tedarikçiden yazılı teklif alınması gerekir. Teklifler satınalma birimi "
+    "tarafından karşılaştırma tablosuna işlenir ve onay makamına sunulur. "
+) * 6
+_TRAILER = {
+    "email_intent": True,
+    "email_recipient_hint": "satinalma@example.com",
+    "email_subject_suggestion": "Araç kiralama teklif süreci",
+    "email_body_suggestion": "Merhaba, araç kiralama hizmet alımı için teklif süreci hakkında bilgi rica ederim.",
+}
+_MESSAGES = (
+    "Evet, gönder",
+    "Maili gönderebilirsin",
+    "Hayır gönderme, iptal et",
+    "Vazgeçtim",
+    "Araç kiralama için kaç teklif gerekir?",
+    "Bu konuda satınalma birimine bir mail taslağı hazırlar mısın?",
+    "Konuyu biraz daha kısa yaz ve tekrar göster",
+    "Onaylıyorum",
+)
+
+# Case: ad -> (setup, işlem sayısı). setup (op, teardown) döner; op bir çağrıda
+# "işlem sayısı" kadar iş yapar.
+Setup = Callable[[], Tuple[Callable[[], Any], Optional[Callable[[], None]]]]
+CASES: Dict[str, Tuple[Setup, int]] = {}
+
+
+def case(name: str, ops: int = 1) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        CASES[name] = (setup, ops)
+        return setup
+    return register
+
+
+# ==== Case'ler ====
+
+@case("sse_encode_content")
+def _sse_content():
+    from app.api.services import sse_event
+
+    payload = {"content": "Satınalma talebi için en az üç "}
+    return (lambda: sse_event(payload)), None
+
+
+@case("sse_encode_end")
+def _sse_end():
+    from app.api.services import sse_event
+
+    payload = {
+        "type": "end",
+        "metrics": {"first_token": 0.4123, "total": 2.8711},
+        "timings": {"validation": 0.41, "model_stream": 2871.1, "output_parse": 0.08, "total": 2890.5},
+        "email_intent": True,
+    }
+    return (lambda: sse_event(payload)), None
+
+
+@case("json_trailer_extract")
+def _trailer_extract():
+    from app.api.services import JSON_TRAILER_END, JSON_TRAILER_START, extract_json_trailer
+
+    text = f"{_REPLY}\n\n{JSON_TRAILER_START}\n{json.dumps(_TRAILER, ensure_ascii=False)}\n{JSON_TRAILER_END}"
+    return (lambda: extract_json_trailer(text)), None
+
+
+@case("json_trailer_absent")
+def _trailer_absent():
+    from app.api.services import extract_json_trailer
+
+    return (lambda: extract_json_trailer(_REPLY)), None
+
+
+@case("is_confirmation_message", ops=len(_MESSAGES))
+def _confirmation():
+    from app.api.services import is_confirmation_message
+
+    return (lambda: [is_confirmation_message(message) for message in _MESSAGES]), None
+
+
+@case("is_cancel_message", ops=len(_MESSAGES))
+def _cancel():
+    from app.api.services import is_cancel_message
+
+    return (lambda: [is_cancel_message(message) for message in _MESSAGES]), None
+
+
+@case("log_event", ops=1000)
+def _log_event():
+    """Kuyruğa bırakma + writer'ın diske yazması dahil, 1000 kayıtlık batch'ler."""
+    from app.utils import conversation_logger
+    from app.utils.conversation_logger import ConversationLogWriter, _PerSessionFileSink, log_event
+
+    logs_dir = Path(tempfile.mkdtemp(prefix="microbench-logs-"))
+    writer = ConversationLogWriter(
+        sink=_PerSessionFileSink(logs_dir=logs_dir, max_open_files=64),
+        queue_size=10000,
+        batch_size=256,
+        flush_interval=0.05,
+    )
+    previous, conversation_logger._writer = conversation_logger._writer, writer
+    loop = asyncio.new_event_loop()
+    sessions = [f"bench-session-{i}" for i in range(16)]
+    payload = {"agent_id": "satinalma-pdf-agent", "user_id": "bench", "message": _MESSAGES[4], "reply": _REPLY[:400]}
+
+    async def batch() -> None:
+        target = writer.written + 1000
+        for i in range(1000):
+            await log_event(session_id=sessions[i % len(sessions)], event="chat_message_response", payload=payload)
+        while writer.written < target:
+            await asyncio.sleep(0.001)
+
+    def teardown() -> None:
+        loop.run_until_complete(writer.stop())
+        loop.close()
+        conversation_logger._writer = previous
+        shutil.rmtree(logs_dir, ignore_errors=True)
+
+    return (lambda: loop.run_until_complete(batch())), teardown
+
+
+@case("chat_request_validate")
+def _chat_request():
+    from app.api.schemas import ChatMessageRequest
+
+    payload = {
+        "user_id": "bench-user-123",
+        "session_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+        "message": _MESSAGES[5],
+        "stream": True,
+    }
+    return (lambda: ChatMessageRequest.model_validate(payload)), None
+
+
+@case("satinalma_reply_dump")
+def _reply_dump():
+    from app.agents.satinalma_agent import SatinalmaReply
+
+    reply = SatinalmaReply(reply=_REPLY, **_TRAILER)
+    return (lambda: reply.model_dump()), None
+
+
+@case("extract_agent_reply")
+def _extract_reply():
+    from app.agents.satinalma_agent import SatinalmaReply
+    from app.api.services import extract_agent_reply
+    from app.configs.agent_ids import AgentID
+
+    reply = SatinalmaReply(reply=_REPLY, **_TRAILER)
+    run = SimpleNamespace(output=reply, content=reply)
+    agent_id = AgentID.SATINALMA_PDF.value
+    return (lambda: extract_agent_reply(run, agent_id)), None
+
+
+# ==== Ölçüm ====
+
+def _time(op: Callable[[], Any], number: int) -> int:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            op()
+        return time.perf_counter_ns() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure(name: str, repeat: int, min_time: float) -> Dict[str, Any]:
+    """Case'i kalibre edip `repeat` kez ölçer; işlem başına ns döner."""
+    setup, ops = CASES[name]
+    op, teardown = setup()
+    try:
+        op()  # ısınma (import, lazy init)
+        number = 1
+        while True:
+            elapsed = _time(op, number)
+            if elapsed >= min_time * 1e9 or number >= 1_000_000:
+                break
+            number = max(number * 2, int(number * min_time * 1e9 / max(elapsed, 1) * 1.1))
+        samples = [_time(op, number) / (number * ops) for _ in range(repeat)]
+    finally:
+        if teardown is not None:
+            teardown()
+    return {
+        "median_ns": round(statistics.median(samples), 1),
+        "min_ns": round(min(samples), 1),
+        "stdev_ns": round(statistics.stdev(samples), 1) if len(samples) > 1 else 0.0,
+        "iterations": number * ops,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> Dict[str, Dict[str, Any]]:
+    """Medyanları baseline ile karşılaştırır; status: regression / improved / ok / new."""
+    reference = baseline.get("results", {})
+    report: Dict[str, Dict[str, Any]] = {}
+    for name, result in results.items():
+        base = reference.get(name)
+        if not base:
+            report[name] = {"status": "new"}
+            continue
+        ratio = result["median_ns"] / base["median_ns"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        report[name] = {"status": status, "baseline_ns": base["median_ns"], "ratio": round(ratio, 3)}
+    return report
+
+
+def _metadata() -> Dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def _print_table(results: Dict[str, Dict[str, Any]], comparison: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    print(f"{'case':<26} {'median ns/op':>14} {'min ns/op':>12} {'baseline':>12} {'ratio':>7}  status", file=sys.stderr)
+    for name, result in results.items():
+        row = (comparison or {}).get(name, {})
+        baseline = f"{row['baseline_ns']:.1f}" if "baseline_ns" in row else "-"
+        ratio = f"{row['ratio']:.3f}" if "ratio" in row else "-"
+        print(
+            f"{name:<26} {result['median_ns']:>14.1f} {result['min_ns']:>12.1f} {baseline:>12} {ratio:>7}  {row.get('status', '-')}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hot path mikro benchmark'ları")
+    parser.add_argument("--filter", action="append", help="Ada göre alt dize filtresi (tekrarlanabilir)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Tekrar başına en az süre (s)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Regresyon eşiği (0.10 = %%10 yavaşlama)")
+    parser.add_argument("--save", action="store_true", help="Sonuçları baseline olarak yaz")
+    parser.add_argument(
+        "--require-baseline",
+        action="store_true",
+        help="Baseline yoksa veya bir case baseline'da yoksa hata ver (çıkış kodu 2)",
+    )
+    parser.add_argument("--json", dest="json_path", help="Raporu JSON dosyasına yaz")
+    parser.add_argument("--list", action="store_true", help="Case'leri listele")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(CASES))
+        return
+    names: List[str] = [
+        name for name in CASES if not args.filter or any(pattern in name for pattern in args.filter)
+    ]
+    if not names:
+        parser.error("filtre hiçbir case ile eşleşmedi")
+    if not args.baseline.exists() and not args.save:
+        message = f"baseline bulunamadı: {args.baseline}; regresyon kontrolü yapılamaz (referans makinede --save ile oluşturun)"
+        if args.require_baseline:
+            parser.error(message)
+        print(f"UYARI: {message}", file=sys.stderr)
+
+    results = {name: measure(name, args.repeat, args.min_time) for name in names}
+    baseline: Dict[str, Any] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    comparison = compare(results, baseline, args.threshold) if baseline else None
+
+    report = {
+        "meta": _metadata(),
+        "threshold": args.threshold,
+        "baseline": str(args.baseline) if baseline else None,
+        "results": results,
+        "comparison": comparison,
+    }
+    _print_table(results, comparison)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.json_path:
+        Path(args.json_path).write_text(text, encoding="utf-8")
+
+    if args.save:
+        merged = dict(baseline.get("results", {}))
+        merged.update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps({"meta": _metadata(), "results": merged}, indent=2), encoding="utf-8"
+        )
+        print(f"Baseline yazıldı: {args.baseline}", file=sys.stderr)
+        return
+
+    unbaselined = [name for name, row in (comparison or {}).items() if row["status"] == "new"]
+    if unbaselined:
+        print("UYARI: baseline'da olmayan case'ler karşılaştırılmadı: " + ", ".join(unbaselined), file=sys.stderr)
+        if args.require_baseline:
+            sys.exit(2)
+    regressions = [name for name, row in (comparison or {}).items() if row["status"] == "regression"]
+    if regressions:
+        print("Performance regression: " + ", ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
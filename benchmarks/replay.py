@@ -0,0 +1,416 @@
+# benchmarks/replay.py
+"""
+Kayıtlı konuşma loglarından trafik tekrarı (replay).
+
+`data/conversations` altındaki loglardan (session başına JSONL veya segmentli
+depo) `start_chat_request` / `chat_message_request` kayıtlarını okuyup session
+başına tur dizilerini kurar ve hedef sunucuya tekrar oynatır:
+
+- Session içinde turlar sırayla gider (bir tur bitmeden sonraki başlamaz)
+- Session'lar birbirinden bağımsız, eşzamanlı çalışır (`--concurrency` sınırlı)
+- `--speed 1` kayıttaki zamanlamayla, `--speed 10` 10 kat hızlı,
+  `--speed 0` beklemeden (maksimum hız) oynatır
+
+Her tur için kayıttaki latency (`*_response` / `*_stream_metrics` event'lerindeki
+`first_token_latency` ve `total_latency`) ile replay'de ölçülen süre
+karşılaştırılır. Stream turlarında sunucunun `end` event'indeki model süreleri,
+diğerlerinde istemci toplam süresi kullanılır. Stream modu kayıttan çıkarılır
+(`--stream on/off` ile zorlanabilir).
+
+Kayıtta `start_chat_request` olmayan (log'u ortadan başlayan) session'lar atlanır.
+Sonraki turlar replay'de açılan yeni session'a ve routing'in atadığı agent'a gider.
+
+Her kayıtlı session `--user-prefix` altında kendi kullanıcı id'siyle
+(`<prefix><kayıttaki user_id>-<session>`) oynatılır. Logların çoğu aynı
+kullanıcı id'siyle kaydedildiğinden, aksi halde tüm trafik tek kullanıcının
+hız limitine ve adil kuyruğuna düşer ve replay 429'a döner.
+
+Kullanım:
+    python -m benchmarks.replay --speed 0
+    python -m benchmarks.replay --speed 5 --concurrency 100 --json replay.json --csv replay.csv
+    python -m benchmarks.replay --source segmented --since 2025-12-01 --limit-sessions 200
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.client import KUAgentClient, KUAgentError
+from app.utils.conversation_store import iter_segment_entries, list_segments
+from benchmarks.load_test import RequestResult, _client, _distribution, _send
+
+REQUEST_EVENTS = {"start_chat_request": "start_chat", "chat_message_request": "chat_message"}
+RESPONSE_EVENTS = {
+    "start_chat_response": ("start_chat", False),
+    "start_chat_stream_metrics": ("start_chat", True),
+    "chat_message_response": ("chat_message", False),
+    "chat_message_stream_metrics": ("chat_message", True),
+}
+
+
+@dataclass
+class ReplayTurn:
+    kind: str
+    offset: float
+    user_id: str
+    message: str
+    agent_id: Optional[str] = None
+    stream: bool = False
+    recorded_ttft: Optional[float] = None
+    recorded_total: Optional[float] = None
+
+
+@dataclass
+class ReplaySession:
+    session_id: str
+    started_at: float
+    turns: List[ReplayTurn] = field(default_factory=list)
+
+
+def _to_epoch(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _iter_log_entries(logs_dir: Path, source: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(session_id, kayıt) çiftlerini döner; format `source` ile seçilir."""
+    if source == "segmented":
+        for path in list_segments(logs_dir / "segments"):
+            for _, entry in iter_segment_entries(path):
+                yield entry.get("session_id", ""), entry
+    else:
+        for path in sorted(logs_dir.glob("*.jsonl")):
+            for _, entry in iter_segment_entries(path):
+                yield path.stem, entry
+
+
+def load_sessions(
+    logs_dir: Path,
+    source: str,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+) -> Tuple[List[ReplaySession], int]:
+    """
+    Loglardan replay edilecek session'ları kurar.
+
+    Args:
+        logs_dir: Konuşma log dizini
+        source: "per_session" veya "segmented"
+        since / until: Session başlangıcı için epoch aralığı
+
+    Returns:
+        Tuple[List[ReplaySession], int]: Başlangıca göre sıralı session'lar ve
+        `start_chat_request` içermediği için atlanan session sayısı
+    """
+    events: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+    for session_id, entry in _iter_log_entries(logs_dir, source):
+        ts = _to_epoch(entry.get("timestamp"))
+        if session_id and ts is not None:
+            events.setdefault(session_id, []).append((ts, entry))
+
+    sessions: List[ReplaySession] = []
+    skipped = 0
+    for session_id, entries in events.items():
+        entries.sort(key=lambda item: item[0])
+        first_ts, first = entries[0]
+        if first.get("event") != "start_chat_request":
+            skipped += 1
+            continue
+        if (since is not None and first_ts < since) or (until is not None and first_ts >= until):
+            continue
+        session = ReplaySession(session_id=session_id, started_at=first_ts)
+        pending: Optional[ReplayTurn] = None
+        for ts, entry in entries:
+            event = entry.get("event", "")
+            payload = entry.get("payload") or {}
+            if event in REQUEST_EVENTS and payload.get("message"):
+                pending = ReplayTurn(
+                    kind=REQUEST_EVENTS[event],
+                    offset=ts - first_ts,
+                    user_id=payload.get("user_id") or "replay",
+                    message=payload["message"],
+                    agent_id=payload.get("agent_id"),
+                )
+                session.turns.append(pending)
+            elif event in RESPONSE_EVENTS and pending is not None and pending.kind == RESPONSE_EVENTS[event][0]:
+                pending.stream = RESPONSE_EVENTS[event][1]
+                pending.recorded_ttft = payload.get("first_token_latency")
+                pending.recorded_total = payload.get("total_latency")
+                pending = None
+        if session.turns:
+            sessions.append(session)
+    sessions.sort(key=lambda item: item.started_at)
+    return sessions, skipped
+
+
+# ==== Replay ====
+
+@dataclass
+class ReplayConfig:
+    base_url: str
+    speed: float
+    concurrency: int
+    stream: str
+    user_prefix: str
+    timeout: float
+
+
+@dataclass
+class ReplayRecord:
+    session_id: str
+    turn: int
+    recorded: ReplayTurn
+    result: RequestResult
+
+    def replayed_total(self) -> Optional[float]:
+        # Kayıttaki süreler sunucu tarafında ölçülür; stream turlarında aynı ölçüm `end` event'inde gelir
+        if self.result.stream and self.result.server_total is not None:
+            return self.result.server_total
+        return self.result.total
+
+    def replayed_ttft(self) -> Optional[float]:
+        if self.result.stream and self.result.server_ttft is not None:
+            return self.result.server_ttft
+        return self.result.ttft
+
+
+async def _replay_session(
+    client: KUAgentClient,
+    config: ReplayConfig,
+    session: ReplaySession,
+    index: int,
+    clock_start: float,
+    first_started_at: float,
+    semaphore: asyncio.Semaphore,
+    records: List[ReplayRecord],
+) -> None:
+    session_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    base_offset = session.started_at - first_started_at
+    for number, turn in enumerate(session.turns):
+        if config.speed > 0:
+            delay = (base_offset + turn.offset) / config.speed - (time.perf_counter() - clock_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        stream = turn.stream if config.stream == "auto" else config.stream == "on"
+        user_id = f"{config.user_prefix}{turn.user_id}-{session.session_id}"
+        if turn.kind == "start_chat":
+            endpoint = "/api/chat/start"
+            payload: Dict[str, Any] = {"user_id": user_id, "message": turn.message, "stream": stream}
+        else:
+            if session_id is None or agent_id is None:
+                return
+            endpoint = f"/api/chat/agents/{agent_id}"
+            payload = {"user_id": user_id, "session_id": session_id, "message": turn.message, "stream": stream}
+        result = RequestResult(
+            user=index,
+            kind=turn.kind,
+            endpoint=endpoint,
+            started_at=time.perf_counter() - clock_start,
+            session_id=session_id,
+        )
+        async with semaphore:
+            await _send(client, result, payload)
+        records.append(ReplayRecord(session_id=session.session_id, turn=number, recorded=turn, result=result))
+        if turn.kind == "start_chat":
+            if not result.ok:
+                return
+            session_id, agent_id = result.session_id, result.agent_id
+
+
+async def replay(config: ReplayConfig, sessions: List[ReplaySession]) -> Tuple[List[ReplayRecord], float]:
+    """Tüm session'ları oynatır; kayıtları ve geçen süreyi döner."""
+    records: List[ReplayRecord] = []
+    semaphore = asyncio.Semaphore(config.concurrency)
+    async with _client(config.base_url, config.concurrency, config.timeout) as client:
+        await client.health()
+        first_started_at = sessions[0].started_at
+        clock_start = time.perf_counter()
+        await asyncio.gather(*(
+            _replay_session(client, config, session, index, clock_start, first_started_at, semaphore, records)
+            for index, session in enumerate(sessions)
+        ))
+        elapsed = time.perf_counter() - clock_start
+    return records, elapsed
+
+
+# ==== Rapor ====
+
+def _summarize(records: List[ReplayRecord], elapsed: float) -> Dict[str, Any]:
+    ok = [record for record in records if record.result.ok]
+    pairs_total = [
+        (record.replayed_total(), record.recorded.recorded_total)
+        for record in ok
+        if record.replayed_total() is not None and record.recorded.recorded_total is not None
+    ]
+    pairs_ttft = [
+        (record.replayed_ttft(), record.recorded.recorded_ttft)
+        for record in ok
+        if record.result.stream and record.replayed_ttft() is not None and record.recorded.recorded_ttft is not None
+    ]
+    errors: Dict[str, int] = {}
+    for record in records:
+        if not record.result.ok:
+            key = record.result.error.split(":", 1)[0] if record.result.error else f"HTTP {record.result.status}"
+            errors[key] = errors.get(key, 0) + 1
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(records), 4) if records else 0.0,
+        "errors": errors,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else None,
+        "message_chars": _distribution([float(len(record.recorded.message)) for record in records]),
+        "replayed_total_seconds": _distribution([replayed for replayed, _ in pairs_total]),
+        "recorded_total_seconds": _distribution([recorded for _, recorded in pairs_total]),
+        "delta_total_seconds": _distribution([replayed - recorded for replayed, recorded in pairs_total]),
+        "replayed_ttft_seconds": _distribution([replayed for replayed, _ in pairs_ttft]),
+        "recorded_ttft_seconds": _distribution([recorded for _, recorded in pairs_ttft]),
+        "delta_ttft_seconds": _distribution([replayed - recorded for replayed, recorded in pairs_ttft]),
+        "compared": {"total": len(pairs_total), "ttft": len(pairs_ttft)},
+    }
+
+
+def build_report(
+    config: ReplayConfig,
+    sessions: List[ReplaySession],
+    skipped: int,
+    records: List[ReplayRecord],
+    elapsed: float,
+    label: Optional[str] = None,
+) -> Dict[str, Any]:
+    by_kind: Dict[str, List[ReplayRecord]] = {}
+    for record in records:
+        by_kind.setdefault(record.recorded.kind, []).append(record)
+    recorded_span = sessions[-1].started_at + sessions[-1].turns[-1].offset - sessions[0].started_at
+    return {
+        "label": label,
+        "config": asdict(config),
+        "sessions": len(sessions),
+        "skipped_sessions": skipped,
+        "turns": sum(len(session.turns) for session in sessions),
+        "recorded_span_seconds": round(recorded_span, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": _summarize(records, elapsed),
+        "by_kind": {kind: _summarize(items, elapsed) for kind, items in sorted(by_kind.items())},
+    }
+
+
+def write_csv(path: str, records: List[ReplayRecord]) -> None:
+    columns = [
+        "session_id", "turn", "kind", "stream", "status", "ok", "error", "message_chars",
+        "recorded_ttft", "replayed_ttft", "recorded_total", "replayed_total", "client_total",
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns)
+        writer.writeheader()
+        for record in sorted(records, key=lambda item: item.result.started_at):
+            result = record.result
+            values = {
+                "recorded_ttft": record.recorded.recorded_ttft,
+                "replayed_ttft": record.replayed_ttft(),
+                "recorded_total": record.recorded.recorded_total,
+                "replayed_total": record.replayed_total(),
+                "client_total": result.total,
+            }
+            writer.writerow({
+                "session_id": record.session_id,
+                "turn": record.turn,
+                "kind": record.recorded.kind,
+                "stream": result.stream,
+                "status": result.status,
+                "ok": result.ok,
+                "error": result.error,
+                "message_chars": len(record.recorded.message),
+                **{key: round(value, 4) if value is not None else None for key, value in values.items()},
+            })
+
+
+def _parse_date(value: str) -> float:
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"geçersiz tarih: {value} (YYYY-MM-DD veya ISO 8601)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Konuşma loglarından trafik replay'i")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logs-dir", type=Path, help="Log dizini (varsayılan: CONVERSATION_LOGS_DIR)")
+    parser.add_argument(
+        "--source",
+        choices=["per_session", "segmented"],
+        help="Log formatı (varsayılan: CONVERSATION_LOG_STORAGE)",
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = kayıttaki hız, 10 = 10 kat hızlı, 0 = beklemeden")
+    parser.add_argument("--concurrency", type=int, default=100, help="Aynı anda açık en fazla istek")
+    parser.add_argument("--stream", choices=["auto", "on", "off"], default="auto", help="auto: kayıttaki mod")
+    parser.add_argument(
+        "--user-prefix",
+        default="replay-",
+        help="Kota/usage kayıtlarını gerçek kullanıcılardan ayırmak için; session başına ayrı kullanıcı id'si üretilir",
+    )
+    parser.add_argument("--since", type=_parse_date)
+    parser.add_argument("--until", type=_parse_date)
+    parser.add_argument("--limit-sessions", type=int)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--label", help="Rapora yazılacak etiket (ör. commit hash)")
+    parser.add_argument("--json", dest="json_path", help="Raporu JSON dosyasına yaz")
+    parser.add_argument("--csv", dest="csv_path", help="Tur başına satırları CSV'ye yaz")
+    args = parser.parse_args()
+
+    # Varsayılanlar sadece ilgili ayar grupları okunarak çözülür; istemci model
+    # ve agent ayarlarına ihtiyaç duymaz
+    if args.logs_dir is None:
+        from app.configs.settings import MailSettings
+
+        args.logs_dir = Path(MailSettings().conversation_logs_dir)
+    if args.source is None:
+        from app.configs.settings import ConversationLogSettings
+
+        args.source = ConversationLogSettings().conversation_log_storage
+
+    sessions, skipped = load_sessions(args.logs_dir, args.source, since=args.since, until=args.until)
+    if args.limit_sessions:
+        sessions = sessions[: args.limit_sessions]
+    if not sessions:
+        print(f"Replay edilecek session bulunamadı ({args.logs_dir}, {args.source})", file=sys.stderr)
+        sys.exit(2)
+
+    config = ReplayConfig(
+        base_url=args.base_url.rstrip("/"),
+        speed=args.speed,
+        concurrency=args.concurrency,
+        stream=args.stream,
+        user_prefix=args.user_prefix,
+        timeout=args.timeout,
+    )
+    try:
+        records, elapsed = asyncio.run(replay(config, sessions))
+    except (httpx.HTTPError, KUAgentError) as e:
+        print(f"Sunucuya ulaşılamadı ({config.base_url}): {e}", file=sys.stderr)
+        sys.exit(2)
+
+    report = build_report(config, sessions, skipped, records, elapsed, label=args.label)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+    if args.csv_path:
+        write_csv(args.csv_path, records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/sqlite_contention.py
+"""
+SQLite session DB contention benchmark.
+
+N eşzamanlı session'ın agno'nun yazma desenini (session satırını oku, runs
+JSON'una yeni run ekle, satırı yeniden yaz) taklit ederek `agent_sessions.db`
+üzerinde yazma throughput'unu ve kilit bekleme süresini ölçer. Her session
+ayrı bir bağlantı/thread kullanır (connection pool'daki gibi).
+
+`--layout runs` ile run'lar `agno_session_runs` tablosuna satır satır eklenir
+(bkz. `app/db/run_store.py`); turn başına maliyet session uzunluğundan bağımsızdır.
+`--shards K` ile session'lar consistent hash ile K dosyaya dağıtılır
+(bkz. `app/db/sharding.py`).
+
+Varsayılan olarak DB'nin geçici bir kopyası üzerinde çalışır.
+
+Kullanım:
+    python -m benchmarks.sqlite_contention --sessions 32 --turns 20
+    python -m benchmarks.sqlite_contention --profile default --profile tuned
+    python -m benchmarks.sqlite_contention --profile tuned --layout runs
+    python -m benchmarks.sqlite_contention --profile tuned --layout runs --shards 4
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+from app.db.hash_ring import HashRing, shard_file
+from app.db.pragmas import sqlite_pragmas
+from app.db.run_schema import RUNS_DDL, RUNS_TABLE
+
+PROFILES = {
+    # SQLite varsayılanları (rollback journal, FULL sync, busy_timeout yok)
+    "default": ["PRAGMA journal_mode=DELETE", "PRAGMA synchronous=FULL"],
+    "tuned": sqlite_pragmas(),
+}
+
+_RUN_TEMPLATE = {
+    "agent_id": "satinalma-pdf-agent",
+    "content": "Satınalma talebi için en az üç teklif alınmalıdır. " * 20,
+    "messages": [{"role": "user", "content": "Araç kiralama için kaç teklif gerekir?"}] * 4,
+    "metrics": {"input_tokens": 400, "output_tokens": 600, "total_tokens": 1000},
+}
+
+
+def _session_worker(
+    db_path: str,
+    session_id: str,
+    pragmas: List[str],
+    layout: str,
+    turns: int,
+    barrier: threading.Barrier,
+    results: List[Dict[str, Any]],
+) -> None:
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    for pragma in pragmas:
+        conn.execute(pragma)
+    now = int(time.time())
+    lock_waits: List[float] = []
+    busy_errors = 0
+    barrier.wait()
+
+    for turn in range(turns):
+        run = dict(_RUN_TEMPLATE, run_id=str(uuid.uuid4()), session_id=session_id)
+        while True:
+            started = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError:
+                busy_errors += 1
+                time.sleep(0.001)
+        lock_waits.append(time.perf_counter() - started)
+        if layout == "runs":
+            conn.execute(
+                f"INSERT INTO {RUNS_TABLE} (session_id, run_index, run_id, agent_id, run_hash, run_data, created_at)"
+                " VALUES (?, ?, ?, ?, '', ?, ?)",
+                (session_id, turn, run["run_id"], run["agent_id"], json.dumps(run), now + turn),
+            )
+            runs_value = None
+        else:
+            row = conn.execute(
+                "SELECT runs FROM agno_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            runs = json.loads(json.loads(row[0])) if row and row[0] else []
+            runs.append(run)
+            runs_value = json.dumps(json.dumps(runs))
+        conn.execute(
+            "INSERT INTO agno_sessions (session_id, session_type, agent_id, user_id, runs, created_at, updated_at)"
+            " VALUES (?, 'agent', ?, 'bench', ?, ?, ?)"
+            " ON CONFLICT(session_id) DO UPDATE SET runs = excluded.runs, updated_at = excluded.updated_at",
+            (session_id, run["agent_id"], runs_value, now, now + turn),
+        )
+        conn.execute("COMMIT")
+    conn.close()
+    results.append({"lock_waits": lock_waits, "busy_errors": busy_errors})
+
+
+def _prepare_db(db_path: str, shard_path: str, pragmas: List[str], layout: str) -> None:
+    """Pragma'ları uygular; shard dosyasında ana DB'deki agno_sessions şemasını oluşturur."""
+    setup = sqlite3.connect(shard_path)
+    for pragma in pragmas:
+        setup.execute(pragma)
+    if shard_path != db_path:
+        source = sqlite3.connect(db_path)
+        (schema,) = source.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'agno_sessions'"
+        ).fetchone()
+        source.close()
+        setup.execute(schema.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1))
+    if layout == "runs":
+        for statement in RUNS_DDL:
+            setup.execute(statement)
+    setup.commit()
+    setup.close()
+
+
+def run_profile(
+    db_path: str,
+    profile: str,
+    sessions: int,
+    turns: int,
+    layout: str = "blob",
+    shards: int = 1,
+) -> Dict[str, Any]:
+    """Tek bir pragma profiliyle benchmark'ı çalıştırır."""
+    pragmas = PROFILES[profile]
+    for index in range(shards):
+        _prepare_db(db_path, shard_file(db_path, index), pragmas, layout)
+
+    ring = HashRing(shards)
+    results: List[Dict[str, Any]] = []
+    barrier = threading.Barrier(sessions + 1)
+    threads = []
+    for _ in range(sessions):
+        session_id = str(uuid.uuid4())
+        session_db = shard_file(db_path, ring.shard_for(session_id))
+        threads.append(
+            threading.Thread(
+                target=_session_worker,
+                args=(session_db, session_id, pragmas, layout, turns, barrier, results),
+            )
+        )
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    waits = sorted(w for r in results for w in r["lock_waits"])
+    writes = len(waits)
+    return {
+        "profile": profile,
+        "layout": layout,
+        "shards": shards,
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "writes": writes,
+        "elapsed_seconds": round(elapsed, 3),
+        "writes_per_second": round(writes / elapsed, 1) if elapsed else None,
+        "lock_wait_total_seconds": round(sum(waits), 3),
+        "lock_wait_p50_ms": round(statistics.median(waits) * 1000, 3) if waits else None,
+        "lock_wait_p99_ms": round(waits[int(len(waits) * 0.99) - 1] * 1000, 3) if waits else None,
+        "busy_errors": sum(r["busy_errors"] for r in results),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite session DB contention benchmark")
+    parser.add_argument("--db", default="data/agent_sessions.db")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES))
+    parser.add_argument("--layout", choices=["blob", "runs"], default="blob")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--in-place", action="store_true", help="Kopya yerine DB'nin kendisini kullan")
+    args = parser.parse_args()
+
+    reports = []
+    for profile in args.profile or ["default", "tuned"]:
+        if args.in_place:
+            reports.append(run_profile(args.db, profile, args.sessions, args.turns, args.layout, args.shards))
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            copy_path = os.path.join(tmp, "agent_sessions.db")
+            shutil.copyfile(args.db, copy_path)
+            reports.append(run_profile(copy_path, profile, args.sessions, args.turns, args.layout, args.shards))
+
+    for report in reports:
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/startup_bench.py
+"""
+Startup (boot) süresi regresyon benchmark'ı.
+
+Her tekrar temiz bir process'te `import app.main` ve `create_app()` sürelerini
+ölçer; medyan değerler hedeflerin üzerindeyse çıkış kodu 1 olur (CI için).
+
+Hedefler:
+- `import app.main`: settings, model, DB ve AgentOS kurmadan < 0.5 s
+- `import app.main` + `create_app()`: < 3.0 s
+
+Kullanım:
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --target-import 0.5 --target-boot 3.0
+"""
+import argparse
+import json
+import statistics
+import sys
+from typing import Any, Dict, List
+
+from app.utils.startup_profile import measure_boot
+
+TARGET_IMPORT_SECONDS = 0.5
+TARGET_BOOT_SECONDS = 3.0
+
+
+def run(runs: int, build_app: bool = True) -> Dict[str, Any]:
+    """`runs` kez ölçer, faz başına medyan ve maksimum döner."""
+    samples: List[Dict[str, Any]] = [
+        measure_boot(build_app=build_app, importtime=False) for _ in range(runs)
+    ]
+    report: Dict[str, Any] = {"runs": runs}
+    for phase in ("import_seconds", "create_app_seconds", "total_seconds"):
+        values = [sample[phase] for sample in samples]
+        report[phase] = {
+            "median": round(statistics.median(values), 4),
+            "max": round(max(values), 4),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup süresi benchmark'ı")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-import", type=float, default=TARGET_IMPORT_SECONDS)
+    parser.add_argument("--target-boot", type=float, default=TARGET_BOOT_SECONDS)
+    parser.add_argument("--import-only", action="store_true", help="create_app() çağırma")
+    args = parser.parse_args()
+
+    report = run(args.runs, build_app=not args.import_only)
+    failures = []
+    if report["import_seconds"]["median"] > args.target_import:
+        failures.append(f"import {report['import_seconds']['median']}s > {args.target_import}s")
+    if not args.import_only and report["total_seconds"]["median"] > args.target_boot:
+        failures.append(f"boot {report['total_seconds']['median']}s > {args.target_boot}s")
+    report["targets"] = {"import_seconds": args.target_import, "boot_seconds": args.target_boot}
+    report["passed"] = not failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        print("Startup regression: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,95 @@
+import asyncio
+import json
 import os
 import sys
-import json
 from pathlib import Path
+from typing import Optional
 
-import requests
+from app.client import Content, EmailIntent, End, Error, KUAgentClient, KUAgentError, Session, SessionInfo
 
 
 class ChatCLI:
-    def __init__(self, base_url: str):
-        self.base_url = base_url.rstrip("/")
-        self.session_id = None
-        self.assigned_agent_id = None
-        self.user_id = None
+    def __init__(self, client: KUAgentClient):
+        self.client = client
+        self.session: Optional[Session] = None
 
-    def start_session(self, user_id: str, message: str, stream: bool = True):
-        url = f"{self.base_url}/api/chat/start"
-        payload = {"user_id": user_id, "message": message, "stream": stream}
-        
-        if stream:
-            resp = requests.post(url, json=payload, stream=True, timeout=30)
-            resp.raise_for_status()
-            
-            # Process stream to find session info and print content
-            print("Atanan agent: ", end="", flush=True) # Will be filled when session info arrives
-            
-            for line in resp.iter_lines():
-                if line:
-                    decoded_line = line.decode("utf-8")
-                    if decoded_line.startswith("data: "):
-                        data_str = decoded_line[6:]
-                        try:
-                            data = json.loads(data_str)
-                            
-                            if data.get("type") == "session_info":
-                                self.session_id = data["session_id"]
-                                self.assigned_agent_id = data["assigned_agent_id"]
-                                print(f"{data['assigned_agent_name']}\nCevap: ", end="", flush=True)
-                                
-                            elif "content" in data:
-                                print(data["content"], end="", flush=True)
-                                
-                            elif data.get("type") == "end":
-                                metrics = data.get("metrics", {})
-                                print(f"\n[Gecikme] İlk Token: {metrics.get('first_token', 0):.2f}s, Toplam: {metrics.get('total', 0):.2f}s")
-                                
-                            elif "error" in data:
-                                print(f"\nHata: {data['error']}")
-                                
-                        except json.JSONDecodeError:
-                            pass
-            print()
-            return {"session_id": self.session_id, "assigned_agent_id": self.assigned_agent_id}
-        else:
-            resp = requests.post(url, json=payload, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-            self.session_id = data["session_id"]
-            self.assigned_agent_id = data["assigned_agent_id"]
-            return data
+    async def _print_stream(self, stream, label: str) -> None:
+        print(label, end="", flush=True)
+        async for event in stream:
+            if isinstance(event, SessionInfo):
+                print(f"{event.agent_name}\nCevap: ", end="", flush=True)
+            elif isinstance(event, Content):
+                print(event.text, end="", flush=True)
+            elif isinstance(event, EmailIntent):
+                print(f"\n[Mail taslağı] Alıcı: {event.recipient_hint} | Konu: {event.subject_suggestion}", end="")
+            elif isinstance(event, End):
+                if stream.stream:
+                    print(f"\n[Gecikme] İlk Token: {event.first_token or 0:.2f}s, Toplam: {event.total or 0:.2f}s", end="")
+                if event.email_triggered:
+                    print("\nEmail bilgisi:", json.dumps(event.email_info, ensure_ascii=False), end="")
+            elif isinstance(event, Error):
+                print(f"\nHata: {event.message}", end="")
+        print()
 
-    def send_message(self, message: str, stream: bool = True):
-        if not self.session_id or not self.assigned_agent_id:
+    async def start_session(self, user_id: str, message: str) -> Session:
+        stream = self.client.start_stream(user_id, message)
+        # Agent adı session_info event'i gelince yazılır
+        await self._print_stream(stream, "Atanan agent: ")
+        if stream.session is None:
+            raise RuntimeError("Session başlatılamadı")
+        self.session = stream.session
+        return self.session
+
+    async def send_message(self, message: str) -> None:
+        if self.session is None:
             raise RuntimeError("Önce oturumu başlatın")
-        url = f"{self.base_url}/api/chat/agents/{self.assigned_agent_id}"
-        payload = {
-            "user_id": self.user_id,
-            "session_id": self.session_id,
-            "message": message,
-            "stream": stream,
-        }
-        resp = requests.post(url, json=payload, stream=stream, timeout=30)
-        resp.raise_for_status()
-        return resp
+        # Onay/iptal turlarında sunucu JSON döner; SDK bunu da event'lere çevirir
+        await self._print_stream(self.client.send_stream(self.session, message), "Agent: ")
 
     def conversation_log_path(self):
-        if not self.session_id:
+        if self.session is None:
             return None
         logs_dir = os.getenv("CONVERSATION_LOGS_DIR", "data/conversations")
-        return Path(logs_dir) / f"{self.session_id}.jsonl"
+        return Path(logs_dir) / f"{self.session.session_id}.jsonl"
 
 
-def main():
+async def run() -> None:
     base_url = os.getenv("CHAT_API_BASE_URL", "http://127.0.0.1:8000")
-    cli = ChatCLI(base_url)
     print(f"API: {base_url}")
     user_id = input("User ID: ").strip()
     if not user_id:
         print("User ID boş olamaz")
         sys.exit(1)
-    cli.user_id = user_id
     print("Çıkmak için ctrl+c veya boş mesaj")
+    async with KUAgentClient(base_url) as client:
+        cli = ChatCLI(client)
+        try:
+            initial = input("İlk mesaj: ").strip()
+            if not initial:
+                print("İlk mesaj boş olamaz")
+                return
+            await cli.start_session(user_id, initial)
+            log_path = cli.conversation_log_path()
+            if log_path:
+                print(f"Log dosyası: {log_path}")
+            while True:
+                msg = input("Mesaj: ").strip()
+                if not msg:
+                    print("Boş girdin, çıkış yapılıyor")
+                    break
+                await cli.send_message(msg)
+        except KUAgentError as api_err:
+            print("HTTP Hatası:", api_err.status, api_err.detail)
+        except Exception as exc:
+            print("Hata:", exc)
+
+
+def main():
     try:
-        initial = input("İlk mesaj: ").strip()
-        if not initial:
-            print("İlk mesaj boş olamaz")
-            return
-        start_data = cli.start_session(user_id, initial)
-        # print("Atanan agent:", start_data["assigned_agent_name"]) # Handled in start_session
-        # print("Cevap:", start_data["reply"]) # Handled in start_session
-        log_path = cli.conversation_log_path()
-        if log_path:
-            print(f"Log dosyası: {log_path}")
-        while True:
-            msg = input("Mesaj: ").strip()
-            if not msg:
-                print("Boş girdin, çıkış yapılıyor")
-                break
-            
-            response = cli.send_message(msg)
-            
-            # Check content type to decide how to handle response
-            content_type = response.headers.get("content-type", "")
-            
-            if "text/event-stream" in content_type:
-                print("Agent: ", end="", flush=True)
-                for line in response.iter_lines():
-                    if line:
-                        decoded_line = line.decode("utf-8")
-                        if decoded_line.startswith("data: "):
-                            data_str = decoded_line[6:]
-                            try:
-                                data = json.loads(data_str)
-                                if "content" in data:
-                                    print(data["content"], end="", flush=True)
-                                elif data.get("type") == "end":
-                                    metrics = data.get("metrics", {})
-                                    print(f"\n[Gecikme] İlk Token: {metrics.get('first_token', 0):.2f}s, Toplam: {metrics.get('total', 0):.2f}s")
-                                elif "error" in data:
-                                    print(f"\nHata: {data['error']}")
-                            except json.JSONDecodeError:
-                                pass
-                print()
-            else:
-                data = response.json()
-                print("Agent:", data["reply"])
-                if data.get("email_triggered"):
-                    print("Email bilgisi:", json.dumps(data.get("email_info"), ensure_ascii=False))
+        asyncio.run(run())
     except KeyboardInterrupt:
         print("\nÇıkış yapıldı")
-    except requests.HTTPError as http_err:
-        print("HTTP Hatası:", http_err.response.status_code, http_err.response.text)
-    except Exception as exc:
-        print("Hata:", exc)
 
 
 if __name__ == "__main__":
     main()
-
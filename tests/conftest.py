@@ -0,0 +1,14 @@
+# tests/conftest.py
+"""
+Test ortamı: ağ ve Google kimlik bilgisi gerektirmeyen minimum ayarlar.
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("MODEL_PROVIDER", "mock")
+os.environ.setdefault("OS_SECURITY_KEY", "test-security-key")
+os.environ.setdefault("SATINALMA_AGENT_INSTRUCTIONS", "test")
+os.environ.setdefault("ORCHESTRATOR_AGENT_INSTRUCTIONS", "test")
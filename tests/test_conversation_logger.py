@@ -0,0 +1,55 @@
+# tests/test_conversation_logger.py
+"""
+ConversationLogWriter'ın farklı event loop'larda (ör. ardışık asyncio.run) çalışması.
+"""
+import asyncio
+import json
+from typing import List
+
+from app.utils.conversation_logger import ConversationLogWriter, LogEntry
+
+
+class _MemorySink:
+    def __init__(self):
+        self.entries: List[LogEntry] = []
+        self.closed = 0
+        self.open_files = 0
+
+    def write_batch(self, entries: List[LogEntry], fsync: bool) -> None:
+        self.entries.extend(entries)
+
+    def sync(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self.closed += 1
+
+
+def test_writer_follows_the_running_event_loop():
+    sink = _MemorySink()
+    writer = ConversationLogWriter(sink, queue_size=10, batch_size=10, flush_interval=0.01)
+
+    async def first_loop() -> None:
+        assert writer.submit("s1", {"turn": 1})
+        # Loop writer durdurulmadan kapanır
+        await asyncio.wait_for(writer._queue.join(), timeout=1)
+
+    async def second_loop() -> None:
+        assert writer.submit("s1", {"turn": 2})
+        await writer.stop()
+
+    asyncio.run(first_loop())
+    asyncio.run(second_loop())
+
+    assert [json.loads(line)["turn"] for _, line in sink.entries] == [1, 2]
+    assert sink.closed == 1
+    assert writer.dropped == 0
+
+    # stop sonrası aynı loop'ta yeniden başlayabilir
+    async def third_loop() -> None:
+        await writer.start()
+        assert writer.submit("s1", {"turn": 3})
+        await writer.stop()
+
+    asyncio.run(third_loop())
+    assert [json.loads(line)["turn"] for _, line in sink.entries] == [1, 2, 3]
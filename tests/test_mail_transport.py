@@ -0,0 +1,224 @@
+# tests/test_mail_transport.py
+"""
+SmtpMailTransport'un aiosmtpd'ye karşı testleri.
+
+Her test, kendi portunda çalışan bir aiosmtpd Controller'ı başlatır; handler
+gelen envelope'ları kaydeder ve istenen aşamada hata döndürebilir.
+"""
+import asyncio
+import socket
+from typing import Callable, List, Optional
+
+import pytest
+
+pytest.importorskip("aiosmtplib")
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app.configs.exceptions import MailServiceError  # noqa: E402
+from app.tools.mail_transport import (  # noqa: E402
+    MailDraft,
+    SmtpConnectionPool,
+    SmtpMailTransport,
+    TokenBucket,
+)
+
+
+class RecordingHandler:
+    """Teslim edilen envelope'ları ve açılan SMTP oturumlarını kaydeder."""
+
+    def __init__(self, reject_data: Optional[Callable[[List[str]], Optional[str]]] = None):
+        self.reject_data = reject_data
+        self.delivered: List[List[str]] = []
+        self.data_calls = 0
+        self.sessions = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        self.sessions.add(id(session))
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("refused"):
+            return "550 5.1.1 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.data_calls += 1
+        if self.reject_data is not None:
+            reply = self.reject_data(list(envelope.rcpt_tos))
+            if reply:
+                return reply
+        self.delivered.append(list(envelope.rcpt_tos))
+        return "250 Message accepted for delivery"
+
+    def recipients(self) -> List[str]:
+        return [address for envelope in self.delivered for address in envelope]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler: RecordingHandler):
+        controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+        controller.start()
+        servers.append(controller)
+        return controller
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+
+def _transport(controller, batch_size: int = 50) -> SmtpMailTransport:
+    pool = SmtpConnectionPool(
+        host=controller.hostname,
+        port=controller.port,
+        size=2,
+        start_tls=False,
+        timeout=5.0,
+    )
+    return SmtpMailTransport(pool=pool, limiter=TokenBucket(rate=0, burst=1), batch_size=batch_size)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_recipients_are_split_into_envelope_batches(smtp_server):
+    handler = RecordingHandler()
+    transport = _transport(smtp_server(handler), batch_size=2)
+    draft = MailDraft(to="a@x.com, b@x.com, c@x.com", cc="d@x.com; e@x.com", subject="s", body="b")
+
+    async def scenario():
+        try:
+            return await transport.send(draft)
+        finally:
+            await transport.close()
+
+    assert _run(scenario()) == "EMAIL_SENT"
+    assert sorted(len(envelope) for envelope in handler.delivered) == [1, 2, 2]
+    assert sorted(handler.recipients()) == ["a@x.com", "b@x.com", "c@x.com", "d@x.com", "e@x.com"]
+
+
+def test_pooled_connection_is_reused(smtp_server):
+    handler = RecordingHandler()
+    transport = _transport(smtp_server(handler))
+
+    async def scenario():
+        try:
+            for index in range(3):
+                await transport.send(MailDraft(to="a@x.com", subject=f"s{index}", body="b"))
+        finally:
+            await transport.close()
+
+    _run(scenario())
+    assert len(handler.delivered) == 3
+    assert len(handler.sessions) == 1
+
+
+def test_permanent_failure_is_not_retried(smtp_server):
+    handler = RecordingHandler(reject_data=lambda rcpts: "554 5.6.0 message rejected")
+    transport = _transport(smtp_server(handler))
+
+    async def scenario():
+        try:
+            await transport.send(MailDraft(to="a@x.com", subject="s", body="b"))
+        finally:
+            await transport.close()
+
+    with pytest.raises(MailServiceError):
+        _run(scenario())
+    assert handler.data_calls == 1
+    assert handler.delivered == []
+
+
+def test_refused_recipient_is_reported(smtp_server):
+    handler = RecordingHandler()
+    transport = _transport(smtp_server(handler))
+
+    async def scenario():
+        try:
+            await transport.send(MailDraft(to="a@x.com, refused@x.com", subject="s", body="b"))
+        finally:
+            await transport.close()
+
+    with pytest.raises(MailServiceError) as excinfo:
+        _run(scenario())
+    assert "1/2" in excinfo.value.message
+    assert handler.recipients() == ["a@x.com"]
+
+
+def test_resend_after_partial_failure_skips_delivered_batches(smtp_server):
+    failures = {"b@x.com": 1}
+
+    def reject_once(rcpts):
+        if rcpts == ["b@x.com"] and failures["b@x.com"]:
+            failures["b@x.com"] -= 1
+            return "451 4.3.0 try again later"
+        return None
+
+    handler = RecordingHandler(reject_data=reject_once)
+    transport = _transport(smtp_server(handler), batch_size=1)
+    draft_kwargs = dict(to="a@x.com, b@x.com, c@x.com", subject="s", body="b", idempotency_key="s1:m1")
+
+    async def scenario():
+        try:
+            with pytest.raises(MailServiceError):
+                await transport.send(MailDraft(**draft_kwargs))
+            # Aynı onayın tool retry'ı aynı anahtarla yeni bir taslak oluşturur
+            first = await transport.send(MailDraft(**draft_kwargs))
+            second = await transport.send(MailDraft(**draft_kwargs))
+            return first, second
+        finally:
+            await transport.close()
+
+    assert _run(scenario()) == ("EMAIL_SENT", "EMAIL_ALREADY_SENT")
+    assert sorted(handler.recipients()) == ["a@x.com", "b@x.com", "c@x.com"]
+
+
+def test_identical_mail_without_the_same_key_is_sent_again(smtp_server):
+    handler = RecordingHandler()
+    transport = _transport(smtp_server(handler))
+
+    async def scenario():
+        try:
+            results = []
+            # Anahtarsız ve farklı onaylara ait aynı içerikli mailler gerçek gönderimlerdir
+            for key in (None, None, "s1:m1", "s1:m2"):
+                results.append(
+                    await transport.send(MailDraft(to="a@x.com", subject="s", body="b", idempotency_key=key))
+                )
+            return results
+        finally:
+            await transport.close()
+
+    assert _run(scenario()) == ["EMAIL_SENT"] * 4
+    assert handler.recipients() == ["a@x.com"] * 4
+
+
+def test_closed_idle_connection_is_replaced(smtp_server):
+    handler = RecordingHandler()
+    controller = smtp_server(handler)
+    transport = _transport(controller)
+
+    async def scenario():
+        try:
+            await transport.send(MailDraft(to="a@x.com", subject="s1", body="b"))
+            # Kapanmış boştaki bağlantı atılır; sonraki gönderim yeni bağlantıyla yapılmalı
+            for conn in transport.pool._idle:
+                conn.client.close()
+            await transport.send(MailDraft(to="a@x.com", subject="s2", body="b"))
+        finally:
+            await transport.close()
+
+    _run(scenario())
+    assert handler.data_calls == 2
+    assert len(handler.delivered) == 2
@@ -0,0 +1,86 @@
+# tests/test_maintenance.py
+"""
+Retention silmesinin, seçimden sonra devam eden session'ları koruması.
+"""
+import gzip
+import json
+import sqlite3
+import time
+
+import pytest
+
+from app.configs.settings import settings
+from app.db.maintenance import _archive_and_delete, _expired_session_ids
+from app.db.run_schema import RUNS_DDL, RUNS_TABLE
+
+_SESSIONS_DDL = (
+    "CREATE TABLE agno_sessions (session_id VARCHAR PRIMARY KEY, session_type VARCHAR, agent_id VARCHAR,"
+    " team_id VARCHAR, workflow_id VARCHAR, user_id VARCHAR, session_data JSON, agent_data JSON,"
+    " team_data JSON, workflow_data JSON, metadata JSON, summary JSON, runs JSON,"
+    " created_at BIGINT NOT NULL, updated_at BIGINT)"
+)
+
+
+@pytest.fixture
+def inactive_days(monkeypatch):
+    monkeypatch.setattr(settings.database, "session_retention_days", 0)
+    monkeypatch.setattr(settings.database, "session_inactive_days", 30)
+
+
+def _create_db(path: str, session_ids, age_days: int) -> None:
+    stamp = int(time.time()) - age_days * 86400
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(_SESSIONS_DDL)
+        for statement in RUNS_DDL:
+            conn.execute(statement)
+        for session_id in session_ids:
+            conn.execute(
+                "INSERT INTO agno_sessions (session_id, session_type, created_at, updated_at) VALUES (?, 'agent', ?, ?)",
+                (session_id, stamp, stamp),
+            )
+            _add_run(conn, session_id, 0, stamp)
+    conn.close()
+
+
+def _add_run(conn: sqlite3.Connection, session_id: str, index: int, stamp: int) -> None:
+    conn.execute(
+        f"INSERT INTO {RUNS_TABLE} (session_id, run_index, run_id, agent_id, run_hash, run_data, created_at)"
+        " VALUES (?, ?, ?, 'agent', ?, ?, ?)",
+        (session_id, index, f"{session_id}-{index}", f"h{index}", json.dumps({"run_id": f"{session_id}-{index}"}), stamp),
+    )
+
+
+def test_session_resumed_after_selection_is_not_deleted(tmp_path, inactive_days):
+    db_file = str(tmp_path / "sessions.db")
+    archive_dir = tmp_path / "archive"
+    _create_db(db_file, ["s-old", "s-resumed"], age_days=60)
+
+    candidates = _expired_session_ids(db_file, 100)
+    assert sorted(candidates) == ["s-old", "s-resumed"]
+
+    # Seçimden sonra başka bir worker session'a yeni tur ekler
+    now = int(time.time())
+    conn = sqlite3.connect(db_file)
+    with conn:
+        conn.execute("UPDATE agno_sessions SET updated_at = ? WHERE session_id = 's-resumed'", (now,))
+        _add_run(conn, "s-resumed", 1, now)
+    conn.close()
+
+    assert _archive_and_delete(db_file, candidates, archive_dir) == ["s-old"]
+
+    conn = sqlite3.connect(db_file)
+    try:
+        remaining = [row[0] for row in conn.execute("SELECT session_id FROM agno_sessions")]
+        runs = conn.execute(f"SELECT session_id, run_index FROM {RUNS_TABLE} ORDER BY session_id, run_index").fetchall()
+    finally:
+        conn.close()
+    assert remaining == ["s-resumed"]
+    assert runs == [("s-resumed", 0), ("s-resumed", 1)]
+
+    archived = []
+    for path in archive_dir.glob("*.jsonl.gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            archived.extend(json.loads(line) for line in handle)
+    assert [record["session_id"] for record in archived] == ["s-old"]
+    assert archived[0]["runs"] == [{"run_id": "s-old-0"}]
@@ -0,0 +1,243 @@
+# tests/test_rate_limit.py
+"""
+FairScheduler davranış testleri ve stream slotunun yanıt başlamadan alınması.
+
+Agent limitleri (`weight`, `max_concurrency`) agents.json yerine test içinde
+verilir; slotlar tek slotlu bir scheduler'da "blocker" run'ı ile doldurulur.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from app.api import services
+from app.configs.exceptions import RateLimitExceededError
+from app.utils import rate_limit
+from app.utils.rate_limit import FairScheduler
+
+
+@pytest.fixture
+def limits(monkeypatch) -> Dict[str, Dict[str, float]]:
+    """agent_id -> limit override'ları; verilmeyen agent'lar weight=1, max_concurrency=0."""
+    overrides: Dict[str, Dict[str, float]] = {}
+
+    def fake_agent_limits(agent_id: str) -> Dict[str, float]:
+        return {"weight": 1.0, "max_concurrency": 0, **overrides.get(agent_id, {})}
+
+    monkeypatch.setattr(rate_limit, "agent_limits", fake_agent_limits)
+    return overrides
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _submit(scheduler: FairScheduler, user_id: str, agent_id: str, order: List[str]) -> asyncio.Task:
+    """Kuyruğa bir run ekler; slot aldığında sırayı kaydeder ve hemen bırakır."""
+
+    async def run() -> None:
+        await scheduler.acquire(user_id, agent_id)
+        order.append(f"{agent_id}:{user_id}")
+        scheduler.release(agent_id)
+
+    task = asyncio.create_task(run())
+    # Task'ın kuyruğa girmesi için
+    await asyncio.sleep(0)
+    return task
+
+
+async def _drain(scheduler: FairScheduler, agent_id: str, tasks: List[asyncio.Task]) -> None:
+    """Blocker slotunu bırakır ve kuyruktaki run'ların bitmesini bekler."""
+    scheduler.release(agent_id)
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=2)
+
+
+def test_users_share_an_agent_fairly(limits):
+    async def scenario() -> List[str]:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0)
+        await scheduler.acquire("blocker", "agent")
+        order: List[str] = []
+        tasks = [await _submit(scheduler, "heavy", "agent", order) for _ in range(3)]
+        tasks.append(await _submit(scheduler, "light", "agent", order))
+        await _drain(scheduler, "agent", tasks)
+        return [entry.split(":")[1] for entry in order]
+
+    # Sonradan gelen kullanıcı, çok istek atanın bütün kuyruğunu beklemez
+    assert _run(scenario()) == ["heavy", "light", "heavy", "heavy"]
+
+
+def test_agents_share_slots_by_weight(limits):
+    limits["fast"] = {"weight": 2.0}
+
+    async def scenario() -> List[str]:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0)
+        await scheduler.acquire("blocker", "fast")
+        order: List[str] = []
+        tasks = []
+        for _ in range(6):
+            tasks.append(await _submit(scheduler, "u1", "fast", order))
+            tasks.append(await _submit(scheduler, "u2", "slow", order))
+        await _drain(scheduler, "fast", tasks)
+        return [entry.split(":")[0] for entry in order]
+
+    first = _run(scenario())[:6]
+    assert first.count("fast") == 4
+    assert first.count("slow") == 2
+
+
+def test_max_concurrency_caps_an_agent_without_blocking_others(limits):
+    limits["capped"] = {"max_concurrency": 1}
+
+    async def scenario() -> None:
+        scheduler = FairScheduler(slots=4, max_queued_per_user=0, queue_timeout=0)
+        await scheduler.acquire("u1", "capped")
+        order: List[str] = []
+        waiting = await _submit(scheduler, "u2", "capped", order)
+        assert not waiting.done()
+        assert scheduler.queued == 1
+
+        # Sınırlı agent'ın bekleyeni, diğer agent'ların boş slotları almasını engellemez
+        await asyncio.wait_for(scheduler.acquire("u3", "other"), timeout=1)
+        scheduler.release("other")
+
+        scheduler.release("capped")
+        await asyncio.wait_for(waiting, timeout=2)
+        assert order == ["capped:u2"]
+        assert scheduler.running == 0
+
+    _run(scenario())
+
+
+def test_full_user_queue_is_rejected_with_429(limits):
+    async def scenario() -> RateLimitExceededError:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=1, queue_timeout=0)
+        await scheduler.acquire("blocker", "agent")
+        queued = await _submit(scheduler, "u1", "agent", [])
+        with pytest.raises(RateLimitExceededError) as excinfo:
+            await scheduler.acquire("u1", "agent")
+        # Başka kullanıcının kuyruğu etkilenmez
+        other = await _submit(scheduler, "u2", "agent", [])
+        await _drain(scheduler, "agent", [queued, other])
+        return excinfo.value
+
+    error = _run(scenario())
+    assert error.limit == "queue_full"
+    assert error.retry_after_seconds >= 1
+
+
+def test_queue_timeout_is_rejected_with_429_and_leaves_no_waiter(limits):
+    async def scenario() -> FairScheduler:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0.05)
+        await scheduler.acquire("blocker", "agent")
+        with pytest.raises(RateLimitExceededError) as excinfo:
+            await scheduler.acquire("u1", "agent")
+        assert excinfo.value.limit == "queue_timeout"
+        assert excinfo.value.retry_after_seconds == 1
+        scheduler.release("agent")
+        return scheduler
+
+    scheduler = _run(scenario())
+    assert scheduler.queued == 0
+    assert scheduler.running == 0
+    assert scheduler.timeouts == 1
+
+
+def test_cancelled_waiter_leaves_the_queue(limits):
+    async def scenario() -> FairScheduler:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0)
+        await scheduler.acquire("blocker", "agent")
+        waiting = await _submit(scheduler, "u1", "agent", [])
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.queued == 0
+        scheduler.release("agent")
+        return scheduler
+
+    scheduler = _run(scenario())
+    assert scheduler.running == 0
+
+
+def test_cancel_after_dispatch_releases_the_slot(limits):
+    async def scenario() -> FairScheduler:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0)
+        await scheduler.acquire("blocker", "agent")
+        order: List[str] = []
+        waiting = await _submit(scheduler, "u1", "agent", order)
+        # Slot bu waiter'a verilir, ama task devam etmeden iptal edilir
+        scheduler.release("agent")
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert order == []
+        # Slot sızmadıysa yeni run beklemeden başlar
+        assert await scheduler.acquire("u2", "agent") == 0.0
+        scheduler.release("agent")
+        return scheduler
+
+    scheduler = _run(scenario())
+    assert scheduler.running == 0
+
+
+class _StreamingAgent:
+    """agent.arun(stream=True) gibi async generator dönen minimum agent."""
+
+    id = "agent"
+    output_schema = None
+
+    def arun(self, **kwargs: Any):
+        async def chunks():
+            for text in ("a", "b"):
+                yield text
+
+        return chunks()
+
+
+def test_stream_slot_is_taken_before_the_response(limits, monkeypatch):
+    async def scenario() -> None:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0.05)
+        monkeypatch.setattr(services, "get_scheduler", lambda: scheduler)
+        agent = _StreamingAgent()
+
+        stream = await services.run_agent(agent, "merhaba", "u1", "s1", stream=True)
+        assert scheduler.running == 1
+
+        # Slot doluyken ikinci stream yanıt oluşmadan 429 verir
+        with pytest.raises(RateLimitExceededError):
+            await services.run_agent(agent, "merhaba", "u2", "s2", stream=True)
+
+        assert [chunk async for chunk in stream] == ["a", "b"]
+        assert scheduler.running == 0
+
+        # Hiç iterasyon yapılmadan kapanan stream de slotu bırakır
+        unread = await services.run_agent(agent, "merhaba", "u3", "s3", stream=True)
+        assert scheduler.running == 1
+        await unread.aclose()
+        await unread.aclose()
+        assert scheduler.running == 0
+
+    _run(scenario())
+
+
+def test_streaming_response_releases_slot_when_body_never_starts(limits, monkeypatch):
+    async def scenario() -> None:
+        scheduler = FairScheduler(slots=1, max_queued_per_user=0, queue_timeout=0)
+        monkeypatch.setattr(services, "get_scheduler", lambda: scheduler)
+        stream = await services.run_agent(_StreamingAgent(), "merhaba", "u1", "s1", stream=True)
+
+        async def body():
+            async for chunk in stream:
+                yield chunk
+
+        response = services.SlotStreamingResponse(body(), stream, media_type="text/event-stream")
+
+        async def receive() -> Dict[str, Any]:
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict[str, Any]) -> None:
+            raise OSError("client went away")
+
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(Exception):
+            await response(scope, receive, send)
+        assert scheduler.running == 0
+
+    _run(scenario())
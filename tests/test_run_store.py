@@ -0,0 +1,82 @@
+# tests/test_run_store.py
+"""
+runs blob'larının run tablosuna taşınması ve `agno_sessions_with_runs` view'ı.
+"""
+import json
+import sqlite3
+from typing import Dict, List
+
+from app.db.run_schema import RUNS_DDL, RUNS_TABLE, RUNS_VIEW, decode_runs_column
+from app.db.run_store import migrate_runs
+
+_SESSIONS_DDL = (
+    "CREATE TABLE agno_sessions (session_id VARCHAR PRIMARY KEY, session_type VARCHAR, agent_id VARCHAR,"
+    " team_id VARCHAR, workflow_id VARCHAR, user_id VARCHAR, session_data JSON, agent_data JSON,"
+    " team_data JSON, workflow_data JSON, metadata JSON, summary JSON, runs JSON,"
+    " created_at BIGINT NOT NULL, updated_at BIGINT)"
+)
+
+
+def _runs(session_id: str, count: int) -> List[Dict]:
+    return [
+        {"run_id": f"{session_id}-{index}", "agent_id": "agent", "content": f"cevap {index} ğüşiöç", "created_at": 100 + index}
+        for index in range(count)
+    ]
+
+
+def _create_db(path: str) -> Dict[str, List[Dict]]:
+    sessions = {"s-plain": _runs("s-plain", 3), "s-double": _runs("s-double", 2), "s-empty": []}
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(_SESSIONS_DDL)
+        for session_id, runs in sessions.items():
+            raw = json.dumps(runs, ensure_ascii=False)
+            if session_id == "s-double":
+                # agno runs'ı JSON kolona JSON string olarak yazabiliyor
+                raw = json.dumps(raw)
+            conn.execute(
+                "INSERT INTO agno_sessions (session_id, session_type, runs, created_at) VALUES (?, 'agent', ?, 1)",
+                (session_id, raw),
+            )
+        conn.execute(
+            "INSERT INTO agno_sessions (session_id, session_type, runs, created_at) VALUES ('s-null', 'agent', NULL, 1)"
+        )
+        for statement in RUNS_DDL:
+            conn.execute(statement)
+    conn.close()
+    sessions["s-null"] = []
+    return sessions
+
+
+def _view_runs(path: str) -> Dict[str, List[Dict]]:
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(f"SELECT session_id, runs FROM {RUNS_VIEW}").fetchall()
+    finally:
+        conn.close()
+    return {session_id: decode_runs_column(runs) for session_id, runs in rows}
+
+
+def test_migrated_runs_are_identical_through_the_view(tmp_path):
+    db_file = str(tmp_path / "sessions.db")
+    expected = _create_db(db_file)
+
+    # Taşınmamış session'lar view'da blob'daki run'larıyla görünür
+    assert _view_runs(db_file) == expected
+
+    assert migrate_runs(db_file, batch_size=2) == {"sessions": 3, "runs": 5}
+    assert _view_runs(db_file) == expected
+
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM agno_sessions WHERE runs IS NOT NULL").fetchone()[0] == 0
+        indexes = conn.execute(
+            f"SELECT run_index FROM {RUNS_TABLE} WHERE session_id = 's-plain' ORDER BY run_index"
+        ).fetchall()
+    finally:
+        conn.close()
+    assert [row[0] for row in indexes] == [0, 1, 2]
+
+    # Tekrar çalıştırmak bir şey değiştirmez
+    assert migrate_runs(db_file) == {"sessions": 0, "runs": 0}
+    assert _view_runs(db_file) == expected
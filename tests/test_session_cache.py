@@ -0,0 +1,134 @@
+# tests/test_session_cache.py
+"""
+Session cache'in worker'lar arası tutarlılığı.
+
+Her "worker" aynı SQLite dosyasını kullanan ayrı bir `AgentSessionDb` ve kendi
+`SessionCache`'idir; invalidation bus'ı da ortak bir geçici dosyadır.
+"""
+import asyncio
+import sqlite3
+import time
+from typing import List
+
+from agno.db.base import SessionType
+from agno.run.agent import RunOutput
+from agno.session import AgentSession
+
+from app.db.run_store import agent_history_scope
+from app.db.session_cache import SessionCache, SqliteInvalidationBus
+from app.db.sqlite import AgentSessionDb
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _worker(db_file: str) -> AgentSessionDb:
+    return AgentSessionDb(
+        db_file=db_file,
+        session_cache=SessionCache(max_bytes=1024 * 1024, ttl_seconds=60),
+    )
+
+
+async def _read(db: AgentSessionDb, session_id: str) -> AgentSession:
+    # Agent'ın geçmiş okuması gibi: append-only run'larda yalnız bu kapsam cache'lenir
+    with agent_history_scope(10):
+        return await db.get_session(session_id, SessionType.AGENT)
+
+
+def _run_ids(session: AgentSession) -> List[str]:
+    return [run.run_id for run in session.runs or []]
+
+
+def test_stale_cached_session_is_reloaded_before_upsert(tmp_path):
+    db_file = str(tmp_path / "sessions.db")
+
+    async def scenario() -> None:
+        worker_a, worker_b = _worker(db_file), _worker(db_file)
+        try:
+            session = AgentSession(session_id="s1", agent_id="agent", user_id="u1", created_at=int(time.time()))
+            session.runs = [RunOutput(run_id="r1", agent_id="agent", session_id="s1")]
+            await worker_a.upsert_session(session)
+
+            # Turn'ün başladığı kopya eski bir versiyona ait olsun
+            conn = sqlite3.connect(db_file)
+            with conn:
+                conn.execute("UPDATE agno_sessions SET updated_at = updated_at - 100")
+            conn.close()
+            worker_a.session_cache.clear()
+
+            stale = await _read(worker_a, "s1")
+            assert "s1" in worker_a.session_cache
+
+            # Diğer worker aynı session'a bir tur ekler
+            fresh = await _read(worker_b, "s1")
+            fresh.runs.append(RunOutput(run_id="r2", agent_id="agent", session_id="s1"))
+            await worker_b.upsert_session(fresh)
+
+            # Bayat kopya üzerinden gelen tur r2'yi silmemeli
+            stale.runs.append(RunOutput(run_id="r3", agent_id="agent", session_id="s1"))
+            result = await worker_a.upsert_session(stale)
+            assert _run_ids(result) == ["r1", "r2", "r3"]
+            assert worker_a.session_cache.stale_writes == 1
+            assert _run_ids(await _read(worker_a, "s1")) == ["r1", "r2", "r3"]
+
+            # Aynı nesnenin tekrar yazılması kendi yazısını bayat saymaz
+            await worker_a.upsert_session(stale)
+            assert worker_a.session_cache.stale_writes == 1
+
+            worker_b.session_cache.clear()
+            assert _run_ids(await _read(worker_b, "s1")) == ["r1", "r2", "r3"]
+        finally:
+            await worker_a.dispose()
+            await worker_b.dispose()
+
+    _run(scenario())
+
+
+async def _wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+def test_entry_invalidated_through_the_bus_is_not_served(tmp_path):
+    db_file = str(tmp_path / "sessions.db")
+    bus_file = str(tmp_path / "bus.db")
+
+    async def scenario() -> None:
+        worker_a, worker_b = _worker(db_file), _worker(db_file)
+        buses = [
+            SqliteInvalidationBus(worker.session_cache, db_file=bus_file, poll_seconds=0.01)
+            for worker in (worker_a, worker_b)
+        ]
+        tasks = [asyncio.create_task(bus.run()) for bus in buses]
+        try:
+            # İlk senkronizasyon geçmiş satırları atlar; yazmadan önce beklenir
+            await _wait_until(lambda: all(bus._last_seq is not None for bus in buses))
+
+            session = AgentSession(session_id="s1", agent_id="agent", user_id="u1", created_at=int(time.time()))
+            session.runs = [RunOutput(run_id="r1", agent_id="agent", session_id="s1")]
+            await worker_b.upsert_session(session)
+
+            assert _run_ids(await _read(worker_a, "s1")) == ["r1"]
+            assert "s1" in worker_a.session_cache
+
+            # Diğer worker'ın yazması bus üzerinden A'nın kaydını siler
+            fresh = await _read(worker_b, "s1")
+            fresh.runs.append(RunOutput(run_id="r2", agent_id="agent", session_id="s1"))
+            await worker_b.upsert_session(fresh)
+            await _wait_until(lambda: "s1" not in worker_a.session_cache)
+
+            hits = worker_a.session_cache.hits
+            assert _run_ids(await _read(worker_a, "s1")) == ["r1", "r2"]
+            assert worker_a.session_cache.hits == hits
+            assert worker_a.session_cache.invalidations >= 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await worker_a.dispose()
+            await worker_b.dispose()
+
+    _run(scenario())
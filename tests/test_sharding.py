@@ -0,0 +1,97 @@
+# tests/test_sharding.py
+"""
+Shard sayısı değişince `rebalance`'ın session'ları kaybetmeden/çoğaltmadan taşıması.
+"""
+import json
+import sqlite3
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from app.db.hash_ring import HashRing, existing_shard_files
+from app.db.run_schema import RUNS_DDL, RUNS_TABLE
+from app.db.sharding import rebalance
+
+_SESSIONS_DDL = (
+    "CREATE TABLE agno_sessions (session_id VARCHAR PRIMARY KEY, session_type VARCHAR, agent_id VARCHAR,"
+    " team_id VARCHAR, workflow_id VARCHAR, user_id VARCHAR, session_data JSON, agent_data JSON,"
+    " team_data JSON, workflow_data JSON, metadata JSON, summary JSON, runs JSON,"
+    " created_at BIGINT NOT NULL, updated_at BIGINT)"
+)
+_VERSIONS_DDL = "CREATE TABLE agno_schema_versions (table_name VARCHAR PRIMARY KEY, version VARCHAR NOT NULL)"
+
+SESSION_COUNT = 120
+
+
+def _create_db(path: str) -> None:
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(_SESSIONS_DDL)
+        conn.execute(_VERSIONS_DDL)
+        conn.execute("INSERT INTO agno_schema_versions VALUES ('agno_sessions', '2.0.0')")
+        for statement in RUNS_DDL:
+            conn.execute(statement)
+        for number in range(SESSION_COUNT):
+            session_id = f"s-{number}"
+            conn.execute(
+                "INSERT INTO agno_sessions (session_id, session_type, user_id, created_at) VALUES (?, 'agent', ?, 1)",
+                (session_id, f"u-{number % 7}"),
+            )
+            # Session başına farklı sayıda run
+            for index in range(number % 3 + 1):
+                conn.execute(
+                    f"INSERT INTO {RUNS_TABLE} (session_id, run_index, run_id, agent_id, run_hash, run_data, created_at)"
+                    " VALUES (?, ?, ?, 'agent', 'h', ?, 1)",
+                    (session_id, index, f"{session_id}-{index}", json.dumps({"run_id": f"{session_id}-{index}"})),
+                )
+    conn.close()
+
+
+def _snapshot(db_file: str) -> Tuple[Dict[int, List[str]], Dict[str, Tuple[int, int]]]:
+    """Shard başına session_id'ler ve session_id -> (shard, run sayısı)."""
+    by_shard: Dict[int, List[str]] = {}
+    runs: Dict[str, Tuple[int, int]] = {}
+    for index, path in existing_shard_files(db_file):
+        conn = sqlite3.connect(path)
+        try:
+            by_shard[index] = [row[0] for row in conn.execute("SELECT session_id FROM agno_sessions")]
+            for session_id, count in conn.execute(
+                f"SELECT session_id, COUNT(*) FROM {RUNS_TABLE} GROUP BY session_id"
+            ):
+                runs[session_id] = (index, count)
+        finally:
+            conn.close()
+    return by_shard, runs
+
+
+def _assert_placed(db_file: str, shard_count: int) -> None:
+    ring = HashRing(shard_count)
+    by_shard, runs = _snapshot(db_file)
+    placed = Counter(session_id for ids in by_shard.values() for session_id in ids)
+    # Her session tam olarak bir kez, ring'in gösterdiği shard'da
+    assert sorted(placed) == sorted(f"s-{number}" for number in range(SESSION_COUNT))
+    assert set(placed.values()) == {1}
+    for index, ids in by_shard.items():
+        assert all(ring.shard_for(session_id) == index for session_id in ids)
+    # Run'lar session'larıyla aynı dosyada ve eksiksiz
+    for number in range(SESSION_COUNT):
+        session_id = f"s-{number}"
+        assert runs[session_id] == (ring.shard_for(session_id), number % 3 + 1)
+
+
+def test_rebalance_to_more_shards_and_back(tmp_path):
+    db_file = str(tmp_path / "sessions.db")
+    _create_db(db_file)
+
+    result = rebalance(db_file, shard_count=4)
+    assert result["moved"] > 0
+    assert len(existing_shard_files(db_file)) == 4
+    _assert_placed(db_file, 4)
+
+    # Tekrar çalıştırmak bir şey taşımaz
+    assert rebalance(db_file, shard_count=4)["moved"] == 0
+    _assert_placed(db_file, 4)
+
+    rebalance(db_file, shard_count=1)
+    _assert_placed(db_file, 1)
+    by_shard, _ = _snapshot(db_file)
+    assert all(not ids for index, ids in by_shard.items() if index != 0)
@@ -0,0 +1,54 @@
+# tests/test_usage.py
+"""
+UsageAccountant'ın agno_metrics'e flush'ı.
+
+Her accountant bir worker process'ini temsil eder: kendi bağlantısıyla aynı
+günün satırını okuyup üzerine ekler.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+
+from app.utils.usage import USAGE_AGGREGATION_PERIOD, UsageAccountant
+
+
+def _stored_totals(db_file: str) -> dict:
+    conn = sqlite3.connect(db_file)
+    try:
+        rows = conn.execute(
+            "SELECT token_metrics FROM agno_metrics WHERE aggregation_period = ?", (USAGE_AGGREGATION_PERIOD,)
+        ).fetchall()
+    finally:
+        conn.close()
+    assert len(rows) == 1
+    return json.loads(rows[0][0])
+
+
+def test_concurrent_flushes_do_not_lose_usage(tmp_path):
+    db_file = str(tmp_path / "usage.db")
+    workers, flushes = 4, 40
+    errors = []
+
+    def worker(index: int) -> None:
+        accountant = UsageAccountant(db_file, {"model": {"input": 1.0, "output": 1.0}})
+        try:
+            for _ in range(flushes):
+                accountant.record(f"user-{index}", "agent", "model", 10, 5)
+                asyncio.run(accountant.flush())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    totals = _stored_totals(db_file)
+    assert totals["runs"] == workers * flushes
+    assert totals["total_tokens"] == workers * flushes * 15
+    assert {user: value["runs"] for user, value in totals["by_user"].items()} == {
+        f"user-{index}": flushes for index in range(workers)
+    }